@@ -13,22 +13,37 @@ import logging
 from typing import Dict, Any, Optional, Tuple
 from datetime import timedelta
 
-from django.db.models import Sum, Avg, Q
+from django.db.models import Sum
 from django.utils import timezone
-from django.core.cache import cache
 
-from product_app.models import Product, Inventory, Category, SalesHistory, Trend
+from backend.cache import CacheNamespace
+
+from product_app.models import (
+    Category,
+    CategorySalesRollup,
+    Inventory,
+    InventoryTotals,
+    Product,
+    SalesStats,
+    Trend,
+)
+from product_app.services.inventory_totals import category_totals, read_totals
+from product_app.services.forecasting import read_forecast
+from product_app.services.name_index import get_name_index, normalize
+from product_app.services.reorder import reorder_for
 
 from .utils import (
     FUZZY_CUTOFF,
-    MAX_FUZZY_SEARCH,
-    LOW_STOCK_THRESHOLD,
+    RECENT_SALES_WINDOW,
+    CATEGORY_SALES_MONTHS,
     RECENT_TREND_DAYS,
     DEFAULT_INVENTORY_TYPE,
 )
 
 logger = logging.getLogger(__name__)
 
+HOT_TRENDS_CACHE = CacheNamespace("ai_hot_trends")
+
 
 # ============================================================================
 # QUERY TYPE DETECTION
@@ -83,68 +98,38 @@ def detect_query_type(user_query: str) -> Tuple[bool, bool, bool]:
 
 def find_best_product_match(query: str) -> Optional[Product]:
     """
-    Find the best matching product for a user query using multi-tier search.
+    Find the best matching product for a user query using the in-process
+    product name index (product_app/services/name_index.py), which covers
+    the whole catalog.
     
     Search strategy (in order of priority):
-    1. Direct match: Exact substring match on product name or SKU
-    2. PostgreSQL full-text search: Trigram similarity with ranking
-    3. Difflib fuzzy match: Fallback for non-PostgreSQL databases
+    1. Exact match: Whole product name or SKU (normalized)
+    2. Prefix match: Name, SKU or a later name word starts with the query
+    3. Fuzzy match: Trigram overlap (typos, or a sentence mentioning the product)
     4. Category fallback: Match by category name if no product found
     
+    Only the selected product is loaded from the database.
+    
     Returns:
         Product object if match found, None otherwise
     """
     if not query:
         return None
 
-    base_qs = Product.objects.all()
-    logger.debug(f"MATCH DEBUG | Total products available: {base_qs.count()}")
-
-    # TIER 1: Direct substring match (fastest, most accurate)
-    q_obj = Q(name__icontains=query) | Q(sku__icontains=query)
-    match_qs = base_qs.filter(q_obj)
-    logger.debug(f"MATCH DEBUG | Direct match count for '{query}': {match_qs.count()}")
-    if match_qs.exists():
-        match = match_qs.first()
-        logger.debug(f"MATCH DEBUG | Direct match selected: {match.name} (ID: {match.id})")
-        return match
-
-    # TIER 2: PostgreSQL full-text search with trigram similarity
-    try:
-        from django.contrib.postgres.search import SearchVector, SearchQuery, SearchRank
-        vector = SearchVector('name', weight='A') + SearchVector('sku', weight='B')
-        query_vec = SearchQuery(query)
-        # SearchRank for annotation; order by rank for relevance
-        fuzzy_match = base_qs.annotate(
-            rank=SearchRank(vector, query_vec)
-        ).filter(rank__gt=FUZZY_CUTOFF).order_by('-rank').first()
-        if fuzzy_match:
-            logger.debug(f"MATCH DEBUG | Trigram fuzzy match: {fuzzy_match.name} (rank: {fuzzy_match.rank})")
-            return fuzzy_match
-    except (ImportError, AttributeError) as e:
-        logger.debug(f"PostgreSQL search failed ({e}); falling back to difflib")
-
-    # TIER 3: Difflib fuzzy matching (works on any database)
-    recent_values = base_qs.values_list("name", "sku")[:MAX_FUZZY_SEARCH]
-    all_refs = [ref.lower() for name, sku in recent_values for ref in (name, sku) if ref]
-    if not all_refs:
-        logger.debug(f"MATCH DEBUG | No references for difflib")
-        return None
+    index = get_name_index()
+    logger.debug(f"MATCH DEBUG | Indexed products available: {len(index)}")
 
-    # Find closest string match using sequence matching
-    best = difflib.get_close_matches(query.lower(), all_refs, n=1, cutoff=FUZZY_CUTOFF)
-    if best:
-        match = best[0].title()
-        ret = base_qs.filter(Q(name__iexact=match) | Q(sku__iexact=match)).first()
-        logger.debug(f"MATCH DEBUG | Difflib match attempted '{match}' -> selected: {ret.name if ret else 'None'}")
-        return ret
+    # TIERS 1-3: exact, prefix, fuzzy
+    match = index.best_match(query, cutoff=FUZZY_CUTOFF)
+    if match:
+        logger.debug(f"MATCH DEBUG | {match.match} match selected: {match.name} (ID: {match.product_id}, score {match.score:.2f})")
+        return Product.objects.select_related("category").filter(pk=match.product_id).first()
 
     # TIER 4: Category fallback (when query might be a category name)
-    categories = list(Category.objects.values_list("name", flat=True)[:20])
-    cat_matches = difflib.get_close_matches(query.lower(), [c.lower() for c in categories], n=1, cutoff=0.4)
+    cat_matches = difflib.get_close_matches(normalize(query), index.category_names(), n=1, cutoff=0.4)
     if cat_matches:
-        category = Category.objects.filter(name__iexact=cat_matches[0].title()).first()
-        ret = category.products.first() if category else None
+        product_id = index.first_product_in_category(cat_matches[0])
+        ret = Product.objects.select_related("category").filter(pk=product_id).first()
         logger.debug(f"MATCH DEBUG | Category fallback '{cat_matches[0]}' -> product: {ret.name if ret else 'None'}")
         return ret
 
@@ -162,36 +147,48 @@ def get_category_insights(category_name: str) -> Dict[str, Any]:
     
     Calculates:
     - Total stock across all products in category
-    - Average daily sales (last 30 days)
+    - Average daily sales (RECENT_SALES_WINDOW rolling window)
     - Count of low-stock items
     - Total product count
+    - Units sold in the last CATEGORY_SALES_MONTHS months (monthly rollups)
     
-    Uses ORM aggregates for performance (no Python loops).
+    Stock figures come from the category's InventoryTotals row (no Inventory scan).
     """
     category = Category.objects.filter(name__iexact=category_name).first()
     if not category:
         return {"error": "Category not found"}
 
-    thirty_days_ago = timezone.now().date() - timedelta(days=RECENT_TREND_DAYS)
-    products = category.products.all()
-
-    total_stock = Inventory.objects.filter(product__in=products).aggregate(total=Sum('total_stock'))['total'] or 0
-    avg_sales = SalesHistory.objects.filter(
-        product__in=products, date__gte=thirty_days_ago
-    ).aggregate(avg=Avg('units_sold'))['avg'] or 0.0
-    low_stock_count = Inventory.objects.filter(
-        product__in=products, total_stock__lt=LOW_STOCK_THRESHOLD
-    ).count()
+    totals = read_totals(InventoryTotals.key_for(category.pk))
+    avg_sales = _recent_average_daily_sales(SalesStats.objects.filter(product__category=category))
+    monthly = CategorySalesRollup.objects.filter(category=category, grain="month").order_by("-period_start")
 
     return {
         "category": category_name,
-        "total_stock": total_stock,
+        "total_stock": totals.total_stock,
         "average_daily_sales": float(avg_sales),
-        "low_stock_items": low_stock_count,
-        "product_count": products.count(),
+        "low_stock_items": totals.low_stock_count + totals.out_of_stock_count,
+        "product_count": totals.product_count,
+        "monthly_units_sold": [
+            {"month": row.period_start.strftime("%Y-%m"), "units_sold": row.units_sold}
+            for row in monthly[:CATEGORY_SALES_MONTHS]
+        ],
     }
 
 
+def _recent_average_daily_sales(stats_qs) -> float:
+    """
+    Average units per recorded sales day over RECENT_SALES_WINDOW, read from the
+    pre-aggregated rolling SalesStats instead of scanning SalesHistory.
+    """
+    totals = stats_qs.aggregate(
+        units=Sum(f"units_{RECENT_SALES_WINDOW}d"),
+        days=Sum(f"days_{RECENT_SALES_WINDOW}d"),
+    )
+    if not totals["days"]:
+        return 0.0
+    return (totals["units"] or 0) / totals["days"]
+
+
 def get_total_inventory_overview() -> Dict[str, Any]:
     """
     Get comprehensive overview of entire inventory system.
@@ -199,46 +196,32 @@ def get_total_inventory_overview() -> Dict[str, Any]:
     Provides high-level metrics:
     - Total stock units across all products
     - Total number of products
-    - Average daily sales (last 30 days)
+    - Average daily sales (RECENT_SALES_WINDOW rolling window)
     - Low stock and out-of-stock counts
     - Top 5 categories by stock volume
     - Restock recommendation flag
     
     Used for general inventory queries like "what's my total stock?"
     """
-    total_stock = Inventory.objects.aggregate(total=Sum('total_stock'))['total'] or 0
-    total_products = Product.objects.count()
-    
-    thirty_days_ago = timezone.now().date() - timedelta(days=RECENT_TREND_DAYS)
-    avg_sales = SalesHistory.objects.filter(
-        date__gte=thirty_days_ago
-    ).aggregate(avg=Avg('units_sold'))['avg'] or 0.0
-    
-    low_stock_count = Inventory.objects.filter(
-        total_stock__lt=LOW_STOCK_THRESHOLD
-    ).count()
-    
-    out_of_stock_count = Inventory.objects.filter(total_stock=0).count()
-    
-    # Get top categories by stock
-    top_categories = Inventory.objects.values(
-        'product__category__name'
-    ).annotate(
-        category_stock=Sum('total_stock')
-    ).order_by('-category_stock')[:5]
-    
+    totals = read_totals()
+    avg_sales = _recent_average_daily_sales(SalesStats.objects.all())
+    low_stock_count = totals.low_stock_count + totals.out_of_stock_count
+
+    # Top categories by stock, from the per-category totals rows
+    top_categories = category_totals(limit=5)
+
     return {
         "query_type": "general_inventory",
-        "total_stock": total_stock,
-        "total_products": total_products,
+        "total_stock": totals.total_stock,
+        "total_products": totals.product_count,
         "average_daily_sales": float(avg_sales),
         "low_stock_items": low_stock_count,
-        "out_of_stock_items": out_of_stock_count,
+        "out_of_stock_items": totals.out_of_stock_count,
         "top_categories": [
-            {"category": cat['product__category__name'] or "Uncategorized", "stock": cat['category_stock']}
-            for cat in top_categories
+            {"category": row.category.name if row.category else "Uncategorized", "stock": row.total_stock}
+            for row in top_categories
         ],
-        "restock_needed": low_stock_count > 0 or out_of_stock_count > 0,
+        "restock_needed": low_stock_count > 0,
     }
 
 
@@ -250,7 +233,8 @@ def get_product_facts(product: Product) -> Tuple[Dict[str, Any], Dict[str, Any]
         Tuple containing:
         - facts: Dict with item name, current_stock, average_daily_sales
         - supplier_info: Dict with supplier name and email (or None)
-        - forecast: Dict with projected_days (or None)
+        - forecast: Dict with projected_days, the stored forecast (method, expected sales)
+          and reorder_point / must_order_by (or None)
     """
     avg_sales = 0.0
     current_stock = 0
@@ -273,9 +257,21 @@ def get_product_facts(product: Product) -> Tuple[Dict[str, Any], Dict[str, Any]
         logger.warning(f"INVENTORY DEBUG | Error accessing inventory fields for {product.name} (ID {product.id}): {e} - defaulting to 0")
         inv_exists = False
 
-    # Calculate forecast and gather supplier info
-    forecast = {"projected_days": round(current_stock / max(avg_sales, 0.01), 1)} if avg_sales > 0 or current_stock > 0 else None
-    supplier_info = {"name": product.supplier.name, "email": product.supplier.contact_email} if hasattr(product, 'supplier') and product.supplier else None
+    # Forecast: stored batch forecast (manage.py fit_demand_forecasts), else the 30-day average
+    supplier = product.supplier if hasattr(product, 'supplier') else None
+    stored = read_forecast(product.id)
+    daily_rate = stored.daily_rate if stored else avg_sales
+    forecast = {"projected_days": round(current_stock / max(daily_rate, 0.01), 1)} if daily_rate > 0 or current_stock > 0 else None
+    if forecast and stored:
+        forecast.update({
+            "method": stored.method,
+            "expected_daily_sales": round(stored.daily_rate, 2),
+            "expected_sales_30d": round(stored.forecast_30d),
+        })
+    if forecast and daily_rate > 0:
+        # Same reorder maths as the catalog report (supplier lead time + safety stock)
+        forecast.update(reorder_for(current_stock, daily_rate, supplier.lead_time_days if supplier else None))
+    supplier_info = {"name": supplier.name, "email": supplier.contact_email} if supplier else None
 
     # Build facts dict
     facts = {
@@ -302,8 +298,8 @@ def get_trend_facts(user_query: str) -> Dict[str, Any]:
     
     # Detect season from query for targeted trend data
     season_match = next((word for word in ["Christmas", "Summer", "Winter"] if word.lower() in user_query.lower()), "General")
-    cache_key = f"hot_trends_{DEFAULT_INVENTORY_TYPE}_{season_match.lower()}"
-    hot_trends = cache.get(cache_key)
+    cache_key = f"{DEFAULT_INVENTORY_TYPE}_{season_match.lower()}"
+    hot_trends = HOT_TRENDS_CACHE.get(cache_key)
     
     if not hot_trends:
         hot_trends_qs = Trend.objects.filter(
@@ -338,7 +334,7 @@ def get_trend_facts(user_query: str) -> Dict[str, Any]:
                 "hot_trends": hot_trends,
                 "prediction_hint": f"Prioritize high hot_score for {season_match} season. Higher scores indicate rising demand."
             }
-            cache.set(cache_key, hot_trends, 3600)
+            HOT_TRENDS_CACHE.set(cache_key, hot_trends, 3600)
             facts.update(trends_data)
             logger.info(f"Trend query detected: {season_match} | Found {len(hot_trends)} trend keywords from {hot_trends_qs.count()} trend entries")
         else:
@@ -1,3 +1,90 @@
-from django.test import TestCase
+import json
+from unittest import mock
 
-# Create your tests here.
+from django.core.cache import cache
+from django.test import RequestFactory, SimpleTestCase, TestCase
+
+from backend.testing import QueryBudgetMixin
+from product_app.models import Category, Product, SalesHistory
+
+from .utils import MAX_REQUESTS_PER_WINDOW, RATE_LIMIT_WINDOW, rate_limit_check
+
+
+class AskLlmQueryBudgetTests(QueryBudgetMixin, TestCase):
+    """
+    Query budgets for each branch of POST /api/ai/ask/ (Ollama is mocked).
+    A budget that fails means the branch gained queries: fix the loop, or
+    raise the number here on purpose in the same change.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        beverages = Category.objects.create(name="Beverages")
+        snacks = Category.objects.create(name="Snacks")
+        for i in range(20):
+            product = Product.objects.create(
+                sku=f"SKU-{i:03d}", name=f"Coffee Blend {i}" if i < 10 else f"Crisps {i}",
+                category=beverages if i < 10 else snacks,
+            )
+            SalesHistory.objects.create(product=product, date="2026-01-01", units_sold=i)
+
+    def setUp(self):
+        cache.clear()
+        patcher = mock.patch("ai_assistant.views.call_ollama", return_value={"answer": "ok"})
+        self.call_ollama = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def ask(self, query):
+        response = self.client.post("/api/ai/ask/", json.dumps({"query": query}), content_type="application/json")
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_general_overview(self):
+        with self.assertQueryBudget(3):  # global totals, sales stats, per-category totals
+            answer = self.ask("What is my total stock?")
+        self.assertEqual(answer["total_products"], 20)
+        self.call_ollama.assert_not_called()
+
+    def test_trend(self):
+        with self.assertQueryBudget(1):  # recent-trend existence check
+            self.ask("Predict the trend for christmas")
+        self.call_ollama.assert_called_once()
+
+    def test_product(self):
+        with self.assertQueryBudget(4):  # name index build (cold), product, inventory, forecast
+            self.ask("How much Coffee Blend 3 do we have?")
+        self.call_ollama.assert_called_once()
+
+    def test_category(self):
+        with self.assertQueryBudget(6):  # name index build (cold), product, category, totals, sales stats, monthly rollups
+            self.ask("Show the category of Coffee Blend 3")
+        self.call_ollama.assert_called_once()
+
+    def test_not_found(self):
+        with self.assertQueryBudget(1):  # name index build (cold)
+            self.ask("How many zzqx do we have?")
+        self.call_ollama.assert_not_called()
+
+
+class RateLimitTests(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+        self.request = RequestFactory().post("/api/ai/ask/", REMOTE_ADDR="203.0.113.7")
+
+    def allowed(self, at):
+        with mock.patch("ai_assistant.utils.time.time", return_value=at):
+            return rate_limit_check(self.request)
+
+    def test_window_slides_across_the_boundary(self):
+        start = 1000 * RATE_LIMIT_WINDOW + RATE_LIMIT_WINDOW - 10  # 10 s before a window boundary
+        self.assertTrue(all(self.allowed(start) for _ in range(MAX_REQUESTS_PER_WINDOW)))
+        self.assertFalse(self.allowed(start))
+
+        # 20 s later a fixed window would allow another full burst; most of it is still in the last minute
+        later = start + 20
+        self.assertTrue(self.allowed(later))
+        self.assertFalse(self.allowed(later))
+
+        # Once the burst has slid out, the full allowance is back
+        after = start + RATE_LIMIT_WINDOW * 3
+        self.assertTrue(all(self.allowed(after) for _ in range(MAX_REQUESTS_PER_WINDOW)))
@@ -16,6 +16,9 @@ from typing import Dict, Any, Union
 import time
 import logging
 
+from backend.cache import CacheNamespace
+from product_app.models import SALES_WINDOWS
+
 logger = logging.getLogger(__name__)
 
 # ============================================================================
@@ -29,20 +32,22 @@ DEFAULT_INVENTORY_TYPE = getattr(settings, "DEFAULT_TREND_CATEGORY", "General")
 
 # Business logic thresholds
 RECENT_SALES_DAYS = getattr(settings, "RECENT_SALES_DAYS", 90)
+# Sales are pre-aggregated in rolling windows (product_app.SalesStats); use the closest one
+RECENT_SALES_WINDOW = min(SALES_WINDOWS, key=lambda window: abs(window - RECENT_SALES_DAYS))
 RECENT_TREND_DAYS = getattr(settings, "RECENT_TREND_DAYS", 30)
+CATEGORY_SALES_MONTHS = getattr(settings, "CATEGORY_SALES_MONTHS", 3)  # Monthly rollups shown in category insights
 LOW_STOCK_THRESHOLD = getattr(settings, "LOW_STOCK_THRESHOLD", 10)
 
 # Search/matching settings
-FUZZY_CUTOFF = getattr(settings, "FUZZY_CUTOFF", 0.3)
-MAX_FUZZY_SEARCH = getattr(settings, "MAX_FUZZY_SEARCH", 100)
+FUZZY_CUTOFF = getattr(settings, "FUZZY_CUTOFF", 0.5)  # Share of trigrams in common (product name index)
 
 # Security settings
 API_KEY = getattr(settings, "AI_API_KEY", "")
 RATE_LIMIT_WINDOW = 60  # Seconds
 MAX_REQUESTS_PER_WINDOW = 10  # Per IP
 
-# In-memory rate limiting storage
-_request_times = {}  # IP -> list of timestamps
+# Per-IP request counters, shared by every worker process
+RATE_LIMIT_CACHE = CacheNamespace("ai_rate_limit")
 
 
 # ============================================================================
@@ -61,26 +66,35 @@ def rate_limit_check(request) -> bool:
     """
     Check if request is within rate limit window.
     
-    Tracks requests per IP and enforces MAX_REQUESTS_PER_WINDOW limit.
+    Sliding window over the last RATE_LIMIT_WINDOW seconds, kept in the
+    shared cache so MAX_REQUESTS_PER_WINDOW holds across every worker
+    process: per IP, the current window's count plus the previous window's
+    count weighted by how much of it still overlaps the sliding window.
+    Rejected requests are not counted.
     Returns True if request is allowed, False if rate limit exceeded.
     """
     ip = get_client_ip(request)
     now = time.time()
+    window, position = divmod(now, RATE_LIMIT_WINDOW)
+    current_key = f"{ip}:{int(window)}"
     
-    # Initialize tracking for new IPs
-    if ip not in _request_times:
-        _request_times[ip] = []
-    
-    # Clean up old timestamps outside the window
-    _request_times[ip] = [t for t in _request_times[ip] if now - t < RATE_LIMIT_WINDOW]
-    
-    # Check if limit exceeded
-    if len(_request_times[ip]) >= MAX_REQUESTS_PER_WINDOW:
-        return False
+    # Count this request in the current window (kept until the next one ends)
+    RATE_LIMIT_CACHE.add(current_key, 0, RATE_LIMIT_WINDOW * 2)
+    try:
+        count = RATE_LIMIT_CACHE.incr(current_key)
+    except ValueError:
+        # Evicted between add and incr: this request opens the window again
+        RATE_LIMIT_CACHE.set(current_key, 1, RATE_LIMIT_WINDOW * 2)
+        count = 1
     
-    # Record this request
-    _request_times[ip].append(now)
-    return True
+    previous = RATE_LIMIT_CACHE.get(f"{ip}:{int(window) - 1}", 0)
+    if previous * (1 - position / RATE_LIMIT_WINDOW) + count <= MAX_REQUESTS_PER_WINDOW:
+        return True
+    try:
+        RATE_LIMIT_CACHE.incr(current_key, -1)
+    except ValueError:
+        pass
+    return False
 
 
 def validate_api_key(request) -> bool:
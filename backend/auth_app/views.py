@@ -45,6 +45,8 @@ class UserListView(generics.ListAPIView):
     queryset = User.objects.all()
     serializer_class = UserSerializer
     permission_classes = [IsAdminUser]
+    ordering = "id"
+    keyset_fields = ("id",)
     
 class UserDetailView(generics.RetrieveUpdateDestroyAPIView):
     queryset = User.objects.all()
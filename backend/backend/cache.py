@@ -0,0 +1,289 @@
+"""
+Shared cache tier.
+
+Provides:
+- SQLiteCache: a Django cache backend on one SQLite file (WAL mode), so
+  every worker process on the host reads and writes the same entries and
+  they survive restarts. Entries expire by TTL; when MAX_ENTRIES is
+  exceeded the least recently used ones are evicted
+- CacheNamespace: namespaced, versioned keys (``<name>:<version>:<key>``)
+  over the configured cache, with per-namespace hit/miss counters that are
+  periodically added up in the cache itself, so they cover every process
+- cache_stats(): those counters
+- database_key(): the KEY_FUNCTION settings use, which scopes every key to
+  the default database, so the dev server, test runs (test database) and
+  load tests (their own DB_NAME) sharing one cache file never see each
+  other's entries
+
+The backend is picked in settings (CACHE_BACKEND): ``sqlite`` (default,
+one host), ``redis`` (several hosts) or ``locmem`` (per process). Code
+uses a CacheNamespace and does not care which one is configured. Bump a
+namespace's version when the shape of its values changes, so old entries
+are ignored instead of misread.
+"""
+
+import logging
+import os
+import pickle
+import sqlite3
+import threading
+import time
+from collections import Counter
+from typing import Any, Dict
+
+from django.core.cache import caches
+from django.db import connections
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+
+logger = logging.getLogger(__name__)
+
+BUSY_TIMEOUT = 5            # Seconds a writer waits for the file lock
+ACCESS_RESOLUTION = 30      # Seconds; reads refresh an entry's LRU time at most this often
+STATS_FLUSH_SECONDS = 10    # How often a process adds its counters to the shared totals
+STATS_NAMESPACE = "cache_stats"
+CULL_CHECK_WRITES = 100     # Writes between MAX_ENTRIES checks (fewer with a small MAX_ENTRIES)
+
+_MISSING = object()
+
+
+# ============================================================================
+# SQLITE BACKEND
+# ============================================================================
+
+class SQLiteCache(BaseCache):
+    """
+    ``LOCATION`` is the database file (created on first use). OPTIONS:
+    MAX_ENTRIES and CULL_FREQUENCY (evict 1/N of the entries when full;
+    0 empties the cache), as for Django's own backends: defaults 300 and
+    3, settings pass CACHE_MAX_ENTRIES (10000). Each process counts the
+    entries only every few writes, so the file can briefly hold a few
+    hundred entries over MAX_ENTRIES. Values are pickled.
+    """
+
+    def __init__(self, location, params):
+        super().__init__(params)
+        self._path = location
+        self._local = threading.local()
+        self._cull_every = max(1, min(CULL_CHECK_WRITES, self._max_entries // 100))
+        self._writes = 0
+
+    def _db(self) -> sqlite3.Connection:
+        # One connection per thread and process (a forked worker opens its own)
+        db = getattr(self._local, "db", None)
+        if db is None or self._local.pid != os.getpid():
+            directory = os.path.dirname(self._path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            db = sqlite3.connect(self._path, timeout=BUSY_TIMEOUT, isolation_level=None, check_same_thread=False)
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("PRAGMA synchronous=NORMAL")
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS cache_entries "
+                "(key TEXT PRIMARY KEY, value BLOB NOT NULL, expires REAL, accessed REAL NOT NULL) WITHOUT ROWID"
+            )
+            db.execute("CREATE INDEX IF NOT EXISTS cache_entries_accessed ON cache_entries (accessed)")
+            db.execute("CREATE INDEX IF NOT EXISTS cache_entries_expires ON cache_entries (expires)")
+            self._local.db, self._local.pid = db, os.getpid()
+        return db
+
+    def get(self, key, default=None, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        db = self._db()
+        row = db.execute("SELECT value, expires, accessed FROM cache_entries WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return default
+        value, expires, accessed = row
+        now = time.time()
+        if expires is not None and expires <= now:
+            db.execute("DELETE FROM cache_entries WHERE key = ? AND expires <= ?", (key, now))
+            return default
+        if now - accessed > ACCESS_RESOLUTION:
+            db.execute("UPDATE cache_entries SET accessed = ? WHERE key = ?", (now, key))
+        return pickle.loads(value)
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        db = self._db()
+        db.execute(
+            "INSERT OR REPLACE INTO cache_entries (key, value, expires, accessed) VALUES (?, ?, ?, ?)",
+            (key, pickle.dumps(value, pickle.HIGHEST_PROTOCOL), self.get_backend_timeout(timeout), time.time()),
+        )
+        self._cull(db)
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        """Store only if the key is missing or expired; True when stored."""
+        key = self.make_and_validate_key(key, version=version)
+        now = time.time()
+        db = self._db()
+        cursor = db.execute(
+            "INSERT INTO cache_entries (key, value, expires, accessed) VALUES (?, ?, ?, ?) "
+            "ON CONFLICT (key) DO UPDATE SET value = excluded.value, expires = excluded.expires, "
+            "accessed = excluded.accessed WHERE cache_entries.expires IS NOT NULL AND cache_entries.expires <= ?",
+            (key, pickle.dumps(value, pickle.HIGHEST_PROTOCOL), self.get_backend_timeout(timeout), now, now),
+        )
+        if cursor.rowcount:
+            self._cull(db)
+        return cursor.rowcount > 0
+
+    def incr(self, key, delta=1, version=None):
+        """Atomic across processes (the read and write share one write lock)."""
+        key = self.make_and_validate_key(key, version=version)
+        db = self._db()
+        db.execute("BEGIN IMMEDIATE")
+        try:
+            row = db.execute("SELECT value, expires FROM cache_entries WHERE key = ?", (key,)).fetchone()
+            if row is None or (row[1] is not None and row[1] <= time.time()):
+                raise ValueError(f"Key '{key}' not found")
+            value = pickle.loads(row[0]) + delta
+            db.execute(
+                "UPDATE cache_entries SET value = ?, accessed = ? WHERE key = ?",
+                (pickle.dumps(value, pickle.HIGHEST_PROTOCOL), time.time(), key),
+            )
+        except BaseException:
+            db.execute("ROLLBACK")
+            raise
+        db.execute("COMMIT")
+        return value
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        now = time.time()
+        cursor = self._db().execute(
+            "UPDATE cache_entries SET expires = ?, accessed = ? WHERE key = ? AND (expires IS NULL OR expires > ?)",
+            (self.get_backend_timeout(timeout), now, key, now),
+        )
+        return cursor.rowcount > 0
+
+    def delete(self, key, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        return self._db().execute("DELETE FROM cache_entries WHERE key = ?", (key,)).rowcount > 0
+
+    def has_key(self, key, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        row = self._db().execute(
+            "SELECT 1 FROM cache_entries WHERE key = ? AND (expires IS NULL OR expires > ?)", (key, time.time()),
+        ).fetchone()
+        return row is not None
+
+    def clear(self):
+        self._db().execute("DELETE FROM cache_entries")
+
+    def _cull(self, db: sqlite3.Connection) -> None:
+        """
+        Every few writes: drop expired entries once over MAX_ENTRIES, then
+        the least recently used 1/CULL_FREQUENCY.
+        """
+        self._writes += 1
+        if self._writes % self._cull_every:
+            return
+        count = db.execute("SELECT count(*) FROM cache_entries").fetchone()[0]
+        if count <= self._max_entries:
+            return
+        db.execute("DELETE FROM cache_entries WHERE expires <= ?", (time.time(),))
+        count = db.execute("SELECT count(*) FROM cache_entries").fetchone()[0]
+        if count <= self._max_entries:
+            return
+        if self._cull_frequency == 0:
+            db.execute("DELETE FROM cache_entries")
+            return
+        evict = count - self._max_entries + self._max_entries // self._cull_frequency
+        db.execute(
+            "DELETE FROM cache_entries WHERE key IN (SELECT key FROM cache_entries ORDER BY accessed LIMIT ?)",
+            (evict,),
+        )
+
+
+def database_key(key: str, key_prefix: str, version: int) -> str:
+    """Django's default key, prefixed with the default database's name as of now (test databases included)."""
+    return f"{connections['default'].settings_dict['NAME']}:{key_prefix}:{version}:{key}"
+
+
+# ============================================================================
+# NAMESPACES
+# ============================================================================
+
+_counters: Counter = Counter()      # (namespace, "hits" | "misses") -> not yet flushed
+_counters_lock = threading.Lock()
+_last_flush = time.monotonic()
+_namespaces: Dict[str, "CacheNamespace"] = {}
+
+
+class CacheNamespace:
+    """
+    Keys of one cache user: ``<name>:<version>:<key>`` in the ``alias`` cache.
+    Reads are counted as hits or misses; writes go straight through.
+    """
+
+    def __init__(self, name: str, version: int = 1, alias: str = "default"):
+        self.name = name
+        self.version = version
+        self.alias = alias
+        _namespaces[name] = self
+
+    @property
+    def cache(self) -> BaseCache:
+        return caches[self.alias]
+
+    def key(self, key: str) -> str:
+        return f"{self.name}:{self.version}:{key}"
+
+    def get(self, key: str, default: Any = None) -> Any:
+        value = self.cache.get(self.key(key), _MISSING)
+        _count(self.name, "misses" if value is _MISSING else "hits")
+        return default if value is _MISSING else value
+
+    def set(self, key: str, value: Any, timeout=DEFAULT_TIMEOUT) -> None:
+        self.cache.set(self.key(key), value, timeout)
+
+    def add(self, key: str, value: Any, timeout=DEFAULT_TIMEOUT) -> bool:
+        return self.cache.add(self.key(key), value, timeout)
+
+    def incr(self, key: str, delta: int = 1) -> int:
+        """Raises ValueError when the key is missing (as Django's caches do)."""
+        return self.cache.incr(self.key(key), delta)
+
+    def delete(self, key: str) -> bool:
+        return self.cache.delete(self.key(key))
+
+
+def _count(name: str, outcome: str) -> None:
+    global _last_flush
+    with _counters_lock:
+        _counters[(name, outcome)] += 1
+        due = time.monotonic() - _last_flush >= STATS_FLUSH_SECONDS
+    if due:
+        flush_stats()
+
+
+def flush_stats() -> None:
+    """Add this process's counters to the shared totals kept in the cache."""
+    global _last_flush
+    with _counters_lock:
+        pending = dict(_counters)
+        _counters.clear()
+        _last_flush = time.monotonic()
+    for (name, outcome), count in pending.items():
+        key = f"{STATS_NAMESPACE}:{name}:{outcome}"
+        cache = caches[_namespaces[name].alias]
+        try:
+            cache.add(key, 0, None)
+            cache.incr(key, count)
+        except Exception as e:
+            # Counters are best effort; never fail the caller's request over them
+            logger.debug(f"Cache stats not flushed for {name} ({e})")
+
+
+def cache_stats() -> Dict[str, Dict[str, Any]]:
+    """``{namespace: {"hits", "misses", "hit_rate"}}`` across every process sharing the cache."""
+    flush_stats()
+    stats = {}
+    for name, namespace in sorted(_namespaces.items()):
+        cache = caches[namespace.alias]
+        hits = cache.get(f"{STATS_NAMESPACE}:{name}:hits", 0)
+        misses = cache.get(f"{STATS_NAMESPACE}:{name}:misses", 0)
+        stats[name] = {
+            "hits": hits,
+            "misses": misses,
+            "hit_rate": round(hits / (hits + misses), 3) if hits + misses else None,
+        }
+    return stats
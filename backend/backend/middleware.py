@@ -0,0 +1,214 @@
+"""
+Per-request database query instrumentation.
+
+Provides:
+- QueryBudgetMiddleware: counts the queries each request runs, their total
+  time and repeated statements (same SQL shape executed more than once,
+  the usual sign of an N+1 loop). With DEBUG the numbers go into
+  ``X-DB-*`` response headers; otherwise requests over the configured
+  thresholds are logged. Outside DEBUG only counts are kept per query:
+  statements are not stored, and shapes are fingerprinted once, for the
+  log line of a request that is already over budget
+- QueryStats / collect_queries(): the same collection for any block of
+  code, used by the test helper in backend/testing.py
+
+Queries are captured by an execute wrapper installed on every database
+connection. The collectors live in a context variable, so queries run in
+sync_to_async threads (sync views served over ASGI) are attributed to the
+request that made them.
+"""
+
+import contextvars
+import logging
+import re
+import time
+from collections import Counter
+from contextlib import contextmanager
+from typing import Dict, List, Optional, Tuple
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+
+logger = logging.getLogger(__name__)
+
+# Production logging thresholds (settings override these)
+DEFAULT_WARN_QUERIES = 50
+DEFAULT_WARN_DUPLICATES = 10     # Repeats of one statement shape
+DEFAULT_WARN_DB_MS = 500
+
+_collectors: contextvars.ContextVar[Tuple["QueryStats", ...]] = contextvars.ContextVar("query_collectors", default=())
+
+
+# ============================================================================
+# COLLECTION
+# ============================================================================
+
+IN_LIST = re.compile(r"\bIN \((?:%s|\?)(?:, ?(?:%s|\?))*\)", re.IGNORECASE)
+LITERAL = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+WHITESPACE = re.compile(r"\s+")
+
+
+def fingerprint(sql: str) -> str:
+    """SQL with literals and IN-list lengths erased, so one statement per loop iteration looks the same."""
+    sql = LITERAL.sub("?", sql)
+    sql = IN_LIST.sub("IN (...)", sql)
+    return WHITESPACE.sub(" ", sql).strip()
+
+
+class QueryStats:
+    """
+    Queries seen while this collector was active: count, time and repeated
+    statements. Executions are counted per SQL string (Django keeps
+    parameters out of it); ``fingerprints`` groups them by shape on first
+    use. ``keep_statements`` also records every statement in order.
+    """
+
+    def __init__(self, keep_statements: bool = True):
+        self.count = 0
+        self.seconds = 0.0
+        self.sql_counts: Counter = Counter()
+        self.statements: Optional[List[str]] = [] if keep_statements else None
+        self._fingerprints: Optional[Counter] = None
+
+    def record(self, sql: str, seconds: float) -> None:
+        self.count += 1
+        self.seconds += seconds
+        self.sql_counts[sql] += 1
+        self._fingerprints = None
+        if self.statements is not None:
+            self.statements.append(sql)
+
+    @property
+    def fingerprints(self) -> Counter:
+        """``{shape: executions}``, literals and IN-list lengths ignored."""
+        if self._fingerprints is None:
+            self._fingerprints = Counter()
+            for sql, n in self.sql_counts.items():
+                self._fingerprints[fingerprint(sql)] += n
+        return self._fingerprints
+
+    @property
+    def milliseconds(self) -> float:
+        return self.seconds * 1000
+
+    def duplicates(self) -> Dict[str, int]:
+        """``{fingerprint: executions}`` for statements run more than once, most repeated first."""
+        return {sql: n for sql, n in self.fingerprints.most_common() if n > 1}
+
+    def max_repeats(self) -> int:
+        return max(self.fingerprints.values(), default=0)
+
+    def max_identical_repeats(self) -> int:
+        """Most executions of one exact SQL string (a lower bound of max_repeats(), without fingerprinting)."""
+        return max(self.sql_counts.values(), default=0)
+
+    def summary(self) -> str:
+        duplicates = self.duplicates()
+        text = f"{self.count} queries in {self.milliseconds:.1f} ms"
+        if duplicates:
+            sql, repeats = next(iter(duplicates.items()))
+            text += f"; {len(duplicates)} repeated statements, worst {repeats}x: {sql[:300]}"
+        return text
+
+
+def _record_queries(execute, sql, params, many, context):
+    collectors = _collectors.get()
+    if not collectors:
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        elapsed = time.perf_counter() - start
+        for stats in collectors:
+            stats.record(sql, elapsed)
+
+
+def _install(connection, **kwargs):
+    if _record_queries not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_record_queries)
+
+
+def install_query_recorder() -> None:
+    """Wrap this thread's open connections, and every connection opened from now on."""
+    connection_created.connect(_install, dispatch_uid="backend.middleware.query_recorder")
+    for connection in connections.all(initialized_only=True):
+        _install(connection)
+
+
+@contextmanager
+def collect_queries(keep_statements: bool = True):
+    """Collect the queries run inside the block (nested collectors all see them)."""
+    install_query_recorder()
+    stats = QueryStats(keep_statements)
+    token = _collectors.set(_collectors.get() + (stats,))
+    try:
+        yield stats
+    finally:
+        _collectors.reset(token)
+
+
+# ============================================================================
+# MIDDLEWARE
+# ============================================================================
+
+class QueryBudgetMiddleware:
+    """
+    Query count, DB time and repeated statements per request.
+
+    DEBUG: ``X-DB-Query-Count``, ``X-DB-Time-Ms`` and ``X-DB-Duplicate-Queries``
+    (statements run more than once / worst repeat count) on every response.
+    Otherwise one log line for requests over QUERY_BUDGET_WARN_QUERIES,
+    QUERY_BUDGET_WARN_DUPLICATES or QUERY_BUDGET_WARN_DB_MS, and a DEBUG
+    line for the rest. Outside DEBUG the duplicate threshold is checked on
+    identical SQL strings, so the per-query cost is one counter update;
+    statement shapes are only fingerprinted for a request being logged as
+    over budget. Streaming bodies are not counted beyond the view.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.headers = settings.DEBUG
+        self.warn_queries = getattr(settings, "QUERY_BUDGET_WARN_QUERIES", DEFAULT_WARN_QUERIES)
+        self.warn_duplicates = getattr(settings, "QUERY_BUDGET_WARN_DUPLICATES", DEFAULT_WARN_DUPLICATES)
+        self.warn_ms = getattr(settings, "QUERY_BUDGET_WARN_DB_MS", DEFAULT_WARN_DB_MS)
+        install_query_recorder()
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        with collect_queries(keep_statements=False) as stats:
+            response = self.get_response(request)
+        self.report(request, response, stats)
+        return response
+
+    async def __acall__(self, request):
+        with collect_queries(keep_statements=False) as stats:
+            response = await self.get_response(request)
+        self.report(request, response, stats)
+        return response
+
+    def report(self, request, response, stats: QueryStats) -> None:
+        if self.headers:
+            response["X-DB-Query-Count"] = str(stats.count)
+            response["X-DB-Time-Ms"] = f"{stats.milliseconds:.1f}"
+            response["X-DB-Duplicate-Queries"] = f"{len(stats.duplicates())}/{stats.max_repeats()}"
+            repeats = stats.max_repeats()
+        else:
+            repeats = stats.max_identical_repeats()
+
+        over_budget = (
+            stats.count > self.warn_queries or repeats > self.warn_duplicates or stats.milliseconds > self.warn_ms
+        )
+        if over_budget:
+            logger.warning(f"Query budget exceeded: {request.method} {request.path} -> {response.status_code}: "
+                           f"{stats.summary()}")
+        elif logger.isEnabledFor(logging.DEBUG):
+            logger.debug(f"{request.method} {request.path} -> {response.status_code}: "
+                         f"{stats.count} queries in {stats.milliseconds:.1f} ms")
@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.1/ref/settings/
 """
 import os
+import tempfile
 from pathlib import Path
 from dotenv import load_dotenv
 
@@ -39,6 +40,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',  # pg_trgm / full-text product search
     'rest_framework',
     'django_rest_passwordreset',
     'auth_app',
@@ -49,6 +51,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'backend.middleware.QueryBudgetMiddleware',  # First, so it sees every query of the request
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'corsheaders.middleware.CorsMiddleware',
@@ -151,7 +154,8 @@ REST_FRAMEWORK = {
     'DEFAULT_PERMISSION_CLASSES': (
         'rest_framework.permissions.IsAuthenticated',
     ),
-    'DEFAULT_PAGINATION_CLASS': None,
+    'DEFAULT_PAGINATION_CLASS': 'product_app.pagination.KeysetPagination',
+    'PAGE_SIZE': 50,
 }
 
 from datetime import timedelta
@@ -162,12 +166,27 @@ SIMPLE_JWT = {
     'BLACKLIST_AFTER_ROTATION': False,
 }
 
-CACHES = {
-    'default': {
+# Shared cache (backend/cache.py): 'sqlite' = one file shared by every worker on this host,
+# 'redis' = a Redis server for several hosts (pip install redis; run it with maxmemory-policy allkeys-lru),
+# 'locmem' = per process. Keys are scoped to the default database's name (backend.cache.database_key),
+# so servers, test runs and load tests on other databases can share one cache safely.
+CACHE_BACKEND = os.getenv('CACHE_BACKEND', 'sqlite')
+CACHE_BACKENDS = {
+    'sqlite': {
+        'BACKEND': 'backend.cache.SQLiteCache',
+        'LOCATION': os.getenv('CACHE_LOCATION', os.path.join(tempfile.gettempdir(), 'stockwise-cache.sqlite3')),
+        'OPTIONS': {'MAX_ENTRIES': int(os.getenv('CACHE_MAX_ENTRIES', 10000))},
+    },
+    'redis': {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': os.getenv('CACHE_LOCATION', 'redis://127.0.0.1:6379/1'),
+    },
+    'locmem': {
         'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
-        'LOCATION': 'unique-snowflake',    
-    }
+        'LOCATION': 'unique-snowflake',
+    },
 }
+CACHES = {'default': {**CACHE_BACKENDS[CACHE_BACKEND], 'KEY_FUNCTION': 'backend.cache.database_key'}}
 
 CELERY_BROKER_URL = 'redis://127.0.0.1:6379/0'
 CELERY_RESULT_BACKEND = 'redis://127.0.0.1:6379/0'
@@ -190,9 +209,20 @@ DJANGO_REST_PASSWORDRESET = {
     'RESET_PASSWORD_TOKEN_GENERATOR': 'django_rest_passwordreset.tokens.get_token_generator'
 }
 
+OLLAMA_API = os.getenv('OLLAMA_API', 'http://localhost:11434/api/generate')  # Load tests point this at loadtest/stub_llm.py
 OLLAMA_API_TIMEOUT = 120
 FUZZY_MATCH_CUTOFF = 0.3
 
+# Live stock events (GET /api/stock/events/): 'memory' for a single process,
+# 'postgres' (LISTEN/NOTIFY) when several processes or nodes serve the API
+STOCK_EVENTS_BUS = os.getenv('STOCK_EVENTS_BUS', 'memory')
+
+# Per-request query instrumentation (backend/middleware.py): X-DB-* headers
+# with DEBUG, otherwise a warning for requests over any of these
+QUERY_BUDGET_WARN_QUERIES = int(os.getenv('QUERY_BUDGET_WARN_QUERIES', 50))
+QUERY_BUDGET_WARN_DUPLICATES = int(os.getenv('QUERY_BUDGET_WARN_DUPLICATES', 10))
+QUERY_BUDGET_WARN_DB_MS = int(os.getenv('QUERY_BUDGET_WARN_DB_MS', 500))
+
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
@@ -210,6 +240,11 @@ LOGGING = {
             'level': 'DEBUG',  # NEW: Shows debug snippets
             'propagate': True,
         },
+        'backend.middleware': {  # Query budget warnings
+            'handlers': ['console'],
+            'level': 'INFO',
+            'propagate': True,
+        },
         'ai_assistant': {  # AI assistant app
             'handlers': ['console'],
             'level': 'INFO',  # Shows info, warning, and error logs
@@ -0,0 +1,37 @@
+"""
+Test helpers shared by the apps.
+
+Provides:
+- QueryBudgetMixin.assertQueryBudget(): fail a test when the block runs more
+  queries than its endpoint's budget, or repeats one statement shape (an
+  N+1 loop) more often than allowed. Uses the same collector as
+  QueryBudgetMiddleware, so the numbers match the X-DB-* headers.
+"""
+
+from contextlib import contextmanager
+
+from backend.middleware import collect_queries
+
+
+class QueryBudgetMixin:
+    """Mix into a TestCase next to the endpoint tests."""
+
+    @contextmanager
+    def assertQueryBudget(self, max_queries: int, max_repeats: int = 1):
+        """
+        The block may run at most ``max_queries`` queries, and no statement
+        (literals ignored) more than ``max_repeats`` times.
+        """
+        with collect_queries() as stats:
+            yield stats
+
+        problems = []
+        if stats.count > max_queries:
+            problems.append(f"{stats.count} queries, budget is {max_queries}")
+        if stats.max_repeats() > max_repeats:
+            problems.append(f"a statement ran {stats.max_repeats()} times, budget is {max_repeats}")
+        if problems:
+            lines = [f"Query budget exceeded: {'; '.join(problems)}"]
+            lines += [f"  {n}x {sql}" for sql, n in stats.duplicates().items()]
+            lines += [f"{i}. {sql}" for i, sql in enumerate(stats.statements, 1)]
+            self.fail("\n".join(lines))
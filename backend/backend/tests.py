@@ -0,0 +1,121 @@
+import os
+import tempfile
+import time
+from unittest import mock
+
+from django.db import connections
+from django.test import SimpleTestCase, override_settings
+
+from backend import cache as shared_cache
+from backend.cache import CacheNamespace, SQLiteCache
+
+
+class SQLiteCacheTests(SimpleTestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, "cache.sqlite3")
+        self.cache = self._backend()
+
+    def _backend(self, **options):
+        return SQLiteCache(self.path, {"OPTIONS": options})
+
+    def test_get_set_delete(self):
+        self.cache.set("report", {"rows": [1, 2]})
+        self.assertEqual(self.cache.get("report"), {"rows": [1, 2]})
+        self.assertTrue(self.cache.delete("report"))
+        self.assertIsNone(self.cache.get("report"))
+
+    def test_expired_entries_are_misses(self):
+        self.cache.set("short", 1, 10)
+        self.cache.set("forever", 2, None)
+        with mock.patch("backend.cache.time.time", return_value=time.time() + 11):
+            self.assertIsNone(self.cache.get("short"))
+            self.assertFalse(self.cache.has_key("short"))
+            self.assertEqual(self.cache.get("forever"), 2)
+
+    def test_add_and_incr(self):
+        self.assertTrue(self.cache.add("hits", 0))
+        self.assertFalse(self.cache.add("hits", 100))
+        self.assertEqual(self.cache.incr("hits", 5), 5)
+        with self.assertRaises(ValueError):
+            self.cache.incr("missing")
+
+    def test_add_replaces_an_expired_entry(self):
+        self.cache.set("window", 9, 10)
+        with mock.patch("backend.cache.time.time", return_value=time.time() + 11):
+            self.assertTrue(self.cache.add("window", 0, 10))
+            self.assertEqual(self.cache.get("window"), 0)
+
+    def test_least_recently_used_entries_are_evicted(self):
+        cache = self._backend(MAX_ENTRIES=3, CULL_FREQUENCY=3)
+        now = time.time()
+        for offset, key in enumerate(["a", "b", "c"]):
+            with mock.patch("backend.cache.time.time", return_value=now + offset):
+                cache.set(key, key)
+        with mock.patch("backend.cache.time.time", return_value=now + 100):
+            cache.get("a")  # Older than ACCESS_RESOLUTION, so the read refreshes it
+            cache.set("d", "d")
+        self.assertEqual([key for key in "abcd" if cache.has_key(key)], ["a", "d"])
+
+    def test_entries_are_counted_every_few_writes(self):
+        cache = self._backend(MAX_ENTRIES=500)  # Checked every 5 writes
+        cache.set("warm", 0)
+        statements = []
+        cache._db().set_trace_callback(statements.append)
+        for i in range(10):
+            cache.set(f"k{i}", i)
+        self.assertEqual(sum("count(*)" in sql for sql in statements), 2)
+
+    def test_instances_on_one_file_share_entries(self):
+        # Two backends on one file stand in for two worker processes
+        other = self._backend()
+        self.cache.set("version", 1)
+        self.assertEqual(other.incr("version"), 2)
+        self.assertEqual(self.cache.get("version"), 2)
+
+
+class CacheNamespaceTests(SimpleTestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        caches = {"default": {
+            "BACKEND": "backend.cache.SQLiteCache",
+            "LOCATION": os.path.join(directory.name, "cache.sqlite3"),
+        }}
+        override = override_settings(CACHES=caches)
+        override.enable()
+        self.addCleanup(override.disable)
+
+    def test_keys_are_namespaced_and_versioned(self):
+        v1 = CacheNamespace("test_shape", version=1)
+        v1.set("report", [1, 2])
+        v2 = CacheNamespace("test_shape", version=2)
+        self.assertIsNone(v2.get("report"))
+        self.assertEqual(v1.cache.get("test_shape:1:report"), [1, 2])
+
+    def test_hits_and_misses_are_counted(self):
+        namespace = CacheNamespace("test_counts")
+        namespace.get("report")
+        namespace.set("report", [])
+        namespace.get("report")
+        namespace.get("report", "default")
+        stats = shared_cache.cache_stats()["test_counts"]
+        self.assertEqual((stats["hits"], stats["misses"]), (2, 1))
+        self.assertAlmostEqual(stats["hit_rate"], 0.667)
+
+        # Totals live in the cache, so a second flush adds to them
+        namespace.get("missing")
+        self.assertEqual(shared_cache.cache_stats()["test_counts"]["misses"], 2)
+
+    def test_keys_are_scoped_to_the_database(self):
+        caches = {"default": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+            "KEY_FUNCTION": "backend.cache.database_key",
+        }}
+        with override_settings(CACHES=caches):
+            namespace = CacheNamespace("test_scope")
+            namespace.set("report", 1)
+            self.assertEqual(namespace.get("report"), 1)
+            with mock.patch.dict(connections["default"].settings_dict, {"NAME": "loadtest"}):
+                self.assertIsNone(namespace.get("report"))
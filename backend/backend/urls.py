@@ -15,11 +15,13 @@ Including another URLconf
     2. Add a URL to urlpatterns:  path('blog/', include('blog.urls'))
 """
 from django.contrib import admin
-from django.urls import path, include
+from django.urls import path, include, re_path
 from rest_framework_simplejwt.views import TokenObtainPairView, TokenRefreshView
 from auth_app.views import RegisterView, UserDetailView, UserListView, UserView, PasswordResetConfirmView
 from django.conf import settings
 from django.conf.urls.static import static
+from product_app.services.images import VARIANT_DIR
+from product_app.views import serve_image_variant
 
 urlpatterns = [
     path('admin/', admin.site.urls),
@@ -37,4 +39,8 @@ urlpatterns = [
 ]
 
 if settings.DEBUG:
+    # Content-hashed image variants first: same files, far-future cache headers
+    urlpatterns += [
+        re_path(rf'^{settings.MEDIA_URL.strip("/")}/{VARIANT_DIR}/(?P<path>.*)$', serve_image_variant),
+    ]
     urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
\ No newline at end of file
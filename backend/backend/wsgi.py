@@ -14,3 +14,8 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'backend.settings')
 
 application = get_wsgi_application()
+
+# Load the product name index (AI matcher, /api/products/autocomplete/) before the first request
+from product_app.services.name_index import warm_name_index  # noqa: E402
+
+warm_name_index()
@@ -0,0 +1,69 @@
+"""
+Shared definitions for the load-test harness.
+
+Provides:
+- Data tiers (TIERS): catalog and sales history sizes seeded by seed.py
+- The deterministic naming scheme (SKUs, product names, categories), so
+  run.py can address any seeded row without reading the database first.
+  It must match product_app/services/fixtures.py, which writes the rows;
+  this module stays free of Django imports for the load generator
+- The load-test user and latency percentiles
+"""
+
+import math
+from dataclasses import dataclass
+from typing import List
+
+
+@dataclass(frozen=True)
+class Tier:
+    products: int
+    sales_rows: int
+    categories: int
+    suppliers: int
+
+
+TIERS = {
+    "1k": Tier(products=1_000, sales_rows=100_000, categories=20, suppliers=10),
+    "100k": Tier(products=100_000, sales_rows=1_000_000, categories=200, suppliers=100),
+    "1m": Tier(products=1_000_000, sales_rows=10_000_000, categories=1_000, suppliers=500),
+}
+
+SKU_PREFIX = "LT-"
+USER_EMAIL = "loadtest@example.com"
+USER_PASSWORD = "loadtest-password"
+
+ADJECTIVES = ["classic", "slim", "organic", "wireless", "vintage", "compact", "deluxe", "waterproof", "recycled", "heavy"]
+COLOURS = ["black", "navy", "olive", "crimson", "ivory", "teal", "sand", "grey"]
+NOUNS = [
+    "jacket", "sneaker", "backpack", "headphones", "lamp", "kettle", "blender", "notebook",
+    "coffee", "tea", "scarf", "mug", "charger", "blanket", "bottle", "umbrella",
+]
+
+
+def sku(index: int) -> str:
+    return f"{SKU_PREFIX}{index:07d}"
+
+
+def product_name(index: int) -> str:
+    # Mixed radixes so neighbouring products differ in every word
+    return (
+        f"{ADJECTIVES[index % len(ADJECTIVES)].title()} {COLOURS[index // 3 % len(COLOURS)]} "
+        f"{NOUNS[index // 7 % len(NOUNS)]} {index}"
+    )
+
+
+def category_name(index: int) -> str:
+    return f"LT {NOUNS[index % len(NOUNS)].title()} {index:04d}"
+
+
+def supplier_name(index: int) -> str:
+    return f"LT Supplier {index:03d}"
+
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    """Nearest-rank percentile of an already sorted list (0.0 when empty)."""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, math.ceil(pct / 100 * len(sorted_values)))
+    return sorted_values[rank - 1]
@@ -0,0 +1,38 @@
+"""Compare two load-test results (loadtest/results/*.json) operation by operation.
+
+    python loadtest/compare.py results/before.json results/after.json
+
+Latency changes are after vs before; negative is faster.
+"""
+import argparse
+import json
+
+parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+parser.add_argument("before")
+parser.add_argument("after")
+args = parser.parse_args()
+
+with open(args.before) as f:
+    before = json.load(f)
+with open(args.after) as f:
+    after = json.load(f)
+
+
+def change(old, new):
+    return f"{(new - old) / old * 100:+.0f}%" if old else "n/a"
+
+
+for label, result in (("before", before), ("after", after)):
+    print(f"{label}: {result['commit'][:8]}{' (dirty)' if result['dirty'] else ''} {result['timestamp']} "
+          f"tier {result['tier']}, {result['config']['users']} users {result['label']}")
+if before["tier"] != after["tier"] or before["config"]["users"] != after["config"]["users"]:
+    print("⚠️  Different tier or user count: the numbers are not directly comparable")
+
+print(f"\n{'operation':<20}" + "".join(f"{title:>28}" for title in ("req/s", "p50 ms", "p95 ms", "p99 ms")))
+rows = [(name, before["operations"].get(name), row) for name, row in after["operations"].items()]
+rows.append(("overall", before["overall"], after["overall"]))
+for name, old, new in rows:
+    if not old:
+        continue
+    cells = [f"{old[key]:>9} → {new[key]:<9} {change(old[key], new[key]):>6}" for key in ("rps", "p50_ms", "p95_ms", "p99_ms")]
+    print(f"{name:<20}" + "".join(f"{cell:>28}" for cell in cells))
@@ -0,0 +1,265 @@
+"""Replay a realistic API mix against a seeded server and record latency percentiles as JSON.
+
+Seed a tier first (loadtest/seed.py), then:
+
+    python loadtest/run.py --tier 100k                 # starts uvicorn + a stub LLM, 60 s at 16 users
+    python loadtest/run.py --tier 100k --url http://localhost:8000   # a server you started
+
+Each virtual user sends requests back to back (closed loop) from a fixed
+per-user random seed, picking operations by MIX weight. Requests in the
+first --warmup seconds are not counted. The result (p50/p95/p99, req/s and
+errors, overall and per operation, plus the git commit and settings) is
+written to loadtest/results/ for loadtest/compare.py.
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import socket
+import subprocess
+import sys
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+
+import requests
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+from loadtest.common import (
+    ADJECTIVES, COLOURS, NOUNS, TIERS, USER_EMAIL, USER_PASSWORD, category_name, percentile, product_name, sku,
+)
+from loadtest.stub_llm import start_stub, stub_url
+
+# operation -> weight (share of requests)
+MIX = {
+    "product_list": 25,
+    "product_search": 20,
+    "product_detail": 25,
+    "quantity_patch": 8,
+    "inventory_summary": 8,
+    "sales_history": 10,
+    "ai_ask": 4,
+}
+AI_CLIENTS = 1000   # ai/ask is rate limited per IP; spread it like real clients would be
+
+parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+parser.add_argument("--tier", choices=TIERS, required=True, help="The tier the database was seeded with")
+parser.add_argument("--url", help="Server base URL (default: start uvicorn against the configured database)")
+parser.add_argument("--workers", type=int, default=2, help="uvicorn worker processes when starting the server")
+parser.add_argument("--users", type=int, default=16, help="Concurrent virtual users")
+parser.add_argument("--duration", type=int, default=60, help="Measured seconds")
+parser.add_argument("--warmup", type=int, default=10, help="Seconds before measuring starts")
+parser.add_argument("--seed", type=int, default=1)
+parser.add_argument("--llm-latency-ms", type=int, default=200, help="Stub LLM reply delay")
+parser.add_argument("--email", default=USER_EMAIL)
+parser.add_argument("--password", default=USER_PASSWORD)
+parser.add_argument("--label", default="", help="Free text stored with the result")
+parser.add_argument("--out", default=os.path.join(BACKEND_DIR, "loadtest", "results"))
+args = parser.parse_args()
+
+tier = TIERS[args.tier]
+
+
+# ============================================================================
+# SERVER
+# ============================================================================
+
+def start_server():
+    """uvicorn on a free port, with ai/ask pointed at a stub LLM; returns (base URL, process)."""
+    llm = start_stub(latency_ms=args.llm_latency_ms)
+    port = _free_port()
+    env = {**os.environ, "OLLAMA_API": stub_url(llm)}
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "backend.asgi:application", "--host", "127.0.0.1", "--port", str(port),
+         "--workers", str(args.workers), "--log-level", "warning", "--no-access-log"],
+        cwd=BACKEND_DIR, env=env,
+    )
+    url = f"http://127.0.0.1:{port}"
+    deadline = time.time() + 60
+    while time.time() < deadline:
+        if process.poll() is not None:
+            sys.exit(f"uvicorn exited with code {process.returncode} (is it installed? pip install -r requirements.txt)")
+        try:
+            requests.get(f"{url}/api/products/", timeout=2)
+            return url, process
+        except requests.ConnectionError:
+            time.sleep(0.5)
+    process.terminate()
+    sys.exit("uvicorn did not start within 60 s")
+
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+# ============================================================================
+# OPERATIONS
+# ============================================================================
+
+def _date(days_ago):
+    return (datetime.now(timezone.utc).date() - timedelta(days=days_ago)).isoformat()
+
+
+def build_request(operation, rng):
+    """(method, path, params, json body, extra headers) for one request of ``operation``."""
+    index = rng.randrange(tier.products)
+    if operation == "product_list":
+        params = {"page_size": 50}
+        if rng.random() < 0.5:
+            params["category"] = category_name(rng.randrange(tier.categories))
+        if rng.random() < 0.2:
+            params["status"] = "low_stock"
+        return "GET", "/api/products/", params, None, {}
+    if operation == "product_search":
+        words = [rng.choice(NOUNS), rng.choice(ADJECTIVES + COLOURS), sku(index)[:7]]
+        return "GET", "/api/products/", {"search": " ".join(words[:rng.randint(1, 2)]), "page_size": 20}, None, {}
+    if operation == "product_detail":
+        return "GET", f"/api/products/{sku(index)}/", None, None, {}
+    if operation == "quantity_patch":
+        return "PATCH", f"/api/products/{sku(index)}/", None, {"quantity": rng.randint(0, 500), "reference": "loadtest"}, {}
+    if operation == "inventory_summary":
+        params = {"category": category_name(rng.randrange(tier.categories))} if rng.random() < 0.5 else None
+        return "GET", "/api/inventory/summary/", params, None, {}
+    if operation == "sales_history":
+        if rng.random() < 0.5:
+            params = {"sku": sku(index), "date_from": _date(30)}
+        else:
+            params = {"group": "week", "by": "category", "date_from": _date(84), "date_to": _date(1)}
+        return "GET", "/api/stock/history/", params, None, {}
+    if operation == "ai_ask":
+        query = rng.choice([
+            f"How much {product_name(index)} do we have?",
+            "What is my total stock?",
+            "Predict the trend for christmas",
+            f"Show the category of {product_name(index)}",
+        ])
+        client_ip = f"10.{rng.randrange(256)}.{rng.randrange(256)}.{rng.randrange(1, AI_CLIENTS)}"
+        return "POST", "/api/ai/ask/", None, {"query": query}, {"X-Forwarded-For": client_ip}
+    raise ValueError(operation)
+
+
+# ============================================================================
+# RUN
+# ============================================================================
+
+def login(url):
+    response = requests.post(f"{url}/api/token/", json={"email": args.email, "password": args.password}, timeout=30)
+    if response.status_code != 200:
+        sys.exit(f"Login as {args.email} failed ({response.status_code}); seed the database with loadtest/seed.py")
+    return {"Authorization": f"Bearer {response.json()['access']}"}
+
+
+def virtual_user(number, url, headers, measure_from, stop_at, samples, lock):
+    rng = random.Random(args.seed * 1000 + number)
+    operations, weights = list(MIX), list(MIX.values())
+    session = requests.Session()
+    session.headers.update(headers)
+    local = []
+    while True:
+        now = time.time()
+        if now >= stop_at:
+            break
+        operation = rng.choices(operations, weights)[0]
+        method, path, params, body, extra = build_request(operation, rng)
+        start = time.perf_counter()
+        try:
+            status = session.request(method, f"{url}{path}", params=params, json=body, headers=extra, timeout=60).status_code
+        except requests.RequestException:
+            status = 0
+        elapsed = time.perf_counter() - start
+        if now >= measure_from:
+            local.append((operation, status, elapsed))
+    with lock:
+        samples.extend(local)
+
+
+def summarize(samples, seconds):
+    latencies = sorted(elapsed for _, _, elapsed in samples)
+    statuses = defaultdict(int)
+    for _, status, _ in samples:
+        if not 200 <= status < 300:
+            statuses[str(status)] += 1
+    return {
+        "requests": len(samples),
+        "rps": round(len(samples) / seconds, 1),
+        "errors": sum(statuses.values()),
+        "error_statuses": dict(statuses),
+        "p50_ms": round(percentile(latencies, 50) * 1000, 2),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 2),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 2),
+        "max_ms": round(latencies[-1] * 1000, 2) if latencies else 0.0,
+    }
+
+
+def git_commit():
+    try:
+        commit = subprocess.check_output(["git", "rev-parse", "HEAD"], cwd=BACKEND_DIR, text=True).strip()
+        dirty = bool(subprocess.check_output(["git", "status", "--porcelain", "--untracked-files=no"], cwd=BACKEND_DIR, text=True).strip())
+        return commit, dirty
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown", False
+
+
+server = None
+url = args.url.rstrip("/") if args.url else None
+if url is None:
+    url, server = start_server()
+
+try:
+    headers = login(url)
+    print("\n" + "=" * 60)
+    print(f"LOAD TEST: tier {args.tier}, {args.users} users, {args.warmup}s warmup + {args.duration}s")
+    print("=" * 60)
+
+    samples, lock = [], threading.Lock()
+    measure_from = time.time() + args.warmup
+    stop_at = measure_from + args.duration
+    threads = [
+        threading.Thread(target=virtual_user, args=(n, url, headers, measure_from, stop_at, samples, lock))
+        for n in range(args.users)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+finally:
+    if server is not None:
+        server.terminate()
+        server.wait(timeout=30)
+
+by_operation = defaultdict(list)
+for sample in samples:
+    by_operation[sample[0]].append(sample)
+
+commit, dirty = git_commit()
+result = {
+    "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+    "commit": commit,
+    "dirty": dirty,
+    "label": args.label,
+    "tier": args.tier,
+    "config": {
+        "users": args.users, "duration": args.duration, "warmup": args.warmup, "seed": args.seed,
+        "workers": args.workers if server is not None else None, "llm_latency_ms": args.llm_latency_ms,
+        "url": args.url or "uvicorn (started by run.py)", "mix": MIX,
+    },
+    "host": {"python": platform.python_version(), "platform": platform.platform(), "cpus": os.cpu_count()},
+    "overall": summarize(samples, args.duration),
+    "operations": {operation: summarize(by_operation[operation], args.duration) for operation in MIX},
+}
+
+os.makedirs(args.out, exist_ok=True)
+path = os.path.join(args.out, f"{datetime.now():%Y%m%d-%H%M%S}-{commit[:8]}-{args.tier}.json")
+with open(path, "w") as f:
+    json.dump(result, f, indent=2)
+
+print(f"\n{'operation':<20}{'req':>8}{'req/s':>9}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'errors':>8}")
+for name, row in [*result["operations"].items(), ("overall", result["overall"])]:
+    print(f"{name:<20}{row['requests']:>8}{row['rps']:>9}{row['p50_ms']:>10}{row['p95_ms']:>10}{row['p99_ms']:>10}{row['errors']:>8}")
+print(f"\nSaved {path}")
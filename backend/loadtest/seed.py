@@ -0,0 +1,54 @@
+"""Seed a scratch database with a fixed load-test data tier (see common.TIERS).
+
+The same tier and --seed always produce the same rows. Point the settings
+at an empty database first; the seeder refuses to add to a catalog that
+already has products:
+
+    DB_NAME=stockwise_load python loadtest/seed.py --tier 100k
+
+Rows come from ``manage.py generate_fixture_data`` (NumPy, COPY on
+PostgreSQL, no signals), which also rebuilds the derived tables.
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "backend.settings")
+
+import django
+
+django.setup()
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+
+from loadtest.common import SKU_PREFIX, TIERS, USER_EMAIL, USER_PASSWORD
+from product_app.models import Product
+
+parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+parser.add_argument("--tier", choices=TIERS, required=True)
+parser.add_argument("--seed", type=int, default=42, help="Random seed (same seed, same rows)")
+args = parser.parse_args()
+
+tier = TIERS[args.tier]
+
+if Product.objects.exists():
+    sys.exit("The database already has products; seed an empty scratch database (see --help)")
+
+started = time.time()
+print(f"Seeding tier {args.tier}: {tier.products:,} products, {tier.sales_rows:,} sales rows (seed {args.seed})")
+User = get_user_model()
+if not User.objects.filter(email=USER_EMAIL).exists():
+    User.objects.create_user(USER_EMAIL, "Load", "Test", USER_PASSWORD)
+call_command(
+    "generate_fixture_data",
+    products=tier.products,
+    sales_days=tier.sales_rows // tier.products,
+    categories=tier.categories,
+    suppliers=tier.suppliers,
+    seed=args.seed,
+    prefix=SKU_PREFIX.rstrip("-"),
+)
+print(f"Done in {time.time() - started:.1f}s. Log in as {USER_EMAIL} / {USER_PASSWORD}")
@@ -0,0 +1,64 @@
+"""Stub Ollama server for load tests: answers /api/generate with a fixed, valid JSON reply.
+
+A real model makes ai/ask latency a measure of the GPU. The stub keeps the
+view's own work (matching, fact gathering, parsing) in the numbers and
+replaces generation with a fixed delay:
+
+    python loadtest/stub_llm.py --port 11500 --latency-ms 200
+    OLLAMA_API=http://127.0.0.1:11500/api/generate uvicorn backend.asgi:application
+
+run.py starts one itself unless --url points at a server you started.
+"""
+import argparse
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Item schema with null numbers: call_ollama fills them in from the facts
+REPLY = json.dumps({
+    "item": "load test",
+    "current_stock": None,
+    "average_daily_sales": None,
+    "restock_needed": False,
+    "recommendation": "Stock levels are fine.",
+})
+
+
+def make_handler(latency_ms: int):
+    class StubHandler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            self.rfile.read(int(self.headers.get("Content-Length", 0)))
+            time.sleep(latency_ms / 1000)
+            body = json.dumps({"model": "stub", "response": REPLY, "done": True}).encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    return StubHandler
+
+
+def start_stub(port: int = 0, latency_ms: int = 200) -> ThreadingHTTPServer:
+    """Serve the stub from a daemon thread (``port=0`` picks a free port) and return the server."""
+    server = ThreadingHTTPServer(("127.0.0.1", port), make_handler(latency_ms))
+    threading.Thread(target=server.serve_forever, daemon=True, name="stub-llm").start()
+    return server
+
+
+def stub_url(server: ThreadingHTTPServer) -> str:
+    return f"http://127.0.0.1:{server.server_address[1]}/api/generate"
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--port", type=int, default=11500)
+    parser.add_argument("--latency-ms", type=int, default=200, help="Simulated generation time")
+    args = parser.parse_args()
+    server = ThreadingHTTPServer(("127.0.0.1", args.port), make_handler(args.latency_ms))
+    print(f"Stub LLM on {stub_url(server)} ({args.latency_ms} ms per reply)")
+    server.serve_forever()
@@ -1,8 +1,31 @@
-from django.contrib import admin
+from datetime import timedelta
+
+from django import forms
+from django.contrib import admin, messages
+from django.contrib.admin.helpers import ActionForm
+from django.utils import timezone
 from django.utils.html import format_html
 from django.urls import reverse
-from django.conf import settings
-from .models import Category, Product, Supplier, Inventory, SalesHistory
+from .models import (
+    Category,
+    CategorySalesRollup,
+    DemandForecast,
+    Inventory,
+    InventoryTotals,
+    LowStockAlert,
+    Product,
+    ProductSalesRollup,
+    SalesHistory,
+    StockMovement,
+    StockSnapshot,
+    Supplier,
+)
+from .pagination import EstimatedCountPaginator
+from .services.catalog import recategorize_products
+from .services.images import image_urls
+from .services.stock import restock_to_threshold
+
+SALES_INLINE_DAYS = 60  # Product pages show this window; the full history is one click away
 
 
 @admin.register(Category)
@@ -18,17 +41,28 @@ class InventoryInline(admin.StackedInline):
     model = Inventory
     extra = 1  # Show one empty form by default
     fields = ("stock_in", "stock_out", "total_stock", "average_daily_sales")
-    readonly_fields = ("total_stock", "average_daily_sales")  # Computed on save
+    readonly_fields = ("total_stock", "average_daily_sales")  # Computed on save / from sales stats
 
 
 class SalesHistoryInline(admin.TabularInline):
     """
     Inline for SalesHistory to add daily sales entries easily.
+    Only the last SALES_INLINE_DAYS are shown (a product can have years of
+    daily rows); ProductAdmin links to the full, paginated history.
     """
     model = SalesHistory
     extra = 0  # No empty forms; add as needed
     fields = ("date", "units_sold")
-    list_display = ("date", "units_sold")
+    verbose_name_plural = f"Sales history (last {SALES_INLINE_DAYS} days)"
+
+    def get_queryset(self, request):
+        since = timezone.localdate() - timedelta(days=SALES_INLINE_DAYS)
+        return super().get_queryset(request).filter(date__gte=since).order_by("-date")
+
+
+class ProductActionForm(ActionForm):
+    """Action bar with the target category for the "recategorize" action."""
+    category = forms.ModelChoiceField(queryset=Category.objects.order_by("name"), required=False, label="Category")
 
 
 @admin.register(Supplier)
@@ -41,34 +75,144 @@ class SupplierAdmin(admin.ModelAdmin):
 @admin.register(Product)
 class ProductAdmin(admin.ModelAdmin):
     list_display = ("id", "sku", "name", "category", "supplier", "quantity", "image_preview")
+    # quantity reads product.inventory, filled by the same join
+    list_select_related = ("category", "supplier", "inventory")
     search_fields = ("sku", "name", "description")
-    list_filter = ("category", "supplier")
+    list_filter = ("category", "supplier", "inventory__stock_status")
+    autocomplete_fields = ("category", "supplier")
     inlines = [SalesHistoryInline]  # Edit inventory/history inline
-    readonly_fields = ("image_preview",)  # For image display
+    readonly_fields = ("image_preview", "sales_history_link")  # For image display
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    action_form = ProductActionForm
+    actions = ["restock_selected", "recategorize_selected"]
 
     def image_preview(self, obj):
         """
         Custom method to display image thumbnail in admin list.
-        Uses MEDIA_URL for paths like 'products/mouse.png' (full: /media/products/mouse.png).
+        Uses the generated 128px thumbnail when there is one, else the source
+        under MEDIA_URL (e.g. 'products/mouse.png' -> /media/products/mouse.png).
         """
-        if obj.image_url:
-            url = f"{settings.MEDIA_URL}{obj.image_url}"  # E.g., /media/products/mouse.png
-            return format_html('<img src="{}" width="50" height="50" style="object-fit: cover;" />', url)
+        image = image_urls(obj.image_url, obj.image_variants, "thumb")
+        if image:
+            return format_html('<img src="{}" width="50" height="50" style="object-fit: cover;" />', image["url"])
         return "No Image"
     image_preview.short_description = "Image Preview"
 
+    def sales_history_link(self, obj):
+        if not obj.pk:
+            return "-"
+        url = reverse("admin:product_app_saleshistory_changelist")
+        return format_html('<a href="{}?product__id__exact={}">All sales history</a>', url, obj.pk)
+    sales_history_link.short_description = "Sales history"
+
+    @admin.action(description="Restock selected low-stock products to just above their threshold")
+    def restock_selected(self, request, queryset):
+        count = restock_to_threshold(queryset, reference="admin")
+        self.message_user(request, f"Restocked {count} products that were at or below their threshold.", messages.SUCCESS)
+
+    @admin.action(description="Move selected products to the category chosen above")
+    def recategorize_selected(self, request, queryset):
+        form = self.action_form(request.POST)
+        form.fields["action"].choices = self.get_action_choices(request)
+        category = form.cleaned_data["category"] if form.is_valid() else None
+        if category is None:
+            self.message_user(request, "Choose a category to move the products to.", messages.WARNING)
+            return
+        count = recategorize_products(queryset, category.pk)
+        self.message_user(request, f"Moved {count} products to {category.name}.", messages.SUCCESS)
+
 
 @admin.register(Inventory)
 class InventoryAdmin(admin.ModelAdmin):
-    list_display = ("id", "product", "total_stock", "average_daily_sales", "updated_at")
+    list_display = ("id", "product", "total_stock", "stock_status", "average_daily_sales", "updated_at")
+    list_select_related = ("product",)
     search_fields = ("product__name", "product__sku")
-    list_filter = ("updated_at",)
-    readonly_fields = ("total_stock", "average_daily_sales")  # Computed
+    list_filter = ("stock_status", "updated_at")
+    autocomplete_fields = ("product",)
+    readonly_fields = ("total_stock", "stock_status", "average_daily_sales")  # Computed (average from sales stats)
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
 
 
 @admin.register(SalesHistory)
 class SalesHistoryAdmin(admin.ModelAdmin):
     list_display = ("id", "product", "date", "units_sold")
-    search_fields = ("product__name", "date")
+    list_select_related = ("product",)
+    search_fields = ("product__sku", "product__name")
     list_filter = ("date", "product__category")
-    date_hierarchy = "date"  # Filter by date range
\ No newline at end of file
+    autocomplete_fields = ("product",)
+    # Largest table: no exact COUNT(*) per page view, pages walk the (date, id) index
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    # No date_hierarchy here: its drill-down runs DISTINCT date scans over every
+    # raw row. Browse by period on the (much smaller) rollup admins below.
+
+
+@admin.register(LowStockAlert)
+class LowStockAlertAdmin(admin.ModelAdmin):
+    list_display = ("id", "product", "total_stock", "low_stock_threshold", "created_at", "sent_at", "attempts")
+    search_fields = ("product__name", "product__sku")
+    list_filter = ("sent_at", "created_at")
+    list_select_related = ("product",)
+    autocomplete_fields = ("product",)
+    readonly_fields = ("last_error",)
+
+
+@admin.register(InventoryTotals)
+class InventoryTotalsAdmin(admin.ModelAdmin):
+    list_display = ("key", "shard", "category", "product_count", "total_stock", "low_stock_count",
+                    "out_of_stock_count", "version", "updated_at")
+    list_select_related = ("category",)
+    readonly_fields = [field.name for field in InventoryTotals._meta.fields]  # Maintained automatically
+
+
+@admin.register(ProductSalesRollup)
+class ProductSalesRollupAdmin(admin.ModelAdmin):
+    list_display = ("period_start", "grain", "product", "units_sold", "sales_days")
+    search_fields = ("product__name", "product__sku")
+    list_filter = ("grain", "product__category")
+    list_select_related = ("product",)
+    autocomplete_fields = ("product",)
+    date_hierarchy = "period_start"  # Weekly/monthly sales by period
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+
+@admin.register(CategorySalesRollup)
+class CategorySalesRollupAdmin(admin.ModelAdmin):
+    list_display = ("period_start", "grain", "category", "units_sold", "sales_days")
+    list_filter = ("grain", "category")
+    list_select_related = ("category",)
+    date_hierarchy = "period_start"
+
+
+@admin.register(StockMovement)
+class StockMovementAdmin(admin.ModelAdmin):
+    list_display = ("created_at", "product", "kind", "quantity", "reference")
+    search_fields = ("product__name", "product__sku", "reference")
+    list_filter = ("kind",)
+    list_select_related = ("product",)
+    readonly_fields = [field.name for field in StockMovement._meta.fields]  # Append-only ledger
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(StockSnapshot)
+class StockSnapshotAdmin(admin.ModelAdmin):
+    list_display = ("taken_at", "product", "stock_in", "stock_out", "total_stock")
+    search_fields = ("product__name", "product__sku")
+    list_select_related = ("product",)
+    readonly_fields = [field.name for field in StockSnapshot._meta.fields]  # Written by snapshot_stock
+
+
+@admin.register(DemandForecast)
+class DemandForecastAdmin(admin.ModelAdmin):
+    list_display = ("product", "model_version", "method", "daily_rate", "forecast_30d", "data_through", "fitted_at")
+    search_fields = ("product__name", "product__sku")
+    list_filter = ("model_version", "method")
+    list_select_related = ("product",)
+    readonly_fields = [field.name for field in DemandForecast._meta.fields]  # Written by fit_demand_forecasts
@@ -0,0 +1,72 @@
+"""
+Indexed, relevance-ranked product search (``?search=``).
+
+On PostgreSQL every term is matched against the stored search vector as a
+prefix query (GIN index) or as a substring of the name / SKU (pg_trgm GIN
+indexes on ``UPPER(col::text)``, the expression Django's ``icontains``
+emits). Category names are only searched through the vector (weight C):
+an ``icontains`` on the joined category has no index, and ORing it in
+would turn the whole search into a sequential scan. Results are annotated
+with ``rank`` (full-text rank + trigram similarity of the name), which the
+view orders by when searching.
+
+Other backends (SQLite in development) keep the plain ``icontains`` scan,
+category name included, with a coarse rank: exact SKU > name prefix >
+anything else.
+"""
+
+import re
+
+from django.contrib.postgres.search import SearchQuery, SearchRank, TrigramSimilarity
+from django.db.models import Case, F, FloatField, Q, Value, When
+from rest_framework import filters
+
+from .services.search_index import SEARCH_CONFIG, search_enabled
+
+# Characters with a meaning in to_tsquery syntax
+TSQUERY_SPECIAL = re.compile(r"[&|!():*<>'\\]")
+
+
+class ProductSearchFilter(filters.SearchFilter):
+    """Drop-in replacement for DRF's SearchFilter on ProductViewSet."""
+
+    def search_terms(self, request):
+        """The ``?search=`` terms, split like SearchFilter does (quoted phrases kept together)."""
+        return list(filters.search_smart_split(self.get_search_terms(request)))
+
+    def filter_queryset(self, request, queryset, view):
+        terms = self.search_terms(request)
+        if not terms:
+            return queryset
+        text = " ".join(terms)
+
+        if not search_enabled():
+            return queryset.filter(_substring(terms, "name", "sku", "category__name")).annotate(
+                rank=Case(
+                    When(sku__iexact=text, then=Value(3.0)),
+                    When(name__istartswith=text, then=Value(2.0)),
+                    default=Value(1.0),
+                    output_field=FloatField(),
+                )
+            )
+
+        substring = _substring(terms, "name", "sku")
+        words = [TSQUERY_SPECIAL.sub(" ", term).strip() for term in terms]
+        words = [word for part in words for word in part.split()]
+        if not words:
+            return queryset.filter(substring).annotate(rank=TrigramSimilarity("name", text))
+        query = SearchQuery(" & ".join(f"{word}:*" for word in words), search_type="raw", config=SEARCH_CONFIG)
+        return queryset.filter(Q(search_vector=query) | substring).annotate(
+            rank=SearchRank(F("search_vector"), query) + TrigramSimilarity("name", text)
+        )
+
+
+def _substring(terms, *fields) -> Q:
+    """Every term must appear (case-insensitively) in at least one of ``fields``."""
+    match = Q()
+    for term in terms:
+        any_field = Q()
+        for field in fields:
+            any_field |= Q(**{f"{field}__icontains": term})
+        match &= any_field
+    return match
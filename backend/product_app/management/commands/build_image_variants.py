@@ -0,0 +1,21 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from product_app.services.images import IMAGE_SIZES, VARIANT_DIR, backfill_image_variants
+
+
+class Command(BaseCommand):
+    help = (f"Generate thumbnail / WebP variants ({', '.join(IMAGE_SIZES)}) under MEDIA_ROOT/{VARIANT_DIR} "
+            "for products whose image has none yet (new uploads get them on save).")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--force", action="store_true",
+                            help="Regenerate every product's variants (after changing the pipeline settings).")
+
+    def handle(self, *args, **options):
+        start = time.time()
+        updated, checked = backfill_image_variants(force=options["force"])
+        self.stdout.write(self.style.SUCCESS(
+            f"Image variants written for {updated} of {checked} products with images in {time.time() - start:.1f}s."
+        ))
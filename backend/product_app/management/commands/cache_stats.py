@@ -0,0 +1,20 @@
+from importlib import import_module
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from backend.cache import cache_stats
+
+
+class Command(BaseCommand):
+    help = ("Show hit/miss counts per cache namespace, summed over every process sharing the cache "
+            f"(backend: {settings.CACHE_BACKEND}).")
+
+    def handle(self, *args, **options):
+        # Namespaces register when their module is imported; the URLconf imports them all
+        import_module(settings.ROOT_URLCONF)
+        stats = cache_stats()
+        self.stdout.write(f"{'namespace':<24}{'hits':>12}{'misses':>12}{'hit rate':>10}")
+        for name, counts in stats.items():
+            rate = f"{counts['hit_rate']:.1%}" if counts["hit_rate"] is not None else "-"
+            self.stdout.write(f"{name:<24}{counts['hits']:>12,}{counts['misses']:>12,}{rate:>10}")
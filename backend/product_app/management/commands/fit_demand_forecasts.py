@@ -0,0 +1,22 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from product_app.models import FORECAST_MODEL_VERSION
+from product_app.services.forecasting import refit_forecasts
+
+
+class Command(BaseCommand):
+    help = ("Fit per-SKU demand forecasts (Croston / Holt) from SalesHistory. "
+            "Run nightly after roll_sales_stats; only SKUs with new sales are refitted.")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--full", action="store_true",
+                            help="Refit every product with sales (first run, or after a model version change).")
+
+    def handle(self, *args, **options):
+        start = time.time()
+        count = refit_forecasts(full=options["full"])
+        self.stdout.write(self.style.SUCCESS(
+            f"Fitted {count} demand forecasts ({FORECAST_MODEL_VERSION}) in {time.time() - start:.1f}s."
+        ))
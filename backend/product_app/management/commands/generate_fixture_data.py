@@ -0,0 +1,57 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from product_app.services.fixtures import FixtureSpec, generate_fixture_data, rebuild_derived_data
+
+
+class Command(BaseCommand):
+    help = ("Generate a synthetic catalog (categories, suppliers, products, inventories, seasonal sales history, "
+            "trends) from a fixed seed, written in bulk without signals.")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--products", type=int, default=10_000)
+        parser.add_argument("--sales-days", type=int, default=90, help="Sales history rows per product (one per day).")
+        parser.add_argument("--categories", type=int, default=20)
+        parser.add_argument("--suppliers", type=int, default=10)
+        parser.add_argument("--trends", type=int, default=200, help="Trend and TrendItem rows each.")
+        parser.add_argument("--seed", type=int, default=42, help="Same seed, same rows.")
+        parser.add_argument("--prefix", default="FX", help="SKU and category/supplier name prefix (default FX).")
+        parser.add_argument("--skip-derived", action="store_true",
+                            help="Do not rebuild sales stats, rollups, totals and search (run them yourself later).")
+
+    def handle(self, *args, **options):
+        spec = FixtureSpec(
+            products=options["products"],
+            sales_days=options["sales_days"],
+            categories=options["categories"],
+            suppliers=options["suppliers"],
+            trends=options["trends"],
+            seed=options["seed"],
+            prefix=options["prefix"],
+        )
+        if spec.products < 1 or spec.categories < 1 or spec.suppliers < 1 or spec.sales_days < 0 or spec.trends < 0:
+            raise CommandError("--products, --categories and --suppliers must be at least 1; counts cannot be negative")
+
+        start = time.time()
+        try:
+            counts = generate_fixture_data(spec, progress=self.stdout.write)
+        except ValueError as e:
+            raise CommandError(str(e))
+        elapsed = time.time() - start
+        rows = sum(counts.values())
+        self.stdout.write(self.style.SUCCESS(
+            f"Wrote {rows:,} rows in {elapsed:.1f}s ({rows / max(elapsed, 1e-9) * 60:,.0f} rows/min): "
+            + ", ".join(f"{count:,} {table}" for table, count in counts.items())
+        ))
+
+        if options["skip_derived"]:
+            self.stdout.write(self.style.WARNING(
+                "Derived tables are stale: run rebuild_sales_rollups, reconcile_inventory_totals, "
+                "roll_sales_stats --rebuild and snapshot_stock --open-missing "
+                "(and rebuild_search_index on PostgreSQL)."
+            ))
+            return
+        start = time.time()
+        rebuild_derived_data(progress=self.stdout.write)
+        self.stdout.write(self.style.SUCCESS(f"Derived tables rebuilt in {time.time() - start:.1f}s"))
@@ -0,0 +1,42 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from product_app.services.catalog import SUPPORTED_FORMATS, detect_format, import_catalog
+
+
+class Command(BaseCommand):
+    help = "Upsert a product catalog (CSV or XLSX with a sku column) with its categories, suppliers and inventories."
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="File to import, or '-' to read CSV from stdin.")
+        parser.add_argument("--format", choices=SUPPORTED_FORMATS, default=None,
+                            help="File format (default: guessed from the extension, else csv).")
+
+    def handle(self, *args, **options):
+        path = options["path"]
+        fmt = options["format"] or detect_format(path)
+
+        try:
+            if path == "-":
+                report = import_catalog(sys.stdin.buffer, fmt)
+            else:
+                with open(path, "rb") as stream:
+                    report = import_catalog(stream, fmt)
+        except (OSError, ValueError) as e:
+            raise CommandError(str(e))
+
+        inventories = report["inventories"]
+        self.stdout.write(self.style.SUCCESS(
+            f"Imported {report['rows_read']} rows in {report['seconds']}s "
+            f"({report['rows_per_second']} rows/s): {report['created']} products created, "
+            f"{report['updated']} updated, {report['unchanged']} unchanged; inventories "
+            f"{inventories['created']} created, {inventories['updated']} updated; "
+            f"{report['categories_created']} categories and {report['suppliers_created']} suppliers created."
+        ))
+        rejected = report["rejected"]
+        if any(rejected.values()):
+            summary = ", ".join(f"{reason}={count}" for reason, count in rejected.items() if count)
+            self.stdout.write(self.style.WARNING(f"Rejected {sum(rejected.values())} rows ({summary})"))
+            for error in report["errors"]:
+                self.stdout.write(f"  - {error}")
@@ -0,0 +1,39 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from product_app.services.sales_import import SUPPORTED_FORMATS, detect_format, import_sales_history
+
+
+class Command(BaseCommand):
+    help = "Stream a POS sales export (CSV with sku,date,units_sold header, or NDJSON) into SalesHistory."
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="File to import, or '-' to read from stdin.")
+        parser.add_argument("--format", choices=SUPPORTED_FORMATS, default=None,
+                            help="File format (default: guessed from the extension, else csv).")
+
+    def handle(self, *args, **options):
+        path = options["path"]
+        fmt = options["format"] or detect_format(path)
+
+        try:
+            if path == "-":
+                report = import_sales_history(sys.stdin.buffer, fmt)
+            else:
+                with open(path, "rb") as stream:
+                    report = import_sales_history(stream, fmt)
+        except (OSError, ValueError) as e:
+            raise CommandError(str(e))
+
+        rejected = report["rejected"]
+        self.stdout.write(self.style.SUCCESS(
+            f"Imported {report['rows_read']} rows in {report['seconds']}s "
+            f"({report['rows_per_second']} rows/s): {report['inserted']} inserted, "
+            f"{report['updated']} updated, {report['unchanged']} unchanged."
+        ))
+        if any(rejected.values()):
+            summary = ", ".join(f"{reason}={count}" for reason, count in rejected.items() if count)
+            self.stdout.write(self.style.WARNING(f"Rejected {sum(rejected.values())} rows ({summary})"))
+            for error in report["errors"]:
+                self.stdout.write(f"  - {error}")
@@ -0,0 +1,15 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from product_app.services.sync import TOMBSTONE_RETENTION, prune_tombstones
+
+
+class Command(BaseCommand):
+    help = (f"Delete delta-sync tombstones older than {TOMBSTONE_RETENTION.days} days "
+            "(clients with older tokens are told to sync from scratch). Run daily.")
+
+    def handle(self, *args, **options):
+        start = time.time()
+        deleted = prune_tombstones()
+        self.stdout.write(self.style.SUCCESS(f"Pruned {deleted} tombstones in {time.time() - start:.1f}s."))
@@ -0,0 +1,17 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from product_app.services.sales_rollups import rebuild_sales_rollups
+
+
+class Command(BaseCommand):
+    help = "Rebuild the weekly/monthly product and category sales rollups from SalesHistory (backfill or repair)."
+
+    def handle(self, *args, **options):
+        start = time.time()
+        written = rebuild_sales_rollups()
+        self.stdout.write(self.style.SUCCESS(
+            f"Rebuilt {written['product']} product and {written['category']} category rollup rows "
+            f"in {time.time() - start:.1f}s."
+        ))
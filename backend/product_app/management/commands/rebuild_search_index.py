@@ -0,0 +1,22 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from product_app.services.search_index import rebuild_search_index, search_enabled
+
+
+class Command(BaseCommand):
+    help = ("Recompute Product.search_vector for every product. "
+            "Run after raw SQL imports or changes to the search vector definition.")
+
+    def handle(self, *args, **options):
+        if not search_enabled():
+            self.stdout.write(self.style.WARNING(
+                "Indexed search needs PostgreSQL; this database uses the LIKE fallback, nothing to rebuild."
+            ))
+            return
+        start = time.time()
+        count = rebuild_search_index()
+        self.stdout.write(self.style.SUCCESS(
+            f"Rebuilt search vectors for {count} products in {time.time() - start:.1f}s."
+        ))
@@ -0,0 +1,20 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from product_app.services.inventory_totals import rebuild_inventory_totals
+
+
+class Command(BaseCommand):
+    help = "Rebuild the global and per-category InventoryTotals rows from Inventory and report any drift."
+
+    def handle(self, *args, **options):
+        start = time.time()
+        drifted = rebuild_inventory_totals()
+        elapsed = time.time() - start
+        if drifted:
+            self.stdout.write(self.style.WARNING(
+                f"Corrected {len(drifted)} drifted totals rows ({', '.join(sorted(drifted))}) in {elapsed:.1f}s."
+            ))
+        else:
+            self.stdout.write(self.style.SUCCESS(f"Inventory totals are consistent ({elapsed:.1f}s)."))
@@ -0,0 +1,27 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from product_app.services.sales_stats import rebuild_sales_stats, roll_sales_windows
+
+
+class Command(BaseCommand):
+    help = "Advance rolling 7/30/90-day sales stats to today (run daily, e.g. from cron just after midnight)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rebuild", action="store_true",
+                            help="Recompute all stats from SalesHistory instead of rolling forward.")
+
+    def handle(self, *args, **options):
+        start = time.time()
+        if options["rebuild"]:
+            count = rebuild_sales_stats()
+            self.stdout.write(self.style.SUCCESS(
+                f"Rebuilt sales stats for {count} products in {time.time() - start:.1f}s."
+            ))
+            return
+
+        count = roll_sales_windows()
+        self.stdout.write(self.style.SUCCESS(
+            f"Rolled sales windows forward; {count} products had expiring sales ({time.time() - start:.1f}s)."
+        ))
@@ -0,0 +1,52 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from product_app.services.alerts import (
+    ALERT_RETENTION_DAYS,
+    DELIVERY_BATCH_SIZE,
+    deliver_low_stock_alerts,
+    prune_low_stock_alerts,
+)
+
+
+class Command(BaseCommand):
+    help = "Deliver queued low-stock alerts as digest emails (run from cron, or with --loop as a worker)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--loop", action="store_true",
+                            help="Keep draining the outbox until interrupted.")
+        parser.add_argument("--interval", type=float, default=30.0,
+                            help="Seconds to sleep between drains when the outbox is empty (with --loop).")
+        parser.add_argument("--batch-size", type=int, default=DELIVERY_BATCH_SIZE,
+                            help="Maximum alerts claimed per drain.")
+        parser.add_argument("--retention-days", type=int, default=ALERT_RETENTION_DAYS,
+                            help="Delete delivered alerts older than this many days.")
+
+    def handle(self, *args, **options):
+        pruned = prune_low_stock_alerts(options["retention_days"])
+        if pruned:
+            self.stdout.write(f"Pruned {pruned} old alerts.")
+
+        try:
+            while True:
+                result = self._drain(options["batch_size"])
+                if not options["loop"]:
+                    break
+                if not result["alerts"] or result["failed"]:
+                    time.sleep(options["interval"])
+        except KeyboardInterrupt:
+            self.stdout.write("Stopped.")
+
+    def _drain(self, batch_size):
+        result = deliver_low_stock_alerts(batch_size)
+        if result["failed"]:
+            self.stderr.write(self.style.ERROR(
+                f"Failed to deliver {result['failed']} alerts; they will be retried."
+            ))
+        elif result["alerts"]:
+            self.stdout.write(self.style.SUCCESS(
+                f"Sent {result['emails']} digest emails covering {result['products']} products "
+                f"({result['alerts']} alerts)."
+            ))
+        return result
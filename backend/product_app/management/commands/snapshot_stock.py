@@ -0,0 +1,44 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from product_app.services.movements import open_snapshots, stock_drift, take_snapshots
+
+
+class Command(BaseCommand):
+    help = ("Snapshot the stock movement ledger and report Inventory counters that differ from it "
+            "(run from cron, e.g. every 15 minutes).")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--check-all", action="store_true",
+                            help="Compare every inventory with the ledger, not only the products snapshotted now.")
+        parser.add_argument("--no-check", action="store_true",
+                            help="Take snapshots only; do not compare Inventory counters with the ledger.")
+        parser.add_argument("--open-missing", action="store_true",
+                            help="First write opening snapshots for inventories with stock but no ledger rows "
+                                 "(after bulk loads that bypass the ledger).")
+
+    def handle(self, *args, **options):
+        if options["open_missing"]:
+            start = time.time()
+            opened = open_snapshots()
+            self.stdout.write(self.style.SUCCESS(f"Opened {opened} inventories in {time.time() - start:.1f}s."))
+        start = time.time()
+        snapshotted = take_snapshots()
+        self.stdout.write(self.style.SUCCESS(f"Took {len(snapshotted)} stock snapshots in {time.time() - start:.1f}s."))
+        if options["no_check"]:
+            return
+
+        start = time.time()
+        drift = stock_drift(None if options["check_all"] else snapshotted)
+        if not drift:
+            self.stdout.write(self.style.SUCCESS(f"Inventory counters match the ledger ({time.time() - start:.1f}s)."))
+            return
+        self.stdout.write(self.style.WARNING(
+            f"{len(drift)} inventories differ from the ledger (counters left unchanged; "
+            "writers that bypass the ledger need opening snapshots):"
+        ))
+        for row in drift[:20]:
+            self.stdout.write(f"  {row['sku']}: {row['total_stock']} on hand, ledger {row['ledger_stock']}")
+        if len(drift) > 20:
+            self.stdout.write(f"  ... and {len(drift) - 20} more")
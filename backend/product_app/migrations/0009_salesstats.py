@@ -0,0 +1,61 @@
+# Generated by Django 5.2.6 on 2026-10-17 07:00
+
+import django.db.models.deletion
+import django.utils.timezone
+from datetime import timedelta
+from django.db import migrations, models
+from django.db.models.functions import Coalesce
+
+
+def backfill_sales_stats(apps, schema_editor):
+    """Seed rolling windows from existing SalesHistory (same maths as rebuild_sales_stats)."""
+    Product = apps.get_model('product_app', 'Product')
+    SalesHistory = apps.get_model('product_app', 'SalesHistory')
+    SalesStats = apps.get_model('product_app', 'SalesStats')
+
+    today = django.utils.timezone.localdate()
+    aggregates = {}
+    for window in (7, 30, 90):
+        in_window = models.Q(date__gte=today - timedelta(days=window))
+        aggregates[f'units_{window}d'] = Coalesce(models.Sum('units_sold', filter=in_window), 0)
+        aggregates[f'days_{window}d'] = models.Count('id', filter=in_window)
+
+    totals = {
+        row.pop('product_id'): row
+        for row in SalesHistory.objects.filter(date__gte=today - timedelta(days=90))
+        .order_by().values('product_id').annotate(**aggregates)
+    }
+    SalesStats.objects.bulk_create(
+        [SalesStats(product_id=pid, window_end=today, **totals.get(pid, {}))
+         for pid in Product.objects.values_list('id', flat=True).iterator()],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('product_app', '0008_inventory_low_stock_threshold'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SalesStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('window_end', models.DateField(db_index=True)),
+                ('units_7d', models.PositiveIntegerField(default=0)),
+                ('days_7d', models.PositiveIntegerField(default=0)),
+                ('units_30d', models.PositiveIntegerField(default=0)),
+                ('days_30d', models.PositiveIntegerField(default=0)),
+                ('units_90d', models.PositiveIntegerField(default=0)),
+                ('days_90d', models.PositiveIntegerField(default=0)),
+                ('changed_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('product', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='sales_stats', to='product_app.product')),
+            ],
+            options={
+                'verbose_name_plural': 'sales stats',
+            },
+        ),
+        migrations.RunPython(backfill_sales_stats, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,68 @@
+# Generated by Django 5.2.6 on 2026-10-17 07:07
+
+import django.db.models.deletion
+import django.utils.timezone
+from decimal import Decimal
+from django.db import migrations, models
+from django.db.models.functions import Coalesce
+
+
+def backfill_inventory_totals(apps, schema_editor):
+    """Seed global and per-category totals (same maths as rebuild_inventory_totals)."""
+    Inventory = apps.get_model('product_app', 'Inventory')
+    InventoryTotals = apps.get_model('product_app', 'InventoryTotals')
+
+    fields = ('product_count', 'stock_in', 'stock_out', 'total_stock',
+              'average_daily_sales_sum', 'low_stock_count', 'out_of_stock_count')
+    low = models.Q(total_stock__gt=0, total_stock__lte=models.F('low_stock_threshold'))
+    rows = list(
+        Inventory.objects.order_by().values('product__category_id').annotate(
+            agg_product_count=models.Count('id'),
+            agg_stock_in=Coalesce(models.Sum('stock_in'), 0),
+            agg_stock_out=Coalesce(models.Sum('stock_out'), 0),
+            agg_total_stock=Coalesce(models.Sum('total_stock'), 0),
+            agg_average_daily_sales_sum=Coalesce(
+                models.Sum('average_daily_sales'), models.Value(Decimal('0')),
+                output_field=models.DecimalField(max_digits=18, decimal_places=2),
+            ),
+            agg_low_stock_count=models.Count('id', filter=low),
+            agg_out_of_stock_count=models.Count('id', filter=models.Q(total_stock__lte=0)),
+        )
+    )
+    totals = [InventoryTotals(key='all', **{f: sum(row[f'agg_{f}'] for row in rows) for f in fields})]
+    for row in rows:
+        category_id = row['product__category_id']
+        key = f"category:{category_id if category_id is not None else 'none'}"
+        totals.append(InventoryTotals(key=key, category_id=category_id, **{f: row[f'agg_{f}'] for f in fields}))
+    InventoryTotals.objects.bulk_create(totals, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('product_app', '0010_lowstockalert'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='InventoryTotals',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(max_length=32, unique=True)),
+                ('product_count', models.BigIntegerField(default=0)),
+                ('stock_in', models.BigIntegerField(default=0)),
+                ('stock_out', models.BigIntegerField(default=0)),
+                ('total_stock', models.BigIntegerField(default=0)),
+                ('average_daily_sales_sum', models.DecimalField(decimal_places=2, default=0, max_digits=18)),
+                ('low_stock_count', models.BigIntegerField(default=0)),
+                ('out_of_stock_count', models.BigIntegerField(default=0)),
+                ('version', models.BigIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('category', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='inventory_totals', to='product_app.category')),
+            ],
+            options={
+                'verbose_name_plural': 'inventory totals',
+            },
+        ),
+        migrations.RunPython(backfill_inventory_totals, migrations.RunPython.noop),
+    ]
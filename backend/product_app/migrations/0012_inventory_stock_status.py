@@ -0,0 +1,37 @@
+# Generated by Django 5.2.6 on 2026-10-17 07:08
+
+from django.db import migrations, models
+
+
+def populate_stock_status(apps, schema_editor):
+    """Same rule as models.stock_status_for, applied in one UPDATE."""
+    Inventory = apps.get_model('product_app', 'Inventory')
+    Inventory.objects.update(stock_status=models.Case(
+        models.When(total_stock__lte=0, then=models.Value('out_of_stock')),
+        models.When(total_stock__lte=models.F('low_stock_threshold'), then=models.Value('low_stock')),
+        default=models.Value('in_stock'),
+    ))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('product_app', '0011_inventorytotals'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='inventory',
+            name='stock_status',
+            field=models.CharField(choices=[('in_stock', 'In stock'), ('low_stock', 'Low stock'), ('out_of_stock', 'Out of stock')], default='out_of_stock', max_length=16),
+        ),
+        migrations.RunPython(populate_stock_status, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='inventory',
+            index=models.Index(condition=models.Q(('stock_status', 'low_stock')), fields=['product'], name='inventory_low_stock_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='inventory',
+            index=models.Index(condition=models.Q(('stock_status', 'out_of_stock')), fields=['product'], name='inventory_out_of_stock_idx'),
+        ),
+    ]
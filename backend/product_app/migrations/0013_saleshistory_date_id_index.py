@@ -0,0 +1,22 @@
+# Generated by Django 5.2.6 on 2026-10-17 07:09
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('product_app', '0012_inventory_stock_status'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='saleshistory',
+            name='date',
+            field=models.DateField(),
+        ),
+        migrations.AddIndex(
+            model_name='saleshistory',
+            index=models.Index(fields=['date', 'id'], name='saleshistory_date_id_idx'),
+        ),
+    ]
@@ -0,0 +1,73 @@
+# Generated by Django 5.2.6 on 2026-10-17 07:12
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models.functions import Trunc
+
+
+def backfill_sales_rollups(apps, schema_editor):
+    """Seed weekly/monthly rollups from SalesHistory (same maths as rebuild_sales_rollups)."""
+    SalesHistory = apps.get_model('product_app', 'SalesHistory')
+    ProductSalesRollup = apps.get_model('product_app', 'ProductSalesRollup')
+    CategorySalesRollup = apps.get_model('product_app', 'CategorySalesRollup')
+
+    for grain in ('week', 'month'):
+        periods = SalesHistory.objects.order_by().annotate(
+            period=Trunc('date', grain, output_field=models.DateField())
+        )
+        totals = {'units': models.Sum('units_sold'), 'days': models.Count('id')}
+        ProductSalesRollup.objects.bulk_create(
+            [ProductSalesRollup(product_id=row['product_id'], grain=grain, period_start=row['period'],
+                                units_sold=row['units'], sales_days=row['days'])
+             for row in periods.values('product_id', 'period').annotate(**totals)],
+            batch_size=1000,
+        )
+        CategorySalesRollup.objects.bulk_create(
+            [CategorySalesRollup(category_id=row['product__category_id'], grain=grain, period_start=row['period'],
+                                 units_sold=row['units'], sales_days=row['days'])
+             for row in periods.values('product__category_id', 'period').annotate(**totals)],
+            batch_size=1000,
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('product_app', '0013_saleshistory_date_id_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CategorySalesRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('grain', models.CharField(choices=[('week', 'Week'), ('month', 'Month')], max_length=8)),
+                ('period_start', models.DateField()),
+                ('units_sold', models.PositiveIntegerField(default=0)),
+                ('sales_days', models.PositiveIntegerField(default=0)),
+                ('category', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='sales_rollups', to='product_app.category')),
+            ],
+            options={
+                'ordering': ['-period_start'],
+                'indexes': [models.Index(fields=['grain', 'period_start'], name='category_rollup_period_idx')],
+                'constraints': [models.UniqueConstraint(fields=('category', 'grain', 'period_start'), name='category_rollup_unique'), models.UniqueConstraint(condition=models.Q(('category__isnull', True)), fields=('grain', 'period_start'), name='category_rollup_uncategorized_unique')],
+            },
+        ),
+        migrations.CreateModel(
+            name='ProductSalesRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('grain', models.CharField(choices=[('week', 'Week'), ('month', 'Month')], max_length=8)),
+                ('period_start', models.DateField()),
+                ('units_sold', models.PositiveIntegerField(default=0)),
+                ('sales_days', models.PositiveIntegerField(default=0)),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='sales_rollups', to='product_app.product')),
+            ],
+            options={
+                'ordering': ['-period_start'],
+                'indexes': [models.Index(fields=['grain', 'period_start'], name='product_rollup_period_idx')],
+                'constraints': [models.UniqueConstraint(fields=('product', 'grain', 'period_start'), name='product_rollup_unique')],
+            },
+        ),
+        migrations.RunPython(backfill_sales_rollups, migrations.RunPython.noop),
+    ]
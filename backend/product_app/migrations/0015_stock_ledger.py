@@ -0,0 +1,58 @@
+# Generated by Django 5.2.6 on 2026-10-17 07:16
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+def open_stock_ledger(apps, schema_editor):
+    """Opening snapshot per inventory from its current counters (the ledger starts here)."""
+    Inventory = apps.get_model('product_app', 'Inventory')
+    StockSnapshot = apps.get_model('product_app', 'StockSnapshot')
+    now = django.utils.timezone.now()
+    StockSnapshot.objects.bulk_create(
+        [StockSnapshot(product_id=product_id, taken_at=now, stock_in=stock_in, stock_out=stock_out)
+         for product_id, stock_in, stock_out in Inventory.objects.exclude(stock_in=0, stock_out=0)
+         .values_list('product_id', 'stock_in', 'stock_out').iterator()],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('product_app', '0014_sales_rollups'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StockMovement',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('receipt', 'Receipt'), ('sale', 'Sale'), ('adjustment', 'Adjustment'), ('transfer', 'Transfer')], default='adjustment', max_length=16)),
+                ('quantity', models.IntegerField()),
+                ('reference', models.CharField(blank=True, help_text="Origin, e.g. 'bulk-adjust', 'api', 'admin'", max_length=64)),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='stock_movements', to='product_app.product')),
+            ],
+            options={
+                'ordering': ['-created_at', '-id'],
+                'indexes': [models.Index(fields=['product', 'created_at'], name='movement_product_time_idx'), models.Index(fields=['created_at'], name='movement_time_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='StockSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('taken_at', models.DateTimeField()),
+                ('stock_in', models.BigIntegerField(default=0)),
+                ('stock_out', models.BigIntegerField(default=0)),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='stock_snapshots', to='product_app.product')),
+            ],
+            options={
+                'ordering': ['-taken_at'],
+                'constraints': [models.UniqueConstraint(fields=('product', 'taken_at'), name='snapshot_product_time_unique')],
+            },
+        ),
+        migrations.RunPython(open_stock_ledger, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 5.2.6 on 2026-10-17 07:26
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('product_app', '0015_stock_ledger'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DemandForecast',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('model_version', models.CharField(max_length=32)),
+                ('method', models.CharField(choices=[('croston', 'Croston (SBA), intermittent demand'), ('holt', 'Holt linear trend'), ('none', 'No recent sales')], max_length=16)),
+                ('daily_rate', models.FloatField(default=0)),
+                ('daily_trend', models.FloatField(default=0)),
+                ('forecast_7d', models.FloatField(default=0)),
+                ('forecast_30d', models.FloatField(default=0)),
+                ('history_days', models.PositiveIntegerField(default=0)),
+                ('data_through', models.DateField()),
+                ('fitted_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='forecasts', to='product_app.product')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('product', 'model_version'), name='forecast_product_version_unique')],
+            },
+        ),
+    ]
@@ -0,0 +1,57 @@
+# Generated by Django 5.2.6 on 2026-10-17 07:35
+
+import django.contrib.postgres.search
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations
+
+# The trigram indexes are on UPPER(col::text): the expression Django's
+# icontains / istartswith lookups emit on PostgreSQL, so those use them too
+SEARCH_INDEXES = [
+    'CREATE INDEX IF NOT EXISTS product_name_trgm_idx ON product_app_product '
+    'USING gin ((UPPER(name::text)) gin_trgm_ops)',
+    'CREATE INDEX IF NOT EXISTS product_sku_trgm_idx ON product_app_product '
+    'USING gin ((UPPER(sku::text)) gin_trgm_ops)',
+    'CREATE INDEX IF NOT EXISTS product_search_vector_idx ON product_app_product USING gin (search_vector)',
+]
+SEARCH_INDEX_NAMES = ['product_name_trgm_idx', 'product_sku_trgm_idx', 'product_search_vector_idx']
+
+BACKFILL_SEARCH_VECTORS = """
+    UPDATE product_app_product AS p SET search_vector =
+        setweight(to_tsvector('simple', COALESCE(p.sku, '')), 'A')
+        || setweight(to_tsvector('simple', COALESCE(p.name, '')), 'A')
+        || setweight(to_tsvector('simple', COALESCE(
+            (SELECT c.name FROM product_app_category AS c WHERE c.id = p.category_id), '')), 'C')
+"""
+
+
+def create_search_indexes(apps, schema_editor):
+    """pg_trgm / GIN indexes and the initial search vectors (PostgreSQL only)."""
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for statement in SEARCH_INDEXES:
+        schema_editor.execute(statement)
+    schema_editor.execute(BACKFILL_SEARCH_VECTORS)
+
+
+def drop_search_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for name in SEARCH_INDEX_NAMES:
+        schema_editor.execute(f'DROP INDEX IF EXISTS {name}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('product_app', '0016_demand_forecasts'),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        migrations.AddField(
+            model_name='product',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.RunPython(create_search_indexes, drop_search_indexes),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 5.2.6 on 2026-10-17 08:31
+
+from django.db import migrations, models
+from django.db.models import Max, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def set_snapshot_movement_ids(apps, schema_editor):
+    """Existing snapshots covered the product's movements created up to taken_at."""
+    StockMovement = apps.get_model('product_app', 'StockMovement')
+    StockSnapshot = apps.get_model('product_app', 'StockSnapshot')
+    covered = (
+        StockMovement.objects.filter(product_id=OuterRef('product_id'), created_at__lte=OuterRef('taken_at'))
+        .order_by().values('product_id').annotate(top=Max('id')).values('top')
+    )
+    StockSnapshot.objects.update(movement_id=Coalesce(Subquery(covered), 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('product_app', '0019_delta_sync'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='stockmovement',
+            name='movement_time_idx',
+        ),
+        migrations.AddField(
+            model_name='stocksnapshot',
+            name='movement_id',
+            field=models.BigIntegerField(default=0, help_text='Last StockMovement id of the product covered'),
+        ),
+        migrations.AddIndex(
+            model_name='stockmovement',
+            index=models.Index(fields=['product', 'id'], name='movement_product_id_idx'),
+        ),
+        migrations.RunPython(set_snapshot_movement_ids, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.6 on 2026-10-17 08:35
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('product_app', '0020_stock_snapshot_movement_id'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='lowstockalert',
+            name='claimed_until',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='lowstockalert',
+            name='delivered_to',
+            field=models.JSONField(blank=True, default=list),
+        ),
+    ]
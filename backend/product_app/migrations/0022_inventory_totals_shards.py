@@ -0,0 +1,27 @@
+# Generated by Django 5.2.6 on 2026-10-17 08:36
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('product_app', '0021_lowstockalert_delivery_lease'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='inventorytotals',
+            name='shard',
+            field=models.PositiveSmallIntegerField(default=0),
+        ),
+        migrations.AlterField(
+            model_name='inventorytotals',
+            name='key',
+            field=models.CharField(max_length=32),
+        ),
+        migrations.AddConstraint(
+            model_name='inventorytotals',
+            constraint=models.UniqueConstraint(fields=('key', 'shard'), name='inventorytotals_key_shard_unique'),
+        ),
+    ]
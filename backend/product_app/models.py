@@ -1,11 +1,8 @@
-from django.core.cache import cache
-from django.db import models
-from django.utils import timezone
 from datetime import timedelta
+from django.db import models, transaction
+from django.contrib.postgres.search import SearchVectorField
+from django.utils import timezone
 from decimal import Decimal
-from django.core.mail import send_mail
-from django.conf import settings
-from auth_app.models import User
 import logging
 
 logger = logging.getLogger(__name__)
@@ -49,6 +46,10 @@ class Product(models.Model):
         Supplier, on_delete=models.SET_NULL, null=True, blank=True, related_name="products"
     )  # NEW: Link to supplier
     image_url = models.CharField(max_length=500, blank=True, help_text="Relative path, e.g., 'products/gray_pants.png'")
+    # SKU + name + category name, refreshed on write (PostgreSQL only; see services/search_index.py)
+    search_vector = SearchVectorField(null=True, editable=False)
+    # Thumbnail / WebP variants of image_url with content-hashed paths (see services/images.py)
+    image_variants = models.JSONField(default=dict, blank=True, editable=False)
 
     # Audit fields
     created_at = models.DateTimeField(auto_now_add=True)  # first created
@@ -59,11 +60,20 @@ class Product(models.Model):
         indexes = [
             models.Index(fields=["sku"]),
             models.Index(fields=["name"]),
+            models.Index(fields=["updated_at", "id"], name="product_updated_id_idx"),  # Delta sync pages
         ]
 
     def __str__(self):
         return f"{self.sku} - {self.name}"
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember the stored category so recategorizing can move InventoryTotals
+        if "category_id" in instance.__dict__:
+            instance._loaded_category_id = instance.category_id
+        return instance
+
     @property
     def quantity(self):
         """
@@ -78,16 +88,153 @@ class SalesHistory(models.Model):
     NEW: Tracks daily sales for trend analysis and better averages/forecasts.
     """
     product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name="sales_history")
-    date = models.DateField(db_index=True)
+    date = models.DateField()
     units_sold = models.PositiveIntegerField(default=0)
 
     class Meta:
-        unique_together = ["product", "date"]  # One entry per day per product
+        unique_together = ["product", "date"]  # One entry per day per product (also serves SKU + range filters)
         ordering = ["-date"]  # Latest first
+        indexes = [
+            models.Index(fields=["date", "id"], name="saleshistory_date_id_idx"),  # Keyset pagination / date ranges
+        ]
 
     def __str__(self):
         return f"{self.product.name} - {self.date}: {self.units_sold} sold"
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember the stored row so signals can apply exact deltas to SalesStats
+        if not instance.get_deferred_fields():
+            instance._loaded_sales = (instance.product_id, instance.date, instance.units_sold)
+        return instance
+
+
+# Rolling sales windows (days) kept up to date by services/sales_stats.py
+SALES_WINDOWS = (7, 30, 90)
+AVERAGE_SALES_WINDOW = 30  # Window behind Inventory.average_daily_sales
+
+
+class SalesStats(models.Model):
+    """
+    Rolling-window sales counters per product (7/30/90 days).
+
+    Maintained incrementally whenever SalesHistory rows are written, and
+    shifted forward once a day by `manage.py roll_sales_stats`, so nothing
+    on the request path has to re-aggregate SalesHistory.
+    Window N covers SalesHistory dates >= window_end - N days.
+    """
+    product = models.OneToOneField(Product, on_delete=models.CASCADE, related_name="sales_stats")
+    window_end = models.DateField(db_index=True)
+    units_7d = models.PositiveIntegerField(default=0)
+    days_7d = models.PositiveIntegerField(default=0)
+    units_30d = models.PositiveIntegerField(default=0)
+    days_30d = models.PositiveIntegerField(default=0)
+    units_90d = models.PositiveIntegerField(default=0)
+    days_90d = models.PositiveIntegerField(default=0)
+    changed_at = models.DateTimeField(default=timezone.now)  # Last sales write (not rollovers)
+
+    class Meta:
+        verbose_name_plural = "sales stats"
+
+    def __str__(self):
+        return f"Sales stats for product {self.product_id} as of {self.window_end}"
+
+    def average_daily_sales(self, window: int = AVERAGE_SALES_WINDOW) -> Decimal:
+        """Units per recorded sales day within `window` (0 when there are no sales rows)."""
+        units = getattr(self, f"units_{window}d")
+        days = getattr(self, f"days_{window}d") or 1
+        return (Decimal(units) / Decimal(days)).quantize(Decimal("0.01"))
+
+
+ROLLUP_GRAINS = [("week", "Week"), ("month", "Month")]
+
+
+def rollup_period_start(day, grain: str):
+    """First day of the week (Monday) or month containing ``day``."""
+    if grain == "week":
+        return day - timedelta(days=day.weekday())
+    return day.replace(day=1)
+
+
+class ProductSalesRollup(models.Model):
+    """
+    Units sold per product per week / month, kept current from every
+    SalesHistory write (services/sales_rollups.py) and rebuildable with
+    `manage.py rebuild_sales_rollups`. Reports read these instead of raw days.
+    """
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name="sales_rollups")
+    grain = models.CharField(max_length=8, choices=ROLLUP_GRAINS)
+    period_start = models.DateField()
+    units_sold = models.PositiveIntegerField(default=0)
+    sales_days = models.PositiveIntegerField(default=0)  # SalesHistory rows in the period
+
+    class Meta:
+        ordering = ["-period_start"]
+        constraints = [
+            models.UniqueConstraint(fields=["product", "grain", "period_start"], name="product_rollup_unique"),
+        ]
+        indexes = [
+            models.Index(fields=["grain", "period_start"], name="product_rollup_period_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.product_id} {self.grain} of {self.period_start}: {self.units_sold} sold"
+
+
+class CategorySalesRollup(models.Model):
+    """
+    Units sold per category per week / month (category NULL = uncategorized).
+    Attributed to each product's current category: recategorizing a product
+    moves its history between rows.
+    """
+    category = models.ForeignKey(
+        Category, on_delete=models.CASCADE, null=True, blank=True, related_name="sales_rollups"
+    )
+    grain = models.CharField(max_length=8, choices=ROLLUP_GRAINS)
+    period_start = models.DateField()
+    units_sold = models.PositiveIntegerField(default=0)
+    sales_days = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        ordering = ["-period_start"]
+        constraints = [
+            models.UniqueConstraint(fields=["category", "grain", "period_start"], name="category_rollup_unique"),
+            # NULLs never conflict in a plain unique index, so uncategorized rows get their own
+            models.UniqueConstraint(
+                fields=["grain", "period_start"],
+                condition=models.Q(category__isnull=True),
+                name="category_rollup_uncategorized_unique",
+            ),
+        ]
+        indexes = [
+            models.Index(fields=["grain", "period_start"], name="category_rollup_period_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.category_id or 'uncategorized'} {self.grain} of {self.period_start}: {self.units_sold} sold"
+
+
+STOCK_STATUS_CHOICES = [
+    ("in_stock", "In stock"),
+    ("low_stock", "Low stock"),
+    ("out_of_stock", "Out of stock"),
+]
+
+
+def stock_status_for(total_stock: int, threshold: int) -> str:
+    """Stock status label: out_of_stock at 0, low_stock up to the inventory's threshold."""
+    if total_stock <= 0:
+        return "out_of_stock"
+    if total_stock <= threshold:
+        return "low_stock"
+    return "in_stock"
+
+
+def is_low_stock(total_stock: int, threshold: int) -> bool:
+    """Low or out of stock by stock_status_for(); alerts and restocks use the same test."""
+    return stock_status_for(total_stock, threshold) != "in_stock"
+
 
 class Inventory(models.Model):
     """
@@ -100,80 +247,319 @@ class Inventory(models.Model):
     total_stock = models.PositiveIntegerField(default=0)
     average_daily_sales = models.DecimalField(max_digits=10, decimal_places=2, default=0)
     low_stock_threshold = models.PositiveIntegerField(default=10)
+    # Derived from total_stock and this inventory's threshold on every write
+    stock_status = models.CharField(max_length=16, choices=STOCK_STATUS_CHOICES, default="out_of_stock")
 
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [
+            # Only the restock-worthy minority is indexed; in_stock is most rows
+            models.Index(
+                fields=["product"],
+                condition=models.Q(stock_status="low_stock"),
+                name="inventory_low_stock_idx",
+            ),
+            models.Index(
+                fields=["product"],
+                condition=models.Q(stock_status="out_of_stock"),
+                name="inventory_out_of_stock_idx",
+            ),
+            models.Index(fields=["updated_at", "id"], name="inventory_updated_id_idx"),  # Delta sync pages
+        ]
+
     def save(self, *args, **kwargs):
-        # Auto-calculate total stock
-        old_stock = self.total_stock  # Track old value for delta check
+        # Auto-calculate total stock and its status
         self.total_stock = self.stock_in - self.stock_out
-        
-        # NEW: Compute average_daily_sales from last 30 days of SalesHistory (fallback to 0)
-        thirty_days_ago = timezone.now().date() - timedelta(days=30)
-        recent_sales = self.product.sales_history.filter(date__gte=thirty_days_ago).aggregate(
-            total=models.Sum('units_sold'),
-            days=models.Count('date')
+        self.stock_status = stock_status_for(self.total_stock, self.low_stock_threshold)
+
+        # average_daily_sales is maintained by services/sales_stats.py whenever
+        # SalesHistory changes, so saving stock counters never touches sales.
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+
+            # Queue an alert (same transaction) only when stock is low by stock_status;
+            # the email is sent outside the request by manage.py send_low_stock_alerts
+            if is_low_stock(self.total_stock, self.low_stock_threshold):
+                LowStockAlert.enqueue([self])
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember the stored counters so InventoryTotals get exact deltas
+        if not instance.get_deferred_fields():
+            instance._loaded_totals = instance.totals_snapshot()
+        return instance
+
+    def totals_snapshot(self):
+        """The values InventoryTotals aggregate, as stored right now on this instance."""
+        return (
+            self.stock_in,
+            self.stock_out,
+            self.total_stock,
+            Decimal(self.average_daily_sales or 0),
+            self.low_stock_threshold,
         )
-        total_sold = recent_sales['total'] or 0
-        days_count = recent_sales['days'] or 1  # Avoid div by zero
-        self.average_daily_sales = Decimal(total_sold) / Decimal(days_count)
-        
+
+    def __str__(self):
+        return f"Inventory for {self.product.name}"
+
+
+class InventoryTotals(models.Model):
+    """
+    Running inventory aggregates so summaries never scan Inventory.
+
+    One global key ("all") plus one key per category ("category:<id>",
+    "category:none" for uncategorized products). Each key is striped over
+    up to SHARDS rows; every Inventory write applies F-expression deltas to
+    one shard in the same transaction (services/inventory_totals.py), so
+    concurrent writers rarely wait on the same row, and readers sum the
+    shards. `manage.py reconcile_inventory_totals` rebuilds them from
+    scratch. The summed `version` increases on every change.
+    """
+    GLOBAL_KEY = "all"
+    SHARDS = 16
+
+    key = models.CharField(max_length=32)
+    shard = models.PositiveSmallIntegerField(default=0)
+    category = models.ForeignKey(
+        Category, on_delete=models.CASCADE, null=True, blank=True, related_name="inventory_totals"
+    )
+    product_count = models.BigIntegerField(default=0)
+    stock_in = models.BigIntegerField(default=0)
+    stock_out = models.BigIntegerField(default=0)
+    total_stock = models.BigIntegerField(default=0)
+    average_daily_sales_sum = models.DecimalField(max_digits=18, decimal_places=2, default=0)
+    low_stock_count = models.BigIntegerField(default=0)
+    out_of_stock_count = models.BigIntegerField(default=0)
+    version = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        verbose_name_plural = "inventory totals"
+        constraints = [
+            models.UniqueConstraint(fields=["key", "shard"], name="inventorytotals_key_shard_unique"),
+        ]
+
+    def __str__(self):
+        return f"Inventory totals ({self.key}, shard {self.shard})"
+
+    @staticmethod
+    def key_for(category_id) -> str:
+        return f"category:{category_id if category_id is not None else 'none'}"
+
+    @property
+    def average_daily_sales(self) -> Decimal:
+        """Mean Inventory.average_daily_sales across the products in this row."""
+        if not self.product_count:
+            return Decimal("0.00")
+        return (Decimal(self.average_daily_sales_sum) / self.product_count).quantize(Decimal("0.01"))
+
+
+MOVEMENT_KINDS = [
+    ("receipt", "Receipt"),
+    ("sale", "Sale"),
+    ("adjustment", "Adjustment"),
+    ("transfer", "Transfer"),
+]
+
+
+class StockMovement(models.Model):
+    """
+    Append-only stock ledger: one signed quantity per change (positive = in).
+
+    Inventory.stock_in / stock_out / total_stock stay authoritative; the
+    ledger is the audit trail behind them, answers ``stock_at`` (latest
+    StockSnapshot + movements since) and lets ``stock_drift`` report rows
+    whose counters disagree with it; see services/movements.py. Rows are
+    never updated or deleted. Writers update the Inventory row before
+    appending its movements, so a product's movement ids are in commit
+    order (the row lock serializes them).
+    """
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name="stock_movements")
+    kind = models.CharField(max_length=16, choices=MOVEMENT_KINDS, default="adjustment")
+    quantity = models.IntegerField()
+    reference = models.CharField(max_length=64, blank=True, help_text="Origin, e.g. 'bulk-adjust', 'api', 'admin'")
+    created_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        ordering = ["-created_at", "-id"]
+        indexes = [
+            models.Index(fields=["product", "created_at"], name="movement_product_time_idx"),
+            models.Index(fields=["product", "id"], name="movement_product_id_idx"),  # Movements after a snapshot
+        ]
+
+    def __str__(self):
+        return f"{self.kind} {self.quantity:+d} for product {self.product_id} at {self.created_at:%Y-%m-%d %H:%M}"
+
+    def save(self, *args, **kwargs):
+        if self.pk is not None:
+            raise ValueError("Stock movements are append-only; record a correcting movement instead.")
         super().save(*args, **kwargs)
 
-        # Trigger notification only when stock *drops below threshold*
-        if self.total_stock < self.low_stock_threshold:
-            self._send_low_stock_email()
-            
-    def _send_low_stock_email(self):
-        """Send email alert to staff users."""
-        cache_key = f"low_stock_alert_sent_{self.product.id}"
-        # Avoid spamming by limiting one alert every 6 hours per product
-        if cache.get(cache_key):
-            logger.info(f"Skipping duplicate alert for {self.product.name} (recently sent).")
-            return
-
-        subject = f"⚠️ Low Stock Alert: {self.product.name}"
-        message = (
-            f"Dear Team,\n\n"
-            f"The stock for *{self.product.name}* (SKU: {self.product.sku}) "
-            f"is now **low**.\n\n"
-            f"📦 Current stock: {self.total_stock}\n"
-            f"🔻 Threshold: {self.low_stock_threshold}\n"
-            f"📅 Avg Daily Sales: {self.average_daily_sales:.2f} units/day\n"
-            f"🚚 Supplier: {self.product.supplier.name if self.product.supplier else 'N/A'}\n\n"
-            f"Suggested Action: Please reorder or review sales forecast.\n\n"
-            f"— StockWise Auto Alert"
-        )
+    def delete(self, *args, **kwargs):
+        raise ValueError("Stock movements are append-only; record a correcting movement instead.")
+
+
+class StockSnapshot(models.Model):
+    """
+    Cumulative ledger totals per product covering every movement of the
+    product with id <= movement_id (ids, not timestamps: a movement's
+    created_at is set before its transaction commits). Point-in-time stock =
+    latest snapshot at or before T + later movements created by T, so the
+    ledger is never rescanned. An opening snapshot (no movements behind it)
+    takes the counters of an inventory written without the ledger.
+    """
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name="stock_snapshots")
+    taken_at = models.DateTimeField()
+    movement_id = models.BigIntegerField(default=0, help_text="Last StockMovement id of the product covered")
+    stock_in = models.BigIntegerField(default=0)
+    stock_out = models.BigIntegerField(default=0)
+
+    class Meta:
+        ordering = ["-taken_at"]
+        constraints = [
+            models.UniqueConstraint(fields=["product", "taken_at"], name="snapshot_product_time_unique"),
+        ]
+
+    def __str__(self):
+        return f"Stock of product {self.product_id} at {self.taken_at:%Y-%m-%d %H:%M}: {self.total_stock}"
+
+    @property
+    def total_stock(self) -> int:
+        return self.stock_in - self.stock_out
+
+
+FORECAST_MODEL_VERSION = "croston-holt-v1"  # Bump when the fitting maths change
+FORECAST_METHODS = [
+    ("croston", "Croston (SBA), intermittent demand"),
+    ("holt", "Holt linear trend"),
+    ("none", "No recent sales"),
+]
+
 
-        # Get all active staff emails
-        staff_emails = list(
-            User.objects.filter(is_staff=True, is_active=True)
-            .values_list("email", flat=True)
-            .distinct()
+class DemandForecast(models.Model):
+    """
+    Stored per-SKU demand forecast, fitted in batch by
+    services/forecasting.py (``manage.py fit_demand_forecasts``).
+    One row per product and model version, so a new model can be fitted
+    alongside the current one before readers switch over.
+    """
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name="forecasts")
+    model_version = models.CharField(max_length=32)
+    method = models.CharField(max_length=16, choices=FORECAST_METHODS)
+    daily_rate = models.FloatField(default=0)  # Expected units per day over the next week
+    daily_trend = models.FloatField(default=0)  # Holt only: change in daily rate per day
+    forecast_7d = models.FloatField(default=0)
+    forecast_30d = models.FloatField(default=0)
+    history_days = models.PositiveIntegerField(default=0)  # Days with sales in the fitted window
+    data_through = models.DateField()  # Last day of the fitted series
+    fitted_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["product", "model_version"], name="forecast_product_version_unique"),
+        ]
+
+    def __str__(self):
+        return f"{self.method} forecast for product {self.product_id}: {self.daily_rate:.2f}/day ({self.model_version})"
+
+
+LOW_STOCK_ALERT_TTL = timedelta(hours=6)  # At most one alert per product per window
+
+
+class LowStockAlert(models.Model):
+    """
+    Transactional outbox for low-stock emails.
+
+    Rows are written in the same transaction as the stock change and
+    delivered later as per-recipient digests by `manage.py send_low_stock_alerts`.
+    A drainer leases rows (claimed_until) and records each recipient it has
+    emailed (delivered_to), so a retry only goes to the ones still missing.
+    The 6-hour per-product dedupe is checked against this table, so it holds
+    across processes and restarts.
+    """
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name="low_stock_alerts")
+    total_stock = models.PositiveIntegerField()          # Snapshot when the alert was raised
+    low_stock_threshold = models.PositiveIntegerField()
+    created_at = models.DateTimeField(default=timezone.now)
+    sent_at = models.DateTimeField(null=True, blank=True)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    last_error = models.TextField(blank=True)
+    claimed_until = models.DateTimeField(null=True, blank=True)  # Lease held by the drainer sending it
+    delivered_to = models.JSONField(default=list, blank=True)    # Recipients already emailed
+
+    class Meta:
+        ordering = ["created_at"]
+        indexes = [
+            models.Index(fields=["product", "created_at"]),
+            models.Index(
+                fields=["created_at"],
+                condition=models.Q(sent_at__isnull=True),
+                name="lowstockalert_pending_idx",
+            ),
+        ]
+
+    def __str__(self):
+        state = f"sent {self.sent_at:%Y-%m-%d %H:%M}" if self.sent_at else "pending"
+        return f"Low stock alert for product {self.product_id} ({state})"
+
+    @classmethod
+    def enqueue(cls, inventories) -> int:
+        """
+        Queue alerts for low inventories, skipping products that already
+        had one raised within LOW_STOCK_ALERT_TTL. Returns alerts created.
+        """
+        by_product = {inv.product_id: inv for inv in inventories}
+        if not by_product:
+            return 0
+        now = timezone.now()
+        recent = set(
+            cls.objects.filter(product_id__in=by_product, created_at__gte=now - LOW_STOCK_ALERT_TTL)
+            .values_list("product_id", flat=True)
         )
-        if not staff_emails:
-            staff_emails = [settings.EMAIL_HOST_USER]
-
-        try:
-            send_mail(
-                subject=subject,
-                message=message,
-                from_email=settings.DEFAULT_FROM_EMAIL,
-                recipient_list=staff_emails,
-                fail_silently=False,
-            )
-            logger.info(
-                f"Low stock email sent for {self.product.name} "
-                f"to {len(staff_emails)} recipients."
+        alerts = [
+            cls(
+                product_id=product_id,
+                total_stock=inv.total_stock,
+                low_stock_threshold=inv.low_stock_threshold,
+                created_at=now,
             )
-            cache.set(cache_key, True, timeout=6 * 60 * 60)  # prevent resending for 6 hours
-        except Exception as e:
-            logger.error(f"Error sending low stock email for {self.product.name}: {e}")
+            for product_id, inv in by_product.items()
+            if product_id not in recent
+        ]
+        cls.objects.bulk_create(alerts)
+        if recent:
+            logger.info(f"Skipping duplicate low stock alerts for {len(recent)} products (recently raised).")
+        return len(alerts)
+
+
+TOMBSTONE_KINDS = [
+    ("product", "Product"),
+    ("inventory", "Inventory"),
+]
+
+
+class Tombstone(models.Model):
+    """
+    Record of a deleted Product / Inventory, so delta-sync clients
+    (GET /api/sync/) can drop their copy. Written by post_delete signals;
+    rows older than the sync retention are pruned by `manage.py prune_tombstones`.
+    """
+    kind = models.CharField(max_length=16, choices=TOMBSTONE_KINDS)
+    object_id = models.BigIntegerField()
+    sku = models.CharField(max_length=64, blank=True)  # Lookup key clients use for products
+    deleted_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["deleted_at", "id"], name="tombstone_deleted_id_idx"),
+        ]
 
     def __str__(self):
-        return f"Inventory for {self.product.name}"
-    
+        return f"Deleted {self.kind} {self.object_id} at {self.deleted_at:%Y-%m-%d %H:%M}"
+
 
 class Trend(models.Model):
     """
@@ -1,69 +1,76 @@
 from rest_framework import serializers
-from .models import Product, Inventory, SalesHistory
+from .models import MOVEMENT_KINDS, Product, Inventory, SalesHistory, StockMovement, Tombstone
+from .services.images import image_urls
+from .services.stock import apply_stock_delta, set_stock_quantity
 
 
 class InventoryMiniSerializer(serializers.ModelSerializer):
     """Compact inventory info to nest inside ProductSerializer."""
-    stock_status = serializers.SerializerMethodField()
 
     class Meta:
         model = Inventory
         fields = ["stock_in", "stock_out", "total_stock", "average_daily_sales", "stock_status"]
-
-    def get_stock_status(self, obj):
-        """Return stock status label based on total stock."""
-        if obj.total_stock == 0:
-            return "out_of_stock"
-        if obj.total_stock <= 10:
-            return "low_stock"
-        return "in_stock"
+        read_only_fields = ["stock_status"]  # Computed on save from low_stock_threshold
 
 
 class ProductSerializer(serializers.ModelSerializer):
     """
     Serializer for products.
     Includes inline inventory details (no duplicate `quantity` field).
+    `image` carries the variant URLs for the size in the serializer context
+    (`image_size`, from `?image_size=`; defaults to "original").
     """
     id = serializers.IntegerField(read_only=True)
     category = serializers.CharField(source="category.name", default="")
     inventory = InventoryMiniSerializer(read_only=True)
+    image = serializers.SerializerMethodField()
 
     class Meta:
         model = Product
-        fields = ["id", "sku", "name", "description", "category", "image_url", "inventory"]
+        fields = ["id", "sku", "name", "description", "category", "image_url", "image", "inventory"]
+
+    def get_image(self, obj):
+        return image_urls(obj.image_url, obj.image_variants, self.context.get("image_size", "original"))
 
 
 class ProductQuantityUpdateSerializer(serializers.Serializer):
     """
-    Serializer for PATCH { "quantity": <int> } → updates Inventory.
+    Serializer for PATCH { "quantity": <int> } (absolute) or { "delta": <+/- int> }
+    → updates Inventory without lost updates under concurrent writers.
     Always returns a full ProductSerializer response.
     """
-    quantity = serializers.IntegerField(min_value=0)
+    quantity = serializers.IntegerField(min_value=0, required=False)
+    delta = serializers.IntegerField(required=False)
+    kind = serializers.ChoiceField(choices=MOVEMENT_KINDS, required=False)
+    reference = serializers.CharField(max_length=64, required=False, allow_blank=True)
 
-    def validate_quantity(self, value):
-        if value < 0:
-            raise serializers.ValidationError("Quantity cannot be negative.")
-        return value
+    def validate(self, attrs):
+        if ("quantity" in attrs) == ("delta" in attrs):
+            raise serializers.ValidationError("Provide exactly one of 'quantity' or 'delta'.")
+        return attrs
 
     def update(self, instance, validated_data):
         """
         instance = Product
-        validated_data = {"quantity": new_quantity}
+        validated_data = {"quantity": new_quantity} or {"delta": units}
         """
-        new_quantity = validated_data["quantity"]
-        inventory, _ = Inventory.objects.get_or_create(product=instance)
-        old_quantity = inventory.total_stock or 0
-
-        if new_quantity > old_quantity:
-            inventory.stock_in += (new_quantity - old_quantity)
-        elif new_quantity < old_quantity:
-            inventory.stock_out += (old_quantity - new_quantity)
-
-        inventory.total_stock = new_quantity
-        inventory.save()
-
-        # Refresh so inline inventory is updated
-        instance.refresh_from_db()
+        # The view validates with partial=True, so field defaults are not applied
+        options = {
+            "kind": validated_data.get("kind", "adjustment"),
+            "reference": validated_data.get("reference", "api"),
+        }
+        try:
+            if "delta" in validated_data:
+                # Conditional UPDATE computed by the database: no read, no lost updates
+                inventory = apply_stock_delta(instance, validated_data["delta"], **options)
+            else:
+                # Row-locked read-modify-write
+                inventory = set_stock_quantity(instance, validated_data["quantity"], **options)
+        except ValueError as e:
+            raise serializers.ValidationError({"delta": str(e)})
+
+        # Point the product at the saved inventory so the response needs no re-fetch
+        instance.inventory = inventory
         return instance
 
     def to_representation(self, instance):
@@ -71,6 +78,24 @@ class ProductQuantityUpdateSerializer(serializers.Serializer):
         return ProductSerializer(instance).data
 
 
+class StockAdjustmentSerializer(serializers.Serializer):
+    """
+    One row of POST /inventory/bulk-adjust/.
+    Either { "sku", "quantity": <absolute> } or { "sku", "delta": <+/- units> },
+    optionally with the ledger "kind" (default "adjustment") and a "reference".
+    """
+    sku = serializers.CharField(max_length=64)
+    quantity = serializers.IntegerField(min_value=0, required=False)
+    delta = serializers.IntegerField(required=False)
+    kind = serializers.ChoiceField(choices=MOVEMENT_KINDS, default="adjustment")
+    reference = serializers.CharField(max_length=64, required=False, allow_blank=True)
+
+    def validate(self, attrs):
+        if ("quantity" in attrs) == ("delta" in attrs):
+            raise serializers.ValidationError("Provide exactly one of 'quantity' or 'delta'.")
+        return attrs
+
+
 class InventorySerializer(serializers.ModelSerializer):
     """Detailed serializer for inventory, includes nested product."""
     product = ProductSerializer(read_only=True)
@@ -81,18 +106,51 @@ class InventorySerializer(serializers.ModelSerializer):
 
 
 class InventorySummarySerializer(serializers.Serializer):
-    """Lightweight serializer for reporting (no nested product)."""
+    """Lightweight serializer for reporting (no nested product), fed by InventoryTotals."""
     stock_in = serializers.IntegerField()
     stock_out = serializers.IntegerField()
     total_stock = serializers.IntegerField()
     average_daily_sales = serializers.DecimalField(max_digits=10, decimal_places=2)
+    product_count = serializers.IntegerField()
+    low_stock_count = serializers.IntegerField()
+    out_of_stock_count = serializers.IntegerField()
+    updated_at = serializers.DateTimeField()
 
 
 class SalesHistorySerializer(serializers.ModelSerializer):
     product_name = serializers.CharField(source="product.name", read_only=True)
     sku = serializers.CharField(source="product.sku", read_only=True)
     image = serializers.CharField(source="product.image_url", read_only=True)
+    category = serializers.CharField(source="product.category.name", default="", read_only=True)
 
     class Meta:
         model = SalesHistory
-        fields = ["id", "product_name", "sku", "image", "units_sold", "date"]
+        fields = ["id", "product_name", "sku", "image", "category", "units_sold", "date"]
+
+
+class StockMovementSerializer(serializers.ModelSerializer):
+    """Read-only ledger row for GET /products/{sku}/movements/."""
+
+    class Meta:
+        model = StockMovement
+        fields = ["id", "kind", "quantity", "reference", "created_at"]
+        read_only_fields = fields
+
+
+class InventorySyncSerializer(InventoryMiniSerializer):
+    """Inventory row in GET /sync/ (keyed by product, like the nested `inventory` it replaces)."""
+    product_id = serializers.IntegerField(read_only=True)
+    sku = serializers.CharField(source="product.sku", read_only=True)
+
+    class Meta(InventoryMiniSerializer.Meta):
+        fields = ["id", "product_id", "sku", *InventoryMiniSerializer.Meta.fields, "low_stock_threshold", "updated_at"]
+        read_only_fields = fields
+
+
+class TombstoneSerializer(serializers.ModelSerializer):
+    """Deleted product / inventory in GET /sync/."""
+
+    class Meta:
+        model = Tombstone
+        fields = ["kind", "object_id", "sku", "deleted_at"]
+        read_only_fields = fields
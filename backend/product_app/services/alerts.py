@@ -0,0 +1,178 @@
+"""
+Low-stock alert delivery for product_app.
+
+Provides:
+- Draining the LowStockAlert outbox into per-recipient digest emails
+  sent over a single reused SMTP connection
+- Retry bookkeeping (attempts / last_error, recipients already emailed)
+  and pruning of old alerts
+
+Alerts are queued by ``LowStockAlert.enqueue`` in the same transaction as
+the stock change; nothing here runs on the request path. Rows are claimed
+with a short transaction and a lease, and mail is sent after it commits,
+so no row locks are held while talking to SMTP.
+"""
+
+import logging
+from collections import defaultdict
+from datetime import timedelta
+from typing import Dict, List
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from auth_app.models import User
+from product_app.models import LowStockAlert, is_low_stock
+
+logger = logging.getLogger(__name__)
+
+DELIVERY_BATCH_SIZE = 500
+MAX_DELIVERY_ATTEMPTS = 5
+ALERT_RETENTION_DAYS = 30
+CLAIM_TIMEOUT = timedelta(minutes=10)  # A drainer that dies releases its alerts after this
+
+
+# ============================================================================
+# DELIVERY
+# ============================================================================
+
+def deliver_low_stock_alerts(batch_size: int = DELIVERY_BATCH_SIZE) -> Dict[str, int]:
+    """
+    Send pending low-stock alerts and mark them delivered.
+
+    Pending rows are claimed (``SELECT ... FOR UPDATE SKIP LOCKED``, then a
+    lease in ``claimed_until``) and committed before any mail is sent, so
+    several drainers never pick the same alert. Alerts for the same
+    product are collapsed into one line showing current stock (products
+    restocked in the meantime are dropped), and each staff recipient gets
+    one digest over a shared connection. Every digest that goes out is
+    recorded on its alerts straight away, so when a later one fails, the
+    retry only emails the recipients that did not get theirs. Alerts stay
+    pending until MAX_DELIVERY_ATTEMPTS is reached.
+
+    Returns ``{"alerts": ..., "products": ..., "emails": ..., "failed": ...}``.
+    """
+    alerts = _claim_alerts(batch_size)
+    if not alerts:
+        return {"alerts": 0, "products": 0, "emails": 0, "failed": 0}
+
+    by_product = defaultdict(list)
+    for alert in alerts:
+        by_product[alert.product_id].append(alert)  # Ordered by created_at, so the last one is current
+    # Products restocked since the alert was raised are dropped from the digest
+    still_low = [
+        group[-1] for group in by_product.values()
+        if is_low_stock(_current_stock(group[-1]), group[-1].low_stock_threshold)
+    ]
+    recipients = _recipients()
+
+    sent, errors = 0, []
+    if still_low:
+        try:
+            with get_connection(fail_silently=False) as connection:
+                for email in recipients:
+                    pending = [alert for alert in still_low if email not in alert.delivered_to]
+                    if not pending:
+                        continue  # Got this digest on an earlier attempt
+                    try:
+                        connection.send_messages([_build_digest(pending, email)])
+                    except Exception as e:
+                        errors.append(f"{email}: {e}")
+                        continue
+                    sent += 1
+                    emailed = [a for alert in pending for a in by_product[alert.product_id]]
+                    for alert in emailed:
+                        alert.delivered_to = [*alert.delivered_to, email]
+                    LowStockAlert.objects.bulk_update(emailed, ["delivered_to"])
+        except Exception as e:  # Could not open the connection
+            errors.append(str(e))
+
+    now, done, failed = timezone.now(), [], []
+    for group in by_product.values():
+        delivered = set(group[-1].delivered_to)
+        if group[-1] not in still_low or delivered.issuperset(recipients):
+            done.extend(alert.pk for alert in group)
+        else:
+            failed.extend(group)
+    LowStockAlert.objects.filter(pk__in=done).update(sent_at=now, claimed_until=None, last_error="")
+    if failed:
+        logger.error(f"Error sending low stock digests for {len(still_low)} products: {'; '.join(errors)}")
+        for alert in failed:
+            alert.attempts += 1
+            alert.last_error = "; ".join(errors)[:1000]
+            alert.claimed_until = None
+        LowStockAlert.objects.bulk_update(failed, ["attempts", "last_error", "claimed_until"])
+
+    logger.info(
+        f"Low stock digests sent: {len(still_low)} products, {sent} emails ({len(alerts)} alerts drained)."
+    )
+    return {"alerts": len(alerts), "products": len(still_low), "emails": sent, "failed": len(failed)}
+
+
+def _claim_alerts(batch_size: int) -> List[LowStockAlert]:
+    """Lease up to ``batch_size`` pending alerts for CLAIM_TIMEOUT (committed before returning)."""
+    now = timezone.now()
+    with transaction.atomic():
+        alerts = list(
+            LowStockAlert.objects.select_for_update(skip_locked=True, of=("self",))
+            .select_related("product__supplier", "product__inventory")
+            .filter(sent_at__isnull=True, attempts__lt=MAX_DELIVERY_ATTEMPTS)
+            .filter(Q(claimed_until__isnull=True) | Q(claimed_until__lt=now))
+            .order_by("created_at")[:batch_size]
+        )
+        LowStockAlert.objects.filter(pk__in=[alert.pk for alert in alerts]).update(claimed_until=now + CLAIM_TIMEOUT)
+    return alerts
+
+
+def _current_stock(alert: LowStockAlert) -> int:
+    inventory = getattr(alert.product, "inventory", None)
+    return inventory.total_stock if inventory else alert.total_stock
+
+
+def _recipients() -> List[str]:
+    """Active staff emails (the SMTP account itself when there are none)."""
+    recipients = list(
+        User.objects.filter(is_staff=True, is_active=True)
+        .exclude(email="")
+        .values_list("email", flat=True)
+        .distinct()
+    )
+    return recipients or [settings.EMAIL_HOST_USER]
+
+
+def _build_digest(alerts: List[LowStockAlert], email: str) -> EmailMessage:
+    """One digest message for ``email``."""
+    lines = [
+        f"- {alert.product.name} (SKU: {alert.product.sku}): {_current_stock(alert)} left, "
+        f"threshold {alert.low_stock_threshold}, "
+        f"supplier {alert.product.supplier.name if alert.product.supplier else 'N/A'}"
+        for alert in sorted(alerts, key=lambda a: a.product.name)
+    ]
+    subject = f"⚠️ Low Stock Alert: {len(alerts)} product(s)"
+    body = (
+        "Dear Team,\n\n"
+        "The following products are now low on stock:\n\n"
+        + "\n".join(lines)
+        + "\n\nSuggested Action: Please reorder or review sales forecast.\n\n"
+        "— StockWise Auto Alert"
+    )
+    return EmailMessage(subject=subject, body=body, from_email=settings.DEFAULT_FROM_EMAIL, to=[email])
+
+
+# ============================================================================
+# HOUSEKEEPING
+# ============================================================================
+
+def prune_low_stock_alerts(retention_days: int = ALERT_RETENTION_DAYS) -> int:
+    """
+    Delete delivered (or abandoned) alerts older than ``retention_days``.
+    Only the last LOW_STOCK_ALERT_TTL of history is needed for dedupe.
+    """
+    cutoff = timezone.now() - timedelta(days=retention_days)
+    deleted, _ = LowStockAlert.objects.filter(created_at__lt=cutoff).exclude(
+        sent_at__isnull=True, attempts__lt=MAX_DELIVERY_ATTEMPTS
+    ).delete()
+    return deleted
@@ -0,0 +1,436 @@
+"""
+Streaming catalog import / export for product_app.
+
+Provides:
+- Row parsing for CSV and XLSX catalogs (header row; ``sku`` required, other
+  columns optional: name, description, category, supplier, image_url,
+  stock_in, stock_out, low_stock_threshold)
+- Chunked upserts: Category and Supplier by name, Product by SKU and
+  Inventory by product, each with one ``bulk_create`` per chunk
+- The bookkeeping the per-row signals would have done (missing inventories,
+  InventoryTotals, stock movements, recategorized totals/rollups, search
+  vectors, name index, image variants)
+- Set-based recategorizing of many products (admin action)
+- Export straight from a server-side cursor (``QuerySet.iterator``) as CSV
+  lines or an XLSX workbook, in the same columns the importer reads
+
+Only columns present in the header are written, so a file with just
+``sku,stock_in`` touches stock and nothing else. Unchanged products keep
+their updated_at (delta sync does not resend them).
+"""
+
+import csv
+import io
+import logging
+import time
+import zipfile
+from typing import IO, Any, Dict, Iterable, Iterator, List, Tuple
+
+from django.db import transaction
+from django.utils import timezone
+from openpyxl import Workbook, load_workbook
+from openpyxl.utils.exceptions import InvalidFileException
+
+from product_app.models import Category, Inventory, LowStockAlert, Product, Supplier, is_low_stock, stock_status_for
+from product_app.services.images import backfill_image_variants
+from product_app.services.inventory_totals import move_categories, record_inventory_changes
+from product_app.services.movements import movements_for_change, record_movements
+from product_app.services.name_index import bump_name_index_version
+from product_app.services.reorder import invalidate_reorder_report
+from product_app.services.sales_rollups import move_rollups
+from product_app.services.search_index import refresh_search_vectors
+
+logger = logging.getLogger(__name__)
+
+SUPPORTED_FORMATS = ("csv", "xlsx")
+IMPORT_CHUNK_SIZE = 2000
+EXPORT_CHUNK_SIZE = 2000
+MAX_REPORTED_ERRORS = 20
+MOVEMENT_REFERENCE = "catalog-import"
+
+PRODUCT_COLUMNS = ("name", "description", "category", "supplier", "image_url")
+INVENTORY_COLUMNS = ("stock_in", "stock_out", "low_stock_threshold")
+IMPORT_COLUMNS = ("sku",) + PRODUCT_COLUMNS + INVENTORY_COLUMNS
+# total_stock and stock_status are derived; the importer ignores them
+EXPORT_COLUMNS = IMPORT_COLUMNS + ("total_stock", "stock_status")
+EXPORT_FIELDS = (
+    "sku", "name", "description", "category__name", "supplier__name", "image_url",
+    "inventory__stock_in", "inventory__stock_out", "inventory__low_stock_threshold",
+    "inventory__total_stock", "inventory__stock_status",
+)
+
+# column -> Product field (category/supplier hold names, resolved to ids)
+PRODUCT_FIELDS = {
+    "name": "name",
+    "description": "description",
+    "category": "category_id",
+    "supplier": "supplier_id",
+    "image_url": "image_url",
+}
+MAX_LENGTHS = {
+    "sku": Product._meta.get_field("sku").max_length,
+    "name": Product._meta.get_field("name").max_length,
+    "category": Category._meta.get_field("name").max_length,
+    "supplier": Supplier._meta.get_field("name").max_length,
+    "image_url": Product._meta.get_field("image_url").max_length,
+}
+INVENTORY_DEFAULTS = {
+    column: Inventory._meta.get_field(column).get_default() for column in INVENTORY_COLUMNS
+}
+
+
+def detect_format(filename: str, default: str = "csv") -> str:
+    """Guess the file format from its extension (.csv, .xlsx)."""
+    name = (filename or "").lower()
+    if name.endswith(".xlsx"):
+        return "xlsx"
+    if name.endswith(".csv"):
+        return "csv"
+    return default
+
+
+# ============================================================================
+# IMPORT
+# ============================================================================
+
+def import_catalog(stream: IO[bytes], fmt: str = "csv") -> Dict[str, Any]:
+    """
+    Upsert a catalog file and return an import report.
+
+    ``stream`` is a binary file object (seekable for XLSX). Rows are applied
+    in chunks inside one transaction; within a chunk the last row for a SKU
+    wins. Report keys: rows_read, created, updated, unchanged, inventories
+    (created / updated), categories_created, suppliers_created, rejected
+    (per reason), errors (first few), seconds, rows_per_second.
+    """
+    if fmt not in SUPPORTED_FORMATS:
+        raise ValueError(f"Unsupported format '{fmt}'. Use one of: {', '.join(SUPPORTED_FORMATS)}")
+
+    start = time.monotonic()
+    report = {
+        "rows_read": 0,
+        "created": 0,
+        "updated": 0,
+        "unchanged": 0,
+        "inventories": {"created": 0, "updated": 0},
+        "categories_created": 0,
+        "suppliers_created": 0,
+        "rejected": {"malformed": 0, "missing_name": 0, "invalid_number": 0, "too_long": 0, "invalid_stock": 0},
+        "errors": [],
+    }
+    columns, records = _parse(stream, fmt)
+    if "sku" not in columns:
+        raise ValueError("The catalog needs a 'sku' column.")
+
+    lookups = {
+        "category": dict(Category.objects.values_list("name", "id")),
+        "supplier": {},
+    }
+    for name, pk in Supplier.objects.order_by("pk").values_list("name", "id"):
+        lookups["supplier"].setdefault(name, pk)  # Names aren't unique; the oldest wins
+
+    images_changed = False
+    with transaction.atomic():
+        chunk: Dict[str, Tuple[int, Dict[str, Any]]] = {}
+        for line_no, row in _valid_rows(records, columns, report):
+            chunk[row["sku"]] = (line_no, row)  # Last row wins
+            if len(chunk) >= IMPORT_CHUNK_SIZE:
+                images_changed |= _import_chunk(chunk, columns, lookups, report)
+                chunk = {}
+        if chunk:
+            images_changed |= _import_chunk(chunk, columns, lookups, report)
+
+        if report["created"] or report["updated"] or report["categories_created"]:
+            bump_name_index_version()
+            invalidate_reorder_report()
+
+    # Outside the transaction: image processing is slow and needs committed rows
+    if images_changed:
+        backfill_image_variants()
+
+    elapsed = time.monotonic() - start
+    report["seconds"] = round(elapsed, 3)
+    report["rows_per_second"] = round(report["rows_read"] / elapsed) if elapsed > 0 else report["rows_read"]
+    logger.info(
+        f"Catalog import: {report['rows_read']} rows in {report['seconds']}s ({report['rows_per_second']}/s), "
+        f"created={report['created']} updated={report['updated']} unchanged={report['unchanged']} "
+        f"rejected={sum(report['rejected'].values())}"
+    )
+    return report
+
+
+def _parse(stream: IO[bytes], fmt: str) -> Tuple[List[str], Iterator[Dict[str, Any]]]:
+    """``(known column names, records)``; header names are lowercased, unknown columns dropped."""
+    if fmt == "csv":
+        rows = csv.reader(io.TextIOWrapper(stream, encoding="utf-8-sig", newline=""))
+    else:
+        try:
+            workbook = load_workbook(stream, read_only=True, data_only=True)
+        except (InvalidFileException, zipfile.BadZipFile, KeyError) as e:
+            raise ValueError(f"Not a readable XLSX workbook ({e})") from e
+        rows = workbook.active.iter_rows(values_only=True)
+    header = next(rows, None) or []
+    columns = [str(name).strip().lower() if name is not None else "" for name in header]
+    columns = [name if name in IMPORT_COLUMNS else None for name in columns]
+    return [name for name in columns if name], ({
+        name: value for name, value in zip(columns, values) if name
+    } for values in rows)
+
+
+def _text(value) -> str:
+    if value is None:
+        return ""
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)  # XLSX stores numeric-looking SKUs as floats
+    return str(value).strip()
+
+
+def _valid_rows(records: Iterable[Dict[str, Any]], columns: List[str], report) -> Iterator[Tuple[int, Dict]]:
+    """Clean parsed records (text trimmed, numbers parsed), counting rejects by reason."""
+    for line_no, record in enumerate(records, start=2):  # Line 1 is the header
+        report["rows_read"] += 1
+        row = {column: _text(record.get(column)) for column in columns if column not in INVENTORY_COLUMNS}
+        if not row.get("sku"):
+            if any(_text(value) for value in record.values()):
+                _reject(report, "malformed", line_no, "missing sku")
+            else:
+                report["rows_read"] -= 1  # Blank line
+            continue
+        if "name" in row and not row["name"]:
+            _reject(report, "missing_name", line_no, f"empty name for '{row['sku']}'")
+            continue
+        too_long = [column for column, limit in MAX_LENGTHS.items() if len(row.get(column, "")) > limit]
+        if too_long:
+            _reject(report, "too_long", line_no, f"{', '.join(too_long)} too long for '{row['sku']}'")
+            continue
+
+        try:
+            for column in INVENTORY_COLUMNS:
+                if column in columns:
+                    raw = _text(record.get(column))
+                    if raw:  # Blank = keep the stored value (or the default)
+                        row[column] = int(raw)
+                        if row[column] < 0:
+                            raise ValueError
+        except ValueError:
+            _reject(report, "invalid_number", line_no, f"stock values for '{row['sku']}' must be whole numbers >= 0")
+            continue
+        yield line_no, row
+
+
+def _reject(report, reason: str, line_no: int, message: str):
+    report["rejected"][reason] += 1
+    if len(report["errors"]) < MAX_REPORTED_ERRORS:
+        report["errors"].append(f"line {line_no}: {message}")
+
+
+def _resolve_names(kind: str, names: Iterable[str], lookups, report) -> None:
+    """Create missing categories / suppliers (one bulk INSERT) and add them to ``lookups``."""
+    known = lookups[kind]
+    missing = {name for name in names if name and name not in known}
+    if not missing:
+        return
+    model = Category if kind == "category" else Supplier
+    # Category names are unique; a concurrent import may have just added one
+    model.objects.bulk_create([model(name=name) for name in missing], ignore_conflicts=kind == "category")
+    for name, pk in model.objects.filter(name__in=missing).order_by("pk").values_list("name", "id"):
+        known.setdefault(name, pk)
+    report[f"{'categories' if kind == 'category' else 'suppliers'}_created"] += len(missing)
+
+
+def _import_chunk(chunk: Dict[str, Tuple[int, Dict]], columns: List[str], lookups, report) -> bool:
+    """Upsert one chunk of products and inventories. Returns True when an image_url changed."""
+    for kind in ("category", "supplier"):
+        if kind in columns:
+            _resolve_names(kind, (row.get(kind) for _, row in chunk.values()), lookups, report)
+
+    product_columns = [column for column in PRODUCT_COLUMNS if column in columns]
+    existing = {
+        product.sku: product
+        for product in Product.objects.filter(sku__in=list(chunk)).only("sku", *PRODUCT_FIELDS.values())
+    }
+
+    # --- Products ---
+    to_write, recategorized, images_changed = [], {}, False
+    for sku, (line_no, row) in chunk.items():
+        values = {}
+        for column in product_columns:
+            value = row[column]
+            if column in ("category", "supplier"):
+                value = lookups[column].get(value) if value else None
+            values[PRODUCT_FIELDS[column]] = value
+        product = existing.get(sku)
+        if product is None:
+            if not row.get("name"):
+                _reject(report, "missing_name", line_no, f"new SKU '{sku}' needs a name")
+                continue
+            to_write.append(Product(sku=sku, **values))
+            images_changed |= bool(values.get("image_url"))
+            report["created"] += 1
+            continue
+        if all(getattr(product, field) == value for field, value in values.items()):
+            report["unchanged"] += 1
+            continue
+        if "category_id" in values and values["category_id"] != product.category_id:
+            recategorized[product.pk] = (product.category_id, values["category_id"])
+        images_changed |= values.get("image_url", product.image_url) != product.image_url
+        to_write.append(Product(sku=sku, **values))
+        report["updated"] += 1
+
+    if to_write:
+        Product.objects.bulk_create(
+            to_write,
+            batch_size=1000,
+            update_conflicts=True,
+            unique_fields=["sku"],
+            update_fields=[PRODUCT_FIELDS[column] for column in product_columns] + ["updated_at"],
+        )
+    product_ids = dict(Product.objects.filter(sku__in=list(chunk)).values_list("sku", "id"))
+    refresh_search_vectors(product_ids[product.sku] for product in to_write)
+
+    # --- Inventories (the create_inventory_for_product signal doesn't fire for bulk_create) ---
+    inventories = {
+        inv.product_id: inv
+        for inv in Inventory.objects.select_for_update().filter(product_id__in=list(product_ids.values()))
+    }
+    # Move the stored contribution first; stock changes below then land in the new category
+    move_categories(
+        (inventories[product_id], old, new) for product_id, (old, new) in recategorized.items()
+        if product_id in inventories
+    )
+    move_rollups(recategorized)
+
+    stock_columns = [column for column in INVENTORY_COLUMNS if column in columns]
+    upserts, previous = [], {}
+    for sku, (line_no, row) in chunk.items():
+        product_id = product_ids.get(sku)
+        if product_id is None:
+            continue  # Rejected above
+        inv = inventories.get(product_id)
+        if inv is not None and not any(column in row for column in stock_columns):
+            continue
+        values = {
+            column: row.get(column, getattr(inv, column) if inv else INVENTORY_DEFAULTS[column])
+            for column in INVENTORY_COLUMNS
+        }
+        if values["stock_out"] > values["stock_in"]:
+            _reject(report, "invalid_stock", line_no, f"stock_out exceeds stock_in for '{sku}'; stock unchanged")
+            if inv is not None:
+                continue
+            values.update(stock_in=0, stock_out=0)
+        if inv is not None and all(getattr(inv, column) == value for column, value in values.items()):
+            continue
+        total_stock = values["stock_in"] - values["stock_out"]
+        upserts.append(Inventory(
+            product_id=product_id,
+            total_stock=total_stock,
+            stock_status=stock_status_for(total_stock, values["low_stock_threshold"]),
+            **values,
+        ))
+        previous[product_id] = inv.totals_snapshot() if inv else None
+        report["inventories"]["updated" if inv else "created"] += 1
+
+    if upserts:
+        Inventory.objects.bulk_create(
+            upserts,
+            batch_size=1000,
+            update_conflicts=True,
+            unique_fields=["product"],
+            update_fields=[*INVENTORY_COLUMNS, "total_stock", "stock_status", "updated_at"],
+        )
+        written = list(Inventory.objects.select_related("product").filter(product_id__in=list(previous)))
+        for inv in written:
+            inv._loaded_totals = previous[inv.product_id]
+        record_movements(
+            movement
+            for inv in written
+            for movement in movements_for_change(inv, inv._loaded_totals, reference=MOVEMENT_REFERENCE)
+        )
+        record_inventory_changes(written)
+        if stock_columns:
+            # Placeholder inventories (no stock in the file) don't raise alerts
+            LowStockAlert.enqueue(inv for inv in written if is_low_stock(inv.total_stock, inv.low_stock_threshold))
+    return images_changed
+
+
+def recategorize_products(products, category_id) -> int:
+    """
+    Move every product in the ``products`` queryset to ``category_id``
+    (``None`` = uncategorized) with one UPDATE, then shift their inventory
+    totals and sales rollups between categories in bulk. Returns the
+    number of products moved.
+    """
+    with transaction.atomic():
+        moving = dict(
+            Product.objects.select_for_update()
+            .filter(pk__in=products.values("pk"))
+            .exclude(category_id=category_id)
+            .values_list("pk", "category_id")
+        )
+        if not moving:
+            return 0
+        # The rows are locked, so this matches exactly the products read above
+        Product.objects.filter(pk__in=products.values("pk")).exclude(category_id=category_id).update(
+            category_id=category_id, updated_at=timezone.now(),
+        )
+        inventories = Inventory.objects.filter(product_id__in=products.values("pk"))
+        move_categories(
+            (inv, moving[inv.product_id], category_id)
+            for inv in inventories.iterator(chunk_size=IMPORT_CHUNK_SIZE)
+            if inv.product_id in moving
+        )
+        move_rollups({product_id: (old, category_id) for product_id, old in moving.items()})
+        refresh_search_vectors(list(moving))
+        bump_name_index_version(moving)
+    logger.info(f"Recategorized {len(moving)} products to category {category_id}")
+    return len(moving)
+
+
+# ============================================================================
+# EXPORT
+# ============================================================================
+
+def export_rows(queryset=None) -> Iterator[Tuple]:
+    """
+    Catalog rows in EXPORT_COLUMNS order, by id, read through a server-side
+    cursor (PostgreSQL) in EXPORT_CHUNK_SIZE batches.
+    """
+    queryset = Product.objects.all() if queryset is None else queryset
+    yield from queryset.order_by("pk").values_list(*EXPORT_FIELDS).iterator(chunk_size=EXPORT_CHUNK_SIZE)
+
+
+class _Echo:
+    """csv.writer target that hands each line back instead of storing it."""
+
+    def write(self, value):
+        return value
+
+
+def export_csv(queryset=None, lines_per_chunk: int = 500) -> Iterator[str]:
+    """CSV text in chunks of ``lines_per_chunk`` lines (header first), for streaming responses."""
+    writer = csv.writer(_Echo())
+    yield writer.writerow(EXPORT_COLUMNS)
+    lines = []
+    for row in export_rows(queryset):
+        lines.append(writer.writerow(row))
+        if len(lines) >= lines_per_chunk:
+            yield "".join(lines)
+            lines = []
+    if lines:
+        yield "".join(lines)
+
+
+def export_xlsx(target: IO[bytes], queryset=None) -> int:
+    """
+    Write the catalog as an XLSX workbook to ``target`` (write-only mode:
+    rows are not kept in memory). Returns the number of products written.
+    """
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet("Catalog")
+    sheet.append(EXPORT_COLUMNS)
+    count = 0
+    for row in export_rows(queryset):
+        sheet.append(row)
+        count += 1
+    workbook.save(target)
+    return count
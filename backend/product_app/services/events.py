@@ -0,0 +1,298 @@
+"""
+Live inventory events for product_app (GET /api/stock/events/, server-sent events).
+
+Provides:
+- ``stock_change`` events (an inventory's stock counters changed) and
+  ``low_stock`` events (its status dropped to low_stock or out_of_stock),
+  published from record_inventory_changes() once the transaction commits
+- An in-process fan-out to every open stream, filtered per subscriber by
+  category id and/or SKU set
+- Two buses carrying events between writers and that fan-out:
+  ``memory`` (single node: publish straight to this process's streams) and
+  ``postgres`` (multi-node: NOTIFY on commit; one LISTEN thread per process
+  that has open streams hands them to the local fan-out). Writers only
+  NOTIFY while some node listens, which they look up in pg_stat_activity
+  at most every LISTENER_CHECK_SECONDS
+
+Select the bus with ``settings.STOCK_EVENTS_BUS``. Streams are coroutines
+waiting on a bounded asyncio.Queue, so an idle connection costs one parked
+task and no thread or database connection. A subscriber that falls
+MAX_QUEUED_EVENTS behind is cut off and told to resync (GET /api/sync/).
+"""
+
+import itertools
+import json
+import logging
+import select
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils import timezone
+
+from product_app.models import Inventory, stock_status_for
+
+logger = logging.getLogger(__name__)
+
+LOW_STATUSES = ("low_stock", "out_of_stock")
+MAX_QUEUED_EVENTS = 1000
+NOTIFY_CHANNEL = "product_app_stock_events"
+NOTIFY_PAYLOAD_LIMIT = 7000   # PostgreSQL rejects NOTIFY payloads of 8000 bytes or more
+LISTEN_POLL_SECONDS = 5       # How often the listener checks whether it is still needed
+LISTEN_RETRY_SECONDS = 2
+LISTENER_APP_NAME = "stockwise-stock-events"  # application_name of LISTEN connections
+LISTENER_CHECK_SECONDS = 5    # How long a writer trusts its "is anyone listening?" answer
+
+
+# ============================================================================
+# EVENTS
+# ============================================================================
+
+def stock_events(changes: Iterable[Tuple[Inventory, Optional[tuple]]]) -> List[Dict[str, Any]]:
+    """
+    Events for inventories whose counters moved, given each one with its
+    previous ``totals_snapshot()`` (``None`` when just created).
+    Inventories need ``select_related("product")``.
+    """
+    now = timezone.now().isoformat()
+    events = []
+    for inv, previous in changes:
+        stock_in, stock_out, total_stock = inv.stock_in, inv.stock_out, inv.total_stock
+        threshold = inv.low_stock_threshold
+        if previous is not None and previous[:3] == (stock_in, stock_out, total_stock) and previous[4] == threshold:
+            continue
+        status = stock_status_for(total_stock, threshold)
+        previous_total = 0 if previous is None else previous[2]
+        event = {
+            "type": "stock_change",
+            "product_id": inv.product_id,
+            "sku": inv.product.sku,
+            "category_id": inv.product.category_id,
+            "total_stock": total_stock,
+            "delta": total_stock - previous_total,
+            "stock_status": status,
+            "low_stock_threshold": threshold,
+            "at": now,
+        }
+        events.append(event)
+        previous_status = "in_stock" if previous is None else stock_status_for(previous[2], previous[4])
+        if status in LOW_STATUSES and status != previous_status:
+            events.append({**event, "type": "low_stock", "previous_status": previous_status})
+    return events
+
+
+def publish_stock_changes(changes: Iterable[Tuple[Inventory, Optional[tuple]]]) -> None:
+    """Publish the events for ``changes`` when the current transaction commits (dropped on rollback)."""
+    bus = get_bus()
+    if not bus.wanted():
+        return
+    events = stock_events(changes)
+    if events:
+        bus.publish(events)
+
+
+# ============================================================================
+# IN-PROCESS FAN-OUT
+# ============================================================================
+
+_ids = itertools.count(1)
+
+
+@dataclass(eq=False)
+class Subscription:
+    """
+    One open stream: its event loop, queue (``maxsize=MAX_QUEUED_EVENTS + 1``)
+    and filters (``None`` = everything).
+    """
+    loop: Any
+    queue: Any
+    category_ids: Optional[Set[int]] = None
+    skus: Optional[Set[str]] = None
+    overflowed: bool = False
+    id: int = field(default_factory=lambda: next(_ids))
+
+    def matches(self, event: Dict[str, Any]) -> bool:
+        if self.category_ids is not None and event["category_id"] not in self.category_ids:
+            return False
+        if self.skus is not None and event["sku"] not in self.skus:
+            return False
+        return True
+
+    def deliver(self, events: List[Dict[str, Any]]) -> None:
+        """Runs on the subscriber's loop. A full queue ends the stream instead of blocking writers."""
+        if self.overflowed:
+            return
+        for event in events:
+            if self.queue.qsize() >= MAX_QUEUED_EVENTS:
+                self.overflowed = True
+                self.queue.put_nowait(None)  # The queue keeps one slot free for this marker
+                return
+            self.queue.put_nowait(event)
+
+
+_subscriptions: Set[Subscription] = set()
+_subscriptions_lock = threading.Lock()
+
+
+def has_subscribers() -> bool:
+    return bool(_subscriptions)
+
+
+def subscribe(subscription: Subscription) -> None:
+    with _subscriptions_lock:
+        _subscriptions.add(subscription)
+    get_bus().subscribed()
+
+
+def unsubscribe(subscription: Subscription) -> None:
+    with _subscriptions_lock:
+        _subscriptions.discard(subscription)
+
+
+def dispatch(events: List[Dict[str, Any]]) -> None:
+    """Hand ``events`` to every matching local subscriber (any thread)."""
+    with _subscriptions_lock:
+        subscriptions = list(_subscriptions)
+    for subscription in subscriptions:
+        matching = [event for event in events if subscription.matches(event)]
+        if not matching:
+            continue
+        try:
+            subscription.loop.call_soon_threadsafe(subscription.deliver, matching)
+        except RuntimeError:
+            # The subscriber's loop has closed; its stream is gone
+            unsubscribe(subscription)
+
+
+# ============================================================================
+# BUSES
+# ============================================================================
+
+class MemoryBus:
+    """Single node: committed events go straight to this process's subscribers."""
+
+    def wanted(self) -> bool:
+        return has_subscribers()
+
+    def publish(self, events: List[Dict[str, Any]]) -> None:
+        transaction.on_commit(lambda: dispatch(events))
+
+    def subscribed(self) -> None:
+        pass
+
+
+class PostgresBus:
+    """
+    Multi-node: events travel as NOTIFY payloads, which PostgreSQL delivers
+    only when (and if) the writing transaction commits. Every process with
+    open streams runs one LISTEN thread on its own connection, tagged with
+    LISTENER_APP_NAME so writers on any node can tell whether to publish.
+
+    A stream opened on another node may miss up to LISTENER_CHECK_SECONDS
+    of events before writers notice it; streams catch up through
+    GET /api/sync/ on connect anyway.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._listening = False
+        self._checked = (0.0, False)  # (monotonic time, any listener then)
+
+    def wanted(self) -> bool:
+        if has_subscribers():
+            return True
+        checked_at, listening = self._checked
+        now = time.monotonic()
+        if now - checked_at >= LISTENER_CHECK_SECONDS:
+            listening = self._listeners_active()
+            self._checked = (now, listening)
+        return listening
+
+    @staticmethod
+    def _listeners_active() -> bool:
+        """Any process (on any node) listening for stock events on this database."""
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT EXISTS (SELECT 1 FROM pg_stat_activity WHERE application_name = %s "
+                "AND datname = current_database())",
+                [LISTENER_APP_NAME],
+            )
+            return cursor.fetchone()[0]
+
+    def publish(self, events: List[Dict[str, Any]]) -> None:
+        with connection.cursor() as cursor:
+            for payload in _payloads(events):
+                cursor.execute("SELECT pg_notify(%s, %s)", [NOTIFY_CHANNEL, payload])
+
+    def subscribed(self) -> None:
+        with self._lock:
+            if self._listening:
+                return
+            self._listening = True
+        threading.Thread(target=self._listen, daemon=True, name="stock-events-listener").start()
+
+    def _listen(self) -> None:
+        try:
+            while has_subscribers():
+                try:
+                    self._listen_once()
+                except Exception as e:
+                    logger.warning(f"Stock event listener lost its connection ({e}); reconnecting")
+                    time.sleep(LISTEN_RETRY_SECONDS)
+        finally:
+            with self._lock:
+                self._listening = False
+            # A stream may have subscribed while this thread was finishing
+            if has_subscribers():
+                self.subscribed()
+
+    def _listen_once(self) -> None:
+        raw = connection.get_new_connection(connection.get_connection_params())
+        try:
+            raw.autocommit = True
+            with raw.cursor() as cursor:
+                cursor.execute("SELECT set_config('application_name', %s, false)", [LISTENER_APP_NAME])
+                cursor.execute(f"LISTEN {NOTIFY_CHANNEL}")
+            logger.info(f"Listening for stock events on {NOTIFY_CHANNEL}")
+            while has_subscribers():
+                if select.select([raw], [], [], LISTEN_POLL_SECONDS) == ([], [], []):
+                    continue
+                raw.poll()
+                events = []
+                while raw.notifies:
+                    events.extend(json.loads(raw.notifies.pop(0).payload))
+                if events:
+                    dispatch(events)
+        finally:
+            raw.close()
+
+
+def _payloads(events: List[Dict[str, Any]]) -> Iterable[str]:
+    """JSON arrays of events, each under NOTIFY_PAYLOAD_LIMIT bytes."""
+    chunk, size = [], 2
+    for event in events:
+        encoded = json.dumps(event, separators=(",", ":"))
+        if chunk and size + len(encoded) + 1 > NOTIFY_PAYLOAD_LIMIT:
+            yield f"[{','.join(chunk)}]"
+            chunk, size = [], 2
+        chunk.append(encoded)
+        size += len(encoded) + 1
+    if chunk:
+        yield f"[{','.join(chunk)}]"
+
+
+BUSES = {"memory": MemoryBus, "postgres": PostgresBus}
+_bus = None
+
+
+def get_bus():
+    global _bus
+    if _bus is None:
+        name = getattr(settings, "STOCK_EVENTS_BUS", "memory")
+        if name not in BUSES:
+            raise ValueError(f"Unknown STOCK_EVENTS_BUS '{name}' (expected one of: {', '.join(BUSES)})")
+        _bus = BUSES[name]()
+    return _bus
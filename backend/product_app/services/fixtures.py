@@ -0,0 +1,370 @@
+"""
+Synthetic catalog data for benchmarks and load tests (manage.py generate_fixture_data).
+
+Provides:
+- Categories, suppliers, products and inventories with a deterministic
+  naming scheme (``<prefix>-0000042`` SKUs), from one NumPy random seed
+- One SalesHistory row per product per day: Poisson demand around a
+  per-product rate with a category-level yearly season, a weekly cycle,
+  slow growth or decline, gamma noise and intermittent (mostly zero) sellers
+- Inventories consistent with those sales (stock_out = units sold)
+- Trend and TrendItem rows for the assistant's trend answers
+
+Rows are built as NumPy arrays per chunk of products and written with
+explicit primary keys: COPY on PostgreSQL, batched executemany elsewhere.
+Nothing goes through Model.save(), so no signals fire; rebuild_derived_data()
+recomputes sales stats, rollups, inventory totals, search vectors and the
+name index afterwards, and opens the stock ledger with one snapshot per
+seeded inventory (no StockMovement rows are generated).
+"""
+
+import csv
+import io
+import json
+import logging
+import time
+from dataclasses import dataclass
+from datetime import timedelta
+from typing import Any, Callable, Dict, Optional
+
+import numpy as np
+from django.core.management.color import no_style
+from django.db import connection, models, transaction
+from django.db.models import Max
+from django.utils import timezone
+
+from product_app.models import Category, Inventory, Product, SalesHistory, Supplier, Trend
+from product_app.services.inventory_totals import rebuild_inventory_totals
+from product_app.services.movements import open_snapshots
+from product_app.services.name_index import bump_name_index_version
+from product_app.services.reorder import invalidate_reorder_report
+from product_app.services.sales_rollups import rebuild_sales_rollups
+from product_app.services.sales_stats import rebuild_sales_stats
+from product_app.services.search_index import rebuild_search_index, search_enabled
+from trend_app.models import TrendItem
+
+logger = logging.getLogger(__name__)
+
+CHUNK_ROWS = 2_000_000    # Sales rows generated per chunk of products (bounds memory)
+WRITE_BATCH = 100_000     # Rows per COPY / executemany call
+
+ADJECTIVES = ["classic", "slim", "organic", "wireless", "vintage", "compact", "deluxe", "waterproof", "recycled", "heavy"]
+COLOURS = ["black", "navy", "olive", "crimson", "ivory", "teal", "sand", "grey"]
+NOUNS = [
+    "jacket", "sneaker", "backpack", "headphones", "lamp", "kettle", "blender", "notebook",
+    "coffee", "tea", "scarf", "mug", "charger", "blanket", "bottle", "umbrella",
+]
+SEASONS = ["Christmas", "Summer", "Winter", "Spring", "Autumn"]
+WEEKLY_PATTERN = np.array([0.95, 0.9, 0.9, 1.0, 1.15, 1.35, 1.25])  # Monday .. Sunday
+THRESHOLDS = np.array([5, 10, 20])
+
+
+@dataclass
+class FixtureSpec:
+    products: int
+    sales_days: int = 90
+    categories: int = 20
+    suppliers: int = 10
+    trends: int = 200
+    seed: int = 42
+    prefix: str = "FX"
+
+
+# ============================================================================
+# NAMING (mirrored by loadtest/common.py)
+# ============================================================================
+
+def fixture_sku(prefix: str, index: int) -> str:
+    return f"{prefix}-{index:07d}"
+
+
+def fixture_product_name(index: int) -> str:
+    # Mixed radixes so neighbouring products differ in every word
+    return (
+        f"{ADJECTIVES[index % len(ADJECTIVES)].title()} {COLOURS[index // 3 % len(COLOURS)]} "
+        f"{NOUNS[index // 7 % len(NOUNS)]} {index}"
+    )
+
+
+def fixture_category_name(prefix: str, index: int) -> str:
+    return f"{prefix} {NOUNS[index % len(NOUNS)].title()} {index:04d}"
+
+
+def fixture_supplier_name(prefix: str, index: int) -> str:
+    return f"{prefix} Supplier {index:03d}"
+
+
+# ============================================================================
+# GENERATION
+# ============================================================================
+
+def generate_fixture_data(spec: FixtureSpec, progress: Optional[Callable[[str], None]] = None) -> Dict[str, int]:
+    """
+    Write ``spec``'s rows and return ``{table: rows written}``. Raises
+    ValueError when products with ``spec.prefix`` SKUs already exist.
+    Derived tables are left stale; call rebuild_derived_data() next.
+    """
+    if Product.objects.filter(sku__startswith=f"{spec.prefix}-").exists():
+        raise ValueError(f"Products with '{spec.prefix}-' SKUs already exist; pick another --prefix")
+    progress = progress or logger.info
+    rng = np.random.default_rng(spec.seed)
+    now = timezone.now()
+    counts = {"categories": spec.categories, "suppliers": spec.suppliers}
+
+    category_ids = _next_ids(Category, spec.categories)
+    supplier_ids = _next_ids(Supplier, spec.suppliers)
+    with transaction.atomic():
+        _insert(Category, {
+            "id": category_ids,
+            "name": [fixture_category_name(spec.prefix, i) for i in range(spec.categories)],
+        })
+        _insert(Supplier, {
+            "id": supplier_ids,
+            "name": [fixture_supplier_name(spec.prefix, i) for i in range(spec.suppliers)],
+            "lead_time_days": rng.integers(2, 22, spec.suppliers),
+        })
+
+    # Category seasons: peak day of the year and strength
+    season_peak = rng.uniform(0, 365, spec.categories)
+    season_strength = rng.uniform(0.0, 0.8, spec.categories)
+    end = timezone.localdate() - timedelta(days=1)
+    dates = np.arange(np.datetime64(end) - spec.sales_days + 1, np.datetime64(end) + 1)
+    day_of_year = (dates - dates.astype("datetime64[Y]")).astype(int)
+    weekday = (dates.astype(int) + 3) % 7  # 1970-01-01 was a Thursday
+    date_strings = np.datetime_as_string(dates)
+
+    product_ids = _next_ids(Product, spec.products)
+    inventory_ids = _next_ids(Inventory, spec.products)
+    sales_id = _next_ids(SalesHistory, 1)[0]
+    chunk = max(1, CHUNK_ROWS // max(spec.sales_days, 1))
+    counts.update(products=0, inventories=0, sales_history=0)
+    started = time.monotonic()
+
+    for start in range(0, spec.products, chunk):
+        n = min(chunk, spec.products - start)
+        index = np.arange(start, start + n)
+        ids = product_ids[start:start + n]
+        categories = rng.integers(0, spec.categories, n)
+
+        # Demand: rate x season x weekday x trend x noise, a third of products intermittent
+        base = rng.lognormal(mean=0.3, sigma=1.0, size=n)
+        growth = rng.normal(0.0, 0.3, n)
+        season = 1 + season_strength[categories, None] * np.cos(
+            2 * np.pi * (day_of_year[None, :] - season_peak[categories, None]) / 365
+        )
+        trend = 1 + growth[:, None] * np.linspace(-0.5, 0.5, spec.sales_days)[None, :]
+        rate = base[:, None] * season * WEEKLY_PATTERN[weekday][None, :] * np.clip(trend, 0.1, None)
+        rate *= rng.gamma(shape=4.0, scale=0.25, size=rate.shape)
+        intermittent = rng.random(n) < 0.33
+        rate[intermittent] *= rng.random((intermittent.sum(), spec.sales_days)) < 0.15
+        units = rng.poisson(rate)
+
+        # Stock: everything sold was received, plus what is on hand now
+        sold = units.sum(axis=1)
+        thresholds = THRESHOLDS[rng.integers(0, len(THRESHOLDS), n)]
+        on_hand = rng.integers(thresholds + 1, thresholds + 1 + np.ceil(base * 60).astype(int) + 50)
+        roll = rng.random(n)
+        on_hand[roll < 0.08] = 0
+        low = (roll >= 0.08) & (roll < 0.2)
+        on_hand[low] = rng.integers(1, thresholds[low] + 1)
+        statuses = np.select(
+            [on_hand <= 0, on_hand <= thresholds], ["out_of_stock", "low_stock"], "in_stock",
+        )
+
+        with transaction.atomic():
+            _insert(Product, {
+                "id": ids,
+                "sku": [fixture_sku(spec.prefix, i) for i in index.tolist()],
+                "name": [fixture_product_name(i) for i in index.tolist()],
+                "category_id": category_ids[categories],
+                "supplier_id": supplier_ids[index % spec.suppliers],
+                "created_at": now,
+                "updated_at": now,
+            })
+            _insert(Inventory, {
+                "id": inventory_ids[start:start + n],
+                "product_id": ids,
+                "stock_in": sold + on_hand,
+                "stock_out": sold,
+                "total_stock": on_hand,
+                "low_stock_threshold": thresholds,
+                "stock_status": statuses,
+                "created_at": now,
+                "updated_at": now,
+            })
+            rows = n * spec.sales_days
+            _insert(SalesHistory, {
+                "id": np.arange(sales_id, sales_id + rows),
+                "product_id": np.repeat(ids, spec.sales_days),
+                "date": np.tile(date_strings, n),
+                "units_sold": units.ravel(),
+            })
+        sales_id += rows
+        counts["products"] += n
+        counts["inventories"] += n
+        counts["sales_history"] += rows
+        elapsed = time.monotonic() - started
+        progress(
+            f"{counts['products']:,} / {spec.products:,} products, {counts['sales_history']:,} sales rows "
+            f"({(counts['products'] * 2 + counts['sales_history']) / max(elapsed, 1e-9) * 60:,.0f} rows/min)"
+        )
+
+    counts.update(_generate_trends(spec, rng, category_ids, now))
+    _reset_sequences()
+    return counts
+
+
+def _generate_trends(spec: FixtureSpec, rng, category_ids: np.ndarray, now) -> Dict[str, int]:
+    """Scraped-trend rows spread over the last 60 days, seasons and fixture categories."""
+    if not spec.trends:
+        return {"trends": 0, "trend_items": 0}
+    n = spec.trends
+    seasons = np.array(SEASONS)[rng.integers(0, len(SEASONS), n)]
+    words = [
+        f"{ADJECTIVES[a]} {COLOURS[c]} {NOUNS[k]}"
+        for a, c, k in zip(
+            rng.integers(0, len(ADJECTIVES), n).tolist(),
+            rng.integers(0, len(COLOURS), n).tolist(),
+            rng.integers(0, len(NOUNS), n).tolist(),
+        )
+    ]
+    popularity = np.round(rng.gamma(2.0, 2.0, n), 2)
+    ages = rng.uniform(0, 60 * 86400, n)
+    scraped = [
+        Trend._meta.get_field("scraped_at").get_db_prep_save(now - timedelta(seconds=age), connection)
+        for age in ages.tolist()
+    ]
+    with transaction.atomic():
+        _insert(Trend, {
+            "id": _next_ids(Trend, n),
+            "season": seasons,
+            "keywords": [f"{word}, {NOUNS[i % len(NOUNS)]}" for i, word in enumerate(words)],
+            "popularity_score": popularity,
+            "hot_score": np.round(popularity * rng.uniform(0.5, 3.0, n), 2),
+            "category_id": category_ids[rng.integers(0, len(category_ids), n)],
+            "scraped_at": scraped,
+            "source_name": "fixture",
+        })
+        _insert(TrendItem, {
+            "id": _next_ids(TrendItem, n),
+            "season": np.char.lower(seasons),
+            "keyword": words,
+            "source": "fixture",
+            "score": popularity,
+            "created_at": scraped,
+        })
+    return {"trends": n, "trend_items": n}
+
+
+def rebuild_derived_data(progress: Optional[Callable[[str], None]] = None) -> None:
+    """
+    Recompute everything bulk writes skip: sales stats and averages, rollups,
+    totals, opening ledger snapshots, search, name index.
+    """
+    progress = progress or logger.info
+    steps = [
+        ("sales stats and average daily sales", rebuild_sales_stats),
+        ("sales rollups", rebuild_sales_rollups),
+        ("inventory totals", rebuild_inventory_totals),
+        # Without them, the ledger of seeded stock is empty and snapshot_stock reports every SKU as drifted
+        ("opening stock snapshots", open_snapshots),
+    ]
+    if search_enabled():
+        steps.append(("search index", rebuild_search_index))
+    for label, step in steps:
+        started = time.monotonic()
+        step()
+        progress(f"Rebuilt {label} in {time.monotonic() - started:.1f}s")
+    bump_name_index_version()
+    invalidate_reorder_report()
+
+
+# ============================================================================
+# WRITING
+# ============================================================================
+
+def _next_ids(model, count: int) -> np.ndarray:
+    start = (model.objects.aggregate(top=Max("id"))["top"] or 0) + 1
+    return np.arange(start, start + count)
+
+
+def _insert(model, columns: Dict[str, Any]) -> None:
+    """
+    Insert rows given as ``{column: values}``. Values are NumPy arrays or
+    lists of database-ready values, or one scalar for every row; columns
+    not given get the field default. Explicit ids keep related rows linked
+    without reading them back (sequences are reset afterwards).
+    """
+    fields = model._meta.concrete_fields
+    unknown = set(columns) - {field.column for field in fields}
+    if unknown:
+        raise ValueError(f"{model.__name__} has no column(s): {', '.join(sorted(unknown))}")
+    count = len(columns["id"])
+    copy = connection.vendor == "postgresql"
+
+    values = []
+    for field in fields:
+        value = columns[field.column] if field.column in columns else field.get_default()
+        if isinstance(value, np.ndarray):
+            value = value.tolist()
+        elif not isinstance(value, list):
+            value = [_scalar(field, value, copy)] * count
+        values.append(value)
+    rows = zip(*values)
+
+    table = connection.ops.quote_name(model._meta.db_table)
+    names = [connection.ops.quote_name(field.column) for field in fields]
+    if copy:
+        # Unquoted empty CSV fields are NULL; keep them '' in NOT NULL text columns
+        not_null = [
+            connection.ops.quote_name(f.column) for f in fields if not f.null and f.empty_strings_allowed
+        ]
+        options = f", FORCE_NOT_NULL ({', '.join(not_null)})" if not_null else ""
+        sql = f"COPY {table} ({', '.join(names)}) FROM STDIN WITH (FORMAT csv{options})"
+        for batch in _batches(rows, WRITE_BATCH):
+            _copy(sql, batch)
+    else:
+        sql = f"INSERT INTO {table} ({', '.join(names)}) VALUES ({', '.join(['%s'] * len(names))})"
+        with connection.cursor() as cursor:
+            for batch in _batches(rows, WRITE_BATCH):
+                cursor.executemany(sql, batch)
+
+
+def _scalar(field: models.Field, value: Any, copy: bool) -> Any:
+    if copy and isinstance(field, models.JSONField):
+        return json.dumps(value)
+    return field.get_db_prep_save(value, connection)
+
+
+def _batches(rows, size: int):
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _copy(sql: str, rows) -> None:
+    buffer = io.StringIO()
+    csv.writer(buffer, lineterminator="\n").writerows(rows)
+    buffer.seek(0)
+    with connection.cursor() as cursor:
+        raw = cursor.cursor
+        if hasattr(raw, "copy_expert"):  # psycopg2
+            raw.copy_expert(sql, buffer, size=1 << 16)
+        else:  # psycopg 3
+            with raw.copy(sql) as copy:
+                copy.write(buffer.getvalue())
+
+
+def _reset_sequences() -> None:
+    """Point the id sequences past the explicit ids (no-op on SQLite)."""
+    statements = connection.ops.sequence_reset_sql(
+        no_style(), [Category, Supplier, Product, Inventory, SalesHistory, Trend, TrendItem],
+    )
+    with connection.cursor() as cursor:
+        for statement in statements:
+            cursor.execute(statement)
@@ -0,0 +1,227 @@
+"""
+Batch demand forecasting for product_app.
+
+Provides:
+- Loading daily SalesHistory series for a batch of products into a
+  (products x days) NumPy matrix (missing days are zero demand)
+- Croston's method (SBA variant) for intermittent demand and Holt's linear
+  trend method for regular demand, both vectorized across products
+- Fitting and upserting DemandForecast rows (full run or incremental:
+  only products whose SalesStats changed since their last fit)
+
+Readers (reorder report, AI assistant) only read the stored forecasts.
+"""
+
+import logging
+from datetime import date, timedelta
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+from django.db import connections
+from django.db.models import Exists, OuterRef
+from django.utils import timezone
+
+from product_app.models import FORECAST_MODEL_VERSION, DemandForecast, SalesHistory, SalesStats
+from product_app.services.reorder import invalidate_reorder_report
+
+logger = logging.getLogger(__name__)
+
+HISTORY_DAYS = 180
+BATCH_SIZE = 2000  # Products per matrix (2000 x 180 floats ≈ 3 MB)
+
+CROSTON_ALPHA = 0.1
+HOLT_ALPHA = 0.3
+HOLT_BETA = 0.05
+# Average demand interval above which a series counts as intermittent (Syntetos-Boylan cut-off)
+INTERMITTENT_ADI = 1.32
+
+FORECAST_FIELDS = [
+    "method", "daily_rate", "daily_trend", "forecast_7d", "forecast_30d",
+    "history_days", "data_through", "fitted_at",
+]
+
+
+# ============================================================================
+# MODELS
+# ============================================================================
+
+def croston_sba(demand: np.ndarray, alpha: float = CROSTON_ALPHA) -> np.ndarray:
+    """
+    Croston's method with the Syntetos-Boylan correction, one row per series.
+    Returns the expected units per day (0 for series with no demand).
+    """
+    rows, days = demand.shape
+    size = np.zeros(rows)       # Smoothed non-zero demand size
+    interval = np.zeros(rows)   # Smoothed interval between demands
+    since = np.ones(rows)       # Days since the previous demand
+    hits = np.zeros(rows, dtype=np.int64)
+
+    for day in demand.T:
+        hit = day > 0
+        # The first demand only seeds the size; the first full gap seeds the interval
+        size = np.where(hit & (hits == 0), day, np.where(hit, size + alpha * (day - size), size))
+        interval = np.where(
+            hit & (hits == 1), since, np.where(hit & (hits > 1), interval + alpha * (since - interval), interval)
+        )
+        hits += hit
+        since = np.where(hit, 1, since + 1)
+
+    # A single demand: spread it over the days observed since it happened
+    first = np.where(hits > 0, (demand > 0).argmax(axis=1), days)
+    interval = np.where(hits == 1, days - first, interval)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        rate = (1 - alpha / 2) * size / interval
+    return np.where(hits > 0, rate, 0.0)
+
+
+def holt_linear(demand: np.ndarray, alpha: float = HOLT_ALPHA, beta: float = HOLT_BETA):
+    """
+    Holt's linear trend method, one row per series.
+    Returns ``(level, trend)`` after the last day; day ``h`` ahead is ``level + h * trend``.
+    """
+    warmup = min(7, demand.shape[1])
+    level = demand[:, :warmup].mean(axis=1)
+    trend = np.zeros(demand.shape[0])
+    for day in demand[:, warmup:].T:
+        previous = level
+        level = alpha * day + (1 - alpha) * (level + trend)
+        trend = beta * (level - previous) + (1 - beta) * trend
+    return level, trend
+
+
+def forecast_matrix(demand: np.ndarray) -> Dict[str, np.ndarray]:
+    """
+    Pick a method per series and forecast it. Intermittent series (average
+    interval between sales days above INTERMITTENT_ADI) use Croston; the
+    rest use Holt. Returns per-series arrays.
+    """
+    rows, days = demand.shape
+    hits = demand > 0
+    sales_days = hits.sum(axis=1)
+    first_sale = np.where(sales_days > 0, hits.argmax(axis=1), days)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        adi = np.where(sales_days > 0, (days - first_sale) / sales_days, np.inf)
+    intermittent = adi > INTERMITTENT_ADI
+
+    croston = croston_sba(demand)
+    level, trend = holt_linear(demand)
+    horizon = np.arange(1, 31)
+    holt_path = np.maximum(level[:, None] + trend[:, None] * horizon, 0)
+
+    path = np.where(intermittent[:, None], croston[:, None], holt_path)
+    method = np.where(sales_days == 0, "none", np.where(intermittent, "croston", "holt"))
+    return {
+        "method": method,
+        "daily_rate": path[:, :7].mean(axis=1),
+        "daily_trend": np.where(intermittent, 0.0, trend),
+        "forecast_7d": path[:, :7].sum(axis=1),
+        "forecast_30d": path.sum(axis=1),
+        "history_days": sales_days,
+    }
+
+
+# ============================================================================
+# FITTING
+# ============================================================================
+
+def load_series(product_ids: List[int], through: date, days: int = HISTORY_DAYS) -> np.ndarray:
+    """Daily units for ``product_ids`` (row order) over the ``days`` ending ``through``."""
+    start = through - timedelta(days=days - 1)
+    matrix = np.zeros((len(product_ids), days))
+    queryset = (
+        SalesHistory.objects.filter(product_id__in=product_ids, date__gte=start, date__lte=through)
+        .order_by().values_list("product_id", "date", "units_sold")
+    )
+    # Plain cursor fetch: converting every row's date through the ORM costs
+    # more than the fit. Drivers return dates as date objects or ISO strings,
+    # so both map to the column offset.
+    sql, params = queryset.query.sql_with_params()
+    with connections[queryset.db].cursor() as cursor:
+        cursor.execute(sql, params)
+        rows = cursor.fetchall()
+    if rows:
+        row_of = {product_id: i for i, product_id in enumerate(product_ids)}
+        column_of = {}
+        for offset in range(days):
+            day = start + timedelta(days=offset)
+            column_of[day] = column_of[day.isoformat()] = offset
+        np.add.at(
+            matrix,
+            ([row_of[row[0]] for row in rows], [column_of[row[1]] for row in rows]),
+            [row[2] for row in rows],
+        )
+    return matrix
+
+
+def fit_forecasts(product_ids: Iterable[int], through: Optional[date] = None) -> int:
+    """
+    Fit and upsert forecasts for ``product_ids`` in batches of BATCH_SIZE.
+    ``through`` is the last complete sales day (default: yesterday).
+    Returns the number of forecasts written.
+    """
+    through = through or timezone.localdate() - timedelta(days=1)
+    # Stamped before reading, so sales written during the fit trigger the next refit
+    fitted_at = timezone.now()
+    product_ids = list(product_ids)
+    written = 0
+
+    for start in range(0, len(product_ids), BATCH_SIZE):
+        batch = product_ids[start:start + BATCH_SIZE]
+        result = forecast_matrix(load_series(batch, through))
+        forecasts = [
+            DemandForecast(
+                product_id=product_id,
+                model_version=FORECAST_MODEL_VERSION,
+                method=str(result["method"][i]),
+                daily_rate=round(float(result["daily_rate"][i]), 4),
+                daily_trend=round(float(result["daily_trend"][i]), 4),
+                forecast_7d=round(float(result["forecast_7d"][i]), 2),
+                forecast_30d=round(float(result["forecast_30d"][i]), 2),
+                history_days=int(result["history_days"][i]),
+                data_through=through,
+                fitted_at=fitted_at,
+            )
+            for i, product_id in enumerate(batch)
+        ]
+        DemandForecast.objects.bulk_create(
+            forecasts,
+            update_conflicts=True,
+            unique_fields=["product", "model_version"],
+            update_fields=FORECAST_FIELDS,
+        )
+        written += len(forecasts)
+
+    if written:
+        invalidate_reorder_report()
+    logger.info(f"Fitted {written} demand forecasts ({FORECAST_MODEL_VERSION}) through {through}")
+    return written
+
+
+def products_to_refit(full: bool = False) -> List[int]:
+    """
+    Products with sales whose forecast is missing (for this model version)
+    or older than their last sales write. ``full`` returns every product with sales.
+    """
+    stats = SalesStats.objects.order_by("product_id")
+    if not full:
+        fresh = DemandForecast.objects.filter(
+            product_id=OuterRef("product_id"),
+            model_version=FORECAST_MODEL_VERSION,
+            fitted_at__gte=OuterRef("changed_at"),
+        )
+        stats = stats.filter(~Exists(fresh))
+    return list(stats.values_list("product_id", flat=True))
+
+
+def refit_forecasts(full: bool = False, through: Optional[date] = None) -> int:
+    """Nightly entry point: refit only products with new sales (or everything when ``full``)."""
+    return fit_forecasts(products_to_refit(full), through)
+
+
+# ============================================================================
+# READING
+# ============================================================================
+
+def read_forecast(product_id: int) -> Optional[DemandForecast]:
+    """The stored forecast for the current model version (``None`` if never fitted)."""
+    return DemandForecast.objects.filter(product_id=product_id, model_version=FORECAST_MODEL_VERSION).first()
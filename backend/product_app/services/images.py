@@ -0,0 +1,202 @@
+"""
+Product image variants for product_app.
+
+Provides:
+- Fixed-size variants of Product.image_url (square thumbnail, small and
+  medium fits, full-size WebP), each as WebP plus a JPEG/PNG fallback
+- Content-hashed filenames (hash of the source bytes and the pipeline
+  version), so variant URLs never change content and can be served with
+  far-future cache headers
+- Recording the variants in Product.image_variants and a catalog backfill
+
+Variants are generated when a product's image_url changes (post_save) and
+by ``manage.py build_image_variants`` for existing files. Writes go through
+default_storage; files that already exist are not rewritten.
+"""
+
+import hashlib
+import io
+import logging
+import os
+from typing import Any, Dict, Optional, Tuple
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.utils import timezone
+from PIL import Image, ImageOps, UnidentifiedImageError
+
+from product_app.models import Product
+
+logger = logging.getLogger(__name__)
+
+PIPELINE_VERSION = "1"   # Bump when sizes or encoder settings change (new hashes, new URLs)
+VARIANT_DIR = "products/variants"
+WEBP_QUALITY = 80
+JPEG_QUALITY = 85
+HASH_LENGTH = 12
+
+# name -> (width, height, crop). Cropped sizes are exactly width x height;
+# the others fit inside the box keeping the aspect ratio. None = source size.
+IMAGE_SIZES = {
+    "thumb": (128, 128, True),
+    "small": (320, 320, False),
+    "medium": (640, 640, False),
+    "original": None,
+}
+IMAGE_SIZE_NAMES = tuple(IMAGE_SIZES)
+CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+
+class ImageVariantError(Exception):
+    """The source image is missing or unreadable."""
+
+
+# ============================================================================
+# GENERATION
+# ============================================================================
+
+def source_hash(data: bytes) -> str:
+    return hashlib.sha256(PIPELINE_VERSION.encode() + data).hexdigest()[:HASH_LENGTH]
+
+
+def _resize(image: Image.Image, spec) -> Image.Image:
+    if spec is None:
+        return image
+    width, height, crop = spec
+    if crop:
+        return ImageOps.fit(image, (width, height), Image.LANCZOS)
+    resized = image.copy()
+    resized.thumbnail((width, height), Image.LANCZOS)
+    return resized
+
+
+def _encode(image: Image.Image, fmt: str) -> bytes:
+    buffer = io.BytesIO()
+    if fmt == "webp":
+        image.save(buffer, "WEBP", quality=WEBP_QUALITY, method=4)
+    elif fmt == "jpeg":
+        image.convert("RGB").save(buffer, "JPEG", quality=JPEG_QUALITY, optimize=True, progressive=True)
+    else:
+        image.save(buffer, "PNG", optimize=True)
+    return buffer.getvalue()
+
+
+def _store(path: str, data: bytes) -> None:
+    # Content-hashed names: an existing file already holds these bytes
+    if not default_storage.exists(path):
+        default_storage.save(path, ContentFile(data))
+
+
+def generate_variants(image_url: str) -> Dict[str, Any]:
+    """
+    Write every variant of ``image_url`` (a MEDIA_ROOT-relative path) and
+    return the ``Product.image_variants`` value describing them.
+    Raises ImageVariantError when the source cannot be read.
+    """
+    try:
+        with default_storage.open(image_url, "rb") as source:
+            data = source.read()
+        image = Image.open(io.BytesIO(data))
+        image = ImageOps.exif_transpose(image)
+        image.load()
+    except (FileNotFoundError, OSError, UnidentifiedImageError) as e:
+        raise ImageVariantError(f"Cannot read product image '{image_url}': {e}") from e
+
+    # Alpha survives in the PNG fallback; everything else falls back to JPEG
+    has_alpha = image.mode in ("RGBA", "LA") or (image.mode == "P" and "transparency" in image.info)
+    image = image.convert("RGBA" if has_alpha else "RGB")
+    fallback = "png" if has_alpha else "jpeg"
+
+    digest = source_hash(data)
+    stem = os.path.splitext(os.path.basename(image_url))[0]
+    sizes = {}
+    for name, spec in IMAGE_SIZES.items():
+        resized = _resize(image, spec)
+        entry = {"width": resized.width, "height": resized.height}
+        for fmt in ("webp", fallback):
+            if name == "original" and fmt == fallback:
+                continue  # The source itself is the fallback
+            path = f"{VARIANT_DIR}/{stem}-{name}-{digest}.{'jpg' if fmt == 'jpeg' else fmt}"
+            _store(path, _encode(resized, fmt))
+            entry[fmt] = path
+        sizes[name] = entry
+    return {"source": image_url, "hash": digest, "fallback": fallback, "sizes": sizes}
+
+
+def refresh_product_images(product: Product, force: bool = False) -> bool:
+    """
+    Bring ``product.image_variants`` in line with ``product.image_url``
+    (queryset UPDATE, no signals). Returns True when variants were written
+    or cleared. Unreadable sources are logged and leave the field empty.
+    """
+    current = product.image_variants or {}
+    if not product.image_url:
+        variants = {}
+    elif not force and current.get("source") == product.image_url:
+        return False
+    else:
+        try:
+            variants = generate_variants(product.image_url)
+        except ImageVariantError as e:
+            logger.warning(f"Image variants skipped for {product.sku}: {e}")
+            variants = {}
+    if variants == current:
+        return False
+    # updated_at moves too: the serialized image URLs changed (delta sync)
+    product.updated_at = timezone.now()
+    Product.objects.filter(pk=product.pk).update(image_variants=variants, updated_at=product.updated_at)
+    product.image_variants = variants
+    return True
+
+
+def backfill_image_variants(force: bool = False) -> Tuple[int, int]:
+    """
+    Generate variants for every product whose image_url has none (or all,
+    with ``force``). Products sharing one source file reuse its files.
+    Returns ``(products updated, products checked)``.
+    """
+    products = Product.objects.exclude(image_url="").only("pk", "sku", "image_url", "image_variants")
+    updated = checked = 0
+    by_source: Dict[str, Dict[str, Any]] = {}
+    for product in products.iterator(chunk_size=500):
+        checked += 1
+        if not force and (product.image_variants or {}).get("source") == product.image_url:
+            continue
+        if product.image_url not in by_source:
+            try:
+                by_source[product.image_url] = generate_variants(product.image_url)
+            except ImageVariantError as e:
+                logger.warning(f"Image variants skipped for {product.sku}: {e}")
+                by_source[product.image_url] = {}
+        variants = by_source[product.image_url]
+        if variants != product.image_variants:
+            Product.objects.filter(pk=product.pk).update(image_variants=variants, updated_at=timezone.now())
+            updated += 1
+    logger.info(f"Image variants backfilled for {updated} of {checked} products with images")
+    return updated, checked
+
+
+# ============================================================================
+# READING
+# ============================================================================
+
+def image_urls(image_url: str, variants: Optional[Dict[str, Any]], size: str = "original") -> Optional[Dict[str, Any]]:
+    """
+    URLs for one size: ``{"size", "url" (WebP), "fallback_url", "width", "height"}``.
+    Without generated variants both URLs point at the source image.
+    """
+    if not image_url:
+        return None
+    original = f"{settings.MEDIA_URL}{image_url}"
+    entry = ((variants or {}).get("sizes") or {}).get(size)
+    if not entry:
+        return {"size": size, "url": original, "fallback_url": original, "width": None, "height": None}
+    fallback = entry.get(variants.get("fallback"))
+    return {
+        "size": size,
+        "url": f"{settings.MEDIA_URL}{entry['webp']}",
+        "fallback_url": f"{settings.MEDIA_URL}{fallback}" if fallback else original,
+        "width": entry["width"],
+        "height": entry["height"],
+    }
@@ -0,0 +1,262 @@
+"""
+Running inventory totals for product_app.
+
+Provides:
+- Per-inventory contributions to InventoryTotals and F-expression delta updates
+  (global key + category key) applied inside the caller's transaction
+- Striped counter rows: each thread writes one of InventoryTotals.SHARDS
+  rows per key, so stock writes to different SKUs do not queue on the
+  global row's lock until commit; reads sum the shards
+- Moving an inventory's contribution when its product changes category
+- Full rebuild from Inventory (backfill / reconcile)
+- Live stock events (services/events.py) for every recorded change
+
+Callers: Inventory signals (save/delete), bulk stock adjustments, the
+average-daily-sales sync and the product recategorize signal.
+"""
+
+import logging
+import os
+import random
+import threading
+from collections import defaultdict
+from decimal import Decimal
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from django.db import transaction
+from django.db.models import Count, DecimalField, F, Max, Q, Sum, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from product_app.models import Category, Inventory, InventoryTotals, stock_status_for
+from product_app.services.events import publish_stock_changes
+
+logger = logging.getLogger(__name__)
+
+TOTALS_FIELDS = (
+    "product_count",
+    "stock_in",
+    "stock_out",
+    "total_stock",
+    "average_daily_sales_sum",
+    "low_stock_count",
+    "out_of_stock_count",
+)
+
+# (category_id, {field: delta})
+TotalsDelta = Tuple[Optional[int], Dict[str, object]]
+
+_local = threading.local()
+
+
+# ============================================================================
+# CONTRIBUTIONS
+# ============================================================================
+
+def contribution(snapshot) -> Dict[str, object]:
+    """What one inventory adds to its totals rows (see ``Inventory.totals_snapshot``)."""
+    stock_in, stock_out, total_stock, average_daily_sales, threshold = snapshot
+    status = stock_status_for(total_stock, threshold)
+    return {
+        "product_count": 1,
+        "stock_in": stock_in,
+        "stock_out": stock_out,
+        "total_stock": total_stock,
+        "average_daily_sales_sum": Decimal(average_daily_sales),
+        "low_stock_count": int(status == "low_stock"),
+        "out_of_stock_count": int(status == "out_of_stock"),
+    }
+
+
+def difference(new: Optional[tuple], old: Optional[tuple]) -> Dict[str, object]:
+    """Field deltas between two snapshots (``None`` = inventory absent)."""
+    after = contribution(new) if new else {}
+    before = contribution(old) if old else {}
+    return {f: after.get(f, 0) - before.get(f, 0) for f in TOTALS_FIELDS}
+
+
+def record_inventory_changes(inventories: Iterable[Inventory], created: bool = False) -> None:
+    """
+    Apply the change since each inventory was loaded (or its whole
+    contribution when ``created``) and re-arm the snapshots.
+    Inventories should come with ``select_related("product")``.
+    """
+    deltas, changes = [], []
+    for inv in inventories:
+        snapshot = inv.totals_snapshot()
+        previous = None if created else getattr(inv, "_loaded_totals", None)
+        deltas.append((inv.product.category_id, difference(snapshot, previous)))
+        changes.append((inv, previous))
+        inv._loaded_totals = snapshot
+    apply_totals_deltas(deltas)
+    publish_stock_changes(changes)
+
+
+def move_category(inventory: Inventory, old_category_id: Optional[int], new_category_id: Optional[int]):
+    """Shift one inventory's contribution between category rows (global row unchanged)."""
+    move_categories([(inventory, old_category_id, new_category_id)])
+
+
+def move_categories(moves: Iterable[Tuple[Inventory, Optional[int], Optional[int]]]) -> None:
+    """``move_category`` for many inventories, with one UPDATE per affected category row."""
+    deltas = []
+    for inventory, old_category_id, new_category_id in moves:
+        share = contribution(inventory.totals_snapshot())
+        deltas.append((old_category_id, {f: -v for f, v in share.items()}))
+        deltas.append((new_category_id, share))
+    apply_totals_deltas(deltas, include_global=False)
+
+
+# ============================================================================
+# DELTA UPDATES
+# ============================================================================
+
+def apply_totals_deltas(deltas: Iterable[TotalsDelta], include_global: bool = True) -> None:
+    """
+    Fold per-category deltas into InventoryTotals with one UPDATE per key,
+    on this thread's shard.
+
+    A transaction runs on one thread, so it always writes the same shard and
+    locks its rows in key order; writers on other threads mostly hold other
+    shards. Missing rows are created on first use.
+    """
+    per_key = defaultdict(lambda: defaultdict(int))
+    categories = {}
+    for category_id, delta in deltas:
+        keys = [InventoryTotals.key_for(category_id)]
+        categories[keys[0]] = category_id
+        if include_global:
+            keys.append(InventoryTotals.GLOBAL_KEY)
+        for key in keys:
+            for field, value in delta.items():
+                per_key[key][field] += value
+
+    now, shard = timezone.now(), _shard()
+    with transaction.atomic():
+        for key in sorted(per_key):
+            changes = {f: F(f) + v for f, v in per_key[key].items() if v}
+            if not changes:
+                continue
+            rows = InventoryTotals.objects.filter(key=key, shard=shard)
+            values = {**changes, "version": F("version") + 1, "updated_at": now}
+            if not rows.update(**values):
+                InventoryTotals.objects.get_or_create(
+                    key=key, shard=shard, defaults={"category_id": categories.get(key)},
+                )
+                rows.update(**values)
+
+
+def _shard() -> int:
+    """This thread's shard, picked at random once per thread (and again after a fork)."""
+    if getattr(_local, "pid", None) != os.getpid():
+        _local.pid, _local.shard = os.getpid(), random.randrange(InventoryTotals.SHARDS)
+    return _local.shard
+
+
+# ============================================================================
+# READS
+# ============================================================================
+
+def _summed(rows, *extra, order=()) -> List[Tuple[InventoryTotals, dict]]:
+    """One unsaved InventoryTotals per key with its shards added up, plus the ``extra`` values."""
+    sums = {f"agg_{f}": Sum(f) for f in (*TOTALS_FIELDS, "version")}
+    return [
+        (
+            InventoryTotals(
+                key=row["key"], category_id=row["category_id"], updated_at=row["agg_updated_at"],
+                **{f: row[f"agg_{f}"] for f in (*TOTALS_FIELDS, "version")},
+            ),
+            row,
+        )
+        for row in (
+            rows.values("key", "category_id", *extra)
+            .annotate(**sums, agg_updated_at=Max("updated_at"))
+            .order_by(*order)
+        )
+    ]
+
+
+def read_totals(key: str = InventoryTotals.GLOBAL_KEY) -> InventoryTotals:
+    """Read one key's totals, summed over its shards (all zero if it has no rows yet)."""
+    rows = _summed(InventoryTotals.objects.filter(key=key))
+    return rows[0][0] if rows else InventoryTotals(key=key)
+
+
+def category_totals(limit: Optional[int] = None) -> List[InventoryTotals]:
+    """Per-category totals (summed over shards), most stock first, with ``category`` loaded."""
+    rows = InventoryTotals.objects.exclude(key=InventoryTotals.GLOBAL_KEY)
+    summed = _summed(rows, "category__name", order=("-agg_total_stock", "key"))[:limit]
+    for totals, row in summed:
+        if totals.category_id:
+            totals.category = Category(pk=totals.category_id, name=row["category__name"])
+    return [totals for totals, _ in summed]
+
+
+def totals_version() -> int:
+    """Moves on every inventory write (the global key's summed version)."""
+    return InventoryTotals.objects.filter(key=InventoryTotals.GLOBAL_KEY).aggregate(v=Sum("version"))["v"] or 0
+
+
+# ============================================================================
+# REBUILD
+# ============================================================================
+
+def rebuild_inventory_totals() -> List[str]:
+    """
+    Recompute every key's totals from Inventory (one grouped query). Keys
+    that drifted are collapsed into shard 0 with the corrected values; the
+    summed version still only goes up. Returns the keys that had drifted.
+    """
+    # Aliases must not shadow Inventory fields, or the filters would reference the sums
+    aggregates = {
+        "agg_product_count": Count("id"),
+        "agg_stock_in": Coalesce(Sum("stock_in"), 0),
+        "agg_stock_out": Coalesce(Sum("stock_out"), 0),
+        "agg_total_stock": Coalesce(Sum("total_stock"), 0),
+        "agg_average_daily_sales_sum": Coalesce(
+            Sum("average_daily_sales"), Value(Decimal("0")),
+            output_field=DecimalField(max_digits=18, decimal_places=2),
+        ),
+        "agg_low_stock_count": Count("id", filter=Q(stock_status="low_stock")),
+        "agg_out_of_stock_count": Count("id", filter=Q(stock_status="out_of_stock")),
+    }
+
+    with transaction.atomic():
+        stored = defaultdict(list)
+        for row in InventoryTotals.objects.select_for_update().order_by("key", "shard"):
+            stored[row.key].append(row)
+        fresh = {}
+        for row in (
+            Inventory.objects.order_by().values("product__category_id").annotate(**aggregates)
+        ):
+            category_id = row["product__category_id"]
+            fresh[InventoryTotals.key_for(category_id)] = (category_id, {f: row[f"agg_{f}"] for f in TOTALS_FIELDS})
+
+        grand = {f: sum(values[f] for _, values in fresh.values()) for f in TOTALS_FIELDS}
+        fresh[InventoryTotals.GLOBAL_KEY] = (None, grand)
+
+        drifted, now = [], timezone.now()
+        for key, (category_id, values) in fresh.items():
+            shards = stored.pop(key, [])
+            current = {f: sum(getattr(row, f) for row in shards) for f in TOTALS_FIELDS}
+            if shards and current == values:
+                continue
+            if current != values:
+                drifted.append(key)
+            InventoryTotals.objects.filter(key=key).delete()
+            InventoryTotals.objects.create(
+                key=key, shard=0, category_id=category_id, updated_at=now,
+                version=sum(row.version for row in shards) + 1, **values,
+            )
+
+        # Category keys with no inventories left are zeroed out of the table
+        if stored:
+            drifted.extend(
+                key for key, shards in stored.items() if any(getattr(row, f) for row in shards for f in TOTALS_FIELDS)
+            )
+            InventoryTotals.objects.filter(key__in=stored).delete()
+            InventoryTotals.objects.filter(key=InventoryTotals.GLOBAL_KEY).update(version=F("version") + 1)
+
+    if drifted:
+        logger.warning(f"Inventory totals rebuilt; {len(drifted)} rows had drifted: {', '.join(sorted(drifted))}")
+    return drifted
@@ -0,0 +1,284 @@
+"""
+Stock movement ledger for product_app.
+
+Provides:
+- Recording StockMovement rows (bulk INSERT) from inventory counter changes
+- Periodic StockSnapshot runs (cumulative totals per product)
+- Opening snapshots for inventories written without the ledger (bulk loads)
+- Point-in-time stock: latest snapshot + movements since
+- Drift reports: Inventory counters that differ from the ledger
+
+Snapshots track the ledger by movement id, not by time: a movement's
+created_at is set before its transaction commits, but writers update the
+Inventory row before appending movements, so the row lock keeps one
+product's movement ids in commit order. A snapshot covers its product's
+movements up to ``movement_id``; anything above it, however late it
+committed, is still added on read. The Inventory counters stay the source
+the API writes; the ledger only reports where they disagree.
+"""
+
+import logging
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from django.db import transaction
+from django.db.models import Exists, Max, OuterRef, Q, Subquery, Sum
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from product_app.models import Inventory, StockMovement, StockSnapshot
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = 1000
+CHECK_BATCH = 5000  # Inventories compared with the ledger per query pair
+
+# product_id -> (stock_in, stock_out)
+LedgerTotals = Dict[int, Tuple[int, int]]
+
+
+# ============================================================================
+# RECORDING
+# ============================================================================
+
+def record_movements(movements: Iterable[StockMovement]) -> int:
+    """Append movements with one bulk INSERT per batch; zero quantities are dropped."""
+    rows = [movement for movement in movements if movement.quantity]
+    if rows:
+        StockMovement.objects.bulk_create(rows, batch_size=BATCH_SIZE)
+    return len(rows)
+
+
+def movements_for_change(
+    inventory: Inventory,
+    previous: Optional[tuple],
+    kind: str = "adjustment",
+    reference: str = "",
+) -> List[StockMovement]:
+    """
+    Movements explaining the change from ``previous`` (an
+    ``Inventory.totals_snapshot()``; ``None`` for a new inventory) to the
+    inventory's current counters. Lowering ``stock_in`` is recorded as an
+    outbound correction, so the ledger total always matches ``total_stock``.
+    """
+    old_in, old_out = (previous[0], previous[1]) if previous else (0, 0)
+    now = timezone.now()
+    return [
+        StockMovement(product_id=inventory.product_id, kind=kind, quantity=quantity,
+                      reference=reference, created_at=now)
+        for quantity in (inventory.stock_in - old_in, old_out - inventory.stock_out)
+        if quantity
+    ]
+
+
+# ============================================================================
+# SNAPSHOTS
+# ============================================================================
+
+def snapshot_watermark() -> int:
+    """Highest movement id covered by a snapshot (0 before the first run)."""
+    return StockSnapshot.objects.aggregate(top=Max("movement_id"))["top"] or 0
+
+
+def take_snapshots() -> List[int]:
+    """
+    Snapshot every product with movements above the watermark. A movement
+    that commits late (below the watermark) is not lost: it stays above its
+    product's own snapshot and is summed on read until the product's next
+    snapshot includes it. Returns the ids of the products snapshotted.
+    """
+    with transaction.atomic():
+        moved = list(
+            StockMovement.objects.filter(id__gt=snapshot_watermark())
+            .order_by().values_list("product_id", flat=True).distinct()
+        )
+        now, snapshots = timezone.now(), []
+        for chunk in _chunks(moved, BATCH_SIZE):
+            base = _latest_snapshots(chunk)
+            for product_id, (moved_in, moved_out, top) in _unsnapshotted_sums(Q(product_id__in=chunk)).items():
+                stock_in, stock_out, _ = base.get(product_id, (0, 0, 0))
+                snapshots.append(StockSnapshot(
+                    product_id=product_id, taken_at=now, movement_id=top,
+                    stock_in=stock_in + moved_in, stock_out=stock_out + moved_out,
+                ))
+        StockSnapshot.objects.bulk_create(snapshots, batch_size=BATCH_SIZE)
+
+    if snapshots:
+        logger.info(f"Stock snapshots taken at {now:%Y-%m-%d %H:%M:%S}: {len(snapshots)} products")
+    return [snapshot.product_id for snapshot in snapshots]
+
+
+def open_snapshots(product_ids: Optional[Iterable[int]] = None) -> int:
+    """
+    Opening snapshots from the current Inventory counters, for writers that
+    bypass the ledger (bulk loads, fixtures). With ``product_ids=None`` every
+    inventory with stock but no snapshot or movement yet is opened. Callers
+    passing ids must hold the rows (or know nothing else writes them).
+    Returns the number of snapshots written.
+    """
+    inventories = Inventory.objects.order_by("product_id")
+    if product_ids is None:
+        inventories = inventories.exclude(stock_in=0, stock_out=0).filter(
+            ~Exists(StockSnapshot.objects.filter(product_id=OuterRef("product_id"))),
+            ~Exists(StockMovement.objects.filter(product_id=OuterRef("product_id"))),
+        )
+    else:
+        inventories = inventories.filter(product_id__in=list(product_ids))
+    # The snapshot covers the movements already behind the counters
+    inventories = inventories.annotate(top=Subquery(
+        StockMovement.objects.filter(product_id=OuterRef("product_id")).order_by("-id").values("id")[:1]
+    ))
+
+    now, written = timezone.now(), 0
+    with transaction.atomic():
+        rows = inventories.values_list("product_id", "stock_in", "stock_out", "top").iterator(chunk_size=BATCH_SIZE)
+        for batch in _chunks(rows, BATCH_SIZE):
+            StockSnapshot.objects.bulk_create([
+                StockSnapshot(product_id=product_id, taken_at=now, stock_in=stock_in, stock_out=stock_out,
+                              movement_id=top or 0)
+                for product_id, stock_in, stock_out, top in batch
+            ])
+            written += len(batch)
+    if written:
+        logger.info(f"Opening stock snapshots written for {written} inventories")
+    return written
+
+
+def stock_at(product_id: int, when: datetime) -> Dict[str, int]:
+    """
+    Ledger totals for one product as of ``when``: the latest snapshot at or
+    before ``when`` plus the product's later movements created by ``when``.
+    """
+    snapshot = (
+        StockSnapshot.objects.filter(product_id=product_id, taken_at__lte=when)
+        .order_by("-taken_at").first()
+    )
+    movements = StockMovement.objects.filter(product_id=product_id, created_at__lte=when)
+    if snapshot:
+        movements = movements.filter(id__gt=snapshot.movement_id)
+    moved = movements.order_by().aggregate(
+        agg_in=Coalesce(Sum("quantity", filter=Q(quantity__gt=0)), 0),
+        agg_out=Coalesce(Sum("quantity", filter=Q(quantity__lt=0)), 0),
+    )
+    stock_in = (snapshot.stock_in if snapshot else 0) + moved["agg_in"]
+    stock_out = (snapshot.stock_out if snapshot else 0) - moved["agg_out"]
+    return {"stock_in": stock_in, "stock_out": stock_out, "total_stock": stock_in - stock_out}
+
+
+def ledger_totals(product_ids: Optional[Iterable[int]] = None) -> LedgerTotals:
+    """Current ledger totals: each product's latest snapshot + its movements above it."""
+    ids = None if product_ids is None else list(product_ids)
+    totals = {
+        product_id: (stock_in, stock_out)
+        for product_id, (stock_in, stock_out, _) in _latest_snapshots(ids).items()
+    }
+    window = Q() if ids is None else Q(product_id__in=ids)
+    for product_id, (moved_in, moved_out, _) in _unsnapshotted_sums(window).items():
+        stock_in, stock_out = totals.get(product_id, (0, 0))
+        totals[product_id] = (stock_in + moved_in, stock_out + moved_out)
+    return totals
+
+
+# ============================================================================
+# DRIFT
+# ============================================================================
+
+def stock_drift(product_ids: Optional[Iterable[int]] = None) -> List[Dict[str, Any]]:
+    """
+    Inventories whose counters differ from the ledger (all of them when
+    ``product_ids`` is None). Nothing is rewritten: drift means a writer
+    bypassed the ledger (give it an opening snapshot) or a bug, and the
+    counters are what the API has been serving. The comparison runs
+    without locks; only rows that look drifted are re-read under a row
+    lock, so in-flight writes are not reported.
+    """
+    inventories = Inventory.objects.order_by("product_id")
+    if product_ids is not None:
+        inventories = inventories.filter(product_id__in=list(product_ids))
+
+    suspects = []
+    rows = inventories.values_list("product_id", "stock_in", "stock_out").iterator(chunk_size=CHECK_BATCH)
+    for batch in _chunks(rows, CHECK_BATCH):
+        ledger = ledger_totals([product_id for product_id, _, _ in batch])
+        suspects.extend(
+            product_id for product_id, stock_in, stock_out in batch
+            if ledger.get(product_id, (0, 0)) != (stock_in, stock_out)
+        )
+
+    drift = []
+    for chunk in _chunks(suspects, BATCH_SIZE):
+        with transaction.atomic():
+            locked = list(
+                Inventory.objects.select_for_update(of=("self",)).select_related("product")
+                .filter(product_id__in=chunk).order_by("pk")
+            )
+            ledger = ledger_totals(chunk)
+            for inv in locked:
+                stock_in, stock_out = ledger.get(inv.product_id, (0, 0))
+                if (inv.stock_in, inv.stock_out) != (stock_in, stock_out):
+                    drift.append({
+                        "product_id": inv.product_id,
+                        "sku": inv.product.sku,
+                        "total_stock": inv.total_stock,
+                        "ledger_stock": stock_in - stock_out,
+                    })
+
+    if drift:
+        logger.warning(
+            f"{len(drift)} inventories differ from the stock ledger (e.g. "
+            + ", ".join(f"{row['sku']}: {row['total_stock']} vs {row['ledger_stock']}" for row in drift[:5])
+            + ")"
+        )
+    return drift
+
+
+# ============================================================================
+# HELPERS
+# ============================================================================
+
+def _unsnapshotted_sums(window: Q) -> Dict[int, Tuple[int, int, int]]:
+    """
+    ``{product_id: (units in, units out, highest movement id)}`` for the
+    movements matching ``window`` above their product's latest snapshot.
+    """
+    covered = (
+        StockSnapshot.objects.filter(product_id=OuterRef("product_id"))
+        .order_by("-taken_at").values("movement_id")[:1]
+    )
+    rows = (
+        StockMovement.objects.filter(window, id__gt=Coalesce(Subquery(covered), 0))
+        .order_by().values("product_id")
+        .annotate(
+            agg_in=Coalesce(Sum("quantity", filter=Q(quantity__gt=0)), 0),
+            agg_out=Coalesce(Sum("quantity", filter=Q(quantity__lt=0)), 0),
+            top=Max("id"),
+        )
+    )
+    return {row["product_id"]: (row["agg_in"], -row["agg_out"], row["top"]) for row in rows}
+
+
+def _latest_snapshots(product_ids: Optional[Iterable[int]] = None) -> Dict[int, Tuple[int, int, int]]:
+    """``{product_id: (stock_in, stock_out, movement_id)}`` from each product's newest snapshot."""
+    newest = (
+        StockSnapshot.objects.filter(product_id=OuterRef("product_id"))
+        .order_by("-taken_at").values("taken_at")[:1]
+    )
+    snapshots = StockSnapshot.objects.filter(taken_at=Subquery(newest))
+    if product_ids is not None:
+        snapshots = snapshots.filter(product_id__in=list(product_ids))
+    return {
+        product_id: (stock_in, stock_out, movement_id)
+        for product_id, stock_in, stock_out, movement_id
+        in snapshots.values_list("product_id", "stock_in", "stock_out", "movement_id")
+    }
+
+
+def _chunks(items: Iterable, size: int):
+    batch = []
+    for item in items:
+        batch.append(item)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
@@ -0,0 +1,489 @@
+"""
+In-process product name index for product_app.
+
+Provides:
+- Normalized tokens for product names, SKUs and category names
+  (accents stripped, lowercased, punctuation split: "SKU-001" -> "sku 001")
+- Exact, prefix (sorted keys + bisect) and fuzzy (character trigram
+  postings counted with NumPy) lookups over the whole catalog
+- A per-process index shared by the AI assistant's product matcher and
+  GET /api/products/autocomplete/, patched or rebuilt when the catalog
+  version moves
+
+Product and Category writes bump a version counter in the shared cache (on
+commit) and log the product ids they changed under the new version. Each
+process re-reads the counter at most every VERSION_CHECK_INTERVAL seconds
+(its own writes are seen at once). When it moved, the changed products are
+re-read by primary key and laid over the index (their old rows hidden); a
+missing log entry (category renames, imports, expired entries) or too many
+changes since the last full build start one background rebuild instead,
+and the stale index keeps serving until it is swapped in.
+"""
+
+import bisect
+import logging
+import re
+import threading
+import time
+import unicodedata
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+from django.db import connection, transaction
+
+from backend.cache import CacheNamespace
+
+from product_app.models import Product
+
+logger = logging.getLogger(__name__)
+
+NAME_INDEX_CACHE = CacheNamespace("name_index")
+VERSION_CACHE_KEY = "version"
+VERSION_CHECK_INTERVAL = 2.0  # Seconds a process trusts the version it last read
+CHANGE_LOG_TIMEOUT = 60 * 10  # Indexes further behind than this rebuild from scratch
+MAX_PATCHED_PRODUCTS = 1000   # Changed products laid over one full build before rebuilding it
+FUZZY_CUTOFF = 0.5       # Minimum share of trigrams in common (of the shorter side)
+COMMON_GRAM_SHARE = 0.5  # Trigrams found in more than this share of products are ignored
+PREFIX_SCAN_LIMIT = 50   # Keys walked per result when many names share a prefix
+
+
+@dataclass(frozen=True)
+class NameMatch:
+    product_id: int
+    sku: str
+    name: str
+    category: Optional[str]
+    match: str           # "exact", "prefix" or "fuzzy"
+    score: float
+
+    def as_dict(self) -> Dict:
+        return {
+            "id": self.product_id,
+            "sku": self.sku,
+            "name": self.name,
+            "category": self.category,
+            "match": self.match,
+            "score": round(self.score, 3),
+        }
+
+
+# ============================================================================
+# NORMALIZATION
+# ============================================================================
+
+ASCII_TOKEN = re.compile(r"[a-z0-9]+")
+WORD_TOKEN = re.compile(r"[^\W_]+")
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase alphanumeric tokens with accents stripped."""
+    if not text:
+        return []
+    if text.isascii():
+        return ASCII_TOKEN.findall(text.lower())
+    text = "".join(ch for ch in unicodedata.normalize("NFKD", text) if not unicodedata.combining(ch))
+    return WORD_TOKEN.findall(text.lower())
+
+
+def normalize(text: str) -> str:
+    return " ".join(tokenize(text))
+
+
+def token_trigrams(token: str) -> List[str]:
+    """pg_trgm-style trigrams: the token padded with two leading spaces and one trailing."""
+    padded = f"  {token} "
+    return [padded[i:i + 3] for i in range(len(padded) - 2)]
+
+
+# ============================================================================
+# INDEX
+# ============================================================================
+
+class ProductNameIndex:
+    """
+    Immutable snapshot of every product's name, SKU and category.
+
+    ``common`` overrides which trigrams count as too common to score: an
+    overlay of a few changed products must score like the full index it
+    is laid over, not by its own trigram frequencies.
+    """
+
+    def __init__(self, rows: List[Tuple[int, str, str, Optional[str]]], version=None,
+                 common: Optional[frozenset] = None):
+        self.version = version
+        self.product_ids = [row[0] for row in rows]
+        self.skus = [row[1] for row in rows]
+        self.names = [row[2] for row in rows]
+        self.categories = [row[3] for row in rows]
+
+        exact: Dict[str, List[int]] = {}
+        keys: List[Tuple[str, int]] = []
+        category_rows: Dict[str, List[int]] = {}
+        # Trigram ids per distinct token; names share most of their words
+        gram_ids: Dict[str, int] = {}
+        token_grams: Dict[str, frozenset] = {}
+        posting_grams: List[int] = []
+        gram_counts: List[int] = []
+
+        for i, (_, sku, name, category) in enumerate(rows):
+            name_tokens, sku_tokens = tokenize(name), tokenize(sku)
+            for full in {" ".join(name_tokens), " ".join(sku_tokens)}:
+                if full:
+                    exact.setdefault(full, []).append(i)
+                    keys.append((full, i))
+            # Later words too, so "jack" finds "Navy Jacket"
+            keys.extend((token, i) for token in name_tokens[1:])
+
+            # Fuzzy matching covers names only; SKUs are codes, matched exactly or by prefix
+            grams = set()
+            for token in name_tokens:
+                ids = token_grams.get(token)
+                if ids is None:
+                    ids = token_grams[token] = frozenset(
+                        gram_ids.setdefault(gram, len(gram_ids)) for gram in token_trigrams(token)
+                    )
+                grams |= ids
+            posting_grams.extend(grams)
+            gram_counts.append(len(grams))
+
+            if category:
+                category_rows.setdefault(normalize(category), []).append(i)
+
+        keys.sort()
+        self._exact = exact
+        self._keys = [key for key, _ in keys]
+        self._key_rows = [row for _, row in keys]
+        self._category_rows = category_rows
+
+        # Postings in CSR form: rows of gram g are _rows[_offsets[g]:_offsets[g + 1]]
+        grams_array = np.array(posting_grams, dtype=np.int32)
+        posting_rows = np.repeat(np.arange(len(rows), dtype=np.int32), gram_counts)
+        order = np.argsort(grams_array, kind="stable")
+        self._gram_ids = gram_ids
+        self._rows = posting_rows[order]
+        frequency = np.bincount(grams_array, minlength=len(gram_ids))
+        self._offsets = np.concatenate(([0], np.cumsum(frequency)))
+        # Trigrams in most rows ("BENCH-" SKU prefixes, say) say nothing about which
+        # product is meant; they are ignored on both sides of the fuzzy score
+        if common is None:
+            self._common = frequency > max(COMMON_GRAM_SHARE * len(rows), 1)
+        else:
+            self._common = np.array([gram in common for gram in gram_ids], dtype=bool)
+        informative = ~self._common[grams_array]
+        self._gram_counts = np.bincount(posting_rows[informative], minlength=len(rows))
+
+    def __len__(self):
+        return len(self.product_ids)
+
+    @classmethod
+    def from_database(cls, version=None) -> "ProductNameIndex":
+        return cls(_product_rows(Product.objects.all()), version)
+
+    def common_grams(self) -> frozenset:
+        return frozenset(gram for gram, gram_id in self._gram_ids.items() if self._common[gram_id])
+
+    def row_of(self, product_id: int) -> Optional[int]:
+        """Row of ``product_id`` (rows are in primary-key order)."""
+        row = bisect.bisect_left(self.product_ids, product_id)
+        return row if row < len(self.product_ids) and self.product_ids[row] == product_id else None
+
+    def patch(self, product_ids, rows, version) -> "PatchedNameIndex":
+        """This index with ``product_ids`` replaced by ``rows`` (ids without a row were deleted)."""
+        return PatchedNameIndex(self, rows, set(product_ids), version)
+
+    # ------------------------------------------------------------------
+    # Lookups
+    # ------------------------------------------------------------------
+
+    def exact(self, query: str, hidden=frozenset()) -> List[int]:
+        """Rows whose whole name or SKU equals ``query`` after normalization."""
+        return [row for row in self._exact.get(normalize(query), []) if row not in hidden]
+
+    def prefix(self, query: str, limit: int = 10, hidden=frozenset()) -> List[int]:
+        """Rows whose name, SKU or any later name word starts with ``query`` (key order)."""
+        key = normalize(query)
+        if not key:
+            return []
+        found, seen = [], set()
+        start = bisect.bisect_left(self._keys, key)
+        for position in range(start, min(start + limit * PREFIX_SCAN_LIMIT, len(self._keys))):
+            if not self._keys[position].startswith(key):
+                break
+            row = self._key_rows[position]
+            if row not in seen and row not in hidden:
+                seen.add(row)
+                found.append(row)
+                if len(found) == limit:
+                    break
+        return found
+
+    def fuzzy(self, query: str, limit: int = 10, cutoff: float = FUZZY_CUTOFF,
+              hidden=frozenset()) -> List[Tuple[int, float]]:
+        """
+        ``(row, score)`` by trigram overlap, best first. The score is the share
+        of the shorter side's trigrams found in the other, so a typo'd query
+        and a sentence mentioning the product both match; ties go to the
+        closer length (Dice coefficient).
+        """
+        grams = {gram for token in set(tokenize(query)) for gram in token_trigrams(token)}
+        known = [self._gram_ids[gram] for gram in grams if gram in self._gram_ids]
+        informative = [gram for gram in known if not self._common[gram]]
+        if not informative:
+            return []
+        # Query trigrams unknown to the index still count towards its size
+        query_size = len(grams) - (len(known) - len(informative))
+        counts = np.bincount(
+            np.concatenate([self._rows[self._offsets[gram]:self._offsets[gram + 1]] for gram in informative]),
+            minlength=len(self),
+        )
+        if hidden:
+            counts[list(hidden)] = 0
+        # Threshold on whole-catalog integer arrays first; only survivors get float scores
+        shorter = np.maximum(np.minimum(query_size, self._gram_counts), 1)
+        rows = np.flatnonzero((counts > 0) & (counts >= cutoff * shorter))
+        overlap = counts[rows]
+        sizes = self._gram_counts[rows]
+        score = overlap / shorter[rows]
+        dice = 2 * overlap / (query_size + sizes)
+        # Score first, Dice only breaks ties (distinct scores differ by far more than 1e-6)
+        rank = score + dice * 1e-6
+        top = np.argpartition(-rank, limit)[:limit] if len(rank) > limit else np.arange(len(rank))
+        top = top[np.argsort(-rank[top], kind="stable")]
+        return [(int(rows[i]), float(score[i])) for i in top]
+
+    def search(self, query: str, limit: int = 10, cutoff: float = FUZZY_CUTOFF) -> List[NameMatch]:
+        """Exact matches, then prefix matches, then fuzzy matches (deduplicated)."""
+        return _search([(self, frozenset())], query, limit, cutoff)
+
+    def best_match(self, query: str, cutoff: float = FUZZY_CUTOFF) -> Optional[NameMatch]:
+        results = self.search(query, limit=1, cutoff=cutoff)
+        return results[0] if results else None
+
+    def category_names(self) -> List[str]:
+        """Normalized names of categories that have products."""
+        return list(self._category_rows)
+
+    def first_product_in_category(self, normalized_category: str, hidden=frozenset()) -> Optional[int]:
+        for row in self._category_rows.get(normalized_category, ()):
+            if row not in hidden:
+                return self.product_ids[row]
+        return None
+
+
+class PatchedNameIndex:
+    """
+    A full ProductNameIndex with changed products laid over it: their base
+    rows are hidden and their current rows live in a small overlay index.
+    Lookups answer like a full build of the same catalog would.
+    """
+
+    def __init__(self, base: ProductNameIndex, rows, product_ids: set, version=None):
+        self.version = version
+        self.base = base
+        self.product_ids_changed = product_ids
+        self.rows = rows
+        self.overlay = ProductNameIndex(rows, version, common=base.common_grams())
+        self.hidden = frozenset(
+            row for row in map(base.row_of, product_ids) if row is not None
+        )
+
+        categories = list(self.overlay.category_names())
+        for name in base.category_names():
+            if base.first_product_in_category(name, self.hidden) is not None and name not in categories:
+                categories.append(name)
+        self._categories = categories
+
+    def __len__(self):
+        return len(self.base) - len(self.hidden) + len(self.overlay)
+
+    def patch(self, product_ids, rows, version) -> "PatchedNameIndex":
+        product_ids = set(product_ids)
+        kept = [row for row in self.rows if row[0] not in product_ids]
+        return PatchedNameIndex(self.base, kept + list(rows), self.product_ids_changed | product_ids, version)
+
+    def search(self, query: str, limit: int = 10, cutoff: float = FUZZY_CUTOFF) -> List[NameMatch]:
+        return _search([(self.base, self.hidden), (self.overlay, frozenset())], query, limit, cutoff)
+
+    def best_match(self, query: str, cutoff: float = FUZZY_CUTOFF) -> Optional[NameMatch]:
+        results = self.search(query, limit=1, cutoff=cutoff)
+        return results[0] if results else None
+
+    def category_names(self) -> List[str]:
+        return list(self._categories)
+
+    def first_product_in_category(self, normalized_category: str) -> Optional[int]:
+        product_id = self.base.first_product_in_category(normalized_category, self.hidden)
+        return product_id if product_id is not None else self.overlay.first_product_in_category(normalized_category)
+
+
+def _search(segments, query: str, limit: int, cutoff: float) -> List[NameMatch]:
+    """
+    Exact, then prefix, then fuzzy matches over ``(index, hidden rows)``
+    segments, deduplicated by product. Fuzzy matches are merged by score.
+    """
+    results, seen = [], set()
+
+    def add(matches, kind):
+        for index, row, score in matches:
+            product_id = index.product_ids[row]
+            if product_id in seen or len(results) == limit:
+                continue
+            seen.add(product_id)
+            results.append(NameMatch(
+                product_id, index.skus[row], index.names[row], index.categories[row], kind, score,
+            ))
+
+    add(((index, row, 1.0) for index, hidden in segments for row in index.exact(query, hidden)), "exact")
+    if len(results) < limit:
+        add(((index, row, 1.0) for index, hidden in segments for row in index.prefix(query, limit, hidden)), "prefix")
+    if len(results) < limit:
+        fuzzy = [
+            (index, row, score)
+            for index, hidden in segments
+            for row, score in index.fuzzy(query, limit, cutoff, hidden)
+        ]
+        add(sorted(fuzzy, key=lambda match: -match[2]), "fuzzy")
+    return results
+
+
+def _product_rows(products) -> List[Tuple[int, str, str, Optional[str]]]:
+    return list(products.order_by("pk").values_list("pk", "sku", "name", "category__name"))
+
+
+# ============================================================================
+# SHARED INSTANCE
+# ============================================================================
+
+_index = None  # ProductNameIndex or PatchedNameIndex
+_lock = threading.Lock()
+_rebuilding = False
+_checked: Tuple[float, Optional[int]] = (0.0, None)  # (monotonic time, version read)
+
+
+def current_version() -> int:
+    return NAME_INDEX_CACHE.get(VERSION_CACHE_KEY, 0)
+
+
+def _checked_version() -> int:
+    """The shared version, read from the cache at most every VERSION_CHECK_INTERVAL seconds."""
+    global _checked
+    checked_at, version = _checked
+    now = time.monotonic()
+    if version is None or now - checked_at >= VERSION_CHECK_INTERVAL:
+        version = current_version()
+        _checked = (now, version)
+    return version
+
+
+def bump_name_index_version(product_ids: Optional[Iterable[int]] = None) -> None:
+    """
+    Mark every process's index stale once the current transaction commits.
+    With ``product_ids`` the change is logged so indexes can patch just those
+    products; without (category renames, imports) they rebuild.
+    """
+    product_ids = None if product_ids is None else sorted(set(product_ids))
+
+    def bump():
+        global _checked
+        try:
+            version = NAME_INDEX_CACHE.incr(VERSION_CACHE_KEY)
+        except ValueError:
+            # Key missing (first bump, or evicted); any fresh value differs from what indexes hold
+            version = time.time_ns()
+            NAME_INDEX_CACHE.set(VERSION_CACHE_KEY, version, None)
+        else:
+            if product_ids is not None:
+                NAME_INDEX_CACHE.set(f"changes:{version}", product_ids, CHANGE_LOG_TIMEOUT)
+        _checked = (0.0, None)  # This process sees its own writes at once
+
+    transaction.on_commit(bump)
+
+
+def _build(version) -> ProductNameIndex:
+    global _index
+    start = time.perf_counter()
+    index = ProductNameIndex.from_database(version)
+    _index = index
+    logger.info(
+        f"Product name index built: {len(index)} products in {(time.perf_counter() - start) * 1000:.0f} ms "
+        f"(version {version})"
+    )
+    return index
+
+
+def _patch(index, version):
+    """
+    ``index`` brought up to ``version`` from the change log, or None when
+    the log does not cover every version in between or too much changed.
+    """
+    # Every logged version changed at least one product
+    if not isinstance(index.version, int) or not 0 < version - index.version <= MAX_PATCHED_PRODUCTS:
+        return None
+    product_ids = set()
+    for step in range(index.version + 1, version + 1):
+        changed = NAME_INDEX_CACHE.get(f"changes:{step}")
+        if changed is None:
+            return None
+        product_ids.update(changed)
+    already = len(index.product_ids_changed) if isinstance(index, PatchedNameIndex) else 0
+    if already + len(product_ids) > MAX_PATCHED_PRODUCTS:
+        return None
+    return index.patch(product_ids, _product_rows(Product.objects.filter(pk__in=product_ids)), version)
+
+
+def _rebuild_in_background(version) -> None:
+    global _rebuilding
+    try:
+        _build(version)
+    except Exception as e:
+        logger.warning(f"Product name index rebuild failed ({e}); serving the previous index")
+    finally:
+        connection.close()
+        with _lock:
+            _rebuilding = False
+
+
+def get_name_index():
+    """
+    This process's index. Built synchronously the first time; afterwards a
+    version change is patched in from the change log when it can be, and
+    otherwise starts one background rebuild while the stale index keeps
+    answering until it is swapped in.
+    """
+    global _index, _rebuilding
+    version = _checked_version()
+    index = _index
+    if index is not None and index.version == version:
+        return index
+    if index is None:
+        with _lock:
+            if _index is None or _index.version != version:
+                return _build(version)
+            return _index
+
+    with _lock:
+        index = _index
+        if _rebuilding or index.version == version:
+            return index
+        try:
+            patched = _patch(index, version)
+        except Exception as e:
+            logger.warning(f"Product name index patch failed ({e}); rebuilding it")
+            patched = None
+        if patched is not None:
+            _index = patched
+            return patched
+        _rebuilding = True
+    threading.Thread(target=_rebuild_in_background, args=(version,), daemon=True,
+                     name="product-name-index").start()
+    return index
+
+
+def warm_name_index() -> None:
+    """Build the index at process start (WSGI/ASGI) so the first request doesn't pay for it."""
+    try:
+        get_name_index()
+    except Exception as e:
+        # No database yet (migrations pending, build step): the first lookup builds it instead
+        logger.warning(f"Product name index not built at startup ({e})")
@@ -0,0 +1,243 @@
+"""
+Catalog-wide reorder planning for product_app.
+
+Provides:
+- Days of cover, reorder point, suggested order quantity and a "must order
+  by" date for every SKU, computed in one vectorized NumPy pass
+- A cached report (invalidated by any inventory write, supplier or product change)
+- The same maths for a single product (AI assistant facts)
+
+Velocity is the stored DemandForecast daily rate (services/forecasting.py),
+falling back to Inventory.average_daily_sales for products not fitted yet;
+lead time is the product's Supplier.lead_time_days.
+"""
+
+import logging
+import math
+from datetime import date, timedelta
+from typing import Any, Dict, Optional
+
+import numpy as np
+from django.db import connections
+from django.db.models import F, FilteredRelation, FloatField, Q
+from django.db.models.functions import Cast, Coalesce
+from django.utils import timezone
+
+from backend.cache import CacheNamespace
+from product_app.models import FORECAST_MODEL_VERSION, Inventory, Product
+from product_app.services.inventory_totals import totals_version
+
+logger = logging.getLogger(__name__)
+
+SAFETY_STOCK_DAYS = 7          # Extra cover held on top of the supplier lead time
+REVIEW_PERIOD_DAYS = 14        # An order should cover the next review cycle too
+DEFAULT_LEAD_TIME_DAYS = 7     # Products without a supplier
+MAX_ORDER_HORIZON_DAYS = 3650  # Slower movers get no "must order by" date (it could overflow date)
+REPORT_CACHE = CacheNamespace("reorder")  # Shared by every worker: one rebuild per inventory change
+REPORT_CACHE_KEY = "report"
+REPORT_CACHE_TIMEOUT = 60 * 60  # Upper bound; writes invalidate it much sooner
+
+NO_SUPPLIER = -1
+BATCH_SIZE = 10000
+
+
+# ============================================================================
+# MATHS
+# ============================================================================
+
+def compute_reorder(
+    stock: np.ndarray,
+    velocity: np.ndarray,
+    lead_time: np.ndarray,
+    safety_days: float = SAFETY_STOCK_DAYS,
+    review_days: float = REVIEW_PERIOD_DAYS,
+) -> Dict[str, np.ndarray]:
+    """
+    Vectorized reorder maths (all inputs are equal-length arrays).
+
+    - ``days_of_cover``: stock / velocity (``inf`` when nothing sells)
+    - ``reorder_point``: velocity x (lead time + safety days), rounded up
+    - ``order_in_days``: days until stock falls to the reorder point
+      (<= 0 means order now; ``inf`` when nothing sells or the date would be
+      more than MAX_ORDER_HORIZON_DAYS away)
+    - ``order_quantity``: units to reach the reorder point plus one review period
+    """
+    stock = stock.astype(np.float64)
+    velocity = velocity.astype(np.float64)
+    selling = velocity > 0
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        days_of_cover = np.where(selling, stock / velocity, np.inf)
+        reorder_point = np.ceil(velocity * (lead_time + safety_days))
+        order_in_days = np.where(selling, (stock - reorder_point) / velocity, np.inf)
+    order_in_days[order_in_days > MAX_ORDER_HORIZON_DAYS] = np.inf
+
+    target = np.ceil(velocity * (lead_time + safety_days + review_days))
+    order_quantity = np.maximum(target - stock, 0)
+    return {
+        "days_of_cover": days_of_cover,
+        "reorder_point": reorder_point.astype(np.int64),
+        "order_in_days": order_in_days,
+        "order_quantity": np.where(selling, order_quantity, 0).astype(np.int64),
+    }
+
+
+def order_by_dates(order_in_days: np.ndarray, today: date) -> np.ndarray:
+    """``datetime64[D]`` "must order by" dates (NaT when ``order_in_days`` is not finite)."""
+    finite = np.isfinite(order_in_days)
+    days = np.floor(np.where(finite, order_in_days, 0)).astype("timedelta64[D]")
+    dates = np.datetime64(today, "D") + days
+    dates[~finite] = np.datetime64("NaT")
+    return dates
+
+
+# ============================================================================
+# CATALOG REPORT
+# ============================================================================
+
+def load_catalog_arrays() -> Dict[str, np.ndarray]:
+    """
+    Stock, velocity and supplier lead time for every inventory, as parallel
+    arrays. Only numeric columns are loaded (the forecast join and the
+    fallback cast happen in SQL, so no Decimal conversion); names are
+    fetched later for the rows shown.
+    """
+    rows = (
+        Inventory.objects.order_by()
+        .annotate(
+            forecast=FilteredRelation(
+                "product__forecasts", condition=Q(product__forecasts__model_version=FORECAST_MODEL_VERSION)
+            ),
+            velocity=Coalesce(F("forecast__daily_rate"), Cast("average_daily_sales", FloatField())),
+        )
+        .values_list("product_id", "product__supplier_id", "total_stock", "velocity",
+                     "product__supplier__lead_time_days")
+    )
+    # Plain cursor fetch straight into one float matrix (NULL -> NaN): at
+    # catalog scale, values_list()'s per-row converters and transposing
+    # tuples in Python cost more than the query itself
+    sql, params = rows.query.sql_with_params()
+    with connections[rows.db].cursor() as cursor:
+        cursor.execute(sql, params)
+        matrix = np.array(cursor.fetchall(), dtype=np.float64).reshape(-1, 5)
+
+    product_id, supplier_id, stock, velocity, lead_time = matrix.T
+    return {
+        "product_id": product_id.astype(np.int64),
+        "supplier_id": np.nan_to_num(supplier_id, nan=NO_SUPPLIER).astype(np.int64),
+        "total_stock": stock.astype(np.int64),
+        "daily_rate": velocity,
+        "lead_time_days": np.nan_to_num(lead_time, nan=DEFAULT_LEAD_TIME_DAYS).astype(np.int64),
+    }
+
+
+def build_reorder_report(today: Optional[date] = None) -> Dict[str, Any]:
+    """
+    Compute the full report, most urgent first (by "must order by" date,
+    then by days of cover). Non-selling products sort last.
+    """
+    today = today or timezone.localdate()
+    catalog = load_catalog_arrays()
+    result = compute_reorder(catalog["total_stock"], catalog["daily_rate"], catalog["lead_time_days"])
+    order = np.lexsort((result["days_of_cover"], result["order_in_days"]))
+
+    report = {key: values[order] for key, values in {**catalog, **result}.items()}
+    report["must_order_by"] = order_by_dates(report["order_in_days"], today)
+    report["as_of"] = today
+    report["generated_at"] = timezone.now()
+    return report
+
+
+def get_reorder_report() -> Dict[str, Any]:
+    """
+    The cached report, rebuilt when inventories changed since it was built
+    (the summed InventoryTotals global version moves on every inventory write).
+    """
+    version = totals_version()
+    cached = REPORT_CACHE.get(REPORT_CACHE_KEY)
+    if cached and cached["version"] == version and cached["report"]["as_of"] == timezone.localdate():
+        return cached["report"]
+
+    start = timezone.now()
+    report = build_reorder_report()
+    REPORT_CACHE.set(REPORT_CACHE_KEY, {"version": version, "report": report}, REPORT_CACHE_TIMEOUT)
+    logger.info(
+        f"Reorder report rebuilt for {len(report['product_id'])} SKUs in "
+        f"{(timezone.now() - start).total_seconds() * 1000:.0f} ms"
+    )
+    return report
+
+
+def invalidate_reorder_report() -> None:
+    """Drop the cached report (supplier lead times or product suppliers changed)."""
+    REPORT_CACHE.delete(REPORT_CACHE_KEY)
+
+
+def report_rows(report: Dict[str, Any], mask: Optional[np.ndarray] = None, limit: Optional[int] = None):
+    """
+    JSON-ready rows of ``report`` (optionally masked / truncated). SKU,
+    name and supplier are looked up for the selected rows only.
+    """
+    indices = np.flatnonzero(mask) if mask is not None else np.arange(len(report["product_id"]))
+    if limit is not None:
+        indices = indices[:limit]
+
+    labels = {}
+    for start in range(0, len(indices), BATCH_SIZE):
+        ids = report["product_id"][indices[start:start + BATCH_SIZE]].tolist()
+        labels.update(
+            (pk, (sku, name, supplier))
+            for pk, sku, name, supplier in Product.objects.filter(pk__in=ids)
+            .values_list("pk", "sku", "name", "supplier__name")
+        )
+
+    rows = []
+    for i in indices:
+        product_id = int(report["product_id"][i])
+        sku, name, supplier = labels.get(product_id, ("", "", None))
+        order_by = report["must_order_by"][i]
+        cover = report["days_of_cover"][i]
+        rows.append({
+            "product_id": product_id,
+            "sku": sku,
+            "name": name,
+            "supplier": supplier,
+            "total_stock": int(report["total_stock"][i]),
+            "daily_rate": round(float(report["daily_rate"][i]), 2),
+            "lead_time_days": int(report["lead_time_days"][i]),
+            "days_of_cover": round(float(cover), 1) if math.isfinite(cover) else None,
+            "reorder_point": int(report["reorder_point"][i]),
+            "order_quantity": int(report["order_quantity"][i]),
+            "must_order_by": None if np.isnat(order_by) else order_by.astype(date),
+        })
+    return rows
+
+
+def due_mask(report: Dict[str, Any], within_days: int) -> np.ndarray:
+    """Products whose "must order by" date falls within ``within_days`` (overdue included)."""
+    return np.floor(report["order_in_days"]) <= within_days
+
+
+def supplier_mask(report: Dict[str, Any], supplier_ids) -> np.ndarray:
+    """Products supplied by any of ``supplier_ids``."""
+    return np.isin(report["supplier_id"], list(supplier_ids))
+
+
+# ============================================================================
+# SINGLE PRODUCT
+# ============================================================================
+
+def reorder_for(total_stock: int, daily_rate: float, lead_time_days: Optional[int],
+                today: Optional[date] = None) -> Dict[str, Any]:
+    """Reorder point and "must order by" date for one product (same maths as the report)."""
+    lead = DEFAULT_LEAD_TIME_DAYS if lead_time_days is None else lead_time_days
+    result = compute_reorder(np.array([total_stock]), np.array([daily_rate]), np.array([lead]))
+    order_in_days = result["order_in_days"][0]
+    reorder_point = int(result["reorder_point"][0])
+    if not math.isfinite(order_in_days):
+        return {"reorder_point": reorder_point, "must_order_by": None}
+    today = today or timezone.localdate()
+    return {
+        "reorder_point": reorder_point,
+        "must_order_by": (today + timedelta(days=math.floor(order_in_days))).isoformat(),
+    }
@@ -0,0 +1,319 @@
+"""
+Streaming bulk import of daily sales (POS exports) into SalesHistory.
+
+Provides:
+- Row parsing for CSV (``sku,date,units_sold`` header) and NDJSON files
+- PostgreSQL loader: COPY into a temp staging table, then one
+  ``INSERT ... ON CONFLICT (product_id, date) DO UPDATE`` merge
+- Portable fallback (SQLite dev): batched ``bulk_create(update_conflicts=True)``
+
+The file is never held in memory: rows are parsed lazily and streamed
+straight into COPY. SKUs are resolved from one preloaded ``{sku: id}`` dict.
+Bulk loads bypass SalesHistory signals, so SalesStats are updated from the
+computed deltas in one pass.
+"""
+
+import csv
+import io
+import json
+import logging
+import time
+from datetime import date
+from typing import IO, Any, Dict, Iterable, Iterator, Optional, Tuple
+
+from django.db import connection, transaction
+
+from product_app.models import Product, SalesHistory
+from product_app.services.sales_stats import apply_sales_deltas
+
+logger = logging.getLogger(__name__)
+
+SUPPORTED_FORMATS = ("csv", "ndjson")
+FALLBACK_BATCH_SIZE = 5000
+MAX_REPORTED_ERRORS = 20
+MAX_UNITS_SOLD = 2147483647  # PostgreSQL integer column
+
+SalesRow = Tuple[int, date, int]  # (product_id, date, units_sold)
+
+
+def detect_format(filename: str, default: str = "csv") -> str:
+    """Guess the file format from its extension (.csv, .ndjson, .jsonl)."""
+    name = (filename or "").lower()
+    if name.endswith((".ndjson", ".jsonl")):
+        return "ndjson"
+    if name.endswith(".csv"):
+        return "csv"
+    return default
+
+
+def import_sales_history(stream: IO[bytes], fmt: str = "csv") -> Dict[str, Any]:
+    """
+    Load a sales export into SalesHistory and return an import report.
+
+    ``stream`` is a binary file object. Later rows win when the same
+    (sku, date) appears more than once. Report keys: rows_read, inserted,
+    updated, unchanged, rejected (per reason), errors (first few),
+    seconds, rows_per_second.
+
+    Raises ValueError (naming the line) for an unsupported format, bytes that
+    are not UTF-8 or CSV the parser cannot read; nothing is imported then.
+    """
+    if fmt not in SUPPORTED_FORMATS:
+        raise ValueError(f"Unsupported format '{fmt}'. Use one of: {', '.join(SUPPORTED_FORMATS)}")
+
+    start = time.monotonic()
+    report = {
+        "rows_read": 0,
+        "inserted": 0,
+        "updated": 0,
+        "unchanged": 0,
+        "rejected": {"malformed": 0, "unknown_sku": 0, "invalid_date": 0, "invalid_units": 0},
+        "errors": [],
+    }
+    sku_map = dict(Product.objects.values_list("sku", "id"))
+    rows = _valid_rows(_parse(stream, fmt), sku_map, report)
+
+    if connection.vendor == "postgresql":
+        _load_with_copy(rows, report)
+    else:
+        _load_with_orm(rows, report)
+
+    elapsed = time.monotonic() - start
+    report["seconds"] = round(elapsed, 3)
+    report["rows_per_second"] = round(report["rows_read"] / elapsed) if elapsed > 0 else report["rows_read"]
+    logger.info(
+        f"Sales import: {report['rows_read']} rows in {report['seconds']}s "
+        f"({report['rows_per_second']}/s), inserted={report['inserted']} updated={report['updated']} "
+        f"rejected={sum(report['rejected'].values())}"
+    )
+    return report
+
+
+# ============================================================================
+# PARSING
+# ============================================================================
+
+def _parse(stream: IO[bytes], fmt: str) -> Iterator[Tuple[int, Dict[str, Any]]]:
+    """Yield ``(line number, record)``; unreadable input raises ValueError naming the line."""
+    lines = _LineReader(stream)
+    if fmt == "csv":
+        reader = csv.DictReader(lines)
+        try:
+            for record in reader:
+                yield reader.line_num, record
+        except csv.Error as e:
+            raise ValueError(f"line {reader.line_num}: {e}")
+        return
+    for line in lines:
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            record = json.loads(line)
+        except json.JSONDecodeError:
+            record = None
+        yield lines.line_no, record if isinstance(record, dict) else {}
+
+
+class _LineReader:
+    """Decode a binary stream one line at a time, so a bad byte is reported with its line number."""
+
+    def __init__(self, stream: IO[bytes]):
+        self.stream = stream
+        self.line_no = 0
+
+    def __iter__(self) -> Iterator[str]:
+        for raw in self.stream:
+            self.line_no += 1
+            try:
+                line = raw.decode("utf-8")
+            except UnicodeDecodeError as e:
+                raise ValueError(f"line {self.line_no}: not valid UTF-8 (byte {e.start})")
+            yield line.lstrip("\ufeff") if self.line_no == 1 else line
+
+
+def _valid_rows(
+    records: Iterable[Tuple[int, Dict[str, Any]]], sku_map: Dict[str, int], report
+) -> Iterator[SalesRow]:
+    """Validate parsed records, counting rejects by reason."""
+    for line_no, record in records:
+        report["rows_read"] += 1
+        sku, raw_date, raw_units = (record.get(k) for k in ("sku", "date", "units_sold"))
+        if sku is None or raw_date is None or raw_units is None:
+            _reject(report, "malformed", line_no, "missing sku/date/units_sold")
+            continue
+
+        product_id = sku_map.get(str(sku).strip())
+        if product_id is None:
+            _reject(report, "unknown_sku", line_no, f"unknown SKU '{sku}'")
+            continue
+        try:
+            day = date.fromisoformat(str(raw_date).strip())
+        except ValueError:
+            _reject(report, "invalid_date", line_no, f"invalid date '{raw_date}'")
+            continue
+        units = _units(raw_units)
+        if units is None:
+            _reject(report, "invalid_units", line_no, f"invalid units_sold '{raw_units}'")
+            continue
+        yield product_id, day, units
+
+
+def _units(raw: Any) -> Optional[int]:
+    """
+    A units_sold value as a non-negative int that fits the column, else None.
+    Only ints and digit strings count: NDJSON 1.5 or true are rejected, not truncated.
+    """
+    if isinstance(raw, bool):
+        return None
+    if isinstance(raw, str):
+        raw = raw.strip()
+        if not (raw.isascii() and raw.isdigit()):
+            return None
+        raw = int(raw)
+    if not isinstance(raw, int) or raw > MAX_UNITS_SOLD:
+        return None
+    return raw if raw >= 0 else None
+
+
+def _reject(report, reason: str, line_no: int, message: str):
+    report["rejected"][reason] += 1
+    if len(report["errors"]) < MAX_REPORTED_ERRORS:
+        report["errors"].append(f"line {line_no}: {message}")
+
+
+# ============================================================================
+# POSTGRESQL: COPY + MERGE
+# ============================================================================
+
+class _CopySource(io.RawIOBase):
+    """Read-only file object that renders rows as CSV lines on demand for COPY."""
+
+    def __init__(self, rows: Iterable[SalesRow]):
+        self._rows = iter(rows)
+        self._buffer = b""
+
+    def readable(self):
+        return True
+
+    def read(self, size=-1):
+        while size < 0 or len(self._buffer) < size:
+            chunk = "".join(
+                f"{pid},{day.isoformat()},{units}\n" for pid, day, units in _take(self._rows, 1000)
+            ).encode("ascii")
+            if not chunk:
+                break
+            self._buffer += chunk
+        if size < 0:
+            size = len(self._buffer)
+        data, self._buffer = self._buffer[:size], self._buffer[size:]
+        return data
+
+    def chunks(self, size=1 << 16):
+        while True:
+            data = self.read(size)
+            if not data:
+                return
+            yield data
+
+
+def _take(iterator, n):
+    for _ in range(n):
+        try:
+            yield next(iterator)
+        except StopIteration:
+            return
+
+
+def _load_with_copy(rows: Iterable[SalesRow], report):
+    table = connection.ops.quote_name(SalesHistory._meta.db_table)
+    copy_sql = "COPY sales_import_staging (product_id, date, units_sold) FROM STDIN WITH (FORMAT csv)"
+    source = _CopySource(rows)
+
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(
+            "CREATE TEMP TABLE sales_import_staging "
+            "(seq bigserial, product_id bigint, date date, units_sold integer) ON COMMIT DROP"
+        )
+        raw = cursor.cursor
+        if hasattr(raw, "copy_expert"):  # psycopg2
+            raw.copy_expert(copy_sql, source, size=1 << 16)
+        else:  # psycopg 3
+            with raw.copy(copy_sql) as copy:
+                for data in source.chunks():
+                    copy.write(data)
+
+        # Last row wins for duplicate (product, date) pairs within the file
+        cursor.execute(
+            "CREATE TEMP TABLE sales_import_merge ON COMMIT DROP AS "
+            "SELECT DISTINCT ON (product_id, date) product_id, date, units_sold "
+            "FROM sales_import_staging ORDER BY product_id, date, seq DESC"
+        )
+        cursor.execute(
+            f"SELECT m.product_id, m.date, m.units_sold - COALESCE(h.units_sold, 0), "
+            f"CASE WHEN h.id IS NULL THEN 1 ELSE 0 END "
+            f"FROM sales_import_merge m LEFT JOIN {table} h "
+            f"ON h.product_id = m.product_id AND h.date = m.date "
+            f"WHERE h.id IS NULL OR h.units_sold <> m.units_sold"
+        )
+        deltas = cursor.fetchall()
+        cursor.execute("SELECT count(*) FROM sales_import_merge")
+        distinct_rows = cursor.fetchone()[0]
+
+        cursor.execute(
+            f"INSERT INTO {table} (product_id, date, units_sold) "
+            f"SELECT product_id, date, units_sold FROM sales_import_merge "
+            f"ON CONFLICT (product_id, date) DO UPDATE SET units_sold = EXCLUDED.units_sold "
+            f"WHERE {table}.units_sold IS DISTINCT FROM EXCLUDED.units_sold"
+        )
+        apply_sales_deltas(deltas)
+
+    inserted = sum(1 for d in deltas if d[3])
+    report["inserted"] += inserted
+    report["updated"] += len(deltas) - inserted
+    report["unchanged"] += distinct_rows - len(deltas)
+
+
+# ============================================================================
+# FALLBACK: BATCHED ORM UPSERT
+# ============================================================================
+
+def _load_with_orm(rows: Iterable[SalesRow], report):
+    with transaction.atomic():
+        batch = {}
+        for product_id, day, units in rows:
+            batch[(product_id, day)] = units  # Last row wins
+            if len(batch) >= FALLBACK_BATCH_SIZE:
+                _upsert_batch(batch, report)
+                batch = {}
+        if batch:
+            _upsert_batch(batch, report)
+
+
+def _upsert_batch(batch: Dict[Tuple[int, date], int], report):
+    product_ids = {pid for pid, _ in batch}
+    days = {day for _, day in batch}
+    existing = {
+        (pid, day): units
+        for pid, day, units in SalesHistory.objects.filter(product_id__in=product_ids, date__in=days)
+        .values_list("product_id", "date", "units_sold")
+    }
+
+    deltas, changed = [], []
+    for (pid, day), units in batch.items():
+        old = existing.get((pid, day))
+        if old == units:
+            report["unchanged"] += 1
+            continue
+        report["inserted" if old is None else "updated"] += 1
+        deltas.append((pid, day, units - (old or 0), 1 if old is None else 0))
+        changed.append(SalesHistory(product_id=pid, date=day, units_sold=units))
+
+    SalesHistory.objects.bulk_create(
+        changed,
+        batch_size=1000,
+        update_conflicts=True,
+        unique_fields=["product", "date"],
+        update_fields=["units_sold"],
+    )
+    apply_sales_deltas(deltas)
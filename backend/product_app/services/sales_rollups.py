@@ -0,0 +1,224 @@
+"""
+Weekly / monthly sales rollups for product_app.
+
+Provides:
+- Incremental maintenance of ProductSalesRollup and CategorySalesRollup from
+  the same SalesHistory deltas that feed SalesStats
+- Moving a product's history between category rollups (recategorize / delete)
+- Full rebuild from SalesHistory (backfill / repair)
+
+Increments are applied with ``INSERT ... ON CONFLICT DO UPDATE`` (PostgreSQL
+and SQLite both support it), so concurrent writers never lose counts.
+"""
+
+import logging
+from collections import defaultdict
+from datetime import date
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from django.db import connection, transaction
+from django.db.models import Count, DateField, Q, Sum
+from django.db.models.functions import Trunc
+
+from product_app.models import (
+    ROLLUP_GRAINS,
+    CategorySalesRollup,
+    Product,
+    ProductSalesRollup,
+    SalesHistory,
+    rollup_period_start,
+)
+
+logger = logging.getLogger(__name__)
+
+GRAINS = [grain for grain, _ in ROLLUP_GRAINS]
+BATCH_SIZE = 1000
+
+# (key, grain, period_start) -> [units delta, sales-day delta]
+Buckets = Dict[Tuple[Optional[int], str, date], List[int]]
+
+
+# ============================================================================
+# INCREMENTAL UPDATES
+# ============================================================================
+
+def apply_rollup_deltas(deltas: Iterable[Tuple[int, date, int, int]]) -> None:
+    """
+    Fold SalesHistory deltas ``(product_id, date, units, days)`` into the
+    product and category rollups for every grain.
+    """
+    products: Buckets = defaultdict(lambda: [0, 0])
+    for product_id, day, units, days in deltas:
+        for grain in GRAINS:
+            bucket = products[(product_id, grain, rollup_period_start(day, grain))]
+            bucket[0] += units
+            bucket[1] += days
+    products = {key: value for key, value in products.items() if value[0] or value[1]}
+    if not products:
+        return
+
+    product_ids = {product_id for product_id, _, _ in products}
+    category_of = dict(Product.objects.filter(pk__in=product_ids).values_list("id", "category_id"))
+    categories: Buckets = defaultdict(lambda: [0, 0])
+    for (product_id, grain, start), (units, days) in products.items():
+        if product_id in category_of:
+            bucket = categories[(category_of[product_id], grain, start)]
+            bucket[0] += units
+            bucket[1] += days
+
+    with transaction.atomic():
+        _apply(ProductSalesRollup, "product_id", products)
+        _apply(CategorySalesRollup, "category_id", categories)
+
+
+def move_product_rollups(product_id: int, old_category_id, new_category_id, remove_only: bool = False) -> None:
+    """
+    Re-attribute a product's rollups from ``old_category_id`` to
+    ``new_category_id`` (or just subtract them when ``remove_only``).
+    """
+    move_rollups({product_id: (old_category_id, new_category_id)}, remove_only)
+
+
+def move_rollups(moves: Dict[int, Tuple[Optional[int], Optional[int]]], remove_only: bool = False) -> None:
+    """``move_product_rollups`` for many products: ``{product_id: (old category, new category)}``."""
+    product_ids = list(moves)
+    categories: Buckets = defaultdict(lambda: [0, 0])
+    for offset in range(0, len(product_ids), BATCH_SIZE):
+        rows = (
+            ProductSalesRollup.objects.filter(product_id__in=product_ids[offset:offset + BATCH_SIZE])
+            .values_list("product_id", "grain", "period_start", "units_sold", "sales_days")
+        )
+        for product_id, grain, start, units, days in rows:
+            old_category_id, new_category_id = moves[product_id]
+            bucket = categories[(old_category_id, grain, start)]
+            bucket[0] -= units
+            bucket[1] -= days
+            if not remove_only:
+                bucket = categories[(new_category_id, grain, start)]
+                bucket[0] += units
+                bucket[1] += days
+    if not categories:
+        return
+    with transaction.atomic():
+        _apply(CategorySalesRollup, "category_id", categories)
+
+
+def merge_category_rollups(category_id: int) -> None:
+    """Fold a category's rollups into the uncategorized rows (before the category is deleted)."""
+    categories: Buckets = {
+        (None, grain, start): [units, days]
+        for grain, start, units, days in CategorySalesRollup.objects.filter(category_id=category_id)
+        .values_list("grain", "period_start", "units_sold", "sales_days")
+    }
+    if categories:
+        _apply(CategorySalesRollup, "category_id", categories)
+
+
+def _apply(model, key_column: str, buckets: Buckets) -> None:
+    """
+    Upsert non-negative increments; apply decrements with a clamped UPDATE
+    (a negative proposed INSERT row would trip the CHECK constraints).
+    Rows left with no sales days are removed.
+    """
+    table = connection.ops.quote_name(model._meta.db_table)
+    increments = defaultdict(list)
+    decrements = defaultdict(list)
+    for (key, grain, start), (units, days) in buckets.items():
+        if not units and not days:
+            continue
+        target = increments if units >= 0 and days >= 0 else decrements
+        target[key is None].append((key, grain, start, units, days))
+
+    with connection.cursor() as cursor:
+        for is_null, rows in increments.items():
+            if is_null:
+                cursor.executemany(
+                    f"INSERT INTO {table} ({key_column}, grain, period_start, units_sold, sales_days) "
+                    f"VALUES (NULL, %s, %s, %s, %s) "
+                    f"ON CONFLICT (grain, period_start) WHERE {key_column} IS NULL DO UPDATE SET "
+                    f"units_sold = {table}.units_sold + EXCLUDED.units_sold, "
+                    f"sales_days = {table}.sales_days + EXCLUDED.sales_days",
+                    [row[1:] for row in rows],
+                )
+            else:
+                cursor.executemany(
+                    f"INSERT INTO {table} ({key_column}, grain, period_start, units_sold, sales_days) "
+                    f"VALUES (%s, %s, %s, %s, %s) "
+                    f"ON CONFLICT ({key_column}, grain, period_start) DO UPDATE SET "
+                    f"units_sold = {table}.units_sold + EXCLUDED.units_sold, "
+                    f"sales_days = {table}.sales_days + EXCLUDED.sales_days",
+                    rows,
+                )
+        for is_null, rows in decrements.items():
+            match = f"{key_column} IS NULL" if is_null else f"{key_column} = %s"
+            cursor.executemany(
+                f"UPDATE {table} SET "
+                f"units_sold = CASE WHEN units_sold + %s < 0 THEN 0 ELSE units_sold + %s END, "
+                f"sales_days = CASE WHEN sales_days + %s < 0 THEN 0 ELSE sales_days + %s END "
+                f"WHERE {match} AND grain = %s AND period_start = %s",
+                [
+                    (units, units, days, days, *(() if is_null else (key,)), grain, start)
+                    for key, grain, start, units, days in rows
+                ],
+            )
+
+    if decrements:
+        keys = {row[0] for rows in decrements.values() for row in rows}
+        empty = Q(**{f"{key_column}__in": keys - {None}})
+        if None in keys:
+            empty |= Q(**{f"{key_column}__isnull": True})
+        model.objects.filter(empty, sales_days=0).delete()
+
+
+# ============================================================================
+# REBUILD
+# ============================================================================
+
+def rebuild_sales_rollups() -> Dict[str, int]:
+    """
+    Recompute every rollup from SalesHistory with grouped queries.
+    Returns the number of rows written per table.
+    """
+    written = {"product": 0, "category": 0}
+    with transaction.atomic():
+        ProductSalesRollup.objects.all().delete()
+        CategorySalesRollup.objects.all().delete()
+        for grain in GRAINS:
+            periods = SalesHistory.objects.order_by().annotate(
+                period=Trunc("date", grain, output_field=DateField())
+            )
+            totals = {"units": Sum("units_sold"), "days": Count("id")}
+
+            product_rows = (
+                ProductSalesRollup(
+                    product_id=row["product_id"], grain=grain, period_start=row["period"],
+                    units_sold=row["units"], sales_days=row["days"],
+                )
+                for row in periods.values("product_id", "period").annotate(**totals).iterator()
+            )
+            written["product"] += _bulk_insert(ProductSalesRollup, product_rows)
+
+            category_rows = (
+                CategorySalesRollup(
+                    category_id=row["product__category_id"], grain=grain, period_start=row["period"],
+                    units_sold=row["units"], sales_days=row["days"],
+                )
+                for row in periods.values("product__category_id", "period").annotate(**totals).iterator()
+            )
+            written["category"] += _bulk_insert(CategorySalesRollup, category_rows)
+
+    logger.info(f"Rebuilt sales rollups: {written['product']} product rows, {written['category']} category rows")
+    return written
+
+
+def _bulk_insert(model, rows) -> int:
+    count, batch = 0, []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= BATCH_SIZE:
+            model.objects.bulk_create(batch)
+            count, batch = count + len(batch), []
+    if batch:
+        model.objects.bulk_create(batch)
+        count += len(batch)
+    return count
@@ -0,0 +1,246 @@
+"""
+Rolling-window sales statistics for product_app.
+
+Provides:
+- Incremental maintenance of SalesStats from SalesHistory changes
+  (also the entry point that feeds services/sales_rollups.py)
+- Daily rollover that drops sales days falling out of each window
+- Full rebuild from SalesHistory (backfill / repair)
+- Syncing Inventory.average_daily_sales from the stats
+"""
+
+import logging
+from collections import defaultdict
+from datetime import date, timedelta
+from decimal import Decimal
+from typing import Iterable, Optional, Tuple
+
+from django.db import transaction
+from django.db.models import Count, DecimalField, F, FloatField, OuterRef, Q, Subquery, Sum, Value
+from django.db.models.functions import Cast, Coalesce, Greatest
+from django.utils import timezone
+
+from product_app.models import (
+    AVERAGE_SALES_WINDOW,
+    SALES_WINDOWS,
+    Inventory,
+    Product,
+    SalesHistory,
+    SalesStats,
+)
+from product_app.services.inventory_totals import apply_totals_deltas
+from product_app.services.sales_rollups import apply_rollup_deltas
+
+logger = logging.getLogger(__name__)
+
+# (product_id, date, units delta, sales-day delta)
+# An inserted SalesHistory row is (+units, +1), a deleted one (-units, -1)
+SalesDelta = Tuple[int, date, int, int]
+
+STATS_FIELDS = [f for w in SALES_WINDOWS for f in (f"units_{w}d", f"days_{w}d")]
+BATCH_SIZE = 1000
+
+
+# ============================================================================
+# INCREMENTAL UPDATES
+# ============================================================================
+
+def apply_sales_deltas(deltas: Iterable[SalesDelta], create_missing: bool = True) -> int:
+    """
+    Fold SalesHistory changes into SalesStats.
+
+    Stats rows are locked, adjusted in Python and written back with one
+    ``bulk_update``; Inventory.average_daily_sales is then refreshed for
+    the same products, and the weekly/monthly rollups get the same deltas.
+    Returns the number of products touched.
+    """
+    deltas = [delta for delta in deltas if delta[2] or delta[3]]
+    per_product = defaultdict(list)
+    for product_id, day, units, days in deltas:
+        per_product[product_id].append((day, units, days))
+    if not per_product:
+        return 0
+
+    now = timezone.now()
+    with transaction.atomic():
+        apply_rollup_deltas(deltas)
+        locked = SalesStats.objects.select_for_update()
+        stats = {}
+        for ids in _chunks(list(per_product)):
+            stats.update((s.product_id, s) for s in locked.filter(product_id__in=ids))
+
+        missing = [pid for pid in per_product if pid not in stats]
+        if missing and create_missing:
+            window_end = timezone.localdate()
+            SalesStats.objects.bulk_create(
+                [SalesStats(product_id=pid, window_end=window_end) for pid in missing],
+                ignore_conflicts=True,
+                batch_size=BATCH_SIZE,
+            )
+            for ids in _chunks(missing):
+                stats.update((s.product_id, s) for s in locked.filter(product_id__in=ids))
+
+        for product_id, row in stats.items():
+            changes = per_product[product_id]
+            for window in SALES_WINDOWS:
+                start = row.window_end - timedelta(days=window)
+                units = sum(u for day, u, _ in changes if day >= start)
+                days = sum(n for day, _, n in changes if day >= start)
+                _add(row, window, units, days)
+            row.changed_at = now
+
+        SalesStats.objects.bulk_update(
+            stats.values(), STATS_FIELDS + ["changed_at"], batch_size=BATCH_SIZE
+        )
+        sync_average_daily_sales(list(stats))
+    return len(stats)
+
+
+def _add(row: SalesStats, window: int, units: int, days: int):
+    units_field, days_field = f"units_{window}d", f"days_{window}d"
+    setattr(row, units_field, max(0, getattr(row, units_field) + units))
+    setattr(row, days_field, max(0, getattr(row, days_field) + days))
+
+
+# ============================================================================
+# ROLLOVER & REBUILD
+# ============================================================================
+
+def roll_sales_windows(today: Optional[date] = None) -> int:
+    """
+    Move every SalesStats row forward to ``today``.
+
+    For each window only the sales days that just expired are read
+    (``[old_end - N, today - N)``) and subtracted, so the cost depends on
+    one day of sales, not on the window length. Returns products adjusted.
+    """
+    today = today or timezone.localdate()
+    adjusted = 0
+    stale_ends = (
+        SalesStats.objects.filter(window_end__lt=today)
+        .values_list("window_end", flat=True)
+        .distinct()
+        .order_by("window_end")
+    )
+    for window_end in list(stale_ends):
+        with transaction.atomic():
+            # Lock the whole cohort so concurrent deltas see a consistent window_end
+            list(SalesStats.objects.select_for_update().filter(window_end=window_end).values_list("pk"))
+
+            expired = defaultdict(lambda: defaultdict(int))
+            for window in SALES_WINDOWS:
+                rows = (
+                    SalesHistory.objects.filter(
+                        date__gte=window_end - timedelta(days=window),
+                        date__lt=today - timedelta(days=window),
+                        product__sales_stats__window_end=window_end,
+                    )
+                    .order_by()
+                    .values("product_id")
+                    .annotate(units=Sum("units_sold"), days=Count("id"))
+                )
+                for row in rows:
+                    expired[row["product_id"]][window] = (row["units"], row["days"])
+
+            stats = []
+            for ids in _chunks(list(expired)):
+                stats.extend(SalesStats.objects.filter(product_id__in=ids))
+            for row in stats:
+                for window, (units, days) in expired[row.product_id].items():
+                    _add(row, window, -units, -days)
+            SalesStats.objects.bulk_update(stats, STATS_FIELDS, batch_size=BATCH_SIZE)
+
+            SalesStats.objects.filter(window_end=window_end).update(window_end=today)
+            sync_average_daily_sales(list(expired))
+            adjusted += len(stats)
+
+        logger.info(f"Rolled sales windows from {window_end} to {today}: {len(expired)} products adjusted")
+    return adjusted
+
+
+def rebuild_sales_stats(today: Optional[date] = None) -> int:
+    """
+    Recompute every SalesStats row from SalesHistory (one grouped query).
+
+    Used to backfill, and to repair after bulk loads that bypassed
+    ``apply_sales_deltas``. Returns the number of products written.
+    """
+    today = today or timezone.localdate()
+    aggregates = {}
+    for window in SALES_WINDOWS:
+        in_window = Q(date__gte=today - timedelta(days=window))
+        aggregates[f"units_{window}d"] = Coalesce(Sum("units_sold", filter=in_window), 0)
+        aggregates[f"days_{window}d"] = Count("id", filter=in_window)
+
+    totals = {
+        row.pop("product_id"): row
+        for row in SalesHistory.objects.filter(date__gte=today - timedelta(days=max(SALES_WINDOWS)))
+        .order_by()
+        .values("product_id")
+        .annotate(**aggregates)
+    }
+    rows = [
+        SalesStats(product_id=pid, window_end=today, **totals.get(pid, {}))
+        for pid in Product.objects.values_list("id", flat=True).iterator()
+    ]
+    with transaction.atomic():
+        SalesStats.objects.bulk_create(
+            rows,
+            batch_size=BATCH_SIZE,
+            update_conflicts=True,
+            unique_fields=["product"],
+            update_fields=["window_end"] + STATS_FIELDS,
+        )
+        sync_average_daily_sales()
+    return len(rows)
+
+
+# ============================================================================
+# INVENTORY SYNC
+# ============================================================================
+
+def sync_average_daily_sales(product_ids: Optional[list] = None) -> int:
+    """
+    Copy the AVERAGE_SALES_WINDOW average from SalesStats into Inventory
+    with set-based UPDATEs. ``None`` means every inventory. Only rows whose
+    average changes are written (and get a new updated_at, which delta sync
+    reads), so a full rebuild does not mark the whole catalog as changed.
+    InventoryTotals receive the matching average_daily_sales_sum deltas.
+    Returns the number of inventories updated.
+    """
+    units = Cast(F(f"units_{AVERAGE_SALES_WINDOW}d"), FloatField())
+    days = Cast(Greatest(F(f"days_{AVERAGE_SALES_WINDOW}d"), Value(1)), FloatField())
+    average = Coalesce(
+        Subquery(
+            SalesStats.objects.filter(product_id=OuterRef("product_id"))
+            .annotate(avg=Cast(units / days, DecimalField(max_digits=10, decimal_places=2)))
+            .values("avg")[:1]
+        ),
+        Value(Decimal("0")),
+        output_field=DecimalField(max_digits=10, decimal_places=2),
+    )
+    if product_ids is None:
+        querysets = [Inventory.objects.all()]
+    else:
+        querysets = [Inventory.objects.filter(product_id__in=ids) for ids in _chunks(product_ids)]
+
+    updated = 0
+    for queryset in querysets:
+        changed, changes = [], []
+        rows = queryset.annotate(new_average=average).values_list(
+            "pk", "product__category_id", "average_daily_sales", "new_average",
+        )
+        for pk, category_id, old, new in rows.iterator(chunk_size=BATCH_SIZE):
+            if new != old:
+                changed.append(pk)
+                changes.append((category_id, {"average_daily_sales_sum": new - old}))
+        now = timezone.now()
+        for pks in _chunks(changed):
+            updated += Inventory.objects.filter(pk__in=pks).update(average_daily_sales=average, updated_at=now)
+        apply_totals_deltas(changes)
+    return updated
+
+
+def _chunks(items: list, size: int = BATCH_SIZE):
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
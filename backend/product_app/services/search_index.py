@@ -0,0 +1,73 @@
+"""
+Product search index for product_app.
+
+Provides:
+- The weighted search vector stored in Product.search_vector
+  (SKU and name weight A, category name weight C; 'simple' config so
+  SKUs and brand names are not stemmed)
+- Refreshing vectors after writes that bypass Product.save()
+  (bulk imports, category renames) and full rebuilds
+
+Vectors and the pg_trgm / GIN indexes only exist on PostgreSQL; on other
+backends these functions are no-ops and search falls back to LIKE scans.
+"""
+
+import logging
+from typing import Iterable, Optional
+
+from django.contrib.postgres.search import SearchVector
+from django.db import connection
+from django.db.models import OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+from product_app.models import Category, Product
+
+logger = logging.getLogger(__name__)
+
+SEARCH_CONFIG = "simple"
+BATCH_SIZE = 5000
+
+
+def search_enabled() -> bool:
+    """Full-text / trigram search needs PostgreSQL."""
+    return connection.vendor == "postgresql"
+
+
+def search_vector_expression():
+    """SQL expression building a product's search vector (usable in UPDATE)."""
+    category_name = Subquery(Category.objects.filter(pk=OuterRef("category_id")).values("name")[:1])
+    return (
+        SearchVector("sku", weight="A", config=SEARCH_CONFIG)
+        + SearchVector("name", weight="A", config=SEARCH_CONFIG)
+        + SearchVector(Coalesce(category_name, Value("")), weight="C", config=SEARCH_CONFIG)
+    )
+
+
+def refresh_search_vectors(product_ids: Optional[Iterable[int]] = None, category_id: Optional[int] = None) -> int:
+    """
+    Recompute search vectors for the given products (or a category's
+    products, or every product) with one UPDATE per batch.
+    Returns the number of rows updated.
+    """
+    if not search_enabled():
+        return 0
+    products = Product.objects.all()
+    if category_id is not None:
+        products = products.filter(category_id=category_id)
+    if product_ids is None:
+        return products.update(search_vector=search_vector_expression())
+
+    product_ids = list(product_ids)
+    updated = 0
+    for start in range(0, len(product_ids), BATCH_SIZE):
+        updated += products.filter(pk__in=product_ids[start:start + BATCH_SIZE]).update(
+            search_vector=search_vector_expression()
+        )
+    return updated
+
+
+def rebuild_search_index() -> int:
+    """Recompute every product's search vector (backfill / repair)."""
+    updated = refresh_search_vectors()
+    logger.info(f"Rebuilt product search vectors for {updated} products")
+    return updated
@@ -0,0 +1,270 @@
+"""
+Stock adjustment services for product_app.
+
+Provides:
+- Race-free single-product adjustments: conditional F-expression UPDATE for
+  deltas, row lock (SELECT ... FOR UPDATE) for absolute quantities
+- Bulk stock adjustments (absolute quantity or relative delta per SKU),
+  each appended to the StockMovement ledger
+- Restocking every low inventory in a queryset to one unit above its
+  threshold (back to in_stock) with one set-based UPDATE (admin action)
+- Batched low-stock alert queueing (one outbox INSERT per batch)
+"""
+
+import logging
+from typing import Any, Dict, Iterable, List
+
+from django.db import transaction
+from django.db.models import Case, F, Value, When
+from django.utils import timezone
+
+from product_app.models import Inventory, LowStockAlert, Product, StockMovement, is_low_stock, stock_status_for
+from product_app.services.inventory_totals import record_inventory_changes
+from product_app.services.movements import movements_for_change, record_movements
+
+logger = logging.getLogger(__name__)
+
+
+# ============================================================================
+# SINGLE-PRODUCT ADJUSTMENTS
+# ============================================================================
+
+def apply_stock_delta(product: Product, delta: int, kind: str = "adjustment", reference: str = "") -> Inventory:
+    """
+    Add (or remove) ``delta`` units with one conditional UPDATE.
+
+    The new counters and stock_status are computed by the database from the
+    row it is updating, and removals only match while enough stock is on
+    hand, so concurrent deltas for the same SKU never lose each other's
+    writes and no read is needed up front. The updated row is read back
+    (still locked by the UPDATE) to record the movement and totals.
+
+    Raises ``ValueError`` when the stock on hand cannot cover a removal.
+    """
+    counter = "stock_in" if delta >= 0 else "stock_out"
+    new_total = F("total_stock") + delta
+
+    with transaction.atomic():
+        rows = Inventory.objects.filter(product=product)
+        if delta < 0:
+            rows = rows.filter(total_stock__gte=-delta)
+        updated = rows.update(**{
+            counter: F(counter) + abs(delta),
+            "total_stock": new_total,
+            "stock_status": Case(
+                When(total_stock__lte=-delta, then=Value("out_of_stock")),
+                When(total_stock__lte=F("low_stock_threshold") - delta, then=Value("low_stock")),
+                default=Value("in_stock"),
+            ),
+            "updated_at": timezone.now(),
+        })
+        if not updated:
+            inventory = _get_or_create_inventory(product)
+            if delta < 0:
+                raise ValueError(f"Insufficient stock: {inventory.total_stock} on hand, delta {delta}.")
+            return apply_stock_delta(product, delta, kind, reference)
+
+        inventory = Inventory.objects.select_related("product").get(product=product)
+        previous = list(inventory.totals_snapshot())
+        previous[0 if delta >= 0 else 1] -= abs(delta)
+        previous[2] -= delta
+        _record_change(inventory, tuple(previous), kind, reference)
+    return inventory
+
+
+def set_stock_quantity(product: Product, quantity: int, kind: str = "adjustment", reference: str = "") -> Inventory:
+    """
+    Set the absolute stock on hand. The inventory row is locked for the
+    read-modify-write, so concurrent writers queue instead of overwriting
+    each other's counters.
+    """
+    with transaction.atomic():
+        inventory = _get_or_create_inventory(product)
+        previous = inventory.totals_snapshot()
+        if quantity > inventory.total_stock:
+            inventory.stock_in += quantity - inventory.total_stock
+        elif quantity < inventory.total_stock:
+            inventory.stock_out += inventory.total_stock - quantity
+        inventory.total_stock = inventory.stock_in - inventory.stock_out
+        inventory.stock_status = stock_status_for(inventory.total_stock, inventory.low_stock_threshold)
+        inventory.updated_at = timezone.now()
+        Inventory.objects.filter(pk=inventory.pk).update(
+            stock_in=inventory.stock_in,
+            stock_out=inventory.stock_out,
+            total_stock=inventory.total_stock,
+            stock_status=inventory.stock_status,
+            updated_at=inventory.updated_at,
+        )
+        _record_change(inventory, previous, kind, reference)
+    return inventory
+
+
+def _get_or_create_inventory(product: Product) -> Inventory:
+    """Row-locked inventory for ``product`` (created, with totals recorded, if missing)."""
+    qs = Inventory.objects.select_for_update(of=("self",)).select_related("product")
+    inventory = qs.filter(product=product).first()
+    if inventory is None:
+        # save() records the new row's totals through the Inventory signals
+        Inventory.objects.get_or_create(product=product)
+        inventory = qs.get(product=product)
+    return inventory
+
+
+def _record_change(inventory: Inventory, previous: tuple, kind: str, reference: str) -> None:
+    """Ledger movement, InventoryTotals delta and low-stock alert for one applied change."""
+    record_movements(movements_for_change(inventory, previous, kind=kind, reference=reference))
+    inventory._loaded_totals = previous
+    record_inventory_changes([inventory])
+    if is_low_stock(inventory.total_stock, inventory.low_stock_threshold):
+        LowStockAlert.enqueue([inventory])
+
+
+# ============================================================================
+# BULK ADJUSTMENTS
+# ============================================================================
+
+def bulk_adjust_stock(rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Apply many stock changes in a single transaction.
+
+    Each row is ``{"sku": str, "quantity": int}`` (set absolute stock) or
+    ``{"sku": str, "delta": int}`` (add/remove units), with an optional
+    movement ``kind`` and ``reference``. Rows are applied in order, so
+    several rows for the same SKU accumulate.
+
+    - SKUs are resolved with one locking query (SELECT ... FOR UPDATE)
+    - Missing Inventory records are created with one bulk INSERT
+    - All changes are written with one ``bulk_update`` (CASE ... WHEN)
+    - One StockMovement per applied row, appended with one bulk INSERT
+    - InventoryTotals get one delta UPDATE per affected row (global + categories)
+    - Low-stock alerts are queued once for the batch, in the same transaction
+
+    Returns one result dict per input row, in input order.
+    """
+    skus = {row["sku"] for row in rows}
+    now = timezone.now()
+    results = []
+
+    with transaction.atomic():
+        inventories = _lock_inventories(skus)
+        touched = {}
+        movements = []
+
+        for row in rows:
+            sku = row["sku"]
+            inv = inventories.get(sku)
+            if inv is None:
+                results.append({"sku": sku, "status": "error", "error": "Unknown SKU."})
+                continue
+
+            previous = inv.total_stock
+            target = row["quantity"] if "quantity" in row else previous + row["delta"]
+            if target < 0:
+                results.append({
+                    "sku": sku,
+                    "status": "error",
+                    "error": f"Insufficient stock: {previous} on hand, delta {row['delta']}.",
+                })
+                continue
+
+            if target > previous:
+                inv.stock_in += target - previous
+            elif target < previous:
+                inv.stock_out += previous - target
+            inv.total_stock = inv.stock_in - inv.stock_out
+            inv.stock_status = stock_status_for(inv.total_stock, inv.low_stock_threshold)
+            inv.updated_at = now
+            touched[inv.pk] = inv
+            movements.append(StockMovement(
+                product_id=inv.product_id,
+                kind=row.get("kind", "adjustment"),
+                quantity=target - previous,
+                reference=row.get("reference") or "bulk-adjust",
+                created_at=now,
+            ))
+
+            results.append({
+                "sku": sku,
+                "status": "ok",
+                "previous_stock": previous,
+                "total_stock": inv.total_stock,
+            })
+
+        if touched:
+            Inventory.objects.bulk_update(
+                touched.values(),
+                ["stock_in", "stock_out", "total_stock", "stock_status", "updated_at"],
+                batch_size=1000,
+            )
+            record_movements(movements)
+            record_inventory_changes(touched.values())
+
+        LowStockAlert.enqueue(
+            inv for inv in touched.values() if is_low_stock(inv.total_stock, inv.low_stock_threshold)
+        )
+
+    logger.info(f"Bulk stock adjustment: {len(touched)} inventories updated from {len(rows)} rows")
+    return results
+
+
+def restock_to_threshold(products, reference: str = "admin-restock") -> int:
+    """
+    Raise every inventory of the ``products`` queryset that is low by
+    stock_status_for() (at or below its low_stock_threshold) to one unit
+    above the threshold, so it is in stock again and raises no alert, with
+    one UPDATE computed by the database. Each restock is recorded as a
+    ``receipt`` movement. Returns the number of inventories restocked.
+    """
+    with transaction.atomic():
+        low = Inventory.objects.filter(
+            product__in=products.values("pk"), total_stock__lte=F("low_stock_threshold"),
+        )
+        inventories = list(low.select_for_update(of=("self",)).select_related("product").order_by("pk"))
+        if not inventories:
+            return 0
+        now = timezone.now()
+        # The rows are locked, so this matches exactly the inventories read above
+        low.update(
+            stock_in=F("stock_in") + F("low_stock_threshold") + 1 - F("total_stock"),
+            total_stock=F("low_stock_threshold") + 1,
+            stock_status="in_stock",
+            updated_at=now,
+        )
+
+        movements = []
+        for inv in inventories:
+            previous = inv.totals_snapshot()
+            inv.stock_in += inv.low_stock_threshold + 1 - inv.total_stock
+            inv.total_stock = inv.low_stock_threshold + 1
+            inv.stock_status = stock_status_for(inv.total_stock, inv.low_stock_threshold)
+            inv.updated_at = now
+            movements.extend(movements_for_change(inv, previous, kind="receipt", reference=reference))
+        record_movements(movements)
+        record_inventory_changes(inventories)
+
+    logger.info(f"Restocked {len(inventories)} inventories to one above their low-stock threshold")
+    return len(inventories)
+
+
+def _lock_inventories(skus: Iterable[str]) -> Dict[str, Inventory]:
+    """
+    Return ``{sku: Inventory}`` for known SKUs, row-locked, creating missing inventories.
+
+    Rows are locked in primary-key order, so two bulk adjustments touching
+    the same SKUs in a different order queue instead of deadlocking.
+    """
+    qs = Inventory.objects.select_for_update(of=("self",)).select_related("product").order_by("pk")
+    inventories = {inv.product.sku: inv for inv in qs.filter(product__sku__in=skus)}
+
+    missing = set(skus) - inventories.keys()
+    if missing:
+        product_ids = list(Product.objects.filter(sku__in=missing).values_list("id", flat=True))
+        if product_ids:
+            # bulk_create skips Inventory.save() and its signals, so totals are recorded here
+            Inventory.objects.bulk_create(
+                [Inventory(product_id=pid) for pid in product_ids], ignore_conflicts=True
+            )
+            created = list(qs.filter(product_id__in=product_ids))
+            record_inventory_changes(created, created=True)
+            inventories.update((inv.product.sku, inv) for inv in created)
+    return inventories
@@ -0,0 +1,141 @@
+"""
+Delta sync for product_app (GET /api/sync/).
+
+Provides:
+- Opaque sync tokens holding one ``(timestamp, id)`` position per stream
+  (products by updated_at, inventories by updated_at, tombstones by deleted_at)
+- Keyset pages of the rows changed after each position, using the
+  ``(updated_at, id)`` / ``(deleted_at, id)`` indexes
+- Tombstone retention (tokens older than it need a full resync)
+
+A transaction can commit rows whose timestamps are older than rows another
+client has already read. Once a stream is drained, its position is therefore
+held back to ``now - SYNC_LAG``. Rows changed in that window are sent again
+on the next sync; clients upsert by id, so repeats are harmless. Rows are
+only lost if a transaction stays open longer than SYNC_LAG.
+"""
+
+import base64
+import json
+import logging
+from datetime import datetime, timedelta, timezone as dt_timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+from django.db.models import Q
+from django.utils import timezone
+
+from product_app.models import Inventory, Product, Tombstone
+
+logger = logging.getLogger(__name__)
+
+SYNC_LAG = timedelta(seconds=60)
+TOMBSTONE_RETENTION = timedelta(days=30)
+TOKEN_VERSION = 1
+
+EPOCH = datetime(1970, 1, 1, tzinfo=dt_timezone.utc)
+
+# stream -> (queryset, position field)
+STREAMS = {
+    "products": (lambda: Product.objects.select_related("category", "inventory"), "updated_at"),
+    "inventories": (lambda: Inventory.objects.select_related("product"), "updated_at"),
+    "deleted": (lambda: Tombstone.objects.all(), "deleted_at"),
+}
+
+Position = Tuple[datetime, int]
+
+
+class SyncTokenError(ValueError):
+    """The token is malformed."""
+
+
+class SyncTokenExpired(Exception):
+    """The token predates the tombstone retention; the client must resync from scratch."""
+
+
+# ============================================================================
+# TOKENS
+# ============================================================================
+
+def encode_token(positions: Dict[str, Position]) -> str:
+    payload = {"v": TOKEN_VERSION, **{
+        stream: [moment.isoformat(), pk] for stream, (moment, pk) in positions.items()
+    }}
+    return base64.urlsafe_b64encode(json.dumps(payload, separators=(",", ":")).encode("utf-8")).decode("ascii")
+
+
+def decode_token(token: str) -> Dict[str, Position]:
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(token.encode("ascii")).decode("utf-8"))
+        if payload.get("v") != TOKEN_VERSION:
+            raise SyncTokenError("Unsupported sync token version")
+        positions = {}
+        for stream in STREAMS:
+            moment, pk = payload[stream]
+            parsed = datetime.fromisoformat(moment)
+            positions[stream] = (parsed if timezone.is_aware(parsed) else timezone.make_aware(parsed), int(pk))
+        return positions
+    except (TypeError, ValueError, KeyError, UnicodeError, AttributeError) as e:
+        raise SyncTokenError(f"Invalid sync token ({e})") from e
+
+
+def initial_positions(now: datetime) -> Dict[str, Position]:
+    """A first sync lists every product and inventory; only later deletions matter."""
+    return {"products": (EPOCH, 0), "inventories": (EPOCH, 0), "deleted": (now - SYNC_LAG, 0)}
+
+
+# ============================================================================
+# CHANGES
+# ============================================================================
+
+def _page(stream: str, position: Position, limit: int) -> Tuple[List[Any], bool]:
+    make_queryset, field = STREAMS[stream]
+    moment, pk = position
+    rows = list(
+        make_queryset()
+        .filter(Q(**{f"{field}__gt": moment}) | Q(**{field: moment, "pk__gt": pk}))
+        .order_by(field, "pk")[:limit + 1]
+    )
+    return rows[:limit], len(rows) > limit
+
+
+def changes_since(token: Optional[str], page_size: int) -> Dict[str, Any]:
+    """
+    Rows changed after ``token`` (``None`` = first sync), up to ``page_size``
+    per stream, and the token to send next. Call again with the new token
+    while ``has_more`` is true.
+    """
+    now = timezone.now()
+    positions = decode_token(token) if token else initial_positions(now)
+    if positions["deleted"][0] < now - TOMBSTONE_RETENTION:
+        raise SyncTokenExpired(
+            f"Sync token is older than {TOMBSTONE_RETENTION.days} days; deletions may be missing. Sync from scratch."
+        )
+
+    cutoff = (now - SYNC_LAG, 0)
+    result: Dict[str, Any] = {"full": token is None}
+    has_more = False
+    for stream, (_, field) in STREAMS.items():
+        rows, more = _page(stream, positions[stream], page_size)
+        if rows:
+            positions[stream] = (getattr(rows[-1], field), rows[-1].pk)
+        if not more:
+            # Drained: hold the position back so late commits are picked up next time
+            positions[stream] = min(positions[stream], cutoff)
+        has_more = has_more or more
+        result[stream] = rows
+
+    result["token"] = encode_token(positions)
+    result["has_more"] = has_more
+    return result
+
+
+def touch_products(**filters) -> int:
+    """Bump updated_at on products whose serialized form changed indirectly (category rename/delete)."""
+    return Product.objects.filter(**filters).update(updated_at=timezone.now())
+
+
+def prune_tombstones(retention: timedelta = TOMBSTONE_RETENTION) -> int:
+    """Delete tombstones older than ``retention``; older tokens already get a full-resync answer."""
+    deleted, _ = Tombstone.objects.filter(deleted_at__lt=timezone.now() - retention).delete()
+    logger.info(f"Pruned {deleted} sync tombstones older than {retention.days} days")
+    return deleted
@@ -1,6 +1,22 @@
-from django.db.models.signals import post_save
+from django.db.models.signals import post_delete, post_save, pre_delete, pre_save
 from django.dispatch import receiver
-from .models import Product, Inventory
+from .models import Category, Product, Inventory, InventoryTotals, SalesHistory, Supplier, Tombstone
+from .services.images import refresh_product_images
+from .services.inventory_totals import (
+    TOTALS_FIELDS,
+    apply_totals_deltas,
+    difference,
+    move_category,
+    read_totals,
+    record_inventory_changes,
+)
+from .services.movements import movements_for_change, record_movements
+from .services.name_index import bump_name_index_version
+from .services.reorder import invalidate_reorder_report
+from .services.search_index import refresh_search_vectors
+from .services.sales_rollups import merge_category_rollups, move_product_rollups
+from .services.sales_stats import apply_sales_deltas
+from .services.sync import touch_products
 
 
 @receiver(post_save, sender=Product)
@@ -10,3 +26,206 @@ def create_inventory_for_product(sender, instance, created, **kwargs):
     """
     if created:
         Inventory.objects.create(product=instance)
+
+
+@receiver(pre_save, sender=SalesHistory)
+def remember_previous_sales(sender, instance, raw=False, **kwargs):
+    """
+    Capture the stored row before an update (if it wasn't loaded from the DB)
+    so the SalesStats delta is exact.
+    """
+    if raw or not instance.pk or hasattr(instance, "_loaded_sales"):
+        return
+    instance._loaded_sales = (
+        SalesHistory.objects.filter(pk=instance.pk)
+        .values_list("product_id", "date", "units_sold")
+        .first()
+    )
+
+
+@receiver(post_save, sender=SalesHistory)
+def update_sales_stats_on_save(sender, instance, created, raw=False, **kwargs):
+    """
+    Keep rolling SalesStats (and Inventory.average_daily_sales) in step with
+    every SalesHistory insert or edit.
+    """
+    if raw:
+        return
+    day = SalesHistory._meta.get_field("date").to_python(instance.date)
+    deltas = []
+    previous = None if created else getattr(instance, "_loaded_sales", None)
+    if previous:
+        old_product, old_day, old_units = previous
+        deltas.append((old_product, old_day, -old_units, -1))
+    deltas.append((instance.product_id, day, instance.units_sold, 1))
+    apply_sales_deltas(deltas)
+    instance._loaded_sales = (instance.product_id, day, instance.units_sold)
+
+
+@receiver(post_delete, sender=SalesHistory)
+def update_sales_stats_on_delete(sender, instance, origin=None, **kwargs):
+    """
+    Remove a deleted sales row from the rolling windows.
+    Skipped when the product itself is being deleted (its stats go with it).
+    """
+    if isinstance(origin, Product) or getattr(origin, "model", None) is Product:
+        return
+    apply_sales_deltas(
+        [(instance.product_id, instance.date, -instance.units_sold, -1)], create_missing=False
+    )
+
+
+@receiver(pre_save, sender=Inventory)
+def remember_previous_inventory(sender, instance, raw=False, **kwargs):
+    """Capture stored counters (if not loaded from the DB) for exact InventoryTotals deltas."""
+    if raw or not instance.pk or hasattr(instance, "_loaded_totals"):
+        return
+    instance._loaded_totals = (
+        Inventory.objects.filter(pk=instance.pk)
+        .values_list("stock_in", "stock_out", "total_stock", "average_daily_sales", "low_stock_threshold")
+        .first()
+    )
+
+
+@receiver(post_save, sender=Inventory)
+def update_inventory_totals_on_save(sender, instance, created, raw=False, **kwargs):
+    """
+    Append the counter change to the stock ledger, then apply it to the
+    global and category totals (same transaction). Callers may set
+    ``_movement_kind`` / ``_movement_reference`` on the instance.
+    """
+    if raw:
+        return
+    previous = None if created else getattr(instance, "_loaded_totals", None)
+    record_movements(movements_for_change(
+        instance, previous,
+        kind=getattr(instance, "_movement_kind", "adjustment"),
+        reference=getattr(instance, "_movement_reference", ""),
+    ))
+    record_inventory_changes([instance], created=created)
+
+
+@receiver(post_delete, sender=Inventory)
+def update_inventory_totals_on_delete(sender, instance, origin=None, **kwargs):
+    """Remove a deleted inventory from the totals."""
+    if isinstance(origin, Product):
+        category_id = origin.category_id
+    else:
+        category_id = Product.objects.filter(pk=instance.product_id).values_list("category_id", flat=True).first()
+    snapshot = getattr(instance, "_loaded_totals", None) or instance.totals_snapshot()
+    apply_totals_deltas([(category_id, difference(None, snapshot))])
+
+
+@receiver(pre_save, sender=Product)
+def remember_previous_category(sender, instance, raw=False, **kwargs):
+    if raw or not instance.pk or hasattr(instance, "_loaded_category_id"):
+        return
+    instance._loaded_category_id = (
+        Product.objects.filter(pk=instance.pk).values_list("category_id", flat=True).first()
+    )
+
+
+@receiver(post_save, sender=Product)
+def move_category_aggregates_on_recategorize(sender, instance, created, raw=False, **kwargs):
+    """Move the product's inventory totals and sales rollups when its category changes."""
+    previous = getattr(instance, "_loaded_category_id", None)
+    instance._loaded_category_id = instance.category_id
+    if raw or created or previous == instance.category_id:
+        return
+    inventory = Inventory.objects.filter(product=instance).first()
+    if inventory:
+        move_category(inventory, previous, instance.category_id)
+    move_product_rollups(instance.pk, previous, instance.category_id)
+
+
+@receiver(pre_delete, sender=Product)
+def remove_category_rollups_on_product_delete(sender, instance, **kwargs):
+    """Product rollups cascade away; take the product's sales out of its category rollups first."""
+    move_product_rollups(instance.pk, instance.category_id, None, remove_only=True)
+
+
+@receiver(pre_delete, sender=Category)
+def merge_category_aggregates_on_delete(sender, instance, **kwargs):
+    """
+    Products of a deleted category become uncategorized (SET_NULL, no signals),
+    so fold the category's totals and sales rollups into the uncategorized rows.
+    """
+    row = read_totals(InventoryTotals.key_for(instance.pk))
+    if any(getattr(row, f) for f in TOTALS_FIELDS):
+        apply_totals_deltas([(None, {f: getattr(row, f) for f in TOTALS_FIELDS})], include_global=False)
+    merge_category_rollups(instance.pk)
+
+
+@receiver(post_save, sender=Supplier)
+@receiver(post_delete, sender=Supplier)
+@receiver(post_save, sender=Product)
+def invalidate_reorder_report_on_change(sender, raw=False, **kwargs):
+    """
+    Lead times, suppliers and names feed the cached reorder report; inventory
+    writes invalidate it through InventoryTotals' version instead.
+    """
+    if not raw:
+        invalidate_reorder_report()
+
+
+@receiver(post_save, sender=Product)
+def refresh_product_search_vector(sender, instance, raw=False, **kwargs):
+    """Keep Product.search_vector current (no-op unless on PostgreSQL)."""
+    if not raw:
+        refresh_search_vectors([instance.pk])
+
+
+@receiver(post_save, sender=Category)
+def refresh_category_search_vectors(sender, instance, created, raw=False, **kwargs):
+    """A renamed category changes the search vector of every product in it."""
+    if not raw and not created:
+        refresh_search_vectors(category_id=instance.pk)
+
+
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=Product)
+def patch_product_name_index(sender, instance, raw=False, **kwargs):
+    """A product's name, SKU or category changed: in-process name indexes patch it in."""
+    if not raw:
+        bump_name_index_version([instance.pk])
+
+
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+def invalidate_product_name_index(sender, raw=False, **kwargs):
+    """Categories changed: in-process name indexes rebuild (see services/name_index.py)."""
+    if not raw:
+        bump_name_index_version()
+
+
+@receiver(post_save, sender=Product)
+def build_product_image_variants(sender, instance, raw=False, **kwargs):
+    """Generate thumbnail / WebP variants when image_url is set or changed."""
+    if not raw:
+        refresh_product_images(instance)
+
+
+@receiver(post_delete, sender=Product)
+@receiver(post_delete, sender=Inventory)
+def record_sync_tombstone(sender, instance, origin=None, **kwargs):
+    """Delta-sync clients learn about deletions from tombstones (see services/sync.py)."""
+    if sender is Product:
+        Tombstone.objects.create(kind="product", object_id=instance.pk, sku=instance.sku)
+    elif isinstance(origin, Product):
+        Tombstone.objects.create(kind="inventory", object_id=instance.pk, sku=origin.sku)
+    else:
+        sku = Product.objects.filter(pk=instance.product_id).values_list("sku", flat=True).first() or ""
+        Tombstone.objects.create(kind="inventory", object_id=instance.pk, sku=sku)
+
+
+@receiver(post_save, sender=Category)
+def touch_products_on_category_rename(sender, instance, created, raw=False, **kwargs):
+    """Products serialize their category name; a rename must reach delta-sync clients."""
+    if not raw and not created:
+        touch_products(category_id=instance.pk)
+
+
+@receiver(pre_delete, sender=Category)
+def touch_products_on_category_delete(sender, instance, **kwargs):
+    """SET_NULL bypasses updated_at, so mark the category's products changed first."""
+    touch_products(category_id=instance.pk)
@@ -29,4 +29,24 @@ def compute_hot_trends(season: str):
         t.hot_score = min(100.0, base_score)  # Cap at 100
         t.save(update_fields=["hot_score"])
     
-    return f"Computed hot scores for {total} trends (with frequency bonuses)"
\ No newline at end of file
+    return f"Computed hot scores for {total} trends (with frequency bonuses)"
+
+def send_low_stock_alerts():
+    """Drain the low-stock alert outbox once.
+
+    Synchronous like compute_hot_trends; schedule it (cron / Celery beat) or
+    run `manage.py send_low_stock_alerts --loop` as a long-lived worker.
+    """
+    from .services.alerts import deliver_low_stock_alerts
+
+    result = deliver_low_stock_alerts()
+    return f"Delivered {result['alerts'] - result['failed']} low stock alerts in {result['emails']} emails"
+
+def refit_demand_forecasts():
+    """Refit demand forecasts for products with new sales (nightly).
+
+    Synchronous like the tasks above; `manage.py fit_demand_forecasts` is the CLI equivalent.
+    """
+    from .services.forecasting import refit_forecasts
+
+    return f"Fitted {refit_forecasts()} demand forecasts"
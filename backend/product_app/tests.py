@@ -1,3 +1,1031 @@
-from django.test import TestCase
+import asyncio
+import base64
+import io
+import json
+import os
+import tempfile
+from datetime import date, timedelta
+from decimal import Decimal
+from unittest import mock
 
-# Create your tests here.
+import numpy as np
+from asgiref.sync import sync_to_async
+from django.core import mail
+from django.core.files.storage import default_storage
+from django.core.mail.backends.locmem import EmailBackend
+from django.core.management import CommandError, call_command
+from django.db.models import Sum
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from PIL import Image
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+
+from auth_app.models import User
+from backend.middleware import QueryStats, fingerprint
+from backend.testing import QueryBudgetMixin
+from .models import (
+    Category, CategorySalesRollup, DemandForecast, Inventory, InventoryTotals, LowStockAlert, Product,
+    ProductSalesRollup, SalesHistory, SalesStats, StockMovement, Supplier, stock_status_for,
+)
+from .services import events, movements, name_index, sync
+from .services.alerts import deliver_low_stock_alerts
+from .services.forecasting import croston_sba, forecast_matrix, holt_linear, products_to_refit, refit_forecasts
+from .services.images import generate_variants, source_hash
+from .services.inventory_totals import read_totals, rebuild_inventory_totals, totals_version
+from .services.reorder import build_reorder_report, reorder_for, report_rows
+from .services.sales_import import import_sales_history
+from .services.sales_rollups import rebuild_sales_rollups
+from .services.sales_stats import rebuild_sales_stats, sync_average_daily_sales
+from .services.stock import apply_stock_delta, restock_to_threshold, set_stock_quantity
+from .views import StockHistoryViewSet
+
+
+class ListQueryCountTests(QueryBudgetMixin, TestCase):
+    """
+    Pin the number of queries the list endpoints run, so a new nested field
+    that is not covered by select_related shows up as a failing test.
+    """
+    PRODUCTS = 1000
+    PAGE_SIZE = 500  # KeysetPagination.max_page_size
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user("staff@example.com", "Staff", "User", "pw")
+        categories = Category.objects.bulk_create([Category(name=f"Category {i}") for i in range(10)])
+        products = Product.objects.bulk_create([
+            Product(sku=f"SKU-{i:04d}", name=f"Product {i:04d}", category=categories[i % 10])
+            for i in range(cls.PRODUCTS)
+        ])
+        # bulk_create skips the post_save signal, so create inventories explicitly
+        Inventory.objects.bulk_create([
+            Inventory(product=p, stock_in=50, stock_out=i % 50, total_stock=50 - i % 50)
+            for i, p in enumerate(products)
+        ])
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def _walk(self, url):
+        """Fetch every page of ``url``; each page must cost one count + one select."""
+        rows, url = [], f"{url}?page_size={self.PAGE_SIZE}"
+        while url:
+            with self.assertNumQueries(2), self.assertQueryBudget(2):
+                response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            rows.extend(response.data["results"])
+            url = response.data["next"]
+        return rows
+
+    def test_product_list(self):
+        rows = self._walk("/api/products/")
+        self.assertEqual(len(rows), self.PRODUCTS)
+        self.assertTrue(all(row["category"] and row["inventory"] for row in rows))
+
+    def test_inventory_list(self):
+        rows = self._walk("/api/inventory/")
+        self.assertEqual(len(rows), self.PRODUCTS)
+        self.assertTrue(all(row["product"]["inventory"] for row in rows))
+
+    def test_product_detail_by_sku(self):
+        with self.assertNumQueries(1):
+            response = self.client.get("/api/products/SKU-0042/")
+        self.assertEqual(response.data["category"], "Category 2")
+        self.assertEqual(response.data["inventory"]["total_stock"], 8)
+
+    @override_settings(DEBUG=True)
+    def test_query_headers_in_debug(self):
+        response = self.client.get("/api/products/?page_size=10")
+        self.assertEqual(response["X-DB-Query-Count"], "2")
+        self.assertEqual(response["X-DB-Duplicate-Queries"], "0/1")
+        self.assertIn("X-DB-Time-Ms", response)
+
+    @override_settings(DEBUG=False, QUERY_BUDGET_WARN_QUERIES=1)
+    def test_over_budget_request_logged(self):
+        with self.assertLogs("backend.middleware", "WARNING") as logs:
+            response = self.client.get("/api/products/?page_size=10")
+        self.assertNotIn("X-DB-Query-Count", response)
+        self.assertIn("GET /api/products/ -> 200: 2 queries", logs.output[0])
+
+    @override_settings(DEBUG=False)
+    def test_requests_under_budget_are_only_counted(self):
+        with mock.patch("backend.middleware.fingerprint") as fingerprinted, \
+                mock.patch("backend.middleware.QueryStats.record", autospec=True,
+                           side_effect=QueryStats.record) as recorded:
+            self.client.get("/api/products/?page_size=10")
+        fingerprinted.assert_not_called()
+        stats = recorded.call_args.args[0]
+        self.assertEqual((stats.count, stats.statements), (2, None))
+
+    def test_fingerprint_ignores_literals(self):
+        self.assertEqual(
+            fingerprint("SELECT * FROM t WHERE id IN (%s, %s, %s) AND name = 'x'"),
+            fingerprint("SELECT *  FROM t WHERE id IN (%s) AND name = 'y'"),
+        )
+
+
+class KeysetPaginationTests(TestCase):
+    NAMES = ["Alpha", "Beta", "Alpha", "Gamma", "Beta", "Alpha", "Gamma"]  # Ties on name
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user("pages@example.com", "Pages", "User", "pw")
+        cls.products = [Product.objects.create(sku=f"KP-{i}", name=name) for i, name in enumerate(cls.NAMES)]
+        # Two rows share each updated_at, so the cursor has to break ties on id
+        stamp = timezone.now()
+        for i, product in enumerate(cls.products):
+            Product.objects.filter(pk=product.pk).update(updated_at=stamp - timedelta(minutes=i // 2))
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def _pages(self, url, link="next"):
+        pages = []
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            pages.append([row["sku"] for row in response.data["results"]])
+            url = response.data[link]
+        return pages, response
+
+    def _round_trip(self, ordering, expected):
+        pages, last = self._pages(f"/api/products/?ordering={ordering}&page_size=2")
+        self.assertEqual([sku for page in pages for sku in page], expected)
+        self.assertEqual([len(page) for page in pages], [2, 2, 2, 1])
+        self.assertIsNone(last.data["next"])
+
+        # Walk back from the last page: the same pages, in reverse
+        back, first = self._pages(last.data["previous"], link="previous")
+        self.assertEqual(back, pages[-2::-1])
+        self.assertIsNone(first.data["previous"])
+
+    def test_name_ordering_round_trips_through_ties(self):
+        expected = [p.sku for p in sorted(self.products, key=lambda p: (p.name, p.pk))]
+        self._round_trip("name", expected)
+        self._round_trip("-name", [p.sku for p in sorted(self.products, key=lambda p: (p.name, p.pk), reverse=True)])
+
+    def test_updated_at_ordering_round_trips_through_ties(self):
+        rows = Product.objects.filter(sku__startswith="KP-").values_list("sku", "updated_at", "pk")
+        expected = [sku for sku, _, _ in sorted(rows, key=lambda row: (row[1], row[2]), reverse=True)]
+        self._round_trip("-updated_at", expected)
+
+    def test_invalid_cursor_is_not_found(self):
+        bad_date = base64.urlsafe_b64encode(b'{"v":"not-a-date","k":1,"r":0}').decode("ascii")
+        for params in ({"cursor": "garbage"}, {"cursor": bad_date, "ordering": "updated_at"}):
+            self.assertEqual(self.client.get("/api/products/", params).status_code, 404)
+
+    def test_page_size_is_capped_and_total_estimated(self):
+        products = Product.objects.bulk_create([Product(sku=f"KP-X{i}", name=f"Extra {i}") for i in range(500)])
+        Inventory.objects.bulk_create([Inventory(product=p) for p in products])
+        response = self.client.get("/api/products/", {"page_size": 10000})
+        self.assertEqual(len(response.data["results"]), 500)
+        self.assertIsNotNone(response.data["next"])
+        self.assertEqual(response["X-Total-Count-Estimate"], "507")  # Exact COUNT(*) off PostgreSQL
+
+        self.assertEqual(len(self.client.get("/api/products/", {"page_size": 0}).data["results"]), 1)
+        response = self.client.get("/api/products/", {"category": "none"})
+        self.assertEqual((response.data["results"], response["X-Total-Count-Estimate"]), ([], "0"))
+
+
+class ProductSearchTests(TestCase):
+    """SQLite fallback ranking: exact SKU > name prefix > any other match."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user("search@example.com", "Search", "User", "pw")
+        cups = Category.objects.create(name="Cups & Mugs")
+        for sku, name, category in (
+            ("PS-1", "Paper cup", None),
+            ("CUP", "Ceramic mug", None),
+            ("PS-2", "Bowl", cups),
+            ("PS-3", "Cup holder", None),
+            ("PS-4", "Plate", None),
+            ("PS-5", "Saucer", cups),
+            ("PS-6", "Teacup", None),
+        ):
+            Product.objects.create(sku=sku, name=name, category=category)
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def _get(self, url="/api/products/", **params):
+        response = self.client.get(url, params)
+        self.assertEqual(response.status_code, 200)
+        return [row["sku"] for row in response.data["results"]], response.data
+
+    def test_exact_sku_then_name_prefix_then_other_matches(self):
+        # Equal ranks fall back to the newest first (-id)
+        self.assertEqual(self._get(search="cup")[0], ["CUP", "PS-3", "PS-6", "PS-5", "PS-2", "PS-1"])
+
+    def test_ordering_param_overrides_rank(self):
+        self.assertEqual(self._get(search="cup", ordering="name")[0], ["PS-2", "CUP", "PS-3", "PS-1", "PS-5", "PS-6"])
+
+    def test_rank_cursor_pages_through_ties(self):
+        pages, data = [], {"next": "/api/products/?search=cup&page_size=2"}
+        while data["next"]:
+            skus, data = self._get(data["next"])
+            pages.append(skus)
+        self.assertEqual(pages, [["CUP", "PS-3"], ["PS-6", "PS-5"], ["PS-2", "PS-1"]])
+        self.assertEqual(self._get(data["previous"])[0], pages[1])
+
+
+class BulkAdjustTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user("bulk@example.com", "Bulk", "User", "pw")
+        for sku, stock in (("BULK-1", 10), ("BULK-2", 3)):
+            inventory = Product.objects.create(sku=sku, name=sku).inventory
+            inventory.stock_in = stock
+            inventory.save()
+        Product.objects.create(sku="BULK-3", name="No stock yet").inventory.delete()
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def _post(self, rows):
+        return self.client.post("/api/inventory/bulk-adjust/", rows, format="json")
+
+    def _stock(self, sku):
+        return Inventory.objects.get(product__sku=sku).total_stock
+
+    def test_rows_apply_in_order_with_per_row_results(self):
+        response = self._post([
+            {"sku": "BULK-1", "quantity": 4},
+            {"sku": "BULK-1", "delta": 6, "kind": "receipt", "reference": "PO-1"},
+            {"sku": "BULK-2", "delta": -5},
+            {"sku": "NOPE", "delta": 1},
+            {"sku": "BULK-3", "delta": 2},
+        ])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual((response.data["updated"], response.data["failed"]), (3, 2))
+        results = response.data["results"]
+        self.assertEqual([r["status"] for r in results], ["ok", "ok", "error", "error", "ok"])
+        self.assertEqual((results[1]["previous_stock"], results[1]["total_stock"]), (4, 10))
+        self.assertIn("Insufficient stock", results[2]["error"])
+
+        self.assertEqual([self._stock(sku) for sku in ("BULK-1", "BULK-2", "BULK-3")], [10, 3, 2])
+        self.assertEqual(
+            list(StockMovement.objects.filter(product__sku="BULK-1", reference__in=["bulk-adjust", "PO-1"])
+                 .order_by("id").values_list("kind", "quantity", "reference")),
+            [("adjustment", -6, "bulk-adjust"), ("receipt", 6, "PO-1")],
+        )
+        self.assertEqual(read_totals().total_stock, 15)
+        self.assertEqual(movements.stock_drift(), [])
+
+    def test_invalid_rows_are_rejected_before_any_write(self):
+        response = self._post([{"sku": "BULK-1", "quantity": 1}, {"sku": "BULK-2", "quantity": 1, "delta": 1}])
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(self._stock("BULK-1"), 10)
+
+
+class StockDeltaTests(TestCase):
+    def setUp(self):
+        self.product = Product.objects.create(sku="DELTA-1", name="Delta")
+        set_stock_quantity(self.product, 8)
+
+    def test_delta_updates_counters_status_and_ledger(self):
+        inventory = apply_stock_delta(self.product, -6, kind="sale", reference="SO-1")
+        self.assertEqual((inventory.stock_in, inventory.stock_out, inventory.total_stock), (8, 6, 2))
+        self.assertEqual(inventory.stock_status, stock_status_for(2, inventory.low_stock_threshold))
+        self.assertEqual(Inventory.objects.get(pk=inventory.pk).total_stock, 2)
+        movement = StockMovement.objects.filter(product=self.product).latest("id")
+        self.assertEqual((movement.kind, movement.quantity, movement.reference), ("sale", -6, "SO-1"))
+        self.assertEqual(read_totals().total_stock, 2)
+
+        self.assertEqual(apply_stock_delta(self.product, 5).total_stock, 7)
+
+    def test_removal_beyond_stock_on_hand_is_rejected(self):
+        movements_before = StockMovement.objects.count()
+        with self.assertRaisesMessage(ValueError, "Insufficient stock: 8 on hand, delta -9."):
+            apply_stock_delta(self.product, -9)
+        inventory = Inventory.objects.get(product=self.product)
+        self.assertEqual((inventory.stock_out, inventory.total_stock), (0, 8))
+        self.assertEqual(StockMovement.objects.count(), movements_before)
+        self.assertEqual(read_totals().total_stock, 8)
+
+
+class NameIndexPatchTests(TestCase):
+    ROWS = [
+        (1, "CB-001", "Coffee Blend", "Coffee"),
+        (2, "CB-002", "Coffee Beans Dark", "Coffee"),
+        (3, "TEA-001", "Green Tea", "Tea"),
+        (4, "MUG-001", "Travel Mug", "Kitchen"),
+    ]
+
+    def test_patched_index_answers_like_a_full_build(self):
+        changed = [(2, "CB-002", "Espresso Beans", "Coffee"), (5, "MUG-002", "Travel Mug Large", "Kitchen")]
+        patched = name_index.ProductNameIndex(self.ROWS).patch([2, 3, 5], changed, version=1)
+        full = name_index.ProductNameIndex([self.ROWS[0], changed[0], self.ROWS[3], changed[1]])
+
+        self.assertEqual(len(patched), len(full))
+        for query in ("coffee", "espresso", "dark", "green tea", "travel mug", "trvel mgu", "CB-00"):
+            self.assertEqual(
+                [(m.product_id, m.match) for m in patched.search(query)],
+                [(m.product_id, m.match) for m in full.search(query)],
+                query,
+            )
+        self.assertEqual(sorted(patched.category_names()), ["coffee", "kitchen"])
+        self.assertIsNone(patched.first_product_in_category("tea"))
+
+    def test_lookups_patch_logged_changes(self):
+        product = Product.objects.create(sku="IDX-1", name="Walnut Shelf")
+        version = 1
+        name_index.NAME_INDEX_CACHE.set(name_index.VERSION_CACHE_KEY, version, None)
+        self.addCleanup(setattr, name_index, "_index", None)
+        name_index._index = name_index.ProductNameIndex.from_database(version)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            product.name = "Oak Shelf"
+            product.save()
+        with mock.patch.object(name_index.ProductNameIndex, "from_database") as full_build:
+            index = name_index.get_name_index()
+        full_build.assert_not_called()
+        self.assertIsInstance(index, name_index.PatchedNameIndex)
+        self.assertEqual(index.best_match("oak shelf").product_id, product.pk)
+        self.assertIsNone(index.best_match("walnut"))
+
+
+class StockEventBusTests(TestCase):
+    def test_postgres_bus_publishes_only_while_someone_listens(self):
+        bus = events.PostgresBus()
+        with mock.patch.object(events.PostgresBus, "_listeners_active", return_value=False) as active:
+            self.assertFalse(bus.wanted())
+            self.assertFalse(bus.wanted())
+            self.assertEqual(active.call_count, 1)
+
+            active.return_value = True
+            later = events.time.monotonic() + events.LISTENER_CHECK_SECONDS
+            with mock.patch.object(events.time, "monotonic", return_value=later):
+                self.assertTrue(bus.wanted())
+            self.assertEqual(active.call_count, 2)
+
+
+class StockEventStreamTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user("events@example.com", "Events", "User", "pw")
+        tea, coffee = Category.objects.create(name="Tea"), Category.objects.create(name="Coffee")
+        for sku, category in (("EV-1", tea), ("EV-2", tea), ("EV-3", coffee)):
+            set_stock_quantity(Product.objects.create(sku=sku, name=sku, category=category), 50)
+        cls.token = str(AccessToken.for_user(cls.user))
+
+    def setUp(self):
+        # Streams of this test only, on the in-process bus
+        for name, value in (("_subscriptions", set()), ("_bus", events.MemoryBus())):
+            patcher = mock.patch.object(events, name, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def _set_stock(self, sku, quantity):
+        with self.captureOnCommitCallbacks(execute=True):  # Events go out on commit
+            set_stock_quantity(Product.objects.get(sku=sku), quantity)
+
+    async def _open(self, query, **headers):
+        response = await self.async_client.get(f"/api/stock/events/{query}", headers=headers)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["Content-Type"], "text/event-stream")
+        self.assertTrue((await self._read(response)).startswith("retry: "))  # Subscribed from here on
+        return response
+
+    async def _read(self, response):
+        return (await asyncio.wait_for(anext(response.streaming_content), 5)).decode("utf-8")
+
+    @staticmethod
+    def _events(chunk):
+        frames = [frame.split("\n") for frame in chunk.split("\n\n") if frame]
+        return [(kind.removeprefix("event: "), json.loads(data.removeprefix("data: "))) for kind, data in frames]
+
+    async def test_filtered_events_arrive_after_commit(self):
+        response = await self._open(f"?access_token={self.token}&category=tea&sku=EV-2,EV-3")
+        await sync_to_async(self._set_stock)("EV-1", 40)  # Tea, but not a listed SKU
+        await sync_to_async(self._set_stock)("EV-3", 40)  # Listed SKU, but coffee
+        await sync_to_async(self._set_stock)("EV-2", 5)
+
+        received = self._events(await self._read(response))
+        self.assertEqual([kind for kind, _ in received], ["stock_change", "low_stock"])
+        changes = {(event["sku"], event["total_stock"], event["delta"]) for _, event in received}
+        self.assertEqual(changes, {("EV-2", 5, -45)})
+        await response.streaming_content.aclose()
+
+    async def test_slow_reader_gets_resync_and_is_dropped(self):
+        response = await self._open("?sku=EV-1", Authorization=f"Bearer {self.token}")
+        flood = [{"type": "stock_change", "sku": "EV-1", "category_id": None, "total_stock": i}
+                 for i in range(events.MAX_QUEUED_EVENTS + 10)]
+        events.dispatch(flood)
+
+        received = self._events(await self._read(response))
+        self.assertEqual(len(received), events.MAX_QUEUED_EVENTS + 1)
+        self.assertEqual(received[-1][0], "resync")
+        with self.assertRaises(StopAsyncIteration):
+            await self._read(response)
+        self.assertFalse(events.has_subscribers())
+
+    async def test_rejected_streams(self):
+        for query, headers, status in (
+            ("", {}, 401),
+            ("?access_token=not-a-token", {}, 401),
+            ("?category=Nope", {"Authorization": f"Bearer {self.token}"}, 400),
+        ):
+            response = await self.async_client.get(f"/api/stock/events/{query}", headers=headers)
+            self.assertEqual(response.status_code, status, query)
+
+    def test_wsgi_is_refused(self):
+        response = self.client.get("/api/stock/events/", headers={"Authorization": f"Bearer {self.token}"})
+        self.assertEqual(response.status_code, 501)
+
+
+class ReorderHorizonTests(TestCase):
+    def test_slow_mover_has_no_order_by_date(self):
+        self.assertEqual(reorder_for(5000, 0.0015, 3), {"reorder_point": 1, "must_order_by": None})
+
+        inventory = Product.objects.create(sku="SLOW-1", name="Slow mover").inventory
+        inventory.stock_in = 50000
+        inventory.average_daily_sales = Decimal("0.01")
+        inventory.save()
+        rows = report_rows(build_reorder_report())
+        self.assertEqual([(row["sku"], row["must_order_by"]) for row in rows], [("SLOW-1", None)])
+
+
+class LowStockThresholdTests(TestCase):
+    def test_alerts_and_restock_agree_with_stock_status(self):
+        product = Product.objects.create(sku="EDGE-1", name="At threshold")
+        set_stock_quantity(product, 10)  # Default threshold is 10: low_stock
+        inventory = Inventory.objects.get(product=product)
+        self.assertEqual(inventory.stock_status, "low_stock")
+        self.assertTrue(LowStockAlert.objects.filter(product=product).exists())
+
+        self.assertEqual(restock_to_threshold(Product.objects.filter(pk=product.pk)), 1)
+        inventory.refresh_from_db()
+        self.assertEqual((inventory.total_stock, inventory.stock_status), (11, "in_stock"))
+        self.assertEqual(restock_to_threshold(Product.objects.filter(pk=product.pk)), 0)
+
+    def test_status_filter_uses_each_inventorys_threshold(self):
+        for sku, threshold in (("EDGE-10", 10), ("EDGE-20", 20)):
+            product = Product.objects.create(sku=sku, name=sku)
+            Inventory.objects.filter(product=product).update(low_stock_threshold=threshold)
+            set_stock_quantity(product, 15)
+
+        client = APIClient()
+        client.force_authenticate(User.objects.create_user("status@example.com", "Status", "User", "pw"))
+        for status, skus in (("in_stock", ["EDGE-10"]), ("low_stock", ["EDGE-20"]), ("out_of_stock", [])):
+            response = client.get("/api/products/", {"status": status})
+            self.assertEqual([row["sku"] for row in response.data["results"]], skus)
+        response = client.get("/api/products/", {"status": "bogus"})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("status", response.data)
+
+
+class InventoryTotalsShardTests(TestCase):
+    def _stock(self, sku, stock, shard):
+        with mock.patch("product_app.services.inventory_totals._shard", return_value=shard):
+            inventory = Product.objects.create(sku=sku, name=sku).inventory
+            inventory.stock_in = stock
+            inventory.save()
+
+    def test_shards_are_summed_and_rebuild_collapses_drift(self):
+        self._stock("SHARD-1", 5, shard=3)
+        self._stock("SHARD-2", 7, shard=11)
+        shards = InventoryTotals.objects.filter(key=InventoryTotals.GLOBAL_KEY).values_list("shard", flat=True)
+        self.assertTrue({3, 11} <= set(shards))
+        totals = read_totals()
+        self.assertEqual((totals.product_count, totals.total_stock), (2, 12))
+        self.assertEqual(rebuild_inventory_totals(), [])
+
+        version = totals_version()
+        InventoryTotals.objects.filter(key=InventoryTotals.GLOBAL_KEY, shard=3).update(total_stock=500)
+        self.assertEqual(rebuild_inventory_totals(), [InventoryTotals.GLOBAL_KEY])
+        self.assertEqual(
+            list(InventoryTotals.objects.filter(key=InventoryTotals.GLOBAL_KEY).values_list("shard", "total_stock")),
+            [(0, 12)],
+        )
+        self.assertGreater(totals_version(), version)
+
+
+class DeltaSyncTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user("sync@example.com", "Sync", "User", "pw")
+        for sku in ("SYNC-1", "SYNC-2", "SYNC-3"):
+            Product.objects.create(sku=sku, name=sku)
+        # Older than SYNC_LAG, so a drained stream does not send them again
+        an_hour_ago = timezone.now() - timedelta(hours=1)
+        Product.objects.update(updated_at=an_hour_ago)
+        Inventory.objects.update(updated_at=an_hour_ago)
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def _sync(self, token=None, page_size=1):
+        """Follow ``has_more`` to the end; returns (products, inventories, deleted, token)."""
+        products, inventories, deleted = [], [], []
+        while True:
+            params = {"page_size": page_size, **({"since": token} if token else {})}
+            response = self.client.get("/api/sync/", params)
+            self.assertEqual(response.status_code, 200)
+            products += [row["sku"] for row in response.data["products"]]
+            inventories += [row["sku"] for row in response.data["inventories"]]
+            deleted += [(row["kind"], row["sku"]) for row in response.data["deleted"]]
+            token = response.data["token"]
+            if not response.data["has_more"]:
+                return products, inventories, deleted, token
+
+    def test_token_round_trip_sends_changes_and_tombstones(self):
+        products, inventories, deleted, token = self._sync()
+        self.assertEqual(sorted(products), ["SYNC-1", "SYNC-2", "SYNC-3"])
+        self.assertEqual(sorted(inventories), ["SYNC-1", "SYNC-2", "SYNC-3"])
+        self.assertEqual(deleted, [])
+        self.assertEqual(self._sync(token)[:3], ([], [], []))
+
+        Product.objects.get(sku="SYNC-1").delete()
+        renamed = Product.objects.get(sku="SYNC-2")
+        renamed.name = "Renamed"
+        renamed.save()
+
+        # Rows changed within SYNC_LAG may repeat across pages; clients upsert them
+        products, inventories, deleted, _ = self._sync(token)
+        self.assertEqual(set(products), {"SYNC-2"})
+        self.assertEqual(inventories, [])
+        self.assertEqual(sorted(deleted), [("inventory", "SYNC-1"), ("product", "SYNC-1")])
+
+    def test_bad_and_expired_tokens(self):
+        response = self.client.get("/api/sync/", {"since": "not-a-token"})
+        self.assertEqual(response.status_code, 400)
+
+        old = timezone.now() - sync.TOMBSTONE_RETENTION - timedelta(days=1)
+        token = sync.encode_token({stream: (old, 0) for stream in sync.STREAMS})
+        response = self.client.get("/api/sync/", {"since": token})
+        self.assertEqual((response.status_code, response.data["code"]), (410, "full_sync_required"))
+
+
+class CatalogRoundTripTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user("catalog@example.com", "Catalog", "User", "pw")
+        coffee = Category.objects.create(name="Coffee")
+        acme = Supplier.objects.create(name="Acme")
+        for sku, name, category, supplier, stock_in in (
+            ("RT-1", "House Blend", coffee, acme, 20),
+            ("RT-2", "Paper Filters", None, None, 4),
+        ):
+            inventory = Product.objects.create(sku=sku, name=name, category=category, supplier=supplier).inventory
+            inventory.stock_in = stock_in
+            inventory.save()
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def _export(self, fmt="csv"):
+        response = self.client.get("/api/products/export/", {"file_format": fmt})
+        self.assertEqual(response.status_code, 200)
+        return b"".join(response.streaming_content)
+
+    def _import(self, content, filename="catalog.csv"):
+        upload = io.BytesIO(content)
+        upload.name = filename
+        response = self.client.post("/api/products/import/", {"file": upload}, format="multipart")
+        self.assertEqual(response.status_code, 200, response.data)
+        return response.data
+
+    def test_csv_export_imports_back_unchanged_then_applies_edits(self):
+        exported = self._export().decode("utf-8")
+        self.assertIn("RT-1,House Blend,,Coffee,Acme,,20,0,10,20,in_stock", exported)
+        report = self._import(exported.encode("utf-8"))
+        self.assertEqual((report["created"], report["updated"], report["unchanged"]), (0, 0, 2))
+
+        edited = exported.replace("RT-1,House Blend,,Coffee,Acme,,20,0,10,20,", "RT-1,House Blend,,Coffee,Acme,,25,0,10,25,")
+        edited += "RT-3,Cold Brew,,Cold Drinks,Acme,,6,1,10,5,low_stock\r\n"
+        report = self._import(edited.encode("utf-8"))
+        # RT-1's product fields are unchanged; only its inventory is updated
+        self.assertEqual((report["created"], report["updated"], report["unchanged"]), (1, 0, 2))
+        self.assertEqual(report["inventories"], {"created": 1, "updated": 1})
+        self.assertEqual(report["categories_created"], 1)
+
+        self.assertEqual(self._export().decode("utf-8"), edited)
+        movement = StockMovement.objects.filter(product__sku="RT-1").latest("id")
+        self.assertEqual((movement.quantity, movement.reference), (5, "catalog-import"))
+        self.assertEqual(read_totals().total_stock, 25 + 4 + 5)
+        self.assertEqual(movements.stock_drift(), [])
+
+    def test_xlsx_export_imports_back_unchanged(self):
+        report = self._import(self._export("xlsx"), "catalog.xlsx")
+        self.assertEqual((report["created"], report["updated"], report["unchanged"]), (0, 0, 2))
+        self.assertEqual(report["rejected"], dict.fromkeys(report["rejected"], 0))
+
+
+class SalesStatsSyncTests(TestCase):
+    def test_rebuild_leaves_unchanged_averages_alone(self):
+        selling = Product.objects.create(sku="AVG-1", name="Selling")
+        idle = Product.objects.create(sku="AVG-2", name="Idle")
+        SalesHistory.objects.create(product=selling, date=timezone.localdate() - timedelta(days=1), units_sold=30)
+        self.assertEqual(Inventory.objects.get(product=selling).average_daily_sales, 30)  # Per sales day
+
+        before = dict(Inventory.objects.values_list("product_id", "updated_at"))
+        rebuild_sales_stats()
+        self.assertEqual(sync_average_daily_sales(), 0)
+        self.assertEqual(dict(Inventory.objects.values_list("product_id", "updated_at")), before)
+
+        SalesHistory.objects.create(product=selling, date=timezone.localdate() - timedelta(days=2), units_sold=15)
+        after = dict(Inventory.objects.values_list("product_id", "updated_at"))
+        self.assertGreater(after[selling.pk], before[selling.pk])
+        self.assertEqual(after[idle.pk], before[idle.pk])
+
+
+class SalesImportTests(TestCase):
+    """Runs the portable bulk_create loader (the COPY path needs PostgreSQL)."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user("sales@example.com", "Sales", "User", "pw")
+        cls.category = Category.objects.create(name="Tea")
+        cls.green = Product.objects.create(sku="SI-1", name="Green Tea", category=cls.category)
+        cls.black = Product.objects.create(sku="SI-2", name="Black Tea", category=cls.category)
+        today = timezone.localdate()
+        cls.day1, cls.day2 = (today - timedelta(days=1)).isoformat(), (today - timedelta(days=2)).isoformat()
+
+    def _import(self, text, fmt="csv"):
+        return import_sales_history(io.BytesIO(text.encode("utf-8")), fmt)
+
+    def _derived(self):
+        """SalesStats and rollup rows, to compare the merged deltas against a rebuild."""
+        rollup = ("grain", "period_start", "units_sold", "sales_days")
+        return (
+            sorted(SalesStats.objects.values_list("product_id", "units_7d", "days_7d", "units_30d", "days_30d")),
+            sorted(ProductSalesRollup.objects.values_list("product_id", *rollup)),
+            sorted(CategorySalesRollup.objects.values_list("category_id", *rollup)),
+        )
+
+    def test_report_counts_rejects_and_keeps_the_last_duplicate(self):
+        report = self._import(
+            "sku,date,units_sold\n"
+            f"SI-1,{self.day1},5\n"
+            f"SI-1,{self.day1},7\n"  # Same (sku, date): last row wins
+            f"SI-2,{self.day2},3\n"
+            f"NOPE,{self.day1},1\n"
+            "SI-1,2024-13-01,1\n"
+            f"SI-1,{self.day2},1.5\n"
+            f"SI-1,{self.day2},2147483648\n"
+            f"SI-1,{self.day2}\n"
+        )
+        self.assertEqual(
+            (report["rows_read"], report["inserted"], report["updated"], report["unchanged"]), (8, 2, 0, 0)
+        )
+        self.assertEqual(
+            report["rejected"], {"malformed": 1, "unknown_sku": 1, "invalid_date": 1, "invalid_units": 2}
+        )
+        self.assertEqual(report["errors"][0], "line 5: unknown SKU 'NOPE'")
+        self.assertEqual(
+            sorted(SalesHistory.objects.values_list("product__sku", "units_sold")), [("SI-1", 7), ("SI-2", 3)]
+        )
+
+    def test_ndjson_units_must_be_whole_numbers(self):
+        report = self._import("\n".join([
+            f'{{"sku": "SI-1", "date": "{self.day1}", "units_sold": 4}}',
+            f'{{"sku": "SI-2", "date": "{self.day1}", "units_sold": "6"}}',
+            f'{{"sku": "SI-1", "date": "{self.day2}", "units_sold": 1.5}}',
+            f'{{"sku": "SI-2", "date": "{self.day2}", "units_sold": true}}',
+            "not json",
+        ]), "ndjson")
+        rejected = report["rejected"]
+        self.assertEqual((report["inserted"], rejected["invalid_units"], rejected["malformed"]), (2, 2, 1))
+        self.assertEqual(
+            sorted(SalesHistory.objects.values_list("product__sku", "units_sold")), [("SI-1", 4), ("SI-2", 6)]
+        )
+
+    def test_reimport_applies_only_the_changed_rows_deltas(self):
+        self._import(f"sku,date,units_sold\nSI-1,{self.day1},5\nSI-2,{self.day2},3\n")
+        stats = SalesStats.objects.get(product=self.green)
+        self.assertEqual((stats.units_7d, stats.days_7d), (5, 1))
+
+        report = self._import(f"sku,date,units_sold\nSI-1,{self.day1},8\nSI-2,{self.day2},3\n")
+        self.assertEqual((report["inserted"], report["updated"], report["unchanged"]), (0, 1, 1))
+        stats.refresh_from_db()
+        self.assertEqual((stats.units_7d, stats.days_7d), (8, 1))
+        monthly = CategorySalesRollup.objects.filter(category=self.category, grain="month")
+        self.assertEqual(monthly.aggregate(total=Sum("units_sold"))["total"], 11)
+
+        merged = self._derived()
+        rebuild_sales_stats()
+        rebuild_sales_rollups()
+        self.assertEqual(self._derived(), merged)
+
+    def test_command_and_endpoint(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "sales.ndjson")
+            with open(path, "w") as f:
+                f.write(f'{{"sku": "SI-1", "date": "{self.day1}", "units_sold": 2}}\n')
+            out = io.StringIO()
+            call_command("import_sales", path, stdout=out)
+            self.assertIn("1 inserted", out.getvalue())
+
+            with open(path, "wb") as f:
+                f.write(f"sku,date,units_sold\nSI-1,{self.day1},9\nSI-2,{self.day2},\xff\n".encode("latin-1"))
+            with self.assertRaisesMessage(CommandError, "line 3: not valid UTF-8"):
+                call_command("import_sales", path, "--format", "csv", stdout=io.StringIO())
+
+        client = APIClient()
+        client.force_authenticate(self.user)
+        upload = io.BytesIO(f"sku,date,units_sold\nSI-1,{self.day1},3\nSI-2,{self.day2},\xff\n".encode("latin-1"))
+        upload.name = "sales.csv"
+        response = client.post("/api/sales/import/", {"file": upload}, format="multipart")
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("line 3", response.data["error"])
+        self.assertEqual(SalesHistory.objects.get().units_sold, 2)  # The rejected file changed nothing
+
+        upload = io.BytesIO(f"sku,date,units_sold\nSI-1,{self.day1},3\n".encode("utf-8"))
+        upload.name = "sales.csv"
+        response = client.post("/api/sales/import/", {"file": upload}, format="multipart")
+        self.assertEqual(response.status_code, 200, response.data)
+        self.assertEqual(response.data["updated"], 1)
+
+
+class StockHistoryTests(TestCase):
+    START = date(2025, 1, 1)  # A Wednesday, so weeks and months start on different days
+
+    @classmethod
+    def setUpTestData(cls):
+        tea, coffee = Category.objects.create(name="Tea"), Category.objects.create(name="Coffee")
+        products = [
+            Product.objects.create(sku=sku, name=sku, category=category)
+            for sku, category in (("H-1", tea), ("H-2", tea), ("H-3", coffee))
+        ]
+        cls.rows = []  # (sku, category, date, units)
+        for k in range(30):
+            product, day = products[k % 3], cls.START + timedelta(days=3 * k)
+            SalesHistory.objects.create(product=product, date=day, units_sold=k + 1)
+            cls.rows.append((product.sku, product.category.name, day, k + 1))
+
+    def setUp(self):
+        self.client = APIClient()
+
+    def _raw(self, **params):
+        response = self.client.get("/api/stock/history/", {"page_size": 500, **params})
+        self.assertEqual(response.status_code, 200)
+        self.assertIsNone(response.data["next"])
+        return sorted((row["date"], row["units_sold"]) for row in response.data["results"])
+
+    def _grouped(self, **params):
+        response = self.client.get("/api/stock/history/", params)
+        self.assertEqual(response.status_code, 200, response.data)
+        return response.data["results"]
+
+    def test_date_sku_and_category_filters(self):
+        def expected(keep):
+            return sorted((day.isoformat(), units) for sku, cat, day, units in self.rows if keep(sku, cat, day))
+
+        self.assertEqual(self._raw(), expected(lambda *_: True))
+        self.assertEqual(
+            self._raw(date_from="2025-01-10", date_to="2025-02-03"),
+            expected(lambda sku, category, day: date(2025, 1, 10) <= day <= date(2025, 2, 3)),
+        )
+        self.assertEqual(self._raw(sku="H-1, H-3"), expected(lambda sku, *_: sku in ("H-1", "H-3")))
+        self.assertEqual(self._raw(category="tea"), expected(lambda sku, category, _: category == "Tea"))
+
+    def test_group_by_and_dates_are_validated(self):
+        for params in ({"group": "year"}, {"group": "week", "by": "supplier"}, {"date_from": "01/02/2025"}):
+            self.assertEqual(self.client.get("/api/stock/history/", params).status_code, 400, params)
+
+    def test_rollups_match_raw_buckets_for_aligned_bounds(self):
+        cases = [
+            {"group": "week", "date_from": "2025-01-06", "date_to": "2025-03-09"},  # Monday .. Sunday
+            {"group": "month", "date_from": "2025-01-01", "date_to": "2025-02-28"},
+            {"group": "month"},
+        ]
+        for case in cases:
+            for extra in ({"by": "product"}, {"by": "category"}, {"by": "category", "category": "Tea"},
+                          {"by": "product", "sku": "H-2"}, {"by": "category", "sku": "H-1,H-3"}):
+                params = {**case, **extra}
+                from_rollups = self._grouped(**params)
+                with mock.patch.object(StockHistoryViewSet, "_rollup_queryset", return_value=None):
+                    self.assertEqual(from_rollups, self._grouped(**params), params)
+                self.assertTrue(from_rollups, params)
+
+        january = [row for row in self._grouped(group="month", by="category") if row["period"] == "2025-01-01"]
+        tea_units = sum(units for _, category, day, units in self.rows if category == "Tea" and day.month == 1)
+        self.assertEqual([row["units_sold"] for row in january if row["name"] == "Tea"], [tea_units])
+
+    def test_unaligned_date_to_reads_raw_rows(self):
+        ProductSalesRollup.objects.update(units_sold=0)  # Only a read of the rollups would see this
+        CategorySalesRollup.objects.update(units_sold=0)
+        aligned = self._grouped(group="month", by="product", date_to="2025-01-31")
+        self.assertEqual({row["units_sold"] for row in aligned}, {0})
+
+        unaligned = self._grouped(group="month", by="product", date_to="2025-01-30")
+        expected = sum(units for *_, day, units in self.rows if day <= date(2025, 1, 30))
+        self.assertEqual(sum(row["units_sold"] for row in unaligned), expected)
+
+
+class DemandForecastTests(TestCase):
+    DAYS = 28
+
+    def test_methods_are_picked_per_series(self):
+        intermittent = np.zeros(self.DAYS)
+        intermittent[3::4] = 4  # 4 units every 4th day
+        demand = np.array([intermittent, np.full(self.DAYS, 5.0), np.arange(1.0, self.DAYS + 1), np.zeros(self.DAYS)])
+
+        result = forecast_matrix(demand)
+        self.assertEqual(list(result["method"]), ["croston", "holt", "holt", "none"])
+        self.assertEqual(list(result["history_days"]), [7, self.DAYS, self.DAYS, 0])
+        # Croston: size 4, interval 4, SBA factor (1 - alpha / 2)
+        self.assertAlmostEqual(result["daily_rate"][0], 0.95)
+        self.assertAlmostEqual(result["forecast_30d"][0], 0.95 * 30)
+        self.assertEqual(result["daily_trend"][0], 0)
+        # Holt on a flat series: level 5, no trend
+        self.assertAlmostEqual(result["daily_rate"][1], 5)
+        self.assertAlmostEqual(result["forecast_30d"][1], 150)
+        self.assertGreater(result["daily_trend"][2], 0)
+        self.assertEqual((result["daily_rate"][3], result["forecast_30d"][3]), (0, 0))
+
+        level, trend = holt_linear(demand[1:2])
+        self.assertAlmostEqual(level[0], 5)
+        self.assertAlmostEqual(trend[0], 0)
+
+    def test_single_demand_is_spread_over_the_days_since(self):
+        demand = np.zeros((1, 10))
+        demand[0, 4] = 6
+        self.assertAlmostEqual(croston_sba(demand)[0], 0.95 * 6 / 6)
+        self.assertEqual(str(forecast_matrix(demand)["method"][0]), "croston")
+
+    def test_refit_only_touches_products_with_new_sales(self):
+        today = timezone.localdate()
+        steady = Product.objects.create(sku="FC-1", name="Steady")
+        changed = Product.objects.create(sku="FC-2", name="Changed")
+        for product in (steady, changed):
+            SalesHistory.objects.create(product=product, date=today - timedelta(days=2), units_sold=3)
+        self.assertEqual(refit_forecasts(through=today), 2)
+        self.assertEqual(products_to_refit(), [])
+        fitted = dict(DemandForecast.objects.values_list("product_id", "fitted_at"))
+
+        SalesHistory.objects.create(product=changed, date=today - timedelta(days=1), units_sold=5)
+        self.assertEqual(products_to_refit(), [changed.pk])
+        self.assertEqual(refit_forecasts(through=today), 1)
+        refitted = dict(DemandForecast.objects.values_list("product_id", "fitted_at"))
+        self.assertEqual(refitted[steady.pk], fitted[steady.pk])
+        self.assertGreater(refitted[changed.pk], fitted[changed.pk])
+        self.assertEqual(DemandForecast.objects.get(product=changed).history_days, 2)
+        self.assertEqual(sorted(products_to_refit(full=True)), [steady.pk, changed.pk])
+
+
+class ImageVariantTests(TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        settings = override_settings(MEDIA_ROOT=tmp.name)
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+    def _source(self, name, mode):
+        buffer = io.BytesIO()
+        Image.new(mode, (800, 400), (200, 40, 40, 128)[:len(mode)]).save(buffer, "PNG")
+        default_storage.save(f"products/{name}", io.BytesIO(buffer.getvalue()))
+        return f"products/{name}", buffer.getvalue()
+
+    def test_variants_are_content_hashed_and_written_once(self):
+        path, data = self._source("mug.png", "RGB")
+        product = Product.objects.create(sku="IMG-1", name="Mug", image_url=path)  # post_save builds variants
+        variants = Product.objects.get(pk=product.pk).image_variants
+        digest = source_hash(data)
+        self.assertEqual((variants["source"], variants["hash"], variants["fallback"]), (path, digest, "jpeg"))
+        thumb = variants["sizes"]["thumb"]
+        self.assertEqual(
+            (thumb["webp"], thumb["jpeg"], thumb["width"], thumb["height"]),
+            (f"products/variants/mug-thumb-{digest}.webp", f"products/variants/mug-thumb-{digest}.jpg", 128, 128),
+        )
+        small = variants["sizes"]["small"]
+        self.assertEqual((small["width"], small["height"]), (320, 160))  # Fits the box, keeps the aspect ratio
+        self.assertEqual(set(variants["sizes"]["original"]), {"width", "height", "webp"})
+
+        files = [
+            default_storage.path(size[fmt])
+            for size in variants["sizes"].values() for fmt in ("webp", "jpeg") if fmt in size
+        ]
+        for file in files:
+            os.utime(file, ns=(0, 0))
+        self.assertEqual(generate_variants(path), variants)
+        self.assertEqual({os.stat(file).st_mtime_ns for file in files}, {0})  # Same names, not rewritten
+
+    def test_alpha_falls_back_to_png(self):
+        path, _ = self._source("glass.png", "RGBA")
+        variants = generate_variants(path)
+        self.assertEqual(variants["fallback"], "png")
+        self.assertTrue(variants["sizes"]["small"]["png"].endswith(f"-small-{variants['hash']}.png"))
+        self.assertTrue(default_storage.exists(variants["sizes"]["small"]["png"]))
+
+    def test_image_size_param(self):
+        path, _ = self._source("bowl.png", "RGB")
+        Product.objects.create(sku="IMG-2", name="Bowl", image_url=path)
+        client = APIClient()
+        client.force_authenticate(User.objects.create_user("images@example.com", "Images", "User", "pw"))
+        image = client.get("/api/products/IMG-2/", {"image_size": "thumb"}).data["image"]
+        digest = Product.objects.get(sku="IMG-2").image_variants["hash"]
+        stem = f"/media/products/variants/bowl-thumb-{digest}"
+        self.assertEqual((image["url"], image["fallback_url"], image["width"]), (f"{stem}.webp", f"{stem}.jpg", 128))
+        response = client.get("/api/products/IMG-2/", {"image_size": "huge"})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("image_size", response.data)
+
+
+class AlertDeliveryTests(TestCase):
+    def test_partial_failure_retries_only_the_missing_recipients(self):
+        for email in ("a@example.com", "b@example.com"):
+            staff = User.objects.create_user(email, "Staff", "User", "pw")
+            staff.is_staff = True
+            staff.save()
+        inventory = Product.objects.create(sku="ALERT-1", name="Alerting").inventory
+        inventory.stock_in = 2
+        inventory.save()  # Below the default threshold: queues an alert
+        self.assertEqual(LowStockAlert.objects.count(), 1)
+
+        send = EmailBackend.send_messages
+
+        def fail_for_b(backend, messages):
+            if messages[0].to == ["b@example.com"]:
+                raise ConnectionError("SMTP dropped")
+            return send(backend, messages)
+
+        with mock.patch.object(EmailBackend, "send_messages", fail_for_b):
+            result = deliver_low_stock_alerts()
+        self.assertEqual((result["emails"], result["failed"]), (1, 1))
+        alert = LowStockAlert.objects.get()
+        self.assertEqual((alert.sent_at, alert.attempts, alert.delivered_to), (None, 1, ["a@example.com"]))
+        self.assertIsNone(alert.claimed_until)
+
+        result = deliver_low_stock_alerts()
+        self.assertEqual((result["emails"], result["failed"]), (1, 0))
+        self.assertEqual([message.to for message in mail.outbox], [["a@example.com"], ["b@example.com"]])
+        self.assertIsNotNone(LowStockAlert.objects.get().sent_at)
+        self.assertEqual(deliver_low_stock_alerts()["alerts"], 0)
+
+
+class StockLedgerTests(TestCase):
+    def setUp(self):
+        self.product = Product.objects.create(sku="LEDGER-1", name="Ledger")
+        self.inventory = self.product.inventory
+        self.inventory.stock_in = 40
+        self.inventory.save()
+
+    def _counters(self):
+        return Inventory.objects.filter(pk=self.inventory.pk).values_list("stock_in", "stock_out").get()
+
+    def test_late_commit_is_not_skipped(self):
+        self.assertEqual(movements.take_snapshots(), [self.product.pk])
+        # A long transaction: created_at from before the snapshot, committed after it
+        Inventory.objects.filter(pk=self.inventory.pk).update(stock_out=15, total_stock=25)
+        StockMovement.objects.create(product=self.product, quantity=-15, created_at=timezone.now() - timedelta(hours=1))
+
+        self.assertEqual(movements.ledger_totals([self.product.pk])[self.product.pk], (40, 15))
+        self.assertEqual(movements.take_snapshots(), [self.product.pk])
+        self.assertEqual(movements.stock_at(self.product.pk, timezone.now())["total_stock"], 25)
+        self.assertEqual(movements.stock_drift(), [])
+
+    def test_drift_is_reported_not_repaired(self):
+        # A bulk write that bypasses the ledger
+        Inventory.objects.filter(pk=self.inventory.pk).update(stock_in=100, total_stock=100)
+        out = io.StringIO()
+        call_command("snapshot_stock", check_all=True, stdout=out)
+        self.assertIn("LEDGER-1: 100 on hand, ledger 40", out.getvalue())
+        self.assertEqual(self._counters(), (100, 0))
+
+        self.assertEqual(movements.open_snapshots([self.product.pk]), 1)
+        self.assertEqual(movements.stock_drift(), [])
+
+
+class FixtureDataTests(TestCase):
+    def test_generated_rows_are_consistent_and_repeatable(self):
+        for prefix in ("FXA", "FXB"):
+            call_command("generate_fixture_data", products=30, sales_days=14, categories=3, suppliers=2,
+                         trends=5, seed=7, prefix=prefix, skip_derived=True, stdout=io.StringIO())
+
+        self.assertEqual(Product.objects.count(), 60)
+        self.assertEqual(SalesHistory.objects.count(), 60 * 14)
+        for inv in Inventory.objects.select_related("product"):
+            sold = inv.product.sales_history.aggregate(units=Sum("units_sold"))["units"]
+            self.assertEqual(inv.stock_out, sold)
+            self.assertEqual(inv.total_stock, inv.stock_in - inv.stock_out)
+            self.assertEqual(inv.stock_status, stock_status_for(inv.total_stock, inv.low_stock_threshold))
+
+        # Same seed, same rows: only the prefix differs
+        def sales(prefix):
+            return list(SalesHistory.objects.filter(product__sku__startswith=prefix)
+                        .order_by("product__sku", "date").values_list("date", "units_sold"))
+        self.assertEqual(sales("FXA-"), sales("FXB-"))
+
+        # Later ORM writes continue after the explicit ids
+        Product.objects.create(sku="AFTER-1", name="After")
+
+    def test_seeded_stock_survives_snapshots(self):
+        call_command("generate_fixture_data", products=20, sales_days=7, categories=2, suppliers=1,
+                     trends=2, seed=3, prefix="FXS", stdout=io.StringIO())
+        before = dict(Inventory.objects.values_list("product_id", "total_stock"))
+
+        out = io.StringIO()
+        call_command("snapshot_stock", "--check-all", stdout=out)
+        self.assertIn("Inventory counters match the ledger", out.getvalue())
+        self.assertEqual(dict(Inventory.objects.values_list("product_id", "total_stock")), before)
+        product_id, total = next(iter(before.items()))
+        self.assertEqual(movements.stock_at(product_id, timezone.now())["total_stock"], total)
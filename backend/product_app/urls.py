@@ -1,10 +1,16 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from .views import ProductViewSet, InventoryViewSet, StockHistoryViewSet
+from .views import (
+    ProductViewSet, InventoryViewSet, StockHistoryViewSet, SalesHistoryImportView, SyncView, stock_events_stream,
+)
 
 router = DefaultRouter()
 router.register(r"products", ProductViewSet, basename="product")
 router.register(r"inventory", InventoryViewSet, basename="inventory")
 router.register(r"stock/history", StockHistoryViewSet, basename="stock-history")
 
-urlpatterns = router.urls
+urlpatterns = router.urls + [
+    path("sales/import/", SalesHistoryImportView.as_view(), name="sales-import"),
+    path("sync/", SyncView.as_view(), name="sync"),
+    path("stock/events/", stock_events_stream, name="stock-events"),
+]
@@ -1,92 +1,652 @@
 from rest_framework import viewsets, status, filters, permissions
+from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
+from rest_framework.parsers import MultiPartParser
 from rest_framework.response import Response
-from django.db.models import Sum, Avg, Value, DecimalField, IntegerField
-from django.db.models.functions import Coalesce
+from rest_framework.views import APIView
+from datetime import datetime, time, timedelta
+import asyncio
+import json
+import os
+import tempfile
 
-from .models import Product, Inventory, SalesHistory
+from asgiref.sync import sync_to_async
+
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.db.models import Count, DateField, F, Q, Sum
+from django.db.models.functions import Trunc
+from django.http import FileResponse, JsonResponse, StreamingHttpResponse
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+from django.views.decorators.http import require_GET
+from django.views.static import serve
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+
+from .models import (
+    STOCK_STATUS_CHOICES,
+    Category,
+    CategorySalesRollup,
+    Inventory,
+    InventoryTotals,
+    Product,
+    ProductSalesRollup,
+    SalesHistory,
+    StockMovement,
+    Supplier,
+    rollup_period_start,
+)
 from .serializers import (
     ProductSerializer,
     ProductQuantityUpdateSerializer,
     InventorySerializer,
     InventorySummarySerializer,
+    InventorySyncSerializer,
     SalesHistorySerializer,
+    StockAdjustmentSerializer,
+    StockMovementSerializer,
+    TombstoneSerializer,
 )
+from .filters import ProductSearchFilter
+from .pagination import KeysetPagination
+from .services.inventory_totals import read_totals
+from .services.images import CACHE_CONTROL, IMAGE_SIZE_NAMES, VARIANT_DIR
+from .services import catalog
+from .services.events import MAX_QUEUED_EVENTS, Subscription, subscribe, unsubscribe
+from .services.movements import stock_at
+from .services.name_index import get_name_index
+from .services.reorder import due_mask, get_reorder_report, report_rows, supplier_mask
+from .services.sales_import import SUPPORTED_FORMATS, detect_format, import_sales_history
+from .services.stock import bulk_adjust_stock
+from .services.sync import SyncTokenError, SyncTokenExpired, changes_since
+
+BULK_ADJUST_MAX_ROWS = 10000
+REORDER_DEFAULT_LIMIT = 100
+REORDER_MAX_LIMIT = 5000
+SYNC_DEFAULT_PAGE_SIZE = 200
+SYNC_MAX_PAGE_SIZE = 1000
+AUTOCOMPLETE_DEFAULT_LIMIT = 10
+AUTOCOMPLETE_MAX_LIMIT = 50
+SSE_KEEPALIVE_SECONDS = 15
+SSE_RETRY_MS = 5000
+SSE_MAX_SKUS = 1000
+STOCK_STATUSES = {value for value, _ in STOCK_STATUS_CHOICES}
+
+# Aggregated stock history (?group=...&by=...)
+HISTORY_GROUPS = ("day", "week", "month")
+HISTORY_GROUP_BY = {
+    "product": {"id": "product_id", "sku": "product__sku", "name": "product__name"},
+    "category": {"id": "product__category_id", "name": "product__category__name"},
+}
+HISTORY_MAX_BUCKETS = 5000
 
 
 class ProductViewSet(viewsets.ModelViewSet):
-    queryset = Product.objects.all().order_by("-id")
+    # Joins everything ProductSerializer reads (category name, nested inventory)
+    queryset = Product.objects.select_related("category", "inventory").order_by("-id")
     serializer_class = ProductSerializer
     permission_classes = [permissions.IsAuthenticated]
     #permission_classes = [permissions.AllowAny]
 
     lookup_field = "sku"
 
-    filter_backends = [filters.SearchFilter, filters.OrderingFilter]
+    # ?search= is indexed and annotates a relevance "rank" (see filters.py)
+    filter_backends = [ProductSearchFilter, filters.OrderingFilter]
     search_fields = ["sku", "name", "category__name"]
-    ordering_fields = ["name", "category", "id"]
+    # Only indexed, non-null columns can back the keyset cursor (see pagination.py)
+    ordering_fields = ["name", "id", "updated_at"]
+    ordering = "-id"
+    keyset_fields = ("id", "name", "updated_at", "rank")
+
+    def get_serializer_context(self):
+        return {**super().get_serializer_context(), "image_size": _image_size_param(self.request)}
 
     def get_queryset(self):
         queryset = super().get_queryset()
+        # Search results come most relevant first unless ?ordering= says otherwise
+        searching = ProductSearchFilter().search_terms(self.request)
+        if searching and not self.request.query_params.get(filters.OrderingFilter.ordering_param):
+            self.ordering = "-rank"
+
         category = self.request.query_params.get("category")
         if category:
-            queryset = queryset.filter(category__iexact=category)
+            queryset = queryset.filter(category__name__iexact=category)
 
+        # stock_status is stored per inventory (own threshold) and partially indexed
         status_param = self.request.query_params.get("status")
-        if status_param == "in_stock":
-            queryset = queryset.filter(inventory__total_stock__gt=10)
-        elif status_param == "low_stock":
-            queryset = queryset.filter(
-                inventory__total_stock__gt=0, inventory__total_stock__lte=10
-            )
-        elif status_param == "out_of_stock":
-            queryset = queryset.filter(inventory__total_stock=0)
+        if status_param:
+            if status_param not in STOCK_STATUSES:
+                raise ValidationError({"status": f"Use one of: {', '.join(sorted(STOCK_STATUSES))}."})
+            queryset = queryset.filter(inventory__stock_status=status_param)
 
         return queryset
 
     def partial_update(self, request, *args, **kwargs):
         """
         PATCH /products/{sku}/
-        - If payload has "quantity" → delegate to ProductQuantityUpdateSerializer
+        - If payload has "quantity" or "delta" → delegate to ProductQuantityUpdateSerializer
         - Else → fall back to normal ProductSerializer
         """
         instance = self.get_object()
 
-        if "quantity" in request.data:
+        if "quantity" in request.data or "delta" in request.data:
             serializer = ProductQuantityUpdateSerializer(
                 instance, data=request.data, partial=True
             )
             serializer.is_valid(raise_exception=True)
             updated_product = serializer.save()
-            return Response(ProductSerializer(updated_product).data, status=status.HTTP_200_OK)
+            return Response(ProductSerializer(updated_product, context=self.get_serializer_context()).data,
+                            status=status.HTTP_200_OK)
 
         # default behavior for other fields
         return super().partial_update(request, *args, **kwargs)
 
+    @action(detail=True, methods=["get"])
+    def movements(self, request, sku=None):
+        """
+        GET /products/{sku}/movements/ (optional ?since=&until=, ISO date or datetime)
+        Newest first, keyset-paginated on the (product, created_at) index.
+        """
+        product = self.get_object()
+        queryset = StockMovement.objects.filter(product=product)
+        since, until = _datetime_param(request, "since", end_of_day=False), _datetime_param(request, "until")
+        if since:
+            queryset = queryset.filter(created_at__gte=since)
+        if until:
+            queryset = queryset.filter(created_at__lte=until)
+
+        paginator = KeysetPagination()
+        paginator.ordering = "-created_at"
+        paginator.keyset_fields = ("created_at",)
+        page = paginator.paginate_queryset(queryset, request)
+        return paginator.get_paginated_response(StockMovementSerializer(page, many=True).data)
+
+    @action(detail=True, methods=["get"], url_path="stock-at")
+    def stock_at(self, request, sku=None):
+        """
+        GET /products/{sku}/stock-at/?at=<ISO date or datetime>
+        Stock as of a point in time: nearest snapshot + movements since.
+        """
+        product = self.get_object()
+        when = _datetime_param(request, "at") or timezone.now()
+        return Response({"sku": product.sku, "at": when, **stock_at(product.pk, when)}, status=status.HTTP_200_OK)
+
+    @action(detail=False, methods=["get"])
+    def export(self, request):
+        """
+        GET /products/export/?file_format=csv|xlsx (plus the list filters ?category=, ?status=)
+        The catalog in the importer's columns. CSV streams rows from a
+        server-side cursor; XLSX is built in a temporary file, then streamed.
+        """
+        fmt = request.query_params.get("file_format", "csv")
+        if fmt not in catalog.SUPPORTED_FORMATS:
+            raise ValidationError({"file_format": f"Use one of: {', '.join(catalog.SUPPORTED_FORMATS)}."})
+        queryset = self.get_queryset()
+        filename = f"catalog-{timezone.localdate().isoformat()}.{fmt}"
+
+        if fmt == "csv":
+            response = StreamingHttpResponse(catalog.export_csv(queryset), content_type="text/csv")
+            response["Content-Disposition"] = f'attachment; filename="{filename}"'
+            return response
+        target = tempfile.TemporaryFile()
+        catalog.export_xlsx(target, queryset)
+        target.seek(0)
+        return FileResponse(target, as_attachment=True, filename=filename)
+
+    @action(detail=False, methods=["post"], url_path="import", parser_classes=[MultiPartParser])
+    def import_catalog(self, request):
+        """
+        POST /products/import/ (multipart: file=<catalog>, optional format=csv|xlsx)
+        Upserts products by SKU with their categories, suppliers and
+        inventories, in chunks, and returns the import report.
+        """
+        upload = request.FILES.get("file")
+        if upload is None:
+            return Response({"error": "Missing 'file' upload."}, status=status.HTTP_400_BAD_REQUEST)
+
+        fmt = request.data.get("format") or catalog.detect_format(upload.name)
+        if fmt not in catalog.SUPPORTED_FORMATS:
+            return Response(
+                {"error": f"Unsupported format '{fmt}'. Use one of: {', '.join(catalog.SUPPORTED_FORMATS)}"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        try:
+            report = catalog.import_catalog(upload.file, fmt)
+        except ValueError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(report, status=status.HTTP_200_OK)
+
+    @action(detail=False, methods=["get"])
+    def autocomplete(self, request):
+        """
+        GET /products/autocomplete/?q=<text> (optional ?limit=<n>)
+        Exact, then prefix, then fuzzy matches on name / SKU from the
+        in-process name index (no database query).
+        """
+        query = request.query_params.get("q", "").strip()
+        try:
+            limit = int(request.query_params.get("limit", AUTOCOMPLETE_DEFAULT_LIMIT))
+        except ValueError:
+            raise ValidationError({"detail": "'limit' must be an integer."})
+        limit = max(1, min(limit, AUTOCOMPLETE_MAX_LIMIT))
+
+        matches = get_name_index().search(query, limit=limit) if query else []
+        return Response({"query": query, "results": [match.as_dict() for match in matches]}, status=status.HTTP_200_OK)
+
 
 class InventoryViewSet(viewsets.ModelViewSet):
-    queryset = Inventory.objects.select_related("product").all()
+    # InventorySerializer nests ProductSerializer; product.inventory is filled
+    # from the same join, so only the category needs an extra one
+    queryset = Inventory.objects.select_related("product__category")
     serializer_class = InventorySerializer
     permission_classes = [permissions.IsAuthenticated]
     #permission_classes = [permissions.AllowAny]
 
+    filter_backends = [filters.OrderingFilter]
+    ordering_fields = ["id", "updated_at"]
+    ordering = "-id"
+    keyset_fields = ("id", "updated_at")
+
+    def get_serializer_context(self):
+        return {**super().get_serializer_context(), "image_size": _image_size_param(self.request)}
+
+    @action(detail=False, methods=["get"])
     def summary(self, request):
-        data = Inventory.objects.aggregate(
-            stock_in=Coalesce(Sum("stock_in"), Value(0, output_field=IntegerField())),
-            stock_out=Coalesce(Sum("stock_out"), Value(0, output_field=IntegerField())),
-            total_stock=Coalesce(Sum("total_stock"), Value(0, output_field=IntegerField())),
-            average_daily_sales=Coalesce(
-                Avg("average_daily_sales"),
-                Value(0, output_field=DecimalField(max_digits=10, decimal_places=2)),
-            ),
-        )
-        serializer = InventorySummarySerializer(data)
+        """
+        GET /inventory/summary/ (optional ?category=<name>)
+        Reads one pre-aggregated InventoryTotals row instead of scanning Inventory.
+        """
+        key = InventoryTotals.GLOBAL_KEY
+        category_name = request.query_params.get("category")
+        if category_name:
+            category = Category.objects.filter(name__iexact=category_name).first()
+            if category is None:
+                return Response({"error": "Category not found."}, status=status.HTTP_404_NOT_FOUND)
+            key = InventoryTotals.key_for(category.pk)
+
+        serializer = InventorySummarySerializer(read_totals(key))
         return Response(serializer.data, status=status.HTTP_200_OK)
 
+    @action(detail=False, methods=["get"])
+    def reorder(self, request):
+        """
+        GET /inventory/reorder/ (optional ?within=<days>, ?supplier=<name>, ?limit=<n>)
+        Days of cover, reorder point and must-order-by date per SKU, most
+        urgent first. Computed for the whole catalog in one NumPy pass and cached
+        until the next inventory write.
+        """
+        try:
+            within = int(request.query_params["within"]) if "within" in request.query_params else None
+            limit = int(request.query_params.get("limit", REORDER_DEFAULT_LIMIT))
+        except ValueError:
+            raise ValidationError({"detail": "'within' and 'limit' must be integers."})
+        limit = max(1, min(limit, REORDER_MAX_LIMIT))
+
+        report = get_reorder_report()
+        overdue = report["order_in_days"] < 0
+        mask = None
+        if within is not None:
+            mask = due_mask(report, within)
+        supplier = request.query_params.get("supplier")
+        if supplier:
+            supplier_ids = list(Supplier.objects.filter(name__iexact=supplier).values_list("id", flat=True))
+            matches = supplier_mask(report, supplier_ids)
+            mask = matches if mask is None else mask & matches
+
+        return Response({
+            "as_of": report["as_of"],
+            "generated_at": report["generated_at"],
+            "sku_count": len(report["product_id"]),
+            "overdue_count": int(overdue.sum()),
+            "matching_count": len(report["product_id"]) if mask is None else int(mask.sum()),
+            "results": report_rows(report, mask, limit),
+        }, status=status.HTTP_200_OK)
+
+    @action(detail=False, methods=["post"], url_path="bulk-adjust")
+    def bulk_adjust(self, request):
+        """
+        POST /inventory/bulk-adjust/
+        Body: [{"sku": "...", "quantity": 10}, {"sku": "...", "delta": -2}, ...]
+        Applies all rows in one transaction and returns a result per row.
+        """
+        serializer = StockAdjustmentSerializer(
+            data=request.data, many=True, allow_empty=False, max_length=BULK_ADJUST_MAX_ROWS
+        )
+        serializer.is_valid(raise_exception=True)
+        results = bulk_adjust_stock(serializer.validated_data)
+        failed = sum(1 for r in results if r["status"] == "error")
+        return Response(
+            {"updated": len(results) - failed, "failed": failed, "results": results},
+            status=status.HTTP_200_OK,
+        )
+
 class StockHistoryViewSet(viewsets.ReadOnlyModelViewSet):
     permission_classes = [permissions.AllowAny]
     """
     Provides read-only access to stock/sales history.
     GET /api/stock/history/
+
+    Filters: ?date_from=YYYY-MM-DD, ?date_to=YYYY-MM-DD (inclusive),
+    ?sku=<sku>[,<sku>...], ?category=<name>.
+    Raw rows are keyset-paginated on (date, id), newest first.
+    ?group=day|week|month&by=product|category returns bucketed sums instead.
     """
-    queryset = SalesHistory.objects.select_related("product").order_by("-date")[:50]
+    queryset = SalesHistory.objects.select_related("product__category")
     serializer_class = SalesHistorySerializer
+
+    filter_backends = [filters.OrderingFilter]
+    ordering_fields = ["date", "id"]
+    ordering = "-date"
+    keyset_fields = ("date", "id")
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        params = self.request.query_params
+
+        date_from = self._date_param("date_from")
+        if date_from:
+            queryset = queryset.filter(date__gte=date_from)
+        date_to = self._date_param("date_to")
+        if date_to:
+            queryset = queryset.filter(date__lte=date_to)
+
+        skus = [sku.strip() for sku in params.get("sku", "").split(",") if sku.strip()]
+        if skus:
+            queryset = queryset.filter(product__sku__in=skus)
+
+        category = params.get("category")
+        if category:
+            queryset = queryset.filter(product__category__name__iexact=category)
+        return queryset
+
+    def list(self, request, *args, **kwargs):
+        if "group" not in request.query_params:
+            return super().list(request, *args, **kwargs)
+
+        group = request.query_params.get("group")
+        by = request.query_params.get("by", "product")
+        if group not in HISTORY_GROUPS or by not in HISTORY_GROUP_BY:
+            raise ValidationError({
+                "group": f"Use group={'|'.join(HISTORY_GROUPS)} and by={'|'.join(HISTORY_GROUP_BY)}."
+            })
+
+        rollups = self._rollup_queryset(group, by)
+        if rollups is not None:
+            buckets, keys = rollups
+        else:
+            keys = HISTORY_GROUP_BY[by]
+            period = F("date") if group == "day" else Trunc("date", group, output_field=DateField())
+            buckets = (
+                self.get_queryset()
+                .order_by()
+                .annotate(period=period)
+                .values("period", *keys.values())
+                .annotate(units_sold=Sum("units_sold"), sales_days=Count("id"))
+            )
+        buckets = list(buckets.order_by("-period", keys["id"])[:HISTORY_MAX_BUCKETS + 1])
+        truncated = len(buckets) > HISTORY_MAX_BUCKETS
+        results = [
+            {
+                "period": bucket["period"].isoformat(),
+                **{name: bucket[lookup] for name, lookup in keys.items()},
+                "units_sold": bucket["units_sold"],
+                "sales_days": bucket["sales_days"],
+            }
+            for bucket in buckets[:HISTORY_MAX_BUCKETS]
+        ]
+        return Response(
+            {"group": group, "by": by, "truncated": truncated, "results": results},
+            status=status.HTTP_200_OK,
+        )
+
+    def _rollup_queryset(self, group, by):
+        """
+        ``(buckets, keys)`` for week/month straight from the rollup tables, or
+        None when the grain or a date bound that splits a period needs raw rows.
+        """
+        if group not in ("week", "month"):
+            return None
+        date_from, date_to = self._date_param("date_from"), self._date_param("date_to")
+        if date_from and rollup_period_start(date_from, group) != date_from:
+            return None
+        if date_to and rollup_period_start(date_to + timedelta(days=1), group) != date_to + timedelta(days=1):
+            return None
+
+        params = self.request.query_params
+        skus = [sku.strip() for sku in params.get("sku", "").split(",") if sku.strip()]
+        category = params.get("category")
+
+        if by == "category" and not skus:
+            rollups = CategorySalesRollup.objects.filter(grain=group)
+            if category:
+                rollups = rollups.filter(category__name__iexact=category)
+            keys = {"id": "category_id", "name": "category__name"}
+        else:
+            rollups = ProductSalesRollup.objects.filter(grain=group)
+            if skus:
+                rollups = rollups.filter(product__sku__in=skus)
+            if category:
+                rollups = rollups.filter(product__category__name__iexact=category)
+            keys = HISTORY_GROUP_BY[by]
+
+        if date_from:
+            rollups = rollups.filter(period_start__gte=date_from)
+        if date_to:
+            rollups = rollups.filter(period_start__lte=date_to)
+        buckets = (
+            rollups.order_by()
+            .annotate(period=F("period_start"))
+            .values("period", *keys.values())
+            .annotate(units_sold=Sum("units_sold"), sales_days=Sum("sales_days"))
+        )
+        return buckets, keys
+
+    def _date_param(self, name):
+        value = self.request.query_params.get(name)
+        if not value:
+            return None
+        try:
+            parsed = parse_date(value)
+        except ValueError:
+            parsed = None
+        if parsed is None:
+            raise ValidationError({name: "Use YYYY-MM-DD."})
+        return parsed
+
+
+def _datetime_param(request, name, end_of_day=True):
+    """Parse an ISO datetime query parameter; a bare date means the end (or start) of that day."""
+    value = request.query_params.get(name)
+    if not value:
+        return None
+    try:
+        parsed = parse_datetime(value)
+        if parsed is None and parse_date(value):
+            parsed = datetime.combine(parse_date(value), time.max if end_of_day else time.min)
+    except ValueError:
+        parsed = None
+    if parsed is None:
+        raise ValidationError({name: "Use an ISO 8601 date or datetime."})
+    if timezone.is_naive(parsed):
+        parsed = timezone.make_aware(parsed)
+    return parsed
+
+
+def _image_size_param(request):
+    """``?image_size=`` for ProductSerializer's ``image`` field (default "original")."""
+    if request is None:
+        return "original"
+    size = request.query_params.get("image_size") or "original"
+    if size not in IMAGE_SIZE_NAMES:
+        raise ValidationError({"image_size": f"Use one of: {', '.join(IMAGE_SIZE_NAMES)}."})
+    return size
+
+
+def serve_image_variant(request, path):
+    """
+    Development server for MEDIA_ROOT/products/variants/ with far-future
+    cache headers (file names are content-hashed). In production serve that
+    directory from the web server with the same Cache-Control header.
+    """
+    response = serve(request, path, document_root=os.path.join(settings.MEDIA_ROOT, VARIANT_DIR))
+    response["Cache-Control"] = CACHE_CONTROL
+    return response
+
+
+class SalesHistoryImportView(APIView):
+    """
+    POST /api/sales/import/ (multipart: file=<export>, optional format=csv|ndjson)
+    Streams a POS export into SalesHistory and returns the import report.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+    parser_classes = [MultiPartParser]
+
+    def post(self, request):
+        upload = request.FILES.get("file")
+        if upload is None:
+            return Response({"error": "Missing 'file' upload."}, status=status.HTTP_400_BAD_REQUEST)
+
+        fmt = request.data.get("format") or detect_format(upload.name)
+        if fmt not in SUPPORTED_FORMATS:
+            return Response(
+                {"error": f"Unsupported format '{fmt}'. Use one of: {', '.join(SUPPORTED_FORMATS)}"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        try:
+            report = import_sales_history(upload.file, fmt)
+        except ValueError as e:  # Undecodable bytes or unreadable CSV, reported with the line number
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(report, status=status.HTTP_200_OK)
+
+
+class SyncView(APIView):
+    """
+    GET /api/sync/?since=<token> (optional ?page_size=<n>, ?image_size=<size>)
+    Products, inventories and deletions changed since the token, paged by
+    (updated_at, id). Omit `since` for the first sync; keep calling with the
+    returned token while `has_more` is true, then store it for next time.
+    410 means the token outlived the tombstone retention: sync from scratch.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request):
+        try:
+            page_size = int(request.query_params.get("page_size", SYNC_DEFAULT_PAGE_SIZE))
+        except ValueError:
+            raise ValidationError({"page_size": "Must be an integer."})
+        page_size = max(1, min(page_size, SYNC_MAX_PAGE_SIZE))
+        context = {"request": request, "image_size": _image_size_param(request)}
+
+        try:
+            changes = changes_since(request.query_params.get("since") or None, page_size)
+        except SyncTokenError as e:
+            raise ValidationError({"since": str(e)})
+        except SyncTokenExpired as e:
+            return Response({"detail": str(e), "code": "full_sync_required"}, status=status.HTTP_410_GONE)
+
+        return Response({
+            "full": changes["full"],
+            "products": ProductSerializer(changes["products"], many=True, context=context).data,
+            "inventories": InventorySyncSerializer(changes["inventories"], many=True).data,
+            "deleted": TombstoneSerializer(changes["deleted"], many=True).data,
+            "token": changes["token"],
+            "has_more": changes["has_more"],
+        }, status=status.HTTP_200_OK)
+
+
+def _authenticate_stream(request):
+    """
+    JWT user for a plain (non-DRF) view: the Authorization header, or
+    ?access_token= since browsers' EventSource cannot send headers.
+    """
+    auth = JWTAuthentication()
+    try:
+        raw_token = request.GET.get("access_token")
+        if raw_token:
+            return auth.get_user(auth.get_validated_token(raw_token))
+        result = auth.authenticate(request)
+    except (InvalidToken, AuthenticationFailed):
+        return None
+    return result[0] if result else None
+
+
+def _stream_filters(request):
+    """``(category_ids, skus)`` from ?category=<name>[,<name>...] and ?sku=<sku>[,<sku>...]; None = all."""
+    category_ids = skus = None
+    names = [name.strip() for name in request.GET.get("category", "").split(",") if name.strip()]
+    if names:
+        query = Q()
+        for name in names:
+            query |= Q(name__iexact=name)
+        category_ids = set(Category.objects.filter(query).values_list("pk", flat=True))
+        if not category_ids:
+            raise ValidationError({"category": "No category matches."})
+    sku_values = {sku.strip() for sku in request.GET.get("sku", "").split(",") if sku.strip()}
+    if len(sku_values) > SSE_MAX_SKUS:
+        raise ValidationError({"sku": f"At most {SSE_MAX_SKUS} SKUs per stream."})
+    if sku_values:
+        skus = sku_values
+    return category_ids, skus
+
+
+def _sse(event_type, data):
+    return f"event: {event_type}\ndata: {json.dumps(data, separators=(',', ':'))}\n\n"
+
+
+@require_GET
+async def stock_events_stream(request):
+    """
+    GET /api/stock/events/ (text/event-stream; optional ?category=<name>[,...], ?sku=<sku>[,...])
+    Pushes `stock_change` and `low_stock` events as inventory writes commit.
+    Reconnect with /api/sync/ to catch up on anything missed while away;
+    a `resync` event means this client fell too far behind and was dropped.
+    Only served through the ASGI entry point (backend.asgi): under WSGI the
+    stream would pin a worker thread and never flush, so it answers 501.
+    """
+    if not isinstance(request, ASGIRequest):
+        return JsonResponse(
+            {"detail": "Live stock events need the ASGI server (uvicorn backend.asgi:application)."}, status=501
+        )
+    user = await sync_to_async(_authenticate_stream)(request)
+    if user is None or not user.is_active:
+        return JsonResponse({"detail": "Authentication credentials were not provided or are invalid."}, status=401)
+    try:
+        category_ids, skus = await sync_to_async(_stream_filters)(request)
+    except ValidationError as e:
+        return JsonResponse(e.detail, status=400)
+
+    queue = asyncio.Queue(maxsize=MAX_QUEUED_EVENTS + 1)
+    subscription = Subscription(asyncio.get_running_loop(), queue, category_ids, skus)
+
+    async def events():
+        subscribe(subscription)
+        try:
+            yield f"retry: {SSE_RETRY_MS}\n\n"
+            while True:
+                try:
+                    event = await asyncio.wait_for(queue.get(), SSE_KEEPALIVE_SECONDS)
+                except asyncio.TimeoutError:
+                    yield ": keepalive\n\n"
+                    continue
+                # Send whatever else is already queued in the same chunk
+                batch = [event]
+                while not queue.empty():
+                    batch.append(queue.get_nowait())
+                frames = []
+                for event in batch:
+                    if event is None:
+                        frames.append(_sse("resync", {"detail": "Too many pending events; sync via /api/sync/."}))
+                        break
+                    frames.append(_sse(event["type"], event))
+                yield "".join(frames)
+                if subscription.overflowed:
+                    return
+        finally:
+            unsubscribe(subscription)
+
+    response = StreamingHttpResponse(events(), content_type="text/event-stream")
+    response["Cache-Control"] = "no-cache"
+    response["X-Accel-Buffering"] = "no"  # nginx: pass frames through unbuffered
+    return response
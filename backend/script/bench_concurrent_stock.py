@@ -0,0 +1,122 @@
+"""Concurrency benchmark: hammer one hot SKU with stock PATCHes from many threads.
+
+Checks that no update is lost and reports throughput. Run against a server
+backed by PostgreSQL (SQLite serialises writers and mostly measures lock waits):
+
+    python manage.py runserver --noreload   # or gunicorn with several workers
+    python script/bench_concurrent_stock.py --email admin@example.com --password secret --sku SKU-001
+
+Modes:
+    delta     PATCH {"delta": +/-n}  (conditional UPDATE, no read)
+    quantity  GET the stock, PATCH {"quantity": stock + n}  (client-side read-modify-write;
+              shows the lost updates clients get when they do not send deltas)
+"""
+import argparse
+import random
+import statistics
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+parser.add_argument("--url", default="http://localhost:8000", help="Server base URL")
+parser.add_argument("--email", required=True)
+parser.add_argument("--password", required=True)
+parser.add_argument("--sku", required=True, help="The hot SKU every thread writes to")
+parser.add_argument("--threads", type=int, default=16)
+parser.add_argument("--requests", type=int, default=50, help="PATCHes per thread")
+parser.add_argument("--mode", choices=["delta", "quantity"], default="delta")
+args = parser.parse_args()
+
+API = f"{args.url.rstrip('/')}/api"
+PRODUCT_URL = f"{API}/products/{args.sku}/"
+
+
+def login():
+    response = requests.post(f"{API}/token/", json={"email": args.email, "password": args.password}, timeout=10)
+    response.raise_for_status()
+    return {"Authorization": f"Bearer {response.json()['access']}"}
+
+
+def current_stock(session):
+    response = session.get(PRODUCT_URL, timeout=10)
+    response.raise_for_status()
+    return response.json()["inventory"]["total_stock"]
+
+
+HEADERS = login()
+local = threading.local()
+
+
+def session():
+    if not hasattr(local, "session"):
+        local.session = requests.Session()
+        local.session.headers.update(HEADERS)
+    return local.session
+
+
+def worker(seed):
+    """Send ``--requests`` PATCHes; return (units applied, latencies, failed status codes)."""
+    rng = random.Random(seed)
+    applied, latencies, failures = 0, [], Counter()
+    for _ in range(args.requests):
+        # Mostly receipts so the SKU never runs dry; a few sales to exercise the conditional path
+        units = rng.choice([1, 2, 3, -1])
+        start = time.perf_counter()
+        if args.mode == "delta":
+            payload = {"delta": units, "reference": "bench"}
+        else:
+            payload = {"quantity": max(0, current_stock(session()) + units), "reference": "bench"}
+        response = session().patch(PRODUCT_URL, json=payload, timeout=30)
+        latencies.append(time.perf_counter() - start)
+        if response.status_code == 200:
+            applied += units
+        else:
+            failures[response.status_code] += 1
+    return applied, latencies, failures
+
+
+print("\n" + "=" * 60)
+print(f"CONCURRENT STOCK BENCHMARK ({args.mode} mode)")
+print("=" * 60)
+
+admin = requests.Session()
+admin.headers.update(HEADERS)
+before = current_stock(admin)
+print(f"\nSKU {args.sku}: {before} on hand; {args.threads} threads x {args.requests} PATCHes")
+
+start = time.perf_counter()
+with ThreadPoolExecutor(max_workers=args.threads) as pool:
+    results = list(pool.map(worker, range(args.threads)))
+elapsed = time.perf_counter() - start
+
+applied = sum(r[0] for r in results)
+latencies = sorted(latency for r in results for latency in r[1])
+failures = sum((r[2] for r in results), Counter())
+after = current_stock(admin)
+expected = before + applied
+ledger = admin.get(f"{PRODUCT_URL}stock-at/", timeout=10).json()["total_stock"]
+
+print(f"\n⏱  {len(latencies)} requests in {elapsed:.2f}s → {len(latencies) / elapsed:.0f} req/s")
+print(f"   latency p50 {statistics.median(latencies) * 1000:.1f} ms, "
+      f"p95 {latencies[int(len(latencies) * 0.95) - 1] * 1000:.1f} ms, max {latencies[-1] * 1000:.1f} ms")
+if failures:
+    # 400 = insufficient stock for a removal; anything else is worth a look in the server log
+    print(f"   rejected: {', '.join(f'{count} x HTTP {code}' for code, count in sorted(failures.items()))}")
+
+if args.mode == "delta":
+    if after == expected:
+        print(f"\n✅ No lost updates: {before} + {applied} = {after}")
+    else:
+        print(f"\n❌ Lost updates: expected {expected}, found {after} ({expected - after:+d} units missing)")
+else:
+    print(f"\nℹ️  Client-side read-modify-write: expected {expected}, found {after} "
+          f"({expected - after:+d} units lost between GET and PATCH)")
+
+if ledger == after:
+    print(f"✅ Movement ledger agrees with the inventory counters ({ledger})")
+else:
+    print(f"❌ Movement ledger says {ledger}, inventory says {after}")
@@ -0,0 +1,121 @@
+"""Product search benchmark: p50/p95 latency of GET /api/products/?search= before and after indexing.
+
+"Before" is the stock DRF SearchFilter (unindexed LIKE '%term%' on sku, name
+and category name); "after" is ProductSearchFilter (search vector + pg_trgm
+GIN indexes on PostgreSQL, ranked). Both run the full list view in-process,
+pagination included. On SQLite both are table scans, so expect no gain there.
+
+    python script/bench_product_search.py --seed 100000   # add BENCH- products once
+    python script/bench_product_search.py                 # measure
+    python script/bench_product_search.py --cleanup       # remove BENCH- products
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "backend.settings")
+
+import django
+
+django.setup()
+
+from django.contrib.auth import get_user_model
+from rest_framework import filters
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from product_app.models import Category, Product
+from product_app.services.search_index import rebuild_search_index, search_enabled
+from product_app.views import ProductViewSet
+
+parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+parser.add_argument("--seed", type=int, default=0, help="Create this many BENCH- products first")
+parser.add_argument("--cleanup", action="store_true", help="Delete the BENCH- products and exit")
+parser.add_argument("--runs", type=int, default=20, help="Requests per search term")
+args = parser.parse_args()
+
+PREFIX = "BENCH-"
+ADJECTIVES = ["classic", "slim", "organic", "wireless", "vintage", "compact", "deluxe", "waterproof"]
+NOUNS = ["jacket", "sneaker", "backpack", "headphones", "lamp", "kettle", "blender", "notebook"]
+COLOURS = ["black", "navy", "olive", "crimson", "ivory", "teal"]
+# Full words, prefixes, a SKU fragment, a multi-word query and a miss
+TERMS = ["jacket", "wirel", "navy lamp", "BENCH-0004", "organic kettle teal", "zzzz-no-match"]
+
+
+def seed(count):
+    categories = [Category.objects.get_or_create(name=f"{PREFIX}{noun}")[0] for noun in NOUNS]
+    rng = random.Random(42)
+    start = Product.objects.filter(sku__startswith=PREFIX).count()
+    batch = []
+    for i in range(start, start + count):
+        noun = rng.choice(NOUNS)
+        batch.append(Product(
+            sku=f"{PREFIX}{i:07d}",
+            name=f"{rng.choice(ADJECTIVES).title()} {rng.choice(COLOURS)} {noun}",
+            category=categories[NOUNS.index(noun)],
+        ))
+        if len(batch) == 5000:
+            Product.objects.bulk_create(batch)
+            batch = []
+    Product.objects.bulk_create(batch)
+    # bulk_create skips the post_save signal that maintains search vectors
+    if search_enabled():
+        rebuild_search_index()
+    print(f"Seeded {count} products")
+
+
+class BeforeViewSet(ProductViewSet):
+    filter_backends = [filters.SearchFilter, filters.OrderingFilter]
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        self.ordering = "-id"  # No rank without ProductSearchFilter
+        return queryset
+
+
+def measure(view, user, term):
+    factory = APIRequestFactory()
+    latencies = []
+    for _ in range(args.runs):
+        request = factory.get("/api/products/", {"search": term})
+        force_authenticate(request, user=user)
+        start = time.perf_counter()
+        response = view(request)
+        response.render()
+        latencies.append(time.perf_counter() - start)
+        assert response.status_code == 200, response.status_code
+    return latencies
+
+
+if args.cleanup:
+    deleted, _ = Product.objects.filter(sku__startswith=PREFIX).delete()
+    Category.objects.filter(name__startswith=PREFIX).delete()
+    print(f"Deleted {deleted} rows")
+    sys.exit(0)
+if args.seed:
+    seed(args.seed)
+
+user = get_user_model().objects.filter(is_superuser=True).first() or get_user_model().objects.first()
+if user is None:
+    sys.exit("Create a user first (manage.py createsuperuser)")
+
+views = {
+    "before (SearchFilter)": BeforeViewSet.as_view({"get": "list"}),
+    "after (ProductSearchFilter)": ProductViewSet.as_view({"get": "list"}),
+}
+
+print("\n" + "=" * 60)
+print("PRODUCT SEARCH BENCHMARK")
+print("=" * 60)
+print(f"\n{Product.objects.count()} products; indexed search "
+      f"{'enabled (PostgreSQL)' if search_enabled() else 'disabled (LIKE fallback)'}; {args.runs} runs per term")
+
+for label, view in views.items():
+    measure(view, user, TERMS[0])  # Warm caches and connections
+    latencies = sorted(latency for term in TERMS for latency in measure(view, user, term))
+    print(f"\n{label}")
+    print(f"   p50 {statistics.median(latencies) * 1000:.1f} ms, "
+          f"p95 {latencies[int(len(latencies) * 0.95) - 1] * 1000:.1f} ms, max {latencies[-1] * 1000:.1f} ms")
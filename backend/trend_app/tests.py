@@ -1,3 +1,33 @@
 from django.test import TestCase
 
-# Create your tests here.
+from backend.testing import QueryBudgetMixin
+from .models import TrendItem
+
+
+class TrendQueryBudgetTests(QueryBudgetMixin, TestCase):
+    """The trend views read TrendItem once; the rest is the pickled model."""
+
+    @classmethod
+    def setUpTestData(cls):
+        TrendItem.objects.bulk_create([
+            TrendItem(season="christmas" if i % 2 else "summer", keyword=f"keyword {i}", source="test")
+            for i in range(50)
+        ])
+
+    def test_trend_list(self):
+        with self.assertQueryBudget(1):
+            response = self.client.get("/api/trends/?season=christmas")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data["predictions"]), 25)
+
+    def test_trend_predictions(self):
+        with self.assertQueryBudget(1):
+            response = self.client.get("/api/trends/predict/")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data["predictions"]), 50)
+
+    def test_trend_forecast(self):
+        with self.assertQueryBudget(1):
+            response = self.client.get("/api/trends/forecast/")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data["forecast"]), 50)
@@ -0,0 +1,33 @@
+import 'dart:convert';
+
+import 'package:http/http.dart' as http;
+
+/// Largest page the list endpoints serve (KeysetPagination.max_page_size).
+const int maxPageSize = 500;
+
+/// GET every page of a cursor-paginated list endpoint
+/// ({ "next", "previous", "results" }) by following `next`, and return all
+/// rows. A plain JSON list (unpaginated endpoint) is returned as is.
+Future<List<dynamic>> fetchAllPages(
+  Uri uri,
+  Future<http.Response> Function(Uri uri) get, {
+  String what = 'list',
+}) async {
+  final rows = <dynamic>[];
+  Uri? next = uri.replace(queryParameters: {...uri.queryParameters, 'page_size': '$maxPageSize'});
+  while (next != null) {
+    final response = await get(next);
+    if (response.statusCode != 200) {
+      throw Exception('Failed to load $what: ${response.statusCode} ${response.body}');
+    }
+    final dynamic body = json.decode(response.body);
+    if (body is List<dynamic>) {
+      return rows..addAll(body);
+    }
+    final page = body as Map<String, dynamic>;
+    rows.addAll(page['results'] as List<dynamic>);
+    final link = page['next'] as String?;
+    next = link == null ? null : Uri.parse(link);
+  }
+  return rows;
+}
@@ -1,6 +1,6 @@
-import 'dart:convert';
 import 'package:http/http.dart' as http;
 import 'package:flutter_secure_storage/flutter_secure_storage.dart';
+import 'package:mobile/common/helper/pagination/fetch_all_pages.dart';
 import 'package:mobile/data/inventory/models/inventory_model.dart';
 
 
@@ -29,17 +29,14 @@ class InventoryRemoteDataSourceImpl implements InventoryRemoteDataSource {
   @override
   Future<List<InventoryModel>> getInventory() async {
     try {
-      final response = await http.get(
-        Uri.parse('${baseUrl}inventory/'), 
-        headers: await _getHeaders(),
+      final headers = await _getHeaders();
+      // Paginated ({ "next", "results" }): follow every page, the totals need all rows
+      final data = await fetchAllPages(
+        Uri.parse('${baseUrl}inventory/'),
+        (uri) => http.get(uri, headers: headers),
+        what: 'inventory',
       );
-
-      if (response.statusCode == 200) {
-        final List<dynamic> data = json.decode(response.body);
-        return data.map((e) => InventoryModel.fromJson(e)).toList();
-      } else {
-        throw Exception('Failed to fetch inventory: ${response.body}');
-      }
+      return data.map((e) => InventoryModel.fromJson(e)).toList();
     } catch (e) {
       throw Exception('Error fetching inventory: $e');
     }
@@ -1,5 +1,6 @@
 import 'dart:convert';
 import 'package:http/http.dart' as http;
+import 'package:mobile/common/helper/pagination/fetch_all_pages.dart';
 import 'package:mobile/data/product/models/product_model.dart';
 import 'package:flutter_secure_storage/flutter_secure_storage.dart';
 
@@ -20,20 +21,19 @@ class ProductRemoteDataSource {
   Future<List<ProductModel>> fetchProducts() async {
     final token = await _getToken();
     final uri = Uri.parse('${baseUrl}products/');
-    final response = await client.get(
+    // Cursor-paginated ({ "next", "previous", "results" }): follow every page
+    final decoded = await fetchAllPages(
       uri,
-      headers: {
-        'Accept': 'application/json',
-        if (token != null) 'Authorization': 'Bearer $token',
-      },
+      (page) => client.get(
+        page,
+        headers: {
+          'Accept': 'application/json',
+          if (token != null) 'Authorization': 'Bearer $token',
+        },
+      ),
+      what: 'products',
     );
-
-    if (response.statusCode == 200) {
-      final List<dynamic> decoded = json.decode(response.body) as List<dynamic>;
-      return decoded.map((e) => ProductModel.fromJson(e as Map<String, dynamic>)).toList();
-    } else {
-      throw Exception('Failed to load products: ${response.statusCode} ${response.body}');
-    }
+    return decoded.map((e) => ProductModel.fromJson(e as Map<String, dynamic>)).toList();
   }
 
   /// PATCH /api/products/{sku}/ with payload: { "quantity": int }
@@ -1,5 +1,5 @@
 import { useEffect, useState, useMemo } from "react";
-import api from "../services/api";
+import api, { fetchAllPages } from "../services/api";
 
 export interface BackendProduct {
   id: number;
@@ -81,8 +81,8 @@ export function useDashboardLogic() {
     const fetchProducts = async () => {
       setLoading(true);
       try {
-        const { data } = await api.get<BackendProduct[]>("/products/?ordering=-updated_at");
-        setProducts(data || []);
+        // Totals are summed over every product, so walk all pages
+        setProducts(await fetchAllPages<BackendProduct>("/products/?ordering=-updated_at"));
       } catch (err) {
         console.error(err);
         setError("Failed to load products");
@@ -1,5 +1,5 @@
 import { useState, useEffect, ChangeEvent } from "react";
-import api from "../services/api";
+import api, { fetchAllPages } from "../services/api";
 import { useInventory } from "../contexts/InventoryContext";
 
 export interface InventoryItem {
@@ -53,8 +53,7 @@ export function useInventoryLogic(onStockChange?: (item: HistoryItem) => void):
     const fetchItems = async () => {
       setLoading(true);
       try {
-        const res = await api.get("inventory/");
-        const rawItems: any[] = Array.isArray(res.data) ? res.data : res.data.results || [];
+        const rawItems = await fetchAllPages<any>("inventory/");
 
         const mapped: InventoryItem[] = rawItems.map((item) => ({
           inventory_id: item.id,
@@ -94,6 +94,13 @@ const UsersPage: React.FC = () => {
         data = payload as User[];
       } else if (isPaginated(payload)) {
         data = payload.results ?? [];
+        // Cursor-paginated: follow `next` so every user is listed
+        let next: string | null = payload.next ?? null;
+        while (next) {
+          const page = await api.get<PaginatedResponse<User>>(next);
+          data = data.concat(page.data.results ?? []);
+          next = page.data.next ?? null;
+        }
       } else {
         data = [payload as User];
       }
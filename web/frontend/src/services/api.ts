@@ -50,4 +50,20 @@ api.interceptors.response.use(
   }
 );
 
+// ✅ Fetch every page of a cursor-paginated list endpoint ({ next, previous, results })
+export const MAX_PAGE_SIZE = 500; // KeysetPagination.max_page_size on the backend
+
+export async function fetchAllPages<T>(url: string): Promise<T[]> {
+  const rows: T[] = [];
+  let next: string | null = `${url}${url.includes("?") ? "&" : "?"}page_size=${MAX_PAGE_SIZE}`;
+  while (next) {
+    // `next` is an absolute URL; axios skips baseURL for those
+    const { data }: { data: T[] | { results?: T[]; next?: string | null } } = await api.get(next);
+    if (Array.isArray(data)) return rows.concat(data);
+    rows.push(...(data.results ?? []));
+    next = data.next ?? null;
+  }
+  return rows;
+}
+
 export default api;
\ No newline at end of file